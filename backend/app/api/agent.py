@@ -1,6 +1,6 @@
 """Agent API routes: 2.1 agent management + 3.0 Agent Run API (spec 25)."""
 
-from core.database import SessionLocal, get_db
+from core.database import get_db
 from core.security import get_current_user, get_runtime_admin
 from fastapi import APIRouter, Depends, HTTPException, Query
 from models.records import User
@@ -8,9 +8,11 @@ from models.records import AgentDefinitionVersion, AgentTemplate
 from schemas.agent import AgentCreateRequest
 from schemas.run import RunCreateRequest
 from services.model_readiness_service import ModelReadinessService
+from services.schedule_driver import get_schedule_driver
 from services.schedule_service import ScheduleService
 from sqlalchemy.orm import Session as DBSession
 import json
+import shlex
 import uuid
 
 router = APIRouter(prefix="/agent", tags=["agent"])
@@ -35,6 +37,12 @@ def _get_runtime():
     return _runtime
 
 
+def _nudge_schedules() -> None:
+    driver = get_schedule_driver()
+    if driver is not None:
+        driver.nudge()
+
+
 def _get_engine():
     if _agent_engine is None:
         raise HTTPException(status_code=503, detail="Agent engine not initialized")
@@ -54,8 +62,16 @@ async def create_agent(
     rt = _get_runtime()
     from runtime.types import AgentConfig
     model, target = req.model, None
-    if req.model_target is not None:
-        target = ModelReadinessService(db).target_for(
+    if req.model_target is not None and req.model_target.kind == "pool":
+        from core.config import settings
+        if req.model_target.model_ref not in settings.model_pools:
+            raise HTTPException(status_code=422, detail="Selected model pool is not configured.")
+        target = {"kind": "pool", "model_ref": req.model_target.model_ref,
+                  "model_name": req.model_target.model_name, "provider_id": None}
+        model = target["model_name"]
+    elif req.model_target is not None:
+        readiness = ModelReadinessService(db)
+        target = readiness.target_for(
             user.id,
             kind=req.model_target.kind,
             model_ref=req.model_target.model_ref,
@@ -63,6 +79,14 @@ async def create_agent(
         )
         if target is None or target.get("model_name") != req.model_target.model_name:
             raise HTTPException(status_code=422, detail="Selected Agent model target is not ready for this user.")
+        extras = [pid for pid in dict.fromkeys(req.model_target.provider_ids) if pid != target.get("provider_id")]
+        if extras and target.get("kind") == "remote":
+            # every pool member must be a ready target for the same model
+            for pid in extras:
+                member = readiness.target_for(user.id, kind="remote", model_ref=req.model_target.model_ref, provider_id=pid)
+                if member is None or member.get("model_name") != target["model_name"]:
+                    raise HTTPException(status_code=422, detail="Every pooled provider must serve the selected model.")
+            target = {**target, "provider_ids": extras}
         model = target["model_name"]
     try:
         rt.create_agent(AgentConfig(
@@ -191,8 +215,13 @@ async def create_run(
         code = getattr(e, "code", None)
         if code == "AGENT_NOT_FOUND":
             raise HTTPException(status_code=404, detail=str(e))
+        if code == "RUN_QUEUE_FULL":
+            raise HTTPException(status_code=429, detail=str(e))
         raise HTTPException(status_code=400, detail=str(e))
-    return {"run_id": run.run_id, "status": run.status, "agent_id": run.agent_id}
+    return {
+        "run_id": run.run_id, "status": run.status, "agent_id": run.agent_id,
+        "queue_position": rt.queue_position(run.run_id),
+    }
 
 
 @router.get("/runs")
@@ -218,11 +247,12 @@ async def get_run(
     run_id: str,
     user: User = Depends(get_current_user),
 ):
+    rt = _get_runtime()
     try:
-        run = _get_runtime().get_run(run_id, user_id=user.id)
+        run = rt.get_run(run_id, user_id=user.id)
     except Exception as e:
         raise HTTPException(status_code=404, detail=str(e))
-    return run.to_dict()
+    return {**run.to_dict(), "queue_position": rt.queue_position(run_id)}
 
 
 @router.post("/runs/{run_id}/cancel")
@@ -281,6 +311,18 @@ async def run_events(
     return {"run_id": run_id, "events": [e.to_dict() for e in events]}
 
 
+@router.get("/runs/{run_id}/trace")
+async def run_trace(
+    run_id: str,
+    user: User = Depends(get_current_user),
+):
+    """Span tree of the run (and its delegated children) for the flame view."""
+    try:
+        return _get_runtime().run_trace(run_id, user_id=user.id)
+    except Exception as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
 @router.get("/runs/{run_id}/stream")
 async def run_stream(
     run_id: str,
@@ -315,13 +357,27 @@ async def run_stream(
 
 @router.post("/mcp/servers")
 async def register_mcp(req: dict, user: User = Depends(get_runtime_admin)):
-    """Register an MCP server; its tools land in the Tool Registry (spec 70)."""
-    name = (req or {}).get("name")
-    endpoint = (req or {}).get("endpoint")
-    if not name or not endpoint:
-        raise HTTPException(status_code=400, detail="name and endpoint required")
+    """Register an MCP server; its tools land in the Tool Registry (spec 70).
+
+    ``endpoint`` connects over HTTP; ``command`` (list or shell-style string)
+    spawns a local stdio server when ``mcp.allow_stdio_servers`` is enabled.
+    """
+    req = req or {}
+    name = req.get("name")
+    endpoint = req.get("endpoint")
+    command = req.get("command")
+    if not name or not (endpoint or command):
+        raise HTTPException(status_code=400, detail="name and endpoint (or command) required")
+    if command:
+        from core.config import settings
+        if not settings.mcp.allow_stdio_servers:
+            raise HTTPException(status_code=403, detail="stdio MCP servers are disabled by server configuration")
+        if isinstance(command, str):
+            command = shlex.split(command)
     try:
-        return await _get_runtime().register_mcp_server(name, endpoint)
+        return await _get_runtime().register_mcp_server(
+            name, endpoint, command=command or None, env=req.get("env") or None,
+        )
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"MCP register failed: {e}")
 
@@ -345,32 +401,6 @@ async def list_tools(user: User = Depends(get_current_user)):
     return {"tools": _get_runtime().list_tools()}
 
 
-async def _persistent_schedule_trigger(schedule_id: str, run_spec: dict) -> None:
-    """Create a scheduled run and write an audit record in a fresh DB session."""
-    db = SessionLocal()
-    try:
-        service = ScheduleService(db)
-        job = service.owned(int(run_spec.get("user_id") or 0), schedule_id)
-        if job is None or not job.enabled:
-            return
-        rt = _get_runtime()
-        run = rt.create_run(
-            agent_id=run_spec.get("agent_id", ""),
-            input_text=run_spec.get("input", ""),
-            user_id=job.user_id,
-            session_id=run_spec.get("session_id"),
-            metadata={**(run_spec.get("metadata") or {}), "schedule_id": schedule_id},
-            execute=True,
-        )
-        service.record_execution(job, run.run_id, "triggered")
-    except Exception as exc:
-        job = ScheduleService(db).owned(int(run_spec.get("user_id") or 0), schedule_id)
-        if job is not None:
-            ScheduleService(db).record_execution(job, None, "failed", error=exc)
-    finally:
-        db.close()
-
-
 @router.post("/schedules")
 async def create_schedule(
     req: dict,
@@ -380,7 +410,10 @@ async def create_schedule(
     """Create a disabled schedule draft; ``enabled=true`` is an explicit opt-in."""
     payload = dict(req or {})
     if "schedule_kind" not in payload:
-        payload["schedule_kind"] = "once" if payload.get("delay_seconds") is not None else "interval"
+        if payload.get("cron_expression"):
+            payload["schedule_kind"] = "cron"
+        else:
+            payload["schedule_kind"] = "once" if payload.get("delay_seconds") is not None else "interval"
     agent_id = payload.get("agent_id")
     rt = _get_runtime()
     if not agent_id or rt.get_agent(agent_id, user_id=user.id) is None:
@@ -388,8 +421,8 @@ async def create_schedule(
     try:
         job = ScheduleService(db).create_draft(user.id, payload)
         if payload.get("enabled") is True:
-            callback = lambda spec: _persistent_schedule_trigger(job.id, spec)
-            job = ScheduleService(db).enable(job, rt, callback)
+            job = ScheduleService(db).enable(job)
+            _nudge_schedules()
         return job.to_dict()
     except ValueError as exc:
         raise HTTPException(status_code=422, detail=str(exc))
@@ -417,11 +450,12 @@ async def enable_schedule(schedule_id: str, db: DBSession = Depends(get_db), use
     job = service.owned(user.id, schedule_id)
     if job is None:
         raise HTTPException(status_code=404, detail="Schedule not found")
-    callback = lambda spec: _persistent_schedule_trigger(job.id, spec)
     try:
-        return service.enable(job, _get_runtime(), callback).to_dict()
+        job = service.enable(job)
     except Exception as exc:
         raise HTTPException(status_code=400, detail=str(exc))
+    _nudge_schedules()
+    return job.to_dict()
 
 
 @router.post("/schedules/{schedule_id}/pause")
@@ -430,7 +464,7 @@ async def pause_schedule(schedule_id: str, db: DBSession = Depends(get_db), user
     job = service.owned(user.id, schedule_id)
     if job is None:
         raise HTTPException(status_code=404, detail="Schedule not found")
-    return service.pause(job, _get_runtime()).to_dict()
+    return service.pause(job).to_dict()
 
 
 @router.post("/schedules/{schedule_id}/run-now")
@@ -439,10 +473,11 @@ async def run_schedule_now(schedule_id: str, db: DBSession = Depends(get_db), us
     job = service.owned(user.id, schedule_id)
     if job is None:
         raise HTTPException(status_code=404, detail="Schedule not found")
-    spec = __import__("json").loads(job.run_spec or "{}")
     rt = _get_runtime()
-    run = rt.create_run(spec.get("agent_id", ""), spec.get("input", ""), user.id, spec.get("session_id"), {**(spec.get("metadata") or {}), "schedule_id": job.id, "trigger_kind": "manual"}, execute=True)
-    service.record_execution(job, run.run_id, "triggered", trigger_kind="manual")
+    execution = await service.fire(job, rt, trigger_kind="manual")
+    if execution.agent_run_id is None:
+        raise HTTPException(status_code=409, detail=execution.error_message or "Schedule run failed")
+    run = rt.get_run(execution.agent_run_id)
     return {"schedule_id": job.id, "run_id": run.run_id, "status": run.status}
 
 
@@ -461,7 +496,7 @@ async def cancel_schedule(job_id: str, db: DBSession = Depends(get_db), user: Us
     job = service.owned(user.id, job_id)
     if job is None:
         raise HTTPException(status_code=404, detail="Schedule not found")
-    service.delete(job, _get_runtime())
+    service.delete(job)
     return {"ok": True}
 
 
@@ -469,3 +504,10 @@ async def cancel_schedule(job_id: str, db: DBSession = Depends(get_db), user: Us
 async def runtime_metrics(user: User = Depends(get_runtime_admin)):
     """Runtime metrics snapshot (spec 49)."""
     return _get_runtime().metrics_snapshot()
+
+
+@router.get("/metrics/prometheus")
+async def runtime_metrics_prometheus(user: User = Depends(get_runtime_admin)):
+    """Runtime metrics in the Prometheus text exposition format."""
+    from fastapi.responses import PlainTextResponse
+    return PlainTextResponse(_get_runtime().metrics_prometheus(), media_type="text/plain; version=0.0.4")
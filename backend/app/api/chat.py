@@ -29,16 +29,30 @@ class ChatRequest(BaseModel):
     messages: list[ChatMessage] = Field(min_length=1, max_length=100)
     session_id: int | None = None
     provider_id: int | None = None
+    # further providers serving the same model; with provider_id they form a balanced pool
+    provider_ids: list[int] = Field(default_factory=list, max_length=8)
+    # a configured model_pools entry instead of provider_id (default: default_model_pool)
+    model_pool: str | None = Field(default=None, max_length=128)
+    temperature: float | None = Field(default=None, ge=0, le=2)
+    # None: cache temperature-0 calls only (response_cache settings); True/False forces it
+    response_cache: bool | None = None
 
 
-def _provider(db: Session, user: User, provider_id: int | None) -> dict | None:
+def _provider(db: Session, user: User, provider_id: int | None, provider_ids: list[int] | None = None) -> dict | list[dict] | None:
     if provider_id is None:
         return None
-    return RemoteProviderService(db, settings.data_dir).resolve(user.id, provider_id)
+    service = RemoteProviderService(db, settings.data_dir)
+    primary = service.resolve(user.id, provider_id)
+    extras = [pid for pid in dict.fromkeys(provider_ids or []) if pid != provider_id]
+    if not extras:
+        return primary
+    return [primary] + [service.resolve(user.id, pid) for pid in extras]
 
 
 def _stream_error(exc: Exception) -> dict:
     """Return a credential-safe, retry-aware SSE error payload."""
+    if getattr(exc, "code", None) == "MODEL_RATE_LIMITED":
+        return {"code": "RATE_LIMITED", "message": "远程服务正在限流。请稍后由用户手动重试。", "retryable": True}
     if isinstance(exc, httpx.HTTPStatusError):
         status = exc.response.status_code
         if status in {401, 403}:
@@ -60,24 +74,30 @@ def _stream_error(exc: Exception) -> dict:
 @router.post("")
 async def chat(req: ChatRequest, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
     try:
-        result = await run_chat(db, get_runtime(), req.model, [item.model_dump() for item in req.messages], user, req.session_id, _provider(db, user, req.provider_id))
+        result = await run_chat(
+            db, get_runtime(), req.model, [item.model_dump() for item in req.messages], user, req.session_id,
+            _provider(db, user, req.provider_id, req.provider_ids),
+            temperature=req.temperature, response_cache=req.response_cache, model_pool=req.model_pool,
+        )
         return result
     except (RemoteProviderError, ValueError, PermissionError) as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
     except Exception as exc:
+        if getattr(exc, "code", None) == "MODEL_RATE_LIMITED":
+            raise HTTPException(status_code=429, detail=str(exc)) from exc
         raise HTTPException(status_code=502, detail=f"Chat request failed: {exc}") from exc
 
 
 @router.post("/stream")
 async def chat_stream(req: ChatRequest, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
     try:
-        provider = _provider(db, user, req.provider_id)
+        provider = _provider(db, user, req.provider_id, req.provider_ids)
     except RemoteProviderError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
     async def event_generator():
         try:
-            async for event in stream_chat(db, get_runtime(), req.model, [item.model_dump() for item in req.messages], user, req.session_id, provider):
+            async for event in stream_chat(db, get_runtime(), req.model, [item.model_dump() for item in req.messages], user, req.session_id, provider, temperature=req.temperature, model_pool=req.model_pool):
                 yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
         except Exception as exc:
             yield f"data: {json.dumps({'type': 'error', 'data': _stream_error(exc)}, ensure_ascii=False)}\n\n"
@@ -8,6 +8,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import StreamingResponse
 from models.records import User
 from pydantic import BaseModel
+from services.model_metrics import metered
 from services.runtime_registry import get_runtime
 
 router = APIRouter(tags=["openai"])
@@ -51,19 +52,11 @@ def _openai_response(model: str, content: str) -> dict:
 async def chat_completions(req: ChatCompletionRequest, user: User = Depends(get_current_user)):
     messages = [{"role": m.role, "content": m.content} for m in req.messages]
     try:
-        runtime = get_runtime()
+        runtime = metered(get_runtime(), user.id)
         if req.stream:
             async def gen():
-                runtime_obj = runtime.get()
-                stream_fn = getattr(runtime_obj, "stream_chat", None)
-                if stream_fn is not None:
-                    async for chunk in stream_fn(req.model, messages):
-                        event = {"choices": [{"delta": {"content": chunk}, "index": 0}]}
-                        yield "data: " + json.dumps(event, ensure_ascii=False) + "\n\n"
-                else:
-                    result = await runtime.chat(req.model, messages)
-                    content = result.get("content", "")
-                    event = {"choices": [{"delta": {"content": content}, "index": 0}]}
+                async for chunk in runtime.stream_chat(req.model, messages):
+                    event = {"choices": [{"delta": {"content": chunk}, "index": 0}]}
                     yield "data: " + json.dumps(event, ensure_ascii=False) + "\n\n"
                 yield "data: [DONE]\n\n"
             return StreamingResponse(gen(), media_type="text/event-stream")
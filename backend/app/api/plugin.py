@@ -82,7 +82,7 @@ async def load_plugin(req: dict):
             manifest = PluginManifest.from_file((req or {})["manifest_path"])
         else:
             manifest = PluginManifest.from_dict((req or {}).get("manifest") or {})
-        state = pm.load(manifest)
+        state = await pm.load_async(manifest)
         return {"name": manifest.name, "status": state["status"], "tools": sorted(state["scope"].tools().keys())}
     except HTTPException:
         raise
@@ -90,6 +90,18 @@ async def load_plugin(req: dict):
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.post("/load-all")
+async def load_all_plugins(req: dict | None = None):
+    """Load every plugin under a directory in dependency waves; returns the startup report."""
+    return await _runtime_pm().load_all(directory=(req or {}).get("directory"))
+
+
+@router.get("/startup-report")
+async def plugin_startup_report():
+    """Per-plugin load timings: manifest parse, import, setup, wave."""
+    return _runtime_pm().startup_report()
+
+
 @router.post("/{name}/start")
 async def start_plugin(name: str):
     if not _runtime_pm().start(name):
@@ -19,6 +19,10 @@ class ProviderUpsert(BaseModel):
     protocol: str = "responses"
     default_model: str = Field(min_length=1, max_length=255)
     api_key: str | None = Field(default=None, min_length=1, max_length=2048)
+    # per-credential quotas; None = the global remote_rate_limit value
+    requests_per_minute: int | None = Field(default=None, ge=0)
+    tokens_per_minute: int | None = Field(default=None, ge=0)
+    max_concurrency: int | None = Field(default=None, ge=1, le=256)
 
 
 def _service(db: Session) -> RemoteProviderService:
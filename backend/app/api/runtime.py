@@ -1,6 +1,8 @@
 """Runtime API routes."""
 
-from fastapi import APIRouter, HTTPException
+from core.security import get_runtime_admin
+from fastapi import APIRouter, Depends, HTTPException
+from models.records import User
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/runtime", tags=["runtime"])
@@ -20,6 +22,11 @@ class LoadRequest(BaseModel):
     model: str
 
 
+class PrewarmRequest(BaseModel):
+    model: str
+    pin: bool = False
+
+
 class RuntimeResponse(BaseModel):
     status: str
     model: str
@@ -66,4 +73,15 @@ async def runtime_status():
     runtime = _get_runtime()
     if hasattr(runtime, "status"):
         return runtime.status()
-    return {"default": "unknown", "runtimes": {}}
\ No newline at end of file
+    return {"default": "unknown", "runtimes": {}}
+
+@router.get("/residency")
+async def runtime_residency(user: User = Depends(get_runtime_admin)):
+    """Resident local models, their footprint and the memory budgets."""
+    return _get_runtime().residency()
+
+
+@router.post("/prewarm")
+async def runtime_prewarm(req: PrewarmRequest, user: User = Depends(get_runtime_admin)):
+    """Load a local model in the background (optionally pinned against eviction)."""
+    return _get_runtime().prewarm(req.model, pin=req.pin)
@@ -4,8 +4,10 @@ import subprocess
 import time
 
 from core.database import get_db
-from core.security import get_current_user
-from fastapi import APIRouter, Depends
+from core.security import get_current_user, get_runtime_admin
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+from services.profiling import get_profiler
 from sqlalchemy.orm import Session as DBSession
 
 router = APIRouter(prefix="/system", tags=["system"])
@@ -48,4 +50,49 @@ def system_logs(
         return {"lines": []}
     with open(log_path, "r", encoding="utf-8", errors="replace") as f:
         lines = f.readlines()
-    return {"lines": lines[-max(1, min(tail, 5000)):]}
\ No newline at end of file
+    return {"lines": lines[-max(1, min(tail, 5000)):]}
+
+
+def _profiler():
+    profiler = get_profiler()
+    if profiler is None:
+        raise HTTPException(status_code=503, detail="Profiler not initialized")
+    return profiler
+
+
+@router.get("/profiling")
+def profiling_status(user: object = Depends(get_runtime_admin)):
+    """Per-route latency percentiles, event-loop lag / stalls and captures."""
+    return _profiler().status()
+
+
+@router.post("/profiling")
+async def toggle_profiling(req: dict, user: object = Depends(get_runtime_admin)):
+    profiler = _profiler()
+    await profiler.set_enabled(bool(req.get("enabled")))
+    return {"enabled": profiler.enabled}
+
+
+@router.post("/profiling/captures")
+def start_capture(req: dict | None = None, user: object = Depends(get_runtime_admin)):
+    """Start a stack-sampling capture (``seconds``, optional ``interval_ms``)."""
+    req = req or {}
+    try:
+        sampler = _profiler().capture(req.get("seconds", 10), req.get("interval_ms"))
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return sampler.summary()
+
+
+@router.get("/profiling/captures/{capture_id}")
+def download_capture(capture_id: str, user: object = Depends(get_runtime_admin)):
+    """Collapsed stacks (flamegraph.pl / speedscope input); 409 while sampling."""
+    sampler = _profiler().captures.get(capture_id)
+    if sampler is None:
+        raise HTTPException(status_code=404, detail="Capture not found")
+    if not sampler.done:
+        raise HTTPException(status_code=409, detail="Capture still running")
+    return PlainTextResponse(
+        sampler.collapsed(),
+        headers={"Content-Disposition": f'attachment; filename="modelforge-{capture_id}.folded"'},
+    )
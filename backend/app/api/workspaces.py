@@ -11,7 +11,6 @@ from core.database import get_db
 from core.security import get_current_user
 from fastapi import APIRouter, Depends, HTTPException
 from models.records import (
-    AgentRun,
     KnowledgeCollection,
     KnowledgeCollectionDocument,
     KnowledgeDocument,
@@ -20,6 +19,7 @@ from models.records import (
     RunArtifact,
     User,
 )
+from services.agent_runtime_service import read_run
 from sqlalchemy.orm import Session
 
 router = APIRouter(prefix="/workspaces", tags=["workspaces"])
@@ -38,10 +38,10 @@ async def list_artifacts(db: Session = Depends(get_db), user: User = Depends(get
 
 @router.post("/artifacts/from-run/{run_id}")
 async def capture_run_artifact(run_id: str, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    run = db.query(AgentRun).filter(AgentRun.run_id == run_id, AgentRun.user_id == user.id).first()
+    run = read_run(run_id, user.id)
     if run is None:
         raise HTTPException(status_code=404, detail="Run not found")
-    payload = {"run_id": run.run_id, "agent_id": run.agent_id, "status": run.status, "output": _redact(run.output or ""), "error": _redact(run.error or ""), "metadata": json.loads(run.meta or "{}")}
+    payload = {"run_id": run.run_id, "agent_id": run.agent_id, "status": run.status, "output": _redact(run.output or ""), "error": _redact(run.error or ""), "metadata": run.metadata or {}}
     item = RunArtifact(id=uuid.uuid4().hex, user_id=user.id, source_kind="agent_run", source_id=run.run_id, artifact_type="run_summary", title=f"Run {run.run_id}", content_json=json.dumps(payload, ensure_ascii=False), content_text=payload["output"], redacted=True)
     db.add(item)
     db.commit()
@@ -116,11 +116,13 @@ async def model_insights(days: int = 30, db: Session = Depends(get_db), user: Us
     rows = db.query(ModelMetricBucket).filter(ModelMetricBucket.user_id == user.id, ModelMetricBucket.bucket_start >= after).all()
     aggregate: dict[str, dict[str, Any]] = {}
     for row in rows:
-        item = aggregate.setdefault(row.model_ref, {"model_ref": row.model_ref, "request_count": 0, "success_count": 0, "error_count": 0, "latency_sum_ms": 0.0, "cost_estimate": 0.0})
+        item = aggregate.setdefault(row.model_ref, {"model_ref": row.model_ref, "request_count": 0, "success_count": 0, "error_count": 0, "latency_sum_ms": 0.0, "input_tokens_estimate": 0, "output_tokens_estimate": 0, "cost_estimate": 0.0})
         item["request_count"] += row.request_count
         item["success_count"] += row.success_count
         item["error_count"] += row.error_4xx_count + row.error_429_count + row.error_5xx_count + row.timeout_count
         item["latency_sum_ms"] += row.latency_sum_ms
+        item["input_tokens_estimate"] += row.input_tokens_estimate
+        item["output_tokens_estimate"] += row.output_tokens_estimate
         item["cost_estimate"] += row.cost_estimate
     for item in aggregate.values():
         item["average_latency_ms"] = round(item.pop("latency_sum_ms") / item["request_count"], 1) if item["request_count"] else None
@@ -9,7 +9,7 @@ from urllib.parse import urlparse
 
 import yaml
 from dotenv import load_dotenv
-from pydantic import BaseModel
+from pydantic import BaseModel, model_validator
 
 _INSECURE_JWT_SECRETS = {"", "modelforge-dev-secret-change-me-0123456789abcdef", "dev-secret"}
 _PRODUCTION_ENVIRONMENTS = {"prod", "production"}
@@ -22,12 +22,42 @@ class RuntimeSettings(BaseModel):
     timeout_seconds: int = 600
     event_persistence: bool = True
     event_retention_days: int = 30
+    # write-behind interval for non-terminal run transitions (terminal ones are synchronous)
+    run_flush_interval_ms: int = 250
+    # run admission (0 = unlimited); runs beyond the limits wait PENDING in a fair queue
+    max_concurrent_runs: int = 8
+    max_runs_per_user: int = 4
+    max_queued_runs: int = 200
+    # snapshot AgentState after each model turn / tool result; resume orphaned runs on start
+    checkpoint_enabled: bool = True
+    resume_on_startup: bool = True
+    # execution lease per run, renewed by its worker; only lapsed leases are resumed elsewhere
+    run_lease_seconds: int = 60
 
 
 class ToolsSettings(BaseModel):
     """Tool execution defaults (config.yaml -> tools:)."""
     default_timeout_seconds: int = 60
     command_execution_enabled: bool = False
+    # execution-class pools (runtime/tools/pool.py)
+    io_thread_workers: int = 8
+    cpu_process_workers: int = 2
+    cpu_process_start_method: str = "spawn"
+    warm_cpu_workers: bool = True
+    # code.search trigram index (services/code_index.py)
+    code_index_dir: str = ""  # "" = <data_dir>/code_index
+    code_index_refresh_seconds: float = 2.0
+    code_index_max_roots: int = 16
+
+
+class MCPSettings(BaseModel):
+    """MCP server sessions (config.yaml -> mcp:)."""
+    # stdio servers run a local command; only admins register them, and only when enabled
+    allow_stdio_servers: bool = False
+    timeout_seconds: float = 30.0
+    max_retries: int = 3
+    backoff_seconds: float = 0.5
+    http_max_connections: int = 10
 
 
 class PolicySettings(BaseModel):
@@ -37,6 +67,128 @@ class PolicySettings(BaseModel):
     default_filesystem_access: bool = True
 
 
+class LocalModelSettings(BaseModel):
+    """Local model residency (config.yaml -> local_models:).
+
+    Budgets are in MiB; 0 lets the residency manager derive one from the
+    host (a share of system RAM / device VRAM).
+    """
+    memory_budget_mb: int = 0
+    vram_budget_mb: int = 0
+    max_resident: int = 3
+    pinned: list[str] = []
+
+
+class SessionSummarySettings(BaseModel):
+    """Rolling session summaries (config.yaml -> session_summary:).
+
+    Prompts carry the stored summary plus the messages after it; once more
+    than ``recent_messages + batch_messages`` are uncovered a background job
+    folds the older ones into the summary. An empty ``model`` reuses the
+    chat's own model.
+    """
+    enabled: bool = True
+    model: str = ""
+    recent_messages: int = 12
+    batch_messages: int = 8
+    max_history_messages: int = 50
+    max_summary_chars: int = 2000
+
+
+class RemoteRateLimitSettings(BaseModel):
+    """Client-side limits per remote provider credential (config.yaml -> remote_rate_limit:).
+
+    Quotas of 0 are unlimited; concurrency adapts (AIMD) between the two
+    bounds and 429 ``Retry-After`` pauses are always honoured.
+    """
+    enabled: bool = True
+    requests_per_minute: int = 0
+    tokens_per_minute: int = 0
+    max_concurrency: int = 8
+    min_concurrency: int = 1
+    max_wait_seconds: float = 60.0
+    default_retry_after_seconds: float = 1.0
+
+
+class ScheduleSettings(BaseModel):
+    """Durable schedule driver (config.yaml -> schedules:)."""
+    enabled: bool = True
+    poll_interval_seconds: float = 5.0  # upper bound on sleeping; also picks up other workers' edits
+    lease_ttl_seconds: float = 30.0
+    misfire_grace_seconds: float = 60.0  # later than this counts as a misfire
+    max_catch_up: int = 10  # catch_up fires at most this many missed slots
+    coalesce_window_seconds: float = 0.0  # >0: fire every job due within the window in one batch
+    dispatch_rate_per_second: float = 0.0  # >0: release batched fires into admission at this rate
+
+    @model_validator(mode="after")
+    def _check_coalesce_window(self) -> "ScheduleSettings":
+        # every fire may wait a full window: it must stay below the misfire grace and lease TTL
+        limit = min(self.lease_ttl_seconds, self.misfire_grace_seconds)
+        if self.coalesce_window_seconds >= limit:
+            raise ValueError(
+                f"schedules.coalesce_window_seconds must be below {limit:g} "
+                "(min of lease_ttl_seconds and misfire_grace_seconds)"
+            )
+        return self
+
+
+class PoolEndpointSettings(BaseModel):
+    """One endpoint of a model pool."""
+    kind: str = "ollama"  # ollama | openai
+    base_url: str
+    api_key_env: str = ""  # env var holding the key for openai endpoints
+    protocol: str = "chat_completions"
+
+
+class ModelPoolSettings(BaseModel):
+    """Endpoints serving the same models (config.yaml -> model_pools: <name>:)."""
+    strategy: str = "least_outstanding"  # least_outstanding | ewma
+    endpoints: list[PoolEndpointSettings] = []
+    failure_threshold: int = 3
+    cooldown_seconds: float = 30.0
+    hedge_after_ms: int = 0  # 0 = no hedged requests
+    health_interval_seconds: float = 30.0
+
+
+class ResponseCacheSettings(BaseModel):
+    """LLM response cache (config.yaml -> response_cache:).
+
+    Off by default. When enabled it only serves temperature-0 calls and
+    agents that set ``runtime_config.response_cache: true``.
+    """
+    enabled: bool = False
+    directory: str = ""  # "" = <data_dir>/llm_cache
+    ttl_seconds: int = 3600
+    max_entries: int = 2000
+    max_size_mb: int = 256
+
+
+class TracingSettings(BaseModel):
+    """Agent run span tracing (config.yaml -> tracing:)."""
+    enabled: bool = True
+    sample_ratio: float = 1.0  # fraction of runs traced; decided once per trace
+    exporter: str = "none"  # none | jsonl | otlp (OTLP/JSON, collector file format)
+    directory: str = ""  # "" = <data_dir>/traces
+    max_traces: int = 200  # finished traces kept in memory for GET /agent/runs/{id}/trace
+    max_file_mb: float = 64.0  # trace file rotates past this size; 0 = never
+    backup_count: int = 3  # rotated files kept (spans.jsonl.1 .. .N)
+
+
+class ProfilingSettings(BaseModel):
+    """Admin profiling surface (config.yaml -> profiling:); admins can also toggle it at runtime."""
+    enabled: bool = False
+    loop_probe_interval_ms: float = 50.0
+    loop_stall_threshold_ms: float = 200.0  # stalls longer than this record the blocking stack
+    sample_interval_ms: float = 10.0  # stack sampler default rate (100 Hz)
+    max_capture_seconds: float = 60.0
+
+
+class ModelMetricsSettings(BaseModel):
+    """Per-minute model usage buckets behind /workspaces/insights (config.yaml -> model_metrics:)."""
+    enabled: bool = True
+    flush_interval_seconds: float = 15.0
+
+
 class Settings(BaseModel):
     # 基础
     model_path: str = "./models"
@@ -55,6 +207,8 @@ class Settings(BaseModel):
     session_cookie_samesite: str = "lax"
     # 运行时
     ollama_base_url: str = "http://localhost:11434"
+    # name of a model_pools entry used instead of ollama_base_url for local agents
+    default_model_pool: str = ""
     enable_streaming: bool = True
     # 模型/下载
     hf_endpoint: str = "https://hf-mirror.com"
@@ -70,9 +224,23 @@ class Settings(BaseModel):
     # 3.0 Agent Runtime
     runtime: RuntimeSettings = RuntimeSettings()
     tools: ToolsSettings = ToolsSettings()
+    mcp: MCPSettings = MCPSettings()
     policy: PolicySettings = PolicySettings()
+    local_models: LocalModelSettings = LocalModelSettings()
+    session_summary: SessionSummarySettings = SessionSummarySettings()
+    response_cache: ResponseCacheSettings = ResponseCacheSettings()
+    remote_rate_limit: RemoteRateLimitSettings = RemoteRateLimitSettings()
+    schedules: ScheduleSettings = ScheduleSettings()
+    model_metrics: ModelMetricsSettings = ModelMetricsSettings()
+    tracing: TracingSettings = TracingSettings()
+    profiling: ProfilingSettings = ProfilingSettings()
+    model_pools: dict[str, ModelPoolSettings] = {}
     # 3.x Plugins
     plugins_dir: str = "./plugins"
+    # load every plugin under plugins_dir at startup (PluginManager.load_all)
+    plugins_autoload: bool = False
+    # tool plugins declaring their tools in the manifest import on first use
+    plugins_lazy_import: bool = True
 
     @property
     def is_production(self) -> bool:
@@ -126,12 +294,15 @@ def load_config(config_path: str | None = None) -> Settings:
         "SESSION_COOKIE_SECURE": "session_cookie_secure",
         "SESSION_COOKIE_SAMESITE": "session_cookie_samesite",
         "OLLAMA_BASE_URL": "ollama_base_url",
+        "DEFAULT_MODEL_POOL": "default_model_pool",
         "HF_ENDPOINT": "hf_endpoint",
         "MODEL_DIR": "model_dir",
         "DATA_DIR": "data_dir",
         "DATASET_DIR": "dataset_dir",
         "TRAIN_OUTPUT_DIR": "train_output_dir",
         "MAX_DATASET_SIZE": "max_dataset_size",
+        "PLUGINS_DIR": "plugins_dir",
+        "PLUGINS_AUTOLOAD": "plugins_autoload",
     }
     for env_key, field_name in env_map.items():
         env_val = os.getenv(env_key)
@@ -145,11 +316,42 @@ def load_config(config_path: str | None = None) -> Settings:
         "RUNTIME_TIMEOUT_SECONDS": ("runtime", "timeout_seconds"),
         "RUNTIME_EVENT_PERSISTENCE": ("runtime", "event_persistence"),
         "RUNTIME_EVENT_RETENTION_DAYS": ("runtime", "event_retention_days"),
+        "RUNTIME_MAX_CONCURRENT_RUNS": ("runtime", "max_concurrent_runs"),
+        "RUNTIME_MAX_RUNS_PER_USER": ("runtime", "max_runs_per_user"),
+        "RUNTIME_MAX_QUEUED_RUNS": ("runtime", "max_queued_runs"),
+        "RUNTIME_CHECKPOINT_ENABLED": ("runtime", "checkpoint_enabled"),
+        "RUNTIME_RESUME_ON_STARTUP": ("runtime", "resume_on_startup"),
+        "RUNTIME_RUN_LEASE_SECONDS": ("runtime", "run_lease_seconds"),
         "TOOL_DEFAULT_TIMEOUT_SECONDS": ("tools", "default_timeout_seconds"),
         "TOOLS_COMMAND_EXECUTION_ENABLED": ("tools", "command_execution_enabled"),
+        "TOOLS_IO_THREAD_WORKERS": ("tools", "io_thread_workers"),
+        "TOOLS_CPU_PROCESS_WORKERS": ("tools", "cpu_process_workers"),
+        "TOOLS_CPU_PROCESS_START_METHOD": ("tools", "cpu_process_start_method"),
+        "TOOLS_WARM_CPU_WORKERS": ("tools", "warm_cpu_workers"),
+        "TOOLS_CODE_INDEX_DIR": ("tools", "code_index_dir"),
+        "MCP_ALLOW_STDIO_SERVERS": ("mcp", "allow_stdio_servers"),
         "POLICY_DEFAULT_NETWORK_ACCESS": ("policy", "default_network_access"),
         "POLICY_DEFAULT_SHELL_ACCESS": ("policy", "default_shell_access"),
         "POLICY_DEFAULT_FILESYSTEM_ACCESS": ("policy", "default_filesystem_access"),
+        "LOCAL_MODEL_MEMORY_BUDGET_MB": ("local_models", "memory_budget_mb"),
+        "LOCAL_MODEL_VRAM_BUDGET_MB": ("local_models", "vram_budget_mb"),
+        "LOCAL_MODEL_MAX_RESIDENT": ("local_models", "max_resident"),
+        "SESSION_SUMMARY_ENABLED": ("session_summary", "enabled"),
+        "SESSION_SUMMARY_MODEL": ("session_summary", "model"),
+        "RESPONSE_CACHE_ENABLED": ("response_cache", "enabled"),
+        "RESPONSE_CACHE_TTL_SECONDS": ("response_cache", "ttl_seconds"),
+        "REMOTE_RATE_LIMIT_ENABLED": ("remote_rate_limit", "enabled"),
+        "SCHEDULES_ENABLED": ("schedules", "enabled"),
+        "MODEL_METRICS_ENABLED": ("model_metrics", "enabled"),
+        "MODEL_METRICS_FLUSH_INTERVAL_SECONDS": ("model_metrics", "flush_interval_seconds"),
+        "TRACING_ENABLED": ("tracing", "enabled"),
+        "TRACING_SAMPLE_RATIO": ("tracing", "sample_ratio"),
+        "TRACING_EXPORTER": ("tracing", "exporter"),
+        "PROFILING_ENABLED": ("profiling", "enabled"),
+        "PROFILING_LOOP_STALL_THRESHOLD_MS": ("profiling", "loop_stall_threshold_ms"),
+        "REMOTE_RATE_LIMIT_RPM": ("remote_rate_limit", "requests_per_minute"),
+        "REMOTE_RATE_LIMIT_TPM": ("remote_rate_limit", "tokens_per_minute"),
+        "REMOTE_RATE_LIMIT_MAX_CONCURRENCY": ("remote_rate_limit", "max_concurrency"),
     }
     for env_key, (section, field) in nested_env.items():
         env_val = os.getenv(env_key)
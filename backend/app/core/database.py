@@ -1,10 +1,13 @@
 """Database engine and session configuration."""
 import os
+import time
+from collections.abc import Callable
 from pathlib import Path
 
 from sqlalchemy import create_engine, text
 from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import QueuePool
 
 # Resolve database path from env or default
 _default_db = os.path.join(
@@ -25,8 +28,33 @@ DATABASE_POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", "32"))
 DATABASE_MAX_OVERFLOW = int(os.getenv("DATABASE_MAX_OVERFLOW", "16"))
 DATABASE_POOL_TIMEOUT = int(os.getenv("DATABASE_POOL_TIMEOUT", "10"))
 
+# Receives each checkout's wait in seconds; the runtime installs its metrics hook.
+_checkout_observer: Callable[[float], None] | None = None
+
+
+def set_checkout_observer(observer: Callable[[float], None] | None) -> None:
+    """Install (or clear with None) the callback timing pooled connection checkouts."""
+    global _checkout_observer
+    _checkout_observer = observer
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool reporting how long each checkout waited to the checkout observer."""
+
+    def _do_get(self):
+        observer = _checkout_observer
+        if observer is None:
+            return super()._do_get()
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            observer(time.perf_counter() - started)
+
+
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
+    poolclass=TimedQueuePool,
     connect_args={"check_same_thread": False},
     pool_size=DATABASE_POOL_SIZE,
     max_overflow=DATABASE_MAX_OVERFLOW,
@@ -66,6 +94,18 @@ def _additive_migrations():
         "ALTER TABLE remote_provider_configs ADD COLUMN verification_status VARCHAR(32) NOT NULL DEFAULT 'unknown'",
         "ALTER TABLE remote_provider_configs ADD COLUMN verification_error_code VARCHAR(64)",
         "ALTER TABLE remote_provider_configs ADD COLUMN verified_models_json TEXT",
+        "ALTER TABLE sessions ADD COLUMN summary TEXT",
+        "ALTER TABLE sessions ADD COLUMN summary_message_id INTEGER",
+        "ALTER TABLE sessions ADD COLUMN summary_updated_at DATETIME",
+        "ALTER TABLE scheduled_jobs ADD COLUMN misfire_policy VARCHAR(24) NOT NULL DEFAULT 'skip'",
+        "ALTER TABLE scheduled_jobs ADD COLUMN cron_expression VARCHAR(120)",
+        "ALTER TABLE scheduled_jobs ADD COLUMN jitter_seconds FLOAT NOT NULL DEFAULT 0",
+        "ALTER TABLE agents ADD COLUMN updated_at DATETIME",
+        "ALTER TABLE agent_runs ADD COLUMN owner VARCHAR(128)",
+        "ALTER TABLE remote_provider_configs ADD COLUMN requests_per_minute INTEGER",
+        "ALTER TABLE remote_provider_configs ADD COLUMN tokens_per_minute INTEGER",
+        "ALTER TABLE remote_provider_configs ADD COLUMN max_concurrency INTEGER",
+        "ALTER TABLE agent_runs ADD COLUMN lease_expires_at DATETIME",
     ]
     with engine.connect() as conn:
         for stmt in statements:
@@ -29,11 +29,18 @@ from core.database import init_db
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from runtime.metrics import instrument_db_pool
+from runtime.models.pool import close_model_pools
+from runtime.tools.pool import init_tool_pools, shutdown_tool_pools
 from services.agent_engine import get_engine
 from services.agent_runtime_service import build_agent_runtime, init_agent_runtime
 from services.knowledge_base import get_global_kb
+from services.model_metrics import init_model_metrics
 from services.plugin_manager import get_manager
+from services.profiling import RouteTimingMiddleware, init_profiler
 from services.runtime_registry import get_runtime
+from services.runtimes.pool_runtime import close_chat_pools
+from services.schedule_driver import ScheduleDriver, init_schedule_driver
 from services.task_execution import RetryTaskMonitor
 from services.task_realtime import task_outbox_publisher
 
@@ -42,24 +49,50 @@ from services.task_realtime import task_outbox_publisher
 async def lifespan(app: FastAPI):
     """Initialize the database and inject service singletons."""
     init_db()
+    instrument_db_pool()
     task_outbox_publisher.start()
     task_retry_monitor.start()
+    profiler = init_profiler()
+    if profiler.enabled:
+        profiler.loop.start()
+    model_metrics = init_model_metrics()
+    if model_metrics is not None:
+        model_metrics.start()
     runtime.set_runtime(get_runtime())
     agent.set_agent_engine(get_engine())
     knowledge.set_knowledge_base(get_global_kb())
     plugin.set_plugin_manager(get_manager())
 
     # 3.0 Agent Runtime
+    tool_pools = init_tool_pools()
+    if settings.tools.warm_cpu_workers:
+        tool_pools.warm()
     agent_runtime = build_agent_runtime()
     init_agent_runtime(agent_runtime)
     agent.set_agent_runtime(agent_runtime)
     agent_runtime.start()
+    if settings.plugins_autoload:
+        await agent_runtime.get_plugin_manager().load_all()
+    if settings.runtime.resume_on_startup:
+        await agent_runtime.resume_runs()
+    schedule_driver = ScheduleDriver(agent_runtime) if settings.schedules.enabled else None
+    init_schedule_driver(schedule_driver)
+    if schedule_driver is not None:
+        schedule_driver.start()
     try:
         yield
     finally:
         task_retry_monitor.stop()
         task_outbox_publisher.stop()
+        if schedule_driver is not None:
+            await schedule_driver.stop()
         await agent_runtime.shutdown()
+        shutdown_tool_pools()
+        close_model_pools()
+        close_chat_pools()
+        if model_metrics is not None:
+            model_metrics.stop()
+        await profiler.loop.stop()
 
 
 
@@ -74,6 +107,10 @@ app.add_middleware(
     allow_credentials=True,
 )
 
+# per-route latency; a pass-through until profiling is enabled
+app.add_middleware(RouteTimingMiddleware)
+
+
 @app.middleware("http")
 async def csrf_protect_cookie_session(request: Request, call_next):
     """Require a nonce for unsafe browser-cookie requests; Bearer clients remain compatible."""
@@ -15,6 +15,7 @@ from sqlalchemy import (
     ForeignKey,
     Index,
     Integer,
+    LargeBinary,
     String,
     Text,
 )
@@ -55,6 +56,10 @@ class Session(Base):
     title = Column(String(200), default="新对话")
     model_id = Column(Integer, nullable=True)  # 关联的模型记录
     is_active = Column(Boolean, default=True)  # 软删除标记
+    # Rolling summary of messages up to and including summary_message_id
+    summary = Column(Text, nullable=True)
+    summary_message_id = Column(Integer, nullable=True)
+    summary_updated_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
 
@@ -162,6 +167,8 @@ class AgentRecord(Base):
     runtime_config = Column(Text, nullable=True)  # JSON
     knowledge_config = Column(Text, nullable=True)  # JSON
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    # bumped by every edit; compiled run profiles key on it (runtime/profile.py)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
 
     def to_dict(self) -> dict:
         import json as _json
@@ -197,9 +204,22 @@ class RemoteProviderConfig(Base):
     verification_status = Column(String(32), nullable=False, default="unknown")
     verification_error_code = Column(String(64), nullable=True)
     verified_models_json = Column(Text, nullable=True)
+    # client-side quotas of this credential; NULL = the global remote_rate_limit value
+    requests_per_minute = Column(Integer, nullable=True)
+    tokens_per_minute = Column(Integer, nullable=True)
+    max_concurrency = Column(Integer, nullable=True)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
 
+    def rate_limits(self) -> dict:
+        """Quotas set on this provider (unset ones are omitted)."""
+        values = {
+            "requests_per_minute": self.requests_per_minute,
+            "tokens_per_minute": self.tokens_per_minute,
+            "max_concurrency": self.max_concurrency,
+        }
+        return {k: v for k, v in values.items() if v is not None}
+
     def to_public_dict(self) -> dict:
         return {
             "id": self.id,
@@ -212,6 +232,7 @@ class RemoteProviderConfig(Base):
             "last_verified_at": self.last_verified_at.isoformat() if self.last_verified_at else None,
             "verification_status": self.verification_status or "unknown",
             "verification_error_code": self.verification_error_code,
+            "rate_limits": self.rate_limits(),
             "created_at": self.created_at.isoformat() if self.created_at else None,
         }
 
@@ -445,6 +466,9 @@ class AgentRun(Base):
     started_at = Column(DateTime, nullable=True)
     finished_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+    # execution lease: the worker executing the run renews it; resume only takes lapsed ones
+    owner = Column(String(128), nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
 
     __table_args__ = (Index("ix_agent_runs_user_created", "user_id", "created_at"),)
 
@@ -471,6 +495,16 @@ class AgentRun(Base):
         }
 
 
+class AgentRunCheckpoint(Base):
+    """Latest zlib-compressed AgentState snapshot of a non-terminal run."""
+    __tablename__ = "agent_run_checkpoints"
+
+    run_id = Column(String(64), primary_key=True)
+    iteration = Column(Integer, nullable=False, default=0)
+    data = Column(LargeBinary, nullable=False)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+
 class AgentEventRecord(Base):
     """ModelForge 3.0: a persisted agent run event (Event is the fact)."""
     __tablename__ = "agent_events"
@@ -667,12 +701,15 @@ class ScheduledJob(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     name = Column(String(160), nullable=False)
     enabled = Column(Boolean, nullable=False, default=False, index=True)
-    schedule_kind = Column(String(24), nullable=False)  # once / interval
+    schedule_kind = Column(String(24), nullable=False)  # once / interval / cron
     delay_seconds = Column(Float, nullable=True)
     interval_seconds = Column(Float, nullable=True)
+    cron_expression = Column(String(120), nullable=True)  # evaluated in ``timezone``
+    jitter_seconds = Column(Float, nullable=False, default=0.0)  # stable per-job offset window
     timezone = Column(String(64), nullable=False, default="UTC")
     run_spec = Column(Text, nullable=False, default="{}")
-    concurrency_policy = Column(String(24), nullable=False, default="skip")
+    concurrency_policy = Column(String(24), nullable=False, default="skip")  # skip / allow / replace
+    misfire_policy = Column(String(24), nullable=False, default="skip")  # skip / catch_up
     max_failures = Column(Integer, nullable=False, default=3)
     failure_count = Column(Integer, nullable=False, default=0)
     runtime_job_id = Column(String(64), nullable=True, index=True)
@@ -691,9 +728,12 @@ class ScheduledJob(Base):
             "schedule_kind": self.schedule_kind,
             "delay_seconds": self.delay_seconds,
             "interval_seconds": self.interval_seconds,
+            "cron_expression": self.cron_expression,
+            "jitter_seconds": self.jitter_seconds,
             "timezone": self.timezone,
             "run_spec": _json.loads(self.run_spec or "{}"),
             "concurrency_policy": self.concurrency_policy,
+            "misfire_policy": self.misfire_policy,
             "max_failures": self.max_failures,
             "failure_count": self.failure_count,
             "next_run_at": self.next_run_at.isoformat() if self.next_run_at else None,
@@ -703,6 +743,16 @@ class ScheduledJob(Base):
         }
 
 
+class SchedulerLease(Base):
+    """Leader lease: only the holder's schedule driver fires persistent jobs."""
+
+    __tablename__ = "scheduler_leases"
+
+    name = Column(String(64), primary_key=True)
+    holder = Column(String(128), nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+
 class ScheduleExecution(Base):
     """Audit link between a persistent schedule and an Agent Run."""
 
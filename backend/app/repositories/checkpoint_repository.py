@@ -0,0 +1,62 @@
+"""CheckpointStore port adapter backed by SQLAlchemy (agent_run_checkpoints table)."""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import threading
+from typing import Any
+
+from core.database import SessionLocal
+from models.records import AgentRunCheckpoint
+from runtime.checkpoint import decode_checkpoint, encode_checkpoint
+
+
+class SQLAlchemyCheckpointStore:
+    """Implements the runtime.CheckpointStore protocol: one upserted row per run.
+
+    The ExecutionEngine calls ``asave``: the snapshot is encoded on the
+    caller's thread (it references live run state) and the SQLite upsert
+    runs in a worker thread. Writes are numbered so a snapshot that reaches
+    the database after a newer one of the same run is dropped.
+    """
+
+    def __init__(self) -> None:
+        self._seq = itertools.count()
+        self._written: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def save(self, run_id: str, data: dict[str, Any]) -> None:
+        self._write(run_id, *self._encode(data), next(self._seq))
+
+    async def asave(self, run_id: str, data: dict[str, Any]) -> None:
+        iteration, blob = self._encode(data)
+        await asyncio.to_thread(self._write, run_id, iteration, blob, next(self._seq))
+
+    @staticmethod
+    def _encode(data: dict[str, Any]) -> tuple[int, bytes]:
+        return int((data.get("state") or {}).get("iteration") or 0), encode_checkpoint(data)
+
+    def _write(self, run_id: str, iteration: int, blob: bytes, seq: int) -> None:
+        with self._lock:
+            if self._written.get(run_id, -1) > seq:
+                return
+            with SessionLocal() as db:
+                row = db.get(AgentRunCheckpoint, run_id)
+                if row is None:
+                    db.add(AgentRunCheckpoint(run_id=run_id, iteration=iteration, data=blob))
+                else:
+                    row.iteration, row.data = iteration, blob
+                db.commit()
+            self._written[run_id] = seq
+
+    def load(self, run_id: str) -> dict[str, Any] | None:
+        with SessionLocal() as db:
+            row = db.get(AgentRunCheckpoint, run_id)
+            return decode_checkpoint(row.data) if row is not None else None
+
+    def delete(self, run_id: str) -> None:
+        with self._lock:
+            self._written.pop(run_id, None)
+            with SessionLocal() as db:
+                db.query(AgentRunCheckpoint).filter(AgentRunCheckpoint.run_id == run_id).delete()
+                db.commit()
@@ -1,22 +1,56 @@
 """RunStore port adapter backed by SQLAlchemy (agent_runs table)."""
 from __future__ import annotations
 
+import asyncio
 import builtins
+import copy
 import datetime
 import json
+import logging
+import threading
 from typing import Any
 
 from core.database import SessionLocal
 from models.records import AgentRun
 from runtime.types import RunRecord, RunStatus
 
+logger = logging.getLogger(__name__)
+
 
 def _now() -> datetime.datetime:
     return datetime.datetime.utcnow()
 
 
 class SQLAlchemyRunStore:
-    """Implements the runtime.RunStore protocol over SQLAlchemy (spec 30)."""
+    """Implements the runtime.RunStore protocol over SQLAlchemy (spec 30).
+
+    Active runs are kept in a hot cache: ``get`` is served from memory and
+    non-terminal transitions (RUNNING, WAITING_HUMAN, ...) are coalesced per
+    run and written behind in one batched transaction every
+    ``flush_interval`` seconds. Terminal transitions flush synchronously and
+    evict the run, so the DB is authoritative for every finished run.
+    ``list`` flushes pending writes first so filters see current state.
+    A batch whose write fails is put back under any newer pending fields and
+    retried with exponential backoff (a failed terminal run stays cached
+    until its write lands).
+
+    ``claim`` / ``renew`` manage the per-run execution lease (``owner`` /
+    ``lease_expires_at``) directly in the DB, so several workers never
+    execute the same run.
+    """
+
+    #: Upper bound on cached active runs (stale entries are flushed and dropped).
+    MAX_HOT_RUNS = 10000
+    #: Ceiling of the retry backoff after failed flushes, in seconds.
+    MAX_RETRY_DELAY = 30.0
+
+    def __init__(self, flush_interval: float = 0.25):
+        self.flush_interval = flush_interval
+        self._hot: dict[str, RunRecord] = {}
+        self._dirty: dict[str, dict[str, Any]] = {}
+        self._lock = threading.RLock()
+        self._flush_scheduled = False
+        self._failures = 0
 
     def _to_record(self, row: AgentRun) -> RunRecord:
         return RunRecord(
@@ -39,7 +73,20 @@ class SQLAlchemyRunStore:
             created_at=row.created_at,
         )
 
+    @staticmethod
+    def _copy(run: RunRecord) -> RunRecord:
+        out = copy.copy(run)
+        out.token_usage = dict(run.token_usage or {})
+        out.metadata = copy.deepcopy(run.metadata or {})
+        return out
+
+    @staticmethod
+    def _is_terminal(status: Any) -> bool:
+        return status in RunStatus.terminal()
+
     def create(self, run: RunRecord) -> RunRecord:
+        run.started_at = run.started_at or _now()
+        run.created_at = run.created_at or _now()
         with SessionLocal() as db:
             row = AgentRun(
                 run_id=run.run_id,
@@ -56,14 +103,20 @@ class SQLAlchemyRunStore:
                 tool_call_count=run.tool_call_count,
                 iteration_count=run.iteration_count,
                 meta=json.dumps(run.metadata, ensure_ascii=False) if run.metadata else None,
-                started_at=run.started_at or _now(),
-                created_at=run.created_at or _now(),
+                started_at=run.started_at,
+                created_at=run.created_at,
             )
             db.add(row)
             db.commit()
+        if not self._is_terminal(run.status):
+            self._cache(self._copy(run))
         return run
 
     def get(self, run_id: str) -> RunRecord | None:
+        with self._lock:
+            hot = self._hot.get(run_id)
+            if hot is not None:
+                return self._copy(hot)
         with SessionLocal() as db:
             row = db.query(AgentRun).filter(AgentRun.run_id == run_id).first()
             return self._to_record(row) if row else None
@@ -73,6 +126,7 @@ class SQLAlchemyRunStore:
         status: str | None = None, parent_run_id: str | None = None,
         limit: int = 50, offset: int = 0,
     ) -> builtins.list[RunRecord]:
+        self.flush()
         with SessionLocal() as db:
             q = db.query(AgentRun)
             if user_id is not None:
@@ -87,28 +141,162 @@ class SQLAlchemyRunStore:
             return [self._to_record(r) for r in rows]
 
     def update(self, run_id: str, **fields: Any) -> RunRecord | None:
+        with self._lock:
+            hot = self._hot.get(run_id)
+            if hot is not None:
+                self._apply(hot, fields)
+                self._dirty.setdefault(run_id, {}).update(fields)
+                if not self._is_terminal(hot.status):
+                    result = self._copy(hot)
+                    self._schedule_flush()
+                    return result
+                # terminal: write this run now and stop caching it
+                pending = self._dirty.pop(run_id)
+                self._hot.pop(run_id, None)
+                result = self._copy(hot)
+        if hot is not None:
+            try:
+                self._write({run_id: pending})
+            except Exception as e:
+                with self._lock:
+                    self._hot.setdefault(run_id, hot)
+                self._requeue({run_id: pending}, e)
+            return result
+        updated = self._write({run_id: fields}, refresh=True).get(run_id)
+        if updated is not None and not self._is_terminal(updated.status):
+            self._cache(self._copy(updated))
+        return updated
+
+    def claim(self, run_id: str, owner: str, ttl_seconds: float) -> bool:
+        """Atomically take a non-terminal run whose lease is free, lapsed or already ours."""
+        now = _now()
         with SessionLocal() as db:
-            row = db.query(AgentRun).filter(AgentRun.run_id == run_id).first()
-            if row is None:
-                return None
-            for key, value in fields.items():
-                if key in ("token_usage", "metadata"):
-                    value = json.dumps(value or {}, ensure_ascii=False)
-                    if key == "token_usage":
-                        row.token_usage = value
-                    else:
-                        row.meta = value
-                elif key == "meta":
-                    row.meta = json.dumps(value or {}, ensure_ascii=False) if value else None
-                elif hasattr(row, key):
-                    setattr(row, key, value)
+            taken = (
+                db.query(AgentRun)
+                .filter(AgentRun.run_id == run_id, AgentRun.status.notin_([s.value for s in RunStatus.terminal()]))
+                .filter(AgentRun.owner.is_(None) | (AgentRun.owner == owner) | (AgentRun.lease_expires_at < now))
+                .update({"owner": owner, "lease_expires_at": now + datetime.timedelta(seconds=ttl_seconds)},
+                        synchronize_session=False)
+            )
+            db.commit()
+        return bool(taken)
+
+    def renew(self, run_ids: builtins.list[str], owner: str, ttl_seconds: float) -> int:
+        """Extend the leases ``owner`` still holds; returns how many were renewed."""
+        if not run_ids:
+            return 0
+        with SessionLocal() as db:
+            n = (
+                db.query(AgentRun)
+                .filter(AgentRun.run_id.in_(run_ids), AgentRun.owner == owner)
+                .update({"lease_expires_at": _now() + datetime.timedelta(seconds=ttl_seconds)},
+                        synchronize_session=False)
+            )
+            db.commit()
+        return n
+
+    def flush(self) -> int:
+        """Write all pending transitions in one transaction; returns runs written."""
+        with self._lock:
+            pending, self._dirty = self._dirty, {}
+            self._flush_scheduled = False
+        if not pending:
+            return 0
+        try:
+            self._write(pending)
+        except Exception as e:
+            self._requeue(pending, e)
+            return 0
+        with self._lock:
+            self._failures = 0
+            for run_id in pending:
+                # terminal runs kept only because their write had failed
+                hot = self._hot.get(run_id)
+                if hot is not None and self._is_terminal(hot.status) and run_id not in self._dirty:
+                    del self._hot[run_id]
+        return len(pending)
+
+    def _requeue(self, batch: dict[str, dict[str, Any]], exc: Exception) -> None:
+        """Put a failed batch back under newer pending fields and retry with backoff."""
+        with self._lock:
+            for run_id, fields in batch.items():
+                self._dirty[run_id] = {**fields, **self._dirty.get(run_id, {})}
+            self._failures += 1
+            delay = min(self.flush_interval * 2 ** self._failures, self.MAX_RETRY_DELAY)
+            failures = self._failures
+        logger.warning(
+            "run store: writing %d run(s) failed (attempt %d), retrying in %.2fs: %s",
+            len(batch), failures, delay, exc,
+        )
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return  # no loop to retry on: the next update or flush writes the batch
+        self._schedule_flush(delay)
+
+    def _schedule_flush(self, delay: float | None = None) -> None:
+        if self._flush_scheduled:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # no event loop (sync callers / scripts): behave write-through
+            self.flush()
+            return
+        self._flush_scheduled = True
+        loop.call_later(self.flush_interval if delay is None else delay, self.flush)
+
+    def _cache(self, run: RunRecord) -> None:
+        with self._lock:
+            self._hot[run.run_id] = run
+            if len(self._hot) <= self.MAX_HOT_RUNS:
+                return
+            oldest = next(iter(self._hot))
+            self._hot.pop(oldest, None)
+            pending = self._dirty.pop(oldest, None)
+        if pending:
+            try:
+                self._write({oldest: pending})
+            except Exception as e:
+                self._requeue({oldest: pending}, e)
+
+    @staticmethod
+    def _apply(run: RunRecord, fields: dict[str, Any]) -> None:
+        for key, value in fields.items():
+            if key in ("metadata", "meta"):
+                run.metadata = copy.deepcopy(value or {})
+            elif key == "token_usage":
+                run.token_usage = dict(value or {})
+            elif hasattr(run, key):
+                setattr(run, key, value)
+
+    def _write(self, batch: dict[str, dict[str, Any]], refresh: bool = False) -> dict[str, RunRecord]:
+        out: dict[str, RunRecord] = {}
+        with SessionLocal() as db:
+            rows = db.query(AgentRun).filter(AgentRun.run_id.in_(list(batch))).all()
+            for row in rows:
+                for key, value in batch[row.run_id].items():
+                    if key in ("token_usage", "metadata"):
+                        value = json.dumps(value or {}, ensure_ascii=False)
+                        if key == "token_usage":
+                            row.token_usage = value
+                        else:
+                            row.meta = value
+                    elif key == "meta":
+                        row.meta = json.dumps(value or {}, ensure_ascii=False) if value else None
+                    elif hasattr(row, key):
+                        setattr(row, key, value)
             db.commit()
-            db.refresh(row)
-            return self._to_record(row)
+            if refresh:
+                for row in rows:
+                    db.refresh(row)
+                    out[row.run_id] = self._to_record(row)
+        return out
 
     def delete_older_than(self, days: int) -> int:
+        self.flush()
         cutoff = _now() - datetime.timedelta(days=days)
         with SessionLocal() as db:
             n = db.query(AgentRun).filter(AgentRun.created_at < cutoff).delete()
             db.commit()
-            return n
\ No newline at end of file
+            return n
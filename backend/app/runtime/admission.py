@@ -0,0 +1,275 @@
+"""Run admission control: bounded concurrency + fair priority queue (spec 58).
+
+``create_run`` used to spawn ``execute_run`` immediately, so a burst of
+requests or scheduler ticks fanned out into unbounded concurrent LLM calls.
+The AdmissionController caps running runs globally and per user; excess runs
+stay PENDING in a bounded queue and start in priority order:
+
+    delegated (children; the parent is parked waiting) > interactive > scheduled
+
+Within a class users are served round-robin so one user's burst cannot starve
+the others. Delegated children borrow their parent's slot (the parent is
+blocked in ``wait_for_run``), which keeps nested delegation deadlock-free.
+
+A run parked on human approval gives its slot back (``suspend``) and queues
+for one again ahead of every other class once approved (``reacquire``), so
+runs waiting on people cannot exhaust ``max_concurrent_runs``.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from .errors import RunQueueFullError
+
+
+class RunClass:
+    """Priority classes, highest first."""
+
+    RESUMED = "resumed"  # suspended runs reacquiring their slot (internal)
+    DELEGATED = "delegated"
+    INTERACTIVE = "interactive"
+    SCHEDULED = "scheduled"
+
+    ORDER = (RESUMED, DELEGATED, INTERACTIVE, SCHEDULED)
+
+
+@dataclass
+class _Ticket:
+    run_id: str
+    user_id: int | None
+    run_class: str
+    start: Callable[[], bool]
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class AdmissionController:
+    """Global / per-user run slots with a fair, bounded priority queue.
+
+    ``start`` callbacks return True when the run task was actually spawned;
+    the runtime calls ``release(run_id)`` when the run finishes. Limits of 0
+    mean unlimited.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_concurrent: int = 8,
+        max_per_user: int = 4,
+        max_queue: int = 200,
+        metrics: Any = None,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_per_user = max_per_user
+        self.max_queue = max_queue
+        self.metrics = metrics
+        self._active: dict[str, int | None] = {}  # run_id -> user_id (slot holders)
+        self._borrowed: set[str] = set()          # delegated runs riding a parent's slot
+        self._per_user: dict[int | None, int] = {}
+        # class -> user -> FIFO of tickets; user order rotates for fairness
+        self._queues: dict[str, OrderedDict[int | None, deque[_Ticket]]] = {
+            c: OrderedDict() for c in RunClass.ORDER
+        }
+        self._queued: dict[str, _Ticket] = {}
+        self._waits: dict[str, float] = {}  # run_id -> seconds queued, until the run picks it up
+        self._suspended: dict[str, int | None] = {}  # run_id -> user_id, slot given back
+
+    @classmethod
+    def from_settings(cls, runtime_settings: Any, metrics: Any = None) -> AdmissionController:
+        return cls(
+            max_concurrent=int(getattr(runtime_settings, "max_concurrent_runs", 8)),
+            max_per_user=int(getattr(runtime_settings, "max_runs_per_user", 4)),
+            max_queue=int(getattr(runtime_settings, "max_queued_runs", 200)),
+            metrics=metrics,
+        )
+
+    # ---- capacity ----
+    def _has_slot(self, user_id: int | None) -> bool:
+        if self.max_concurrent and len(self._active) >= self.max_concurrent:
+            return False
+        if self.max_per_user and self._per_user.get(user_id, 0) >= self.max_per_user:
+            return False
+        return True
+
+    def check(self, user_id: int | None, run_class: str) -> None:
+        """Raise RunQueueFullError if a new run could neither start nor queue."""
+        if run_class == RunClass.DELEGATED or self._has_slot(user_id):
+            return
+        if self.max_queue and len(self._queued) >= self.max_queue:
+            if self.metrics is not None:
+                self.metrics.inc("runs_rejected_total")
+            raise RunQueueFullError(details={"queued": len(self._queued), "max_queue": self.max_queue})
+
+    # ---- submission ----
+    def submit(
+        self,
+        run_id: str,
+        user_id: int | None,
+        run_class: str,
+        start: Callable[[], bool],
+    ) -> int:
+        """Start ``run_id`` now (returns 0) or queue it (returns its 1-based position)."""
+        if run_class not in self._queues or run_class == RunClass.RESUMED:
+            run_class = RunClass.INTERACTIVE
+        if run_class == RunClass.DELEGATED:
+            if start():
+                self._borrowed.add(run_id)
+            return 0
+        self.check(user_id, run_class)
+        ticket = _Ticket(run_id, user_id, run_class, start)
+        if self._has_slot(user_id) and not self._queued:
+            self._admit(ticket)
+            return 0
+        self._queues[run_class].setdefault(user_id, deque()).append(ticket)
+        self._queued[run_id] = ticket
+        if self.metrics is not None:
+            self.metrics.inc("runs_queued_total")
+        self._dispatch()
+        return self.position(run_id) or 0
+
+    def release(self, run_id: str) -> None:
+        """A run finished (or never started): free its slot and admit the next."""
+        self._borrowed.discard(run_id)
+        self._waits.pop(run_id, None)
+        self._suspended.pop(run_id, None)
+        if run_id in self._active:
+            user_id = self._active.pop(run_id)
+            left = self._per_user.get(user_id, 1) - 1
+            if left > 0:
+                self._per_user[user_id] = left
+            else:
+                self._per_user.pop(user_id, None)
+        self._dispatch()
+
+    def suspend(self, run_id: str) -> bool:
+        """Give back the slot of a run parked outside execution (human approval).
+
+        Returns False for runs without a slot of their own (borrowed / not
+        admitted); those need no ``reacquire``.
+        """
+        if run_id not in self._active:
+            return False
+        user_id = self._active[run_id]
+        self.release(run_id)
+        self._suspended[run_id] = user_id
+        return True
+
+    async def reacquire(self, run_id: str) -> None:
+        """Wait for a slot again after ``suspend``, ahead of every queued class."""
+        if run_id not in self._suspended:
+            return
+        user_id = self._suspended.pop(run_id)
+        granted = asyncio.get_running_loop().create_future()
+
+        def start() -> bool:
+            if granted.done():  # the waiter went away (run cancelled)
+                return False
+            granted.set_result(None)
+            return True
+
+        ticket = _Ticket(run_id, user_id, RunClass.RESUMED, start)
+        if self._has_slot(user_id) and not self._queued:
+            self._admit(ticket)
+        else:
+            self._queues[RunClass.RESUMED].setdefault(user_id, deque()).append(ticket)
+            self._queued[run_id] = ticket
+            self._dispatch()
+        try:
+            await granted
+        except asyncio.CancelledError:
+            self.remove(run_id)
+            raise
+
+    def remove(self, run_id: str) -> bool:
+        """Drop a queued run (cancelled before it started)."""
+        ticket = self._queued.pop(run_id, None)
+        if ticket is None:
+            return False
+        users = self._queues[ticket.run_class]
+        q = users.get(ticket.user_id)
+        if q is not None:
+            try:
+                q.remove(ticket)
+            except ValueError:
+                pass
+            if not q:
+                users.pop(ticket.user_id, None)
+        return True
+
+    # ---- scheduling ----
+    def _admit(self, ticket: _Ticket) -> None:
+        self._active[ticket.run_id] = ticket.user_id
+        self._per_user[ticket.user_id] = self._per_user.get(ticket.user_id, 0) + 1
+        wait = time.monotonic() - ticket.enqueued_at
+        self._waits[ticket.run_id] = wait
+        if self.metrics is not None:
+            self.metrics.record("run_queue_wait_duration", wait)
+        if not ticket.start():
+            self.release(ticket.run_id)
+
+    def _next(self) -> _Ticket | None:
+        if self.max_concurrent and len(self._active) >= self.max_concurrent:
+            return None
+        for run_class in RunClass.ORDER:
+            users = self._queues[run_class]
+            for user_id in list(users):
+                if not self._has_slot(user_id):
+                    continue
+                q = users[user_id]
+                ticket = q.popleft()
+                # rotate: this user goes to the back of the class round-robin
+                users.pop(user_id)
+                if q:
+                    users[user_id] = q
+                return ticket
+        return None
+
+    def _dispatch(self) -> None:
+        while True:
+            ticket = self._next()
+            if ticket is None:
+                return
+            self._queued.pop(ticket.run_id, None)
+            self._admit(ticket)
+
+    # ---- introspection ----
+    def queue_wait(self, run_id: str) -> float | None:
+        """Seconds ``run_id`` spent queued before admission (None for borrowed slots)."""
+        return self._waits.get(run_id)
+
+    def position(self, run_id: str) -> int | None:
+        """1-based position in the expected dispatch order (None if not queued)."""
+        if run_id not in self._queued:
+            return None
+        pos = 0
+        for run_class in RunClass.ORDER:
+            lanes = [list(q) for q in self._queues[run_class].values()]
+            depth = 0
+            while any(depth < len(lane) for lane in lanes):
+                for lane in lanes:
+                    if depth < len(lane):
+                        pos += 1
+                        if lane[depth].run_id == run_id:
+                            return pos
+                depth += 1
+        return None
+
+    def is_queued(self, run_id: str) -> bool:
+        return run_id in self._queued
+
+    def status(self) -> dict[str, Any]:
+        return {
+            "active": len(self._active),
+            "borrowed": len(self._borrowed),
+            "queued": len(self._queued),
+            "queued_by_class": {
+                c: sum(len(q) for q in users.values()) for c, users in self._queues.items()
+            },
+            "max_concurrent": self.max_concurrent,
+            "max_per_user": self.max_per_user,
+            "max_queue": self.max_queue,
+        }
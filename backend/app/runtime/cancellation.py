@@ -12,10 +12,32 @@ class CancellationToken:
 
     def __init__(self):
         self._cancelled = False
+        self._callbacks: list = []
 
     def cancel(self) -> None:
-        """Request cancellation."""
+        """Request cancellation and notify registered waiters."""
+        if self._cancelled:
+            return
         self._cancelled = True
+        callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def add_callback(self, callback) -> None:
+        """Call ``callback()`` on cancellation (immediately if already cancelled)."""
+        if self._cancelled:
+            callback()
+        else:
+            self._callbacks.append(callback)
+
+    def remove_callback(self, callback) -> None:
+        try:
+            self._callbacks.remove(callback)
+        except ValueError:
+            pass
 
     @property
     def cancelled(self) -> bool:
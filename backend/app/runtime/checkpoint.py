@@ -0,0 +1,47 @@
+"""Run checkpoints: compact snapshots of ``AgentState`` for resumable runs.
+
+The ExecutionEngine saves one after every model turn and every tool result,
+so a run interrupted by a restart resumes from its last completed step
+instead of re-issuing LLM and tool calls. Snapshots are JSON compressed with
+zlib; the store keeps only the latest one per run and drops it once the run
+reaches a terminal state.
+"""
+from __future__ import annotations
+
+import json
+import zlib
+from typing import Any
+
+CHECKPOINT_VERSION = 1
+
+
+def encode_checkpoint(data: dict[str, Any]) -> bytes:
+    return zlib.compress(json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str).encode(), 6)
+
+
+def decode_checkpoint(blob: bytes) -> dict[str, Any] | None:
+    try:
+        data = json.loads(zlib.decompress(blob))
+    except (zlib.error, ValueError):
+        return None
+    return data if data.get("version") == CHECKPOINT_VERSION else None
+
+
+class InMemoryCheckpointStore:
+    """Implements the runtime.CheckpointStore protocol in process memory (tests)."""
+
+    def __init__(self) -> None:
+        self._blobs: dict[str, bytes] = {}
+
+    def save(self, run_id: str, data: dict[str, Any]) -> None:
+        self._blobs[run_id] = encode_checkpoint(data)
+
+    def load(self, run_id: str) -> dict[str, Any] | None:
+        blob = self._blobs.get(run_id)
+        return decode_checkpoint(blob) if blob is not None else None
+
+    def delete(self, run_id: str) -> None:
+        self._blobs.pop(run_id, None)
+
+    def size(self, run_id: str) -> int:
+        return len(self._blobs.get(run_id, b""))
@@ -1,5 +1,6 @@
 """Context Engine (spec 15 / 16): assembles the final LLM prompt."""
 
 from .builder import ContextBuilder
+from .tokens import HeuristicCounter, TokenCounter, get_token_counter
 
-__all__ = ["ContextBuilder"]
\ No newline at end of file
+__all__ = ["ContextBuilder", "HeuristicCounter", "TokenCounter", "get_token_counter"]
\ No newline at end of file
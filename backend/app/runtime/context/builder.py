@@ -1,8 +1,13 @@
 from __future__ import annotations
 
-from typing import Any
+import asyncio
+import hashlib
+import inspect
+from typing import Any, Callable
 
 from ..run_context import RunContext
+from ..tracing import span
+from .tokens import CachedCounter, get_token_counter
 
 
 class ContextBuilder:
@@ -12,6 +17,11 @@ class ContextBuilder:
     Knowledge Retrieval -> Tool State -> Context Budget -> Final Prompt.
     """
 
+    #: Turns always kept regardless of budget (the live exchange + tool results).
+    MIN_RECENT = 6
+    #: Upper bound on tokens reserved for a dropped-history summary.
+    SUMMARY_RESERVE = 512
+
     def __init__(
         self,
         *,
@@ -19,11 +29,23 @@ class ContextBuilder:
         knowledge_provider: Any = None,
         history_provider: Any = None,
         contributors: list | None = None,
+        token_counter: CachedCounter | None = None,
+        tokenizer_resolver: Callable[[str], Any] | None = None,
+        summarizer: Callable[..., Any] | None = None,
     ):
         self.memory_provider = memory_provider
         self.knowledge_provider = knowledge_provider
         self.history_provider = history_provider
         self.contributors = list(contributors or [])
+        # token budgeting: a fixed counter, or one resolved per model (local
+        # models count with their own tokenizer via ``tokenizer_resolver``,
+        # which returns a tokenizer or a ready CachedCounter, or None)
+        self.token_counter = token_counter
+        self.tokenizer_resolver = tokenizer_resolver
+        self._counters: dict[str, CachedCounter] = {}  # fallback counters only
+        # optional ``summarizer(dropped_messages, max_tokens=...)`` (sync or
+        # async) whose text replaces history that no longer fits the budget
+        self.summarizer = summarizer
 
     async def build(
         self,
@@ -31,18 +53,51 @@ class ContextBuilder:
         working_messages: list[dict[str, Any]],
         iteration: int = 0,
     ) -> list[dict[str, Any]]:
-        """Return the prompt message list for the current LLM call."""
+        """Return the prompt message list for the current LLM call.
+
+        Memory, knowledge and history depend only on the run input and
+        session, so they are fetched concurrently on the first iteration and
+        memoized on the RunContext; later iterations only re-append the
+        working messages.
+        """
+        prefix = ctx.context_prefix
+        if prefix is None:
+            prefix = await self._build_prefix(ctx)
+            ctx.context_prefix = prefix
+        messages = prefix + list(working_messages)
+        budget = ctx.max_context_tokens
+        counter = self.counter_for(ctx.model)
+        if self.summarizer is None:
+            return self._fit(messages, budget, counter)[0]
+        kept, dropped = self._fit(messages, budget, counter)
+        if not dropped:
+            return kept
+        # re-fit with room reserved for the summary of what was dropped
+        reserve = min(self.SUMMARY_RESERVE, max(budget // 8, 1))
+        kept, dropped = self._fit(messages, budget - reserve, counter)
+        with span("context.summary", dropped=len(dropped)):
+            summary = await self._summarize(ctx, dropped, reserve, counter)
+        if not summary:
+            return kept
+        at = next((i for i, m in enumerate(kept) if m.get("role") != "system"), len(kept))
+        return [*kept[:at], summary, *kept[at:]]
+
+    async def _build_prefix(self, ctx: RunContext) -> list[dict[str, Any]]:
+        """System prompt (with memory / knowledge / skills) + session history."""
+        memories, knowledge, history = await asyncio.gather(
+            _traced("context.memory", self._retrieve_memories(ctx)),
+            _traced("context.knowledge", self._retrieve_knowledge(ctx)),
+            _traced("context.history", self._load_history(ctx)),
+        )
         system = ctx.system_prompt or "You are a helpful AI agent running tasks for the user."
         extras: list[str] = []
 
         # memory retrieval (spec 17)
-        memories = await self._retrieve_memories(ctx)
         if memories:
             extras.append("[用户记忆]")
             extras.extend(f"- {m}" for m in memories)
 
         # knowledge retrieval (spec 18) - only when the agent declared sources
-        knowledge = await self._retrieve_knowledge(ctx)
         if knowledge:
             extras.append("[知识库资料]")
             extras.extend(f"- [{k.get('source', '?')}] {k.get('text', '')}" for k in knowledge)
@@ -57,18 +112,8 @@ class ContextBuilder:
         if extras:
             system = system + "\n\n" + "\n".join(extras)
 
-        prompt: list[dict[str, Any]] = [{"role": "system", "content": system}]
-
         # session history (spec 5: Session is long-term context)
-        if self.history_provider is not None and ctx.session_id is not None:
-            try:
-                history = await self.history_provider.load(ctx.session_id, limit=20)
-                prompt.extend(history)
-            except Exception:
-                pass
-
-        prompt.extend(working_messages)
-        return self._trim(prompt, ctx.max_context_tokens)
+        return [{"role": "system", "content": system}, *history]
 
     def _collect_contributions(self, ctx: RunContext) -> list[dict[str, Any]]:
         """Merge run-level contributions (from skill plugins / agent plugins) with
@@ -95,6 +140,14 @@ class ContextBuilder:
         except Exception:
             return []
 
+    async def _load_history(self, ctx: RunContext) -> list[dict[str, Any]]:
+        if self.history_provider is None or ctx.session_id is None:
+            return []
+        try:
+            return list(await self.history_provider.load(ctx.session_id, limit=20))
+        except Exception:
+            return []
+
     async def _retrieve_knowledge(self, ctx: RunContext) -> list[dict[str, Any]]:
         if self.knowledge_provider is None:
             return []
@@ -105,33 +158,117 @@ class ContextBuilder:
         except Exception:
             return []
 
-    @staticmethod
-    def _rough_tokens(msg: dict[str, Any]) -> int:
-        text = str(msg.get("content", "") or "")
-        return max(1, len(text) // 4)
+    def counter_for(self, model: str | None) -> CachedCounter:
+        """Token counter for ``model``: injected > model tokenizer > tiktoken > heuristic.
+
+        The resolver is asked on every call, so a model loaded later switches
+        to its own tokenizer and nothing here keeps an unloaded model alive;
+        only the model-independent fallbacks are cached.
+        """
+        if self.token_counter is not None:
+            return self.token_counter
+        if self.tokenizer_resolver is not None and model:
+            try:
+                resolved = self.tokenizer_resolver(model)
+            except Exception:
+                resolved = None
+            if isinstance(resolved, CachedCounter):
+                return resolved
+            if resolved is not None:
+                return get_token_counter(model, resolved)
+        key = model or ""
+        counter = self._counters.get(key)
+        if counter is None:
+            counter = get_token_counter(model)
+            self._counters[key] = counter
+        return counter
+
+    async def _summarize(
+        self,
+        ctx: RunContext,
+        dropped: list[dict[str, Any]],
+        reserve: int,
+        counter: CachedCounter,
+    ) -> dict[str, Any] | None:
+        """Summary message for ``dropped``, memoized on the run while the set is unchanged."""
+        digest = hashlib.sha1()
+        for m in dropped:
+            digest.update(str(m.get("role", "")).encode())
+            digest.update(str(m.get("content", "") or "").encode("utf-8", "replace"))
+        key = digest.hexdigest()
+        cached = ctx.variables.get("_context_summary")
+        if cached and cached[0] == key:
+            text = cached[1]
+        else:
+            try:
+                result = self.summarizer(dropped, max_tokens=reserve)
+                if inspect.isawaitable(result):
+                    result = await result
+                text = str(result or "").strip()
+            except Exception:
+                text = ""
+            ctx.variables["_context_summary"] = (key, text)
+        if not text:
+            return None
+        msg = {"role": "system", "content": f"[早期对话摘要]\n{text}"}
+        return msg if counter.message_tokens(msg) <= reserve else None
 
     def _trim(
         self,
         messages: list[dict[str, Any]],
         budget: int,
+        counter: CachedCounter | None = None,
     ) -> list[dict[str, Any]]:
+        return self._fit(messages, budget, counter or self.counter_for(None))[0]
+
+    def _fit(
+        self,
+        messages: list[dict[str, Any]],
+        budget: int,
+        counter: CachedCounter,
+    ) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
         """Context budget (spec 16): keep system + recent messages, drop oldest.
 
-        Tool results and recent turns are preserved; only mid-history is dropped.
+        Single pass from newest to oldest over a running total. System
+        messages and the last ``MIN_RECENT`` turns are always kept; a tool
+        result stays grouped with the assistant message that called it, so a
+        trimmed prompt never starts with an orphaned tool message. Returns
+        ``(kept, dropped)``.
         """
-        if budget <= 0:
-            return messages
-        total = sum(self._rough_tokens(m) for m in messages)
-        if total <= budget:
-            return messages
-        if len(messages) <= 2:
-            return messages
-        out = list(messages)
-        while len(out) > 7 and sum(self._rough_tokens(m) for m in out) > budget:
-            for idx, m in enumerate(out):
-                if m.get("role") != "system" and idx != len(out) - 1:
-                    out.pop(idx)
-                    break
-            else:
+        n = len(messages)
+        if budget <= 0 or n <= 2:
+            return messages, []
+        costs = [counter.message_tokens(m) for m in messages]
+        if sum(costs) <= budget:
+            return messages, []
+        keep = [m.get("role") == "system" for m in messages]
+        used = sum(c for c, k in zip(costs, keep) if k)
+        recent = 0
+        i = n - 1
+        while i >= 0:
+            if keep[i]:
+                i -= 1
+                continue
+            j = i
+            while j > 0 and messages[j].get("role") == "tool" and not keep[j - 1]:
+                j -= 1
+            cost = sum(costs[j:i + 1])
+            if recent >= self.MIN_RECENT and used + cost > budget:
                 break
-        return out
\ No newline at end of file
+            for k in range(j, i + 1):
+                keep[k] = True
+            used += cost
+            recent += i - j + 1
+            i = j - 1
+        kept = [m for m, k in zip(messages, keep) if k]
+        dropped = [m for m, k in zip(messages, keep) if not k]
+        return kept, dropped
+
+
+async def _traced(name: str, retrieval: Any) -> Any:
+    """Await one prefix retrieval inside a child span of the active trace."""
+    with span(name) as s:
+        result = await retrieval
+        if s is not None:
+            s.set(items=len(result))
+        return result
@@ -0,0 +1,166 @@
+"""Token counting for context budgeting (spec 16).
+
+``len(text) // 4`` undercounts Chinese by roughly 4x, so the budget let
+CJK-heavy prompts overflow the model context. Counters here are pluggable:
+
+* ``TiktokenCounter``   - BPE counts when ``tiktoken`` is installed
+* ``TokenizerCounter``  - a local model's own tokenizer (``encode``)
+* ``HeuristicCounter``  - CJK-aware estimate, always available
+
+``CachedCounter`` memoizes per-message counts so a message is tokenized once
+per process rather than once per iteration.
+"""
+from __future__ import annotations
+
+import json
+from collections import OrderedDict
+from typing import Any, Protocol, runtime_checkable
+
+#: Chat formats wrap every message in a few framing tokens (role, separators).
+MESSAGE_OVERHEAD = 4
+
+
+@runtime_checkable
+class TokenCounter(Protocol):
+    name: str
+
+    def count(self, text: str) -> int: ...
+
+
+def _is_cjk(ch: str) -> bool:
+    code = ord(ch)
+    return (
+        0x4E00 <= code <= 0x9FFF      # CJK unified ideographs
+        or 0x3400 <= code <= 0x4DBF   # extension A
+        or 0x3040 <= code <= 0x30FF   # hiragana / katakana
+        or 0xAC00 <= code <= 0xD7AF   # hangul syllables
+        or 0xF900 <= code <= 0xFAFF   # compatibility ideographs
+        or 0x3000 <= code <= 0x303F   # CJK punctuation
+        or 0xFF00 <= code <= 0xFFEF   # full-width forms
+    )
+
+
+class HeuristicCounter:
+    """CJK-aware estimate calibrated against cl100k-style BPE vocabularies.
+
+    ASCII text averages ~4 characters per token; CJK ideographs are close to
+    one token each (often more); other non-ASCII letters ~2 characters per
+    token. The estimate errs high so budgets are not overrun.
+    """
+
+    name = "heuristic"
+    ASCII_CHARS_PER_TOKEN = 4.0
+    CJK_TOKENS_PER_CHAR = 1.1
+    OTHER_CHARS_PER_TOKEN = 2.0
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        ascii_n = cjk_n = other_n = 0
+        for ch in text:
+            if ch.isascii():
+                ascii_n += 1
+            elif _is_cjk(ch):
+                cjk_n += 1
+            else:
+                other_n += 1
+        estimate = (
+            ascii_n / self.ASCII_CHARS_PER_TOKEN
+            + cjk_n * self.CJK_TOKENS_PER_CHAR
+            + other_n / self.OTHER_CHARS_PER_TOKEN
+        )
+        return max(1, int(estimate + 0.999))
+
+
+class TiktokenCounter:
+    """Exact BPE counts via ``tiktoken`` (optional dependency)."""
+
+    name = "tiktoken"
+
+    def __init__(self, encoding: Any):
+        self._encoding = encoding
+
+    @classmethod
+    def create(cls, model: str | None = None) -> TiktokenCounter | None:
+        try:
+            import tiktoken
+        except ImportError:
+            return None
+        try:
+            encoding = tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            try:
+                encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception:
+                return None
+        return cls(encoding)
+
+    def count(self, text: str) -> int:
+        return len(self._encoding.encode(text or "", disallowed_special=()))
+
+
+class TokenizerCounter:
+    """Counts with a model's own tokenizer (transformers ``encode`` / llama-cpp ``tokenize``)."""
+
+    name = "tokenizer"
+
+    def __init__(self, tokenizer: Any):
+        self._tokenizer = tokenizer
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        encode = getattr(self._tokenizer, "encode", None)
+        if encode is not None:
+            return len(encode(text, add_special_tokens=False))
+        # llama-cpp ``Llama.tokenize`` takes bytes
+        return len(self._tokenizer.tokenize(text.encode("utf-8"), add_bos=False))
+
+
+class CachedCounter:
+    """Per-message token cache in front of any counter (bounded LRU)."""
+
+    MAX_ENTRIES = 4096
+
+    def __init__(self, counter: TokenCounter, max_entries: int | None = None):
+        self.counter = counter
+        self.name = counter.name
+        self._cache: OrderedDict[tuple[str, str], int] = OrderedDict()
+        self._max = max_entries or self.MAX_ENTRIES
+        self.hits = 0
+        self.misses = 0
+
+    def count(self, text: str) -> int:
+        return self.counter.count(text)
+
+    def message_tokens(self, msg: dict[str, Any]) -> int:
+        key = (str(msg.get("role", "")), _message_text(msg))
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return cached
+        self.misses += 1
+        value = MESSAGE_OVERHEAD + self.counter.count(key[1])
+        self._cache[key] = value
+        if len(self._cache) > self._max:
+            self._cache.popitem(last=False)
+        return value
+
+
+def _message_text(msg: dict[str, Any]) -> str:
+    text = str(msg.get("content", "") or "")
+    calls = msg.get("tool_calls")
+    if calls:
+        text += json.dumps(calls, ensure_ascii=False, default=str)
+    return text
+
+
+def get_token_counter(model: str | None = None, tokenizer: Any = None) -> CachedCounter:
+    """Best available counter: model tokenizer > tiktoken > CJK heuristic."""
+    if tokenizer is not None and (hasattr(tokenizer, "encode") or hasattr(tokenizer, "tokenize")):
+        return CachedCounter(TokenizerCounter(tokenizer))
+    counter = TiktokenCounter.create(model)
+    if counter is not None:
+        return CachedCounter(counter)
+    return CachedCounter(HeuristicCounter())
@@ -0,0 +1,117 @@
+"""Five-field cron expressions evaluated in an IANA timezone.
+
+Supports ``*``, lists, ranges, ``/`` steps, month / weekday names and the
+``@hourly`` / ``@daily`` / ``@weekly`` / ``@monthly`` / ``@yearly`` macros.
+Like Vixie cron, when both day-of-month and day-of-week are restricted a day
+matching either one fires. Times are evaluated on the local wall clock:
+a slot inside a DST gap runs after the gap, a repeated hour fires once.
+"""
+from __future__ import annotations
+
+import datetime
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+MACROS = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+_MONTHS = {name: i + 1 for i, name in enumerate("jan feb mar apr may jun jul aug sep oct nov dec".split())}
+_DAYS = {name: i for i, name in enumerate("sun mon tue wed thu fri sat".split())}
+# (low, high, names) for minute, hour, day-of-month, month, day-of-week
+_FIELDS = ((0, 59, {}), (0, 23, {}), (1, 31, {}), (1, 12, _MONTHS), (0, 7, _DAYS))
+_UTC = datetime.timezone.utc
+
+
+def get_zone(name: str | None) -> datetime.tzinfo:
+    if not name or name.upper() == "UTC":
+        return _UTC
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError) as exc:
+        raise ValueError(f"unknown timezone: {name}") from exc
+
+
+def _parse_field(text: str, low: int, high: int, names: dict[str, int]) -> frozenset[int]:
+    def value(token: str) -> int:
+        token = token.lower()
+        number = names[token] if token in names else int(token)
+        if not low <= number <= high:
+            raise ValueError(f"cron value {token} out of range {low}-{high}")
+        return number
+
+    values: set[int] = set()
+    for part in text.split(","):
+        base, _, step_text = part.partition("/")
+        step = int(step_text) if step_text else 1
+        if step < 1:
+            raise ValueError("cron step must be positive")
+        if base == "*":
+            start, end = low, high
+        elif "-" in base:
+            first, last = base.split("-", 1)
+            start, end = value(first), value(last)
+        else:
+            start = value(base)
+            end = high if step_text else start
+        if start > end:
+            raise ValueError(f"cron range {base} is reversed")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+class CronExpression:
+    """Parsed cron schedule; ``next_after`` walks the local wall clock."""
+
+    def __init__(self, expression: str):
+        text = MACROS.get(expression.strip().lower(), expression.strip())
+        parts = text.split()
+        if len(parts) != 5:
+            raise ValueError("cron expression needs 5 fields: minute hour day month weekday")
+        try:
+            fields = [_parse_field(part, *spec) for part, spec in zip(parts, _FIELDS)]
+        except (KeyError, ValueError) as exc:
+            raise ValueError(f"invalid cron expression {expression!r}: {exc}") from exc
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = fields
+        self.weekdays = frozenset(d % 7 for d in weekdays)
+        # as in Vixie cron, a day field starting with "*" (also "*/n") is unrestricted
+        self._dom_any, self._dow_any = parts[2].startswith("*"), parts[4].startswith("*")
+
+    def _day_matches(self, day: datetime.datetime) -> bool:
+        dom = day.day in self.days
+        dow = (day.weekday() + 1) % 7 in self.weekdays
+        if self._dom_any or self._dow_any:
+            return dom and dow
+        return dom or dow
+
+    def next_after(self, moment: datetime.datetime) -> datetime.datetime:
+        """First matching naive wall-clock minute strictly after ``moment``."""
+        t = moment.replace(second=0, microsecond=0, tzinfo=None) + datetime.timedelta(minutes=1)
+        limit = t + datetime.timedelta(days=366 * 5)
+        while t < limit:
+            if t.month not in self.months:
+                t = (t.replace(day=1, hour=0, minute=0) + datetime.timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(t):
+                t = t.replace(hour=0, minute=0) + datetime.timedelta(days=1)
+            elif t.hour not in self.hours:
+                t = t.replace(minute=0) + datetime.timedelta(hours=1)
+            elif t.minute not in self.minutes:
+                t += datetime.timedelta(minutes=1)
+            else:
+                return t
+        raise ValueError(f"cron expression {self.expression!r} never fires")
+
+    def next_fire(self, after_utc: datetime.datetime, timezone: str | None = "UTC") -> datetime.datetime:
+        """Next fire time after naive-UTC ``after_utc``, as naive UTC."""
+        zone = get_zone(timezone)
+        local = after_utc.replace(tzinfo=_UTC).astimezone(zone).replace(tzinfo=None)
+        while True:
+            local = self.next_after(local)
+            fire = local.replace(tzinfo=zone).astimezone(_UTC).replace(tzinfo=None)
+            if fire > after_utc:
+                return fire
@@ -61,6 +61,12 @@ class ToolTimeoutError(RuntimeError):
     default_message = "Tool execution timed out"
 
 
+class RunQueueFullError(RuntimeError):
+    code = "RUN_QUEUE_FULL"
+    http_status = 429
+    default_message = "Run queue is full, retry later"
+
+
 class ModelNotFoundError(RuntimeError):
     code = "MODEL_NOT_FOUND"
     http_status = 404
@@ -73,6 +79,12 @@ class ModelUnavailableError(RuntimeError):
     default_message = "Model unavailable"
 
 
+class ModelRateLimitedError(RuntimeError):
+    code = "MODEL_RATE_LIMITED"
+    http_status = 429
+    default_message = "Model provider rate limit: no capacity before the deadline"
+
+
 class ContextTooLargeError(RuntimeError):
     code = "CONTEXT_TOO_LARGE"
     http_status = 413
@@ -109,5 +121,6 @@ ERROR_CODES = (
     "TOOL_NOT_FOUND", "TOOL_DENIED", "TOOL_TIMEOUT", "MODEL_NOT_FOUND",
     "MODEL_UNAVAILABLE", "CONTEXT_TOO_LARGE", "POLICY_DENIED",
     "HUMAN_APPROVAL_REQUIRED", "RUNTIME_ERROR", "AGENT_LOOP_LIMIT",
-    "AGENT_TOOL_CALL_LIMIT",
+    "AGENT_TOOL_CALL_LIMIT", "RUN_QUEUE_FULL",
+    "MODEL_RATE_LIMITED",
 )
\ No newline at end of file
@@ -109,6 +109,11 @@ class EventBus:
         """Persistence adapter (None = in-memory only)."""
         return self._store
 
+    @property
+    def queue_depth(self) -> int:
+        """Events waiting for the persistence writer."""
+        return self._queue.qsize()
+
     @property
     def write_failures(self) -> int:
         """Count of persistence write failures (audit P0-4 observability)."""
@@ -4,6 +4,7 @@ import asyncio
 import time
 from typing import Any
 
+from .checkpoint import CHECKPOINT_VERSION
 from .errors import (
     AgentLoopLimitError,
     AgentToolCallLimitError,
@@ -15,9 +16,10 @@ from .errors import (
     ToolTimeoutError,
 )
 from .logging import get_logger, log_run
-from .models.base import ModelProvider
+from .models.base import ModelProvider, ToolCall
 from .run_context import RunContext, ToolExecutionContext
 from .state import AgentState
+from .tracing import Tracer
 
 
 class ExecutionEngine:
@@ -38,12 +40,19 @@ class ExecutionEngine:
         context_builder: Any | None = None,
         metrics: Any | None = None,
         logger: Any | None = None,
+        checkpoints: Any | None = None,
+        usage: Any | None = None,
+        tracer: Any | None = None,
     ):
         self.event_bus = event_bus
         self.tool_runner = tool_runner
         self.context_builder = context_builder
         self.metrics = metrics
+        # per-user model usage buckets (services/model_metrics.py)
+        self.usage = usage
+        self.tracer = tracer or Tracer(enabled=False)
         self.logger = logger or get_logger()
+        self.checkpoints = checkpoints
 
     # ---- public ----
     async def execute(
@@ -51,15 +60,25 @@ class ExecutionEngine:
         ctx: RunContext,
         provider: ModelProvider,
     ) -> dict[str, Any]:
-        """Run the loop; never raises - returns an outcome dict (spec 20)."""
-        state = AgentState(run_id=ctx.run_id)
-        # system prompt is assembled by the ContextEngine when one is configured;
-        # otherwise keep it inline for plain runs (spec 68).
-        if self.context_builder is None and ctx.system_prompt:
-            state.messages.append({"role": "system", "content": ctx.system_prompt})
-        state.messages.append({"role": "user", "content": ctx.input_text or ""})
-
-        token_usage: dict[str, int] = {}
+        """Run the loop; never raises - returns an outcome dict (spec 20).
+
+        With a checkpoint store the loop resumes from the run's last
+        snapshot: completed model turns and tool results are replayed from
+        state, only tool calls without a recorded result are executed.
+        """
+        state, token_usage = self._restore(ctx)
+        if state is None:
+            state = AgentState(run_id=ctx.run_id)
+            # system prompt is assembled by the ContextEngine when one is configured;
+            # otherwise keep it inline for plain runs (spec 68).
+            if self.context_builder is None and ctx.system_prompt:
+                state.messages.append({"role": "system", "content": ctx.system_prompt})
+            state.messages.append({"role": "user", "content": ctx.input_text or ""})
+            pending: list[ToolCall] = []
+        else:
+            pending = self._pending_tool_calls(state)
+            await self._emit(ctx, "run.resumed", {"iteration": state.iteration, "pending_tool_calls": len(pending)})
+
         final_output = ""
         outcome_status = "COMPLETED"
         error: str | None = None
@@ -67,117 +86,49 @@ class ExecutionEngine:
 
         try:
             while True:
+                if pending:  # tool calls a restart interrupted
+                    await self._run_tool_calls(ctx, state, pending, token_usage)
+                    pending = []
                 self._check(ctx, state)
                 state.iteration += 1
                 if state.iteration > ctx.max_iterations:
                     raise AgentLoopLimitError()
 
-                prompt_messages = state.messages
-                if self.context_builder is not None:
-                    prompt_messages = await self.context_builder.build(ctx, state.messages, state.iteration)
-
-                tool_schemas = self._tool_schemas(ctx)
-                await self._emit(ctx, "model.request.started", {"iteration": state.iteration})
-                try:
-                    llm_timeout = max(1.0, min(ctx.timeout_seconds or 600, 120.0))
-                    result = await asyncio.wait_for(
-                        provider.chat(prompt_messages, tools=tool_schemas),
-                        timeout=llm_timeout,
-                    )
-                except asyncio.TimeoutError:
-                    raise RunTimeoutError()
-                except RunCancelledError:
-                    raise
-                except Exception as e:
-                    raise RuntimeError(message=f"Model request failed: {e}")
-
-                for k, v in (result.usage or {}).items():
-                    token_usage[k] = token_usage.get(k, 0) + int(v or 0)
-                if self.metrics is not None:
-                    self.metrics.on_llm_call(result.total_tokens)
-                await self._emit(ctx, "model.request.completed", {
-                    "usage": result.usage,
-                    "model": result.model,
-                })
-
-                # record the assistant turn so providers see the full history
-                state.messages.append({
-                    "role": "assistant",
-                    "content": result.content or "",
-                    "tool_calls": [t.to_dict() for t in result.tool_calls] if result.tool_calls else None,
-                })
-
-                if not result.tool_calls:
-                    final_output = result.content or ""
-                    await self._emit(ctx, "agent.response", {"content": final_output})
-                    break
-
-                for tc in result.tool_calls:
-                    self._check(ctx, state)
-                    state.tool_calls.append(tc.to_dict())
-                    if state.tool_call_count + 1 > ctx.max_tool_calls:
-                        raise AgentToolCallLimitError()
-                    state.tool_call_count += 1
-                    try:
-                        await self._policy_gate(ctx, tc.name)
-                    except ToolDeniedError as e:
-                        await self._emit(ctx, "tool.call.failed", {
-                            "tool": tc.name, "code": "TOOL_DENIED", "error": e.message,
-                        })
-                        state.messages.append({
-                            "role": "tool",
-                            "content": f"Error: {e.message} (denied by policy)",
-                            "tool_call_id": tc.id,
-                            "name": tc.name,
-                        })
-                        continue
-
-                    tctx = ToolExecutionContext(
-                        user_id=ctx.user_id,
-                        agent_id=ctx.agent_id,
-                        run_id=ctx.run_id,
-                        session_id=ctx.session_id,
-                        timeout=ctx.tool_timeout,
-                        policy=ctx.policy,
-                        cancellation_token=ctx.cancellation,
-                        metadata={**(getattr(ctx, "metadata", {}) or {}), "tool": tc.name},
-                    )
-                    await self._emit(ctx, "tool.call.started", {
-                        "tool": tc.name,
-                        "arguments": tc.arguments,
-                        "call_id": tc.id,
+                with self.tracer.span("agent.iteration", iteration=state.iteration):
+                    prompt_messages = state.messages
+                    if self.context_builder is not None:
+                        with self.tracer.span("context.build"):
+                            prompt_messages = await self.context_builder.build(ctx, state.messages, state.iteration)
+
+                    tool_schemas = self._tool_schemas(ctx)
+                    await self._emit(ctx, "model.request.started", {"iteration": state.iteration})
+                    with self.tracer.span("llm.request", model=ctx.model, messages=len(prompt_messages)) as span:
+                        result = await self._invoke(ctx, provider, prompt_messages, tool_schemas)
+                        if span is not None:
+                            span.set(cached=result.cached, **{f"tokens.{k}": v for k, v in (result.usage or {}).items()})
+                    # cache hits cost no tokens and no model call
+                    if not result.cached:
+                        for k, v in (result.usage or {}).items():
+                            token_usage[k] = token_usage.get(k, 0) + int(v or 0)
+                    await self._emit(ctx, "model.request.completed", {
+                        "usage": result.usage,
+                        "cached": result.cached,
+                        "model": result.model,
                     })
-                    t0 = time.monotonic()
-                    tool_ok = True
-                    tool_output = ""
-                    try:
-                        tool_output = await self.tool_runner.run(tc.name, tc.arguments, tctx)
-                    except ToolTimeoutError:
-                        tool_ok = False
-                        tool_output = "Error: tool timed out"
-                    except ToolNotFoundError:
-                        tool_ok = False
-                        tool_output = "Error: tool not found"
-                    except RunCancelledError:
-                        raise
-                    except Exception as e:
-                        tool_ok = False
-                        tool_output = "Error: " + str(e)
-                    duration = time.monotonic() - t0
-                    if self.metrics is not None:
-                        self.metrics.on_tool_call(duration)
-                    await self._emit(
-                        ctx,
-                        "tool.call.completed" if tool_ok else "tool.call.failed",
-                        {"tool": tc.name, "duration": round(duration, 3), "output": tool_output[:500]},
-                    )
+
+                    # record the assistant turn so providers see the full history
                     state.messages.append({
-                        "role": "tool",
-                        "content": tool_output,
-                        "tool_call_id": tc.id,
-                        "name": tc.name,
+                        "role": "assistant",
+                        "content": result.content or "",
+                        "tool_calls": [t.to_dict() for t in result.tool_calls] if result.tool_calls else None,
                     })
-                    state.variables["last_tool_output"] = tool_output
+
+                    if not result.tool_calls:
+                        final_output = result.content or ""
+                        await self._emit(ctx, "agent.response", {"content": final_output})
+                        break
+                    await self._checkpoint(ctx, state, token_usage)
+                    await self._run_tool_calls(ctx, state, list(result.tool_calls), token_usage)
         except RunCancelledError:
             outcome_status = "CANCELLED"
             error = "cancelled"
@@ -206,13 +157,169 @@ class ExecutionEngine:
             "duration": duration,
         }
 
+    async def _invoke(
+        self, ctx: RunContext, provider: ModelProvider, messages: list[dict[str, Any]], tools: list | None,
+    ) -> Any:
+        """One model request with the per-call timeout and LLM metrics."""
+        started = time.monotonic()
+        try:
+            llm_timeout = max(1.0, min(ctx.timeout_seconds or 600, 120.0))
+            result = await asyncio.wait_for(provider.chat(messages, tools=tools), timeout=llm_timeout)
+        except asyncio.TimeoutError as e:
+            self._llm_metric(ctx, provider, started, "timeout", error=e)
+            raise RunTimeoutError()
+        except RunCancelledError:
+            raise
+        except Exception as e:
+            self._llm_metric(ctx, provider, started, "error", error=e)
+            raise RuntimeError(message=f"Model request failed: {e}")
+        if not result.cached:
+            self._llm_metric(ctx, provider, started, "ok", result)
+        return result
+
+    async def _run_tool_calls(
+        self, ctx: RunContext, state: AgentState, tool_calls: list[ToolCall], token_usage: dict[str, int],
+    ) -> None:
+        """Execute one assistant turn's tool calls, checkpointing after each result."""
+        for tc in tool_calls:
+            self._check(ctx, state)
+            state.tool_calls.append(tc.to_dict())
+            if state.tool_call_count + 1 > ctx.max_tool_calls:
+                raise AgentToolCallLimitError()
+            state.tool_call_count += 1
+            with self.tracer.span("tool.call", tool=tc.name, call_id=tc.id) as span:
+                status = await self._run_tool_call(ctx, state, tc, token_usage)
+                if span is not None:
+                    span.set(outcome=status)
+
+    async def _run_tool_call(
+        self, ctx: RunContext, state: AgentState, tc: ToolCall, token_usage: dict[str, int],
+    ) -> str:
+        """Gate, execute and record one tool call; returns its outcome status."""
+        try:
+            await self._policy_gate(ctx, tc.name)
+        except ToolDeniedError as e:
+            await self._emit(ctx, "tool.call.failed", {
+                "tool": tc.name, "code": "TOOL_DENIED", "error": e.message,
+            })
+            state.messages.append({
+                "role": "tool",
+                "content": f"Error: {e.message} (denied by policy)",
+                "tool_call_id": tc.id,
+                "name": tc.name,
+            })
+            await self._checkpoint(ctx, state, token_usage)
+            return "denied"
+
+        tctx = ToolExecutionContext(
+            user_id=ctx.user_id,
+            agent_id=ctx.agent_id,
+            run_id=ctx.run_id,
+            session_id=ctx.session_id,
+            timeout=ctx.tool_timeout,
+            policy=ctx.policy,
+            decisions=ctx.profile.decisions if ctx.profile is not None else None,
+            cancellation_token=ctx.cancellation,
+            metadata={**(getattr(ctx, "metadata", {}) or {}), "tool": tc.name},
+        )
+        await self._emit(ctx, "tool.call.started", {
+            "tool": tc.name,
+            "arguments": tc.arguments,
+            "call_id": tc.id,
+        })
+        t0 = time.monotonic()
+        tool_ok = True
+        tool_status = "ok"
+        tool_output = ""
+        try:
+            tool_output = await self.tool_runner.run(tc.name, tc.arguments, tctx)
+        except ToolTimeoutError:
+            tool_ok = False
+            tool_status = "timeout"
+            tool_output = "Error: tool timed out"
+        except ToolNotFoundError:
+            tool_ok = False
+            tool_status = "not_found"
+            tool_output = "Error: tool not found"
+        except ToolDeniedError as e:
+            tool_ok = False
+            tool_status = "denied"
+            tool_output = f"Error: {e.message} (denied by policy)"
+        except RunCancelledError:
+            raise
+        except Exception as e:
+            tool_ok = False
+            tool_status = "error"
+            tool_output = "Error: " + str(e)
+        duration = time.monotonic() - t0
+        if self.metrics is not None:
+            self.metrics.on_tool_call(duration, tool=tc.name, agent=ctx.agent_id, status=tool_status)
+        await self._emit(
+            ctx,
+            "tool.call.completed" if tool_ok else "tool.call.failed",
+            {"tool": tc.name, "duration": round(duration, 3), "output": tool_output[:500]},
+        )
+        state.messages.append({
+            "role": "tool",
+            "content": tool_output,
+            "tool_call_id": tc.id,
+            "name": tc.name,
+        })
+        state.variables["last_tool_output"] = tool_output
+        await self._checkpoint(ctx, state, token_usage)
+        return tool_status
+
     # ---- internals ----
+    async def _checkpoint(self, ctx: RunContext, state: AgentState, token_usage: dict[str, int]) -> None:
+        if self.checkpoints is None:
+            return
+        data = {
+            "version": CHECKPOINT_VERSION,
+            "state": state.to_dict(),
+            "token_usage": token_usage,
+            "elapsed": ctx.elapsed(),
+        }
+        try:
+            # stores backed by a database write off the event loop
+            asave = getattr(self.checkpoints, "asave", None)
+            if asave is not None:
+                await asave(ctx.run_id, data)
+            else:
+                self.checkpoints.save(ctx.run_id, data)
+        except Exception as e:
+            # a failed snapshot only costs resumability, never the run
+            log_run(self.logger, 30, "checkpoint failed", run_id=ctx.run_id, error=str(e))
+
+    def _restore(self, ctx: RunContext) -> tuple[AgentState | None, dict[str, int]]:
+        data = self.checkpoints.load(ctx.run_id) if self.checkpoints is not None else None
+        if not data:
+            return None, {}
+        # the timeout budget keeps counting across the restart
+        ctx.started_at = time.monotonic() - float(data.get("elapsed") or 0.0)
+        return AgentState.from_dict(data["state"]), dict(data.get("token_usage") or {})
+
+    @staticmethod
+    def _pending_tool_calls(state: AgentState) -> list[ToolCall]:
+        """Tool calls of the last assistant turn that have no recorded result."""
+        for index in range(len(state.messages) - 1, -1, -1):
+            message = state.messages[index]
+            if message.get("role") != "assistant":
+                continue
+            done = {m.get("tool_call_id") for m in state.messages[index + 1:] if m.get("role") == "tool"}
+            return [
+                ToolCall(id=c["id"], name=c["name"], arguments=c.get("arguments") or {}, type=c.get("type", "tool_call"))
+                for c in message.get("tool_calls") or [] if c["id"] not in done
+            ]
+        return []
+
     def _check(self, ctx: RunContext, state: AgentState) -> None:
         if ctx.cancellation is not None:
             ctx.cancellation.check()
         ctx.check_timeout()
 
     def _tool_schemas(self, ctx: RunContext) -> list | None:
+        if ctx.profile is not None:
+            return ctx.profile.tool_schemas
         if self.tool_runner is None or not ctx.tools:
             return None
         schemas = []
@@ -227,11 +334,13 @@ class ExecutionEngine:
         policy = getattr(ctx, "policy", None)
         if policy is None or not hasattr(policy, "check_tool"):
             return
-        tool = None
-        runner = self.tool_runner
-        if runner is not None and hasattr(runner, "registry"):
-            tool = runner.registry.get(tool_name)
-        decision = policy.check_tool(ctx, tool_name, tool)
+        decision = ctx.profile.decision(tool_name) if ctx.profile is not None else None
+        if decision is None:
+            tool = None
+            runner = self.tool_runner
+            if runner is not None and hasattr(runner, "registry"):
+                tool = runner.registry.get(tool_name)
+            decision = policy.check_tool(ctx, tool_name, tool)
         if not decision.allowed:
             raise ToolDeniedError(decision.reason)
         if decision.require_approval:
@@ -246,6 +355,30 @@ class ExecutionEngine:
             return False
         return await waiter(ctx, tool_name)
 
+    def _llm_metric(
+        self,
+        ctx: RunContext,
+        provider: Any,
+        started: float,
+        status: str,
+        result: Any = None,
+        error: BaseException | None = None,
+    ) -> None:
+        duration = time.monotonic() - started
+        model = (result.model if result is not None else "") or ctx.model or getattr(provider, "model", None)
+        if self.metrics is not None:
+            self.metrics.on_llm_call(
+                result.total_tokens if result is not None else 0,
+                duration=duration, model=model, agent=ctx.agent_id, status=status,
+            )
+        if self.usage is not None:
+            usage = (result.usage or {}) if result is not None else {}
+            self.usage.record(
+                ctx.user_id, model, duration * 1000, error=error,
+                input_tokens=usage.get("prompt_tokens") or usage.get("input_tokens") or 0,
+                output_tokens=usage.get("completion_tokens") or usage.get("output_tokens") or 0,
+            )
+
     async def _emit(self, ctx: RunContext, event_type: str, payload: dict[str, Any]) -> None:
         if self.event_bus is not None:
             await self.event_bus.publish(
@@ -1,6 +1,7 @@
 """KnowledgeProvider + HistoryProvider adapters for the Context Engine."""
 from __future__ import annotations
 
+import asyncio
 from typing import Any
 
 
@@ -11,6 +12,9 @@ class KBKnowledgeProvider:
         self._kb = kb
 
     async def retrieve(self, query: str, top_k: int = 3) -> list[dict[str, Any]]:
+        return await asyncio.to_thread(self._retrieve, query, top_k)
+
+    def _retrieve(self, query: str, top_k: int) -> list[dict[str, Any]]:
         kb = self._kb
         if kb is None:
             from services.knowledge_base import get_global_kb
@@ -26,11 +30,12 @@ class SessionHistoryProvider:
     """HistoryProvider port backed by the sessions table (spec 5)."""
 
     async def load(self, session_id: int, limit: int = 20) -> list[dict[str, Any]]:
+        return await asyncio.to_thread(self._load, session_id, limit)
+
+    @staticmethod
+    def _load(session_id: int, limit: int) -> list[dict[str, Any]]:
+        """Rolling summary (if any) + the most recent ``limit`` turns."""
         from core.database import SessionLocal
-        from services.session_service import SessionService
+        from services.session_summary import prompt_history
         with SessionLocal() as db:
-            msgs = SessionService.get_session_messages(db, session_id, limit=limit, offset=0)
-            return [
-                {"role": m.role, "content": m.content}
-                for m in msgs if m.role in ("user", "assistant")
-            ]
\ No newline at end of file
+            return prompt_history(db, session_id, limit=limit, roles=("user", "assistant"))
\ No newline at end of file
@@ -3,6 +3,8 @@ from __future__ import annotations
 import logging
 from typing import Any
 
+from .tracing import current_span
+
 
 def get_logger(name: str = "modelforge.runtime") -> logging.Logger:
     """Return a namespaced logger (spec 81: no print())."""
@@ -19,10 +21,18 @@ def log_run(
     session_id: int | None = None,
     **fields: Any,
 ) -> None:
-    """Structured log line; every runtime log carries run_id (spec 48)."""
+    """Structured log line; every runtime log carries run_id (spec 48).
+
+    Inside a sampled span the line also carries ``trace_id`` / ``span_id``
+    so logs can be joined with the exported trace.
+    """
     parts = [message]
     if run_id:
         parts.append(f"run_id={run_id}")
+    span = current_span()
+    if span is not None and span.sampled:
+        parts.append(f"trace_id={span.trace_id}")
+        parts.append(f"span_id={span.span_id}")
     if agent_id:
         parts.append(f"agent_id={agent_id}")
     if session_id is not None:
@@ -7,5 +7,8 @@ builtin / plugin / MCP tools.
 from .adapter import MCPToolAdapter
 from .client import MCPClient
 from .registry import MCPRegistry
+from .transport import HTTPTransport, MCPConnectionError, StdioTransport
 
-__all__ = ["MCPClient", "MCPRegistry", "MCPToolAdapter"]
\ No newline at end of file
+__all__ = [
+    "HTTPTransport", "MCPClient", "MCPConnectionError", "MCPRegistry", "MCPToolAdapter", "StdioTransport",
+]
\ No newline at end of file
@@ -1,16 +1,25 @@
 from __future__ import annotations
 
+import asyncio
+import random
 import uuid
-from typing import Any
+from typing import Any, Callable
 
-import httpx
+from .transport import HTTPTransport, MCPConnectionError, StdioTransport
+
+#: safe to resend after the connection dropped mid-request
+IDEMPOTENT_METHODS = frozenset({"initialize", "tools/list", "ping"})
 
 
 class MCPClient:
     """JSON-RPC 2.0 client for an MCP server (spec 36).
 
-    Phase 1 uses HTTP transport; the registry / adapter layers keep the
-    transport swappable (stdio / SSE later).
+    One long-lived session per server: HTTP servers share a keep-alive
+    connection pool, ``command=[...]`` spawns a local server over stdio.
+    A dropped connection is re-established with exponential backoff and
+    the handshake is replayed; tool calls are only resent when the server
+    cannot have received them. ``list_tools`` is cached until the server
+    sends ``notifications/tools/list_changed``.
     """
 
     PROTOCOL_VERSION = "2024-11-05"
@@ -18,37 +27,124 @@ class MCPClient:
     def __init__(
         self,
         name: str,
-        endpoint: str,
+        endpoint: str | None = None,
         headers: dict[str, str] | None = None,
         timeout: float = 30.0,
+        command: list[str] | None = None,
+        env: dict[str, str] | None = None,
+        cwd: str | None = None,
+        max_retries: int = 3,
+        backoff_seconds: float = 0.5,
+        max_backoff_seconds: float = 10.0,
+        max_connections: int = 10,
     ):
+        if not endpoint and not command:
+            raise ValueError("MCP server needs an endpoint or a command")
         self.name = name
-        self.endpoint = endpoint
+        self.command = list(command) if command else None
+        self.endpoint = endpoint or "stdio:" + " ".join(self.command)
         self.headers = headers or {}
         self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
         self.server_info: dict[str, Any] = {}
         self.tools: list[dict[str, Any]] = []
-        self._transport: Any = None
+        self.tools_stale = True
+        self.on_tools_changed: Callable[[], Any] | None = None
+        self.reconnects = 0
+        if self.command:
+            self._transport: Any = StdioTransport(self.command, env=env, cwd=cwd)
+        else:
+            self._transport = HTTPTransport(endpoint, self.headers, timeout, max_connections=max_connections)
+        self._transport.on_message = self._on_message
+        self._initialized = False
+        self._established = False
+        self._connect_lock = asyncio.Lock()
+        # replies and tools-changed callbacks fired from the transport reader
+        self._background: set[asyncio.Task] = set()
+
+    @property
+    def transport_kind(self) -> str:
+        return self._transport.kind
 
     def with_transport(self, transport: Any) -> MCPClient:
         """Inject an httpx transport (tests / custom transports)."""
-        self._transport = transport
+        self._transport.transport = transport
         return self
 
+    # ---- session ----
+    async def _ensure_session(self, method: str) -> None:
+        if method == "initialize":
+            # the only path that (re)spawns a stdio server, so it always gets the handshake
+            await self._transport.connect()
+            return
+        if self._initialized and self._transport.connected:
+            return
+        async with self._connect_lock:
+            if self._initialized and self._transport.connected:
+                return
+            if self._initialized:
+                # the session dropped (server exited): reconnect and replay the handshake
+                self.reconnects += 1
+                await self._transport.close()
+            await self.initialize()
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.max_backoff_seconds, self.backoff_seconds * (2 ** attempt))
+        return delay * random.uniform(0.5, 1.0)
+
     async def _rpc(self, method: str, params: dict[str, Any] | None = None) -> dict[str, Any]:
-        payload: dict[str, Any] = {"jsonrpc": "2.0", "id": uuid.uuid4().hex, "method": method}
-        if params is not None:
-            payload["params"] = params
-        async with httpx.AsyncClient(
-            timeout=self.timeout, headers=self.headers, transport=self._transport,
-        ) as client:
-            resp = await client.post(self.endpoint, json=payload)
-            resp.raise_for_status()
-            data = resp.json()
-        if "error" in data:
-            raise RuntimeError(data["error"].get("message", "MCP RPC error"))
-        return data.get("result") or {}
+        attempt = 0
+        while True:
+            payload: dict[str, Any] = {"jsonrpc": "2.0", "id": uuid.uuid4().hex, "method": method}
+            if params is not None:
+                payload["params"] = params
+            try:
+                await self._ensure_session(method)
+                data = await asyncio.wait_for(self._transport.request(payload), timeout=self.timeout)
+            except MCPConnectionError as e:
+                # a server that never answered fails fast (registration errors)
+                retry = self._established and (not e.sent or method in IDEMPOTENT_METHODS)
+                if not retry or attempt >= self.max_retries:
+                    raise
+                await asyncio.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+            if "error" in data:
+                raise RuntimeError(data["error"].get("message", "MCP RPC error"))
+            return data.get("result") or {}
 
+    def _on_message(self, message: dict[str, Any]) -> None:
+        """Server-initiated traffic: notifications and requests such as ping."""
+        method = message.get("method")
+        if method == "notifications/tools/list_changed":
+            self.tools_stale = True
+            if self.on_tools_changed is not None:
+                result = self.on_tools_changed()
+                if asyncio.iscoroutine(result):
+                    self._spawn(result)
+        elif method is not None and "id" in message:
+            reply: dict[str, Any] = {"jsonrpc": "2.0", "id": message["id"]}
+            if method == "ping":
+                reply["result"] = {}
+            else:
+                reply["error"] = {"code": -32601, "message": f"method not found: {method}"}
+            self._spawn(self._reply(reply))
+
+    def _spawn(self, coro: Any) -> None:
+        # keep a reference until done; the loop only holds tasks weakly
+        task = asyncio.ensure_future(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _reply(self, payload: dict[str, Any]) -> None:
+        try:
+            await self._transport.notify(payload)
+        except MCPConnectionError:
+            pass
+
+    # ---- protocol ----
     async def initialize(self) -> dict[str, Any]:
         result = await self._rpc("initialize", {
             "protocolVersion": self.PROTOCOL_VERSION,
@@ -56,11 +152,17 @@ class MCPClient:
             "clientInfo": {"name": "modelforge", "version": "3.0"},
         })
         self.server_info = result.get("serverInfo") or {}
+        self._initialized = self._established = True
+        await self._reply({"jsonrpc": "2.0", "method": "notifications/initialized"})
         return result
 
-    async def list_tools(self) -> list[dict[str, Any]]:
+    async def list_tools(self, refresh: bool = False) -> list[dict[str, Any]]:
+        """Server tools; served from cache until the server reports a change."""
+        if not refresh and not self.tools_stale:
+            return self.tools
         result = await self._rpc("tools/list")
         self.tools = result.get("tools") or []
+        self.tools_stale = False
         return self.tools
 
     async def call_tool(self, name: str, arguments: dict[str, Any]) -> str:
@@ -70,4 +172,12 @@ class MCPClient:
             for c in (result.get("content") or [])
             if c.get("type") == "text"
         ]
-        return "\n".join(texts) or "(no output)"
\ No newline at end of file
+        return "\n".join(texts) or "(no output)"
+
+    async def close(self) -> None:
+        self._initialized = False
+        pending = list(self._background)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        await self._transport.close()
@@ -30,6 +30,8 @@ class MCPRegistry:
         out = []
         for s in self._servers.values():
             entry = {"name": s.name, "endpoint": s.endpoint, "server_info": s.server_info}
+            if hasattr(s, "transport_kind"):
+                entry["transport"] = s.transport_kind
             if getattr(s, "tools", None):
                 entry["tools"] = [t.get("name") for t in s.tools]
             out.append(entry)
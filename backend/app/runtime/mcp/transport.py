@@ -0,0 +1,220 @@
+"""Long-lived MCP transports: pooled HTTP and a multiplexed stdio subprocess.
+
+A transport moves JSON-RPC messages; ``MCPClient`` owns the protocol
+(handshake, retries, tool cache). Both transports raise
+``MCPConnectionError`` when the connection is unusable, with ``sent``
+telling the client whether the server may already have seen the request.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+from typing import Any, Callable
+
+import httpx
+
+#: largest single stdio message (a tool result can be large)
+STDIO_LINE_LIMIT = 16 * 1024 * 1024
+
+
+class MCPConnectionError(ConnectionError):
+    def __init__(self, message: str, sent: bool = False):
+        super().__init__(message)
+        self.sent = sent
+
+
+class HTTPTransport:
+    """JSON-RPC over HTTP POST on one keep-alive ``httpx.AsyncClient``."""
+
+    kind = "http"
+
+    def __init__(
+        self,
+        endpoint: str,
+        headers: dict[str, str] | None = None,
+        timeout: float = 30.0,
+        transport: Any = None,
+        max_connections: int = 10,
+    ):
+        self.endpoint = endpoint
+        self.headers = headers or {}
+        self.timeout = timeout
+        self.transport = transport
+        self.max_connections = max_connections
+        self.on_message: Callable[[dict[str, Any]], None] | None = None
+        self._client: httpx.AsyncClient | None = None
+
+    @property
+    def connected(self) -> bool:
+        return self._client is not None
+
+    async def connect(self) -> None:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                headers=self.headers,
+                transport=self.transport,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+
+    async def request(self, payload: dict[str, Any]) -> dict[str, Any]:
+        await self.connect()
+        try:
+            resp = await self._client.post(self.endpoint, json=payload)
+        except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+            raise MCPConnectionError(str(e) or type(e).__name__, sent=False) from e
+        except httpx.TransportError as e:
+            raise MCPConnectionError(str(e) or type(e).__name__, sent=True) from e
+        resp.raise_for_status()
+        data = resp.json()
+        # a server may batch notifications with the response
+        if isinstance(data, list):
+            response = {}
+            for message in data:
+                if "id" in message and message.get("id") == payload.get("id"):
+                    response = message
+                elif self.on_message is not None:
+                    self.on_message(message)
+            return response
+        return data
+
+    async def notify(self, payload: dict[str, Any]) -> None:
+        await self.connect()
+        try:
+            await self._client.post(self.endpoint, json=payload)
+        except httpx.TransportError as e:
+            raise MCPConnectionError(str(e) or type(e).__name__, sent=False) from e
+
+    async def close(self) -> None:
+        client, self._client = self._client, None
+        if client is not None:
+            await client.aclose()
+
+
+class StdioTransport:
+    """A spawned MCP server speaking newline-delimited JSON-RPC on stdin/stdout.
+
+    Requests are written as soon as they are issued; a reader task routes
+    each response to the waiting future by JSON-RPC id, so any number of
+    calls are in flight at once. Notifications and server requests go to
+    ``on_message``. Only ``connect`` starts the process; requests on a dead
+    one fail with ``MCPConnectionError(sent=False)`` so the client respawns it
+    through its initialize handshake.
+    """
+
+    kind = "stdio"
+
+    def __init__(self, command: list[str], env: dict[str, str] | None = None, cwd: str | None = None):
+        if not command:
+            raise ValueError("stdio MCP server needs a command")
+        self.command = list(command)
+        self.env = env
+        self.cwd = cwd
+        self.on_message: Callable[[dict[str, Any]], None] | None = None
+        self._proc: asyncio.subprocess.Process | None = None
+        self._reader: asyncio.Task | None = None
+        self._pending: dict[Any, asyncio.Future] = {}
+        self._write_lock = asyncio.Lock()
+
+    @property
+    def connected(self) -> bool:
+        # the reader ends at stdout EOF, possibly before the exit status is reaped
+        return (
+            self._proc is not None and self._proc.returncode is None
+            and self._reader is not None and not self._reader.done()
+        )
+
+    @property
+    def pid(self) -> int | None:
+        return self._proc.pid if self._proc is not None else None
+
+    async def connect(self) -> None:
+        if self.connected:
+            return
+        try:
+            self._proc = await asyncio.create_subprocess_exec(
+                *self.command,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                env={**os.environ, **self.env} if self.env else None,
+                cwd=self.cwd,
+                limit=STDIO_LINE_LIMIT,
+            )
+        except OSError as e:
+            raise MCPConnectionError(f"cannot start {self.command[0]}: {e}") from e
+        self._reader = asyncio.create_task(self._read_loop(self._proc))
+
+    async def _read_loop(self, proc: asyncio.subprocess.Process) -> None:
+        try:
+            while True:
+                line = await proc.stdout.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    continue  # servers may log to stdout; ignore non-JSON lines
+                if not isinstance(message, dict):
+                    continue
+                if "method" not in message and message.get("id") in self._pending:
+                    future = self._pending.pop(message["id"])
+                    if not future.done():
+                        future.set_result(message)
+                elif self.on_message is not None:
+                    self.on_message(message)
+        except (asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            self._fail_pending("MCP server process exited")
+
+    def _fail_pending(self, reason: str) -> None:
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(MCPConnectionError(reason, sent=True))
+
+    async def _write(self, payload: dict[str, Any]) -> None:
+        data = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode() + b"\n"
+        async with self._write_lock:
+            if not self.connected:
+                raise MCPConnectionError("MCP server process is not running")
+            try:
+                self._proc.stdin.write(data)
+                await self._proc.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError) as e:
+                raise MCPConnectionError(str(e), sent=False) from e
+
+    async def request(self, payload: dict[str, Any]) -> dict[str, Any]:
+        # no implicit respawn: a fresh process needs the client's initialize handshake
+        future = asyncio.get_running_loop().create_future()
+        self._pending[payload["id"]] = future
+        try:
+            await self._write(payload)
+            return await future
+        finally:
+            self._pending.pop(payload["id"], None)
+
+    async def notify(self, payload: dict[str, Any]) -> None:
+        await self._write(payload)
+
+    async def close(self) -> None:
+        proc, self._proc = self._proc, None
+        reader, self._reader = self._reader, None
+        if proc is not None and proc.returncode is None:
+            try:
+                proc.stdin.close()
+                await asyncio.wait_for(proc.wait(), timeout=2.0)
+            except (asyncio.TimeoutError, OSError):
+                proc.kill()
+                await proc.wait()
+        if reader is not None:
+            reader.cancel()
+            try:
+                await reader
+            except asyncio.CancelledError:
+                pass
+        self._fail_pending("MCP transport closed")
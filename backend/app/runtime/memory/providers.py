@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 from typing import Any
 
 
@@ -12,6 +13,11 @@ class DBMemoryProvider:
         query: str,
         top_k: int = 3,
     ) -> list[dict[str, Any]]:
+        # blocking DB read: keep the loop free so retrievals can overlap
+        return await asyncio.to_thread(self._retrieve, user_id, query, top_k)
+
+    @staticmethod
+    def _retrieve(user_id: int, query: str, top_k: int) -> list[dict[str, Any]]:
         from core.database import SessionLocal
         from services.memory_store import MemoryStore
         with SessionLocal() as db:
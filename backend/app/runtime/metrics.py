@@ -1,74 +1,311 @@
 from __future__ import annotations
 
+import math
+import threading
+import time
 from collections import defaultdict
-from typing import Any
+from typing import Any, AsyncIterator, Callable
+
+LabelKey = tuple[tuple[str, str], ...]
+
+
+class Histogram:
+    """Fixed-memory histogram over exponential buckets.
+
+    Bucket ``i`` holds values in ``(MIN * 2**((i-1)/SUB), MIN * 2**(i/SUB)]``,
+    so every estimate is within ~9% of the true value whatever the traffic
+    volume; slot 0 collects values <= MIN and the last slot everything above
+    ``MIN * 2**OCTAVES`` (~5 days in seconds). count / sum / min / max are
+    exact.
+    """
+
+    MIN = 1e-4
+    SUB = 4
+    OCTAVES = 32
+    SLOTS = SUB * OCTAVES + 2
+
+    __slots__ = ("counts", "count", "sum", "min", "max")
+
+    def __init__(self):
+        self.counts = [0] * self.SLOTS
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    @classmethod
+    def upper(cls, slot: int) -> float:
+        return cls.MIN * 2 ** (slot / cls.SUB)
+
+    @classmethod
+    def slot(cls, value: float) -> int:
+        if value <= cls.MIN:
+            return 0
+        return min(cls.SLOTS - 1, math.ceil(math.log2(value / cls.MIN) * cls.SUB))
+
+    def observe(self, value: float) -> None:
+        self.counts[self.slot(value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other: Histogram) -> None:
+        for i, n in enumerate(other.counts):
+            self.counts[i] += n
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> float:
+        """Estimated value at quantile ``q`` (0..1); 0.0 when empty."""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                if i == 0:
+                    return self.min
+                if i == self.SLOTS - 1:
+                    return self.max
+                # geometric midpoint of the bucket, clamped to what was observed
+                estimate = math.sqrt(self.upper(i - 1) * self.upper(i))
+                return min(self.max, max(self.min, estimate))
+        return self.max
+
+    def cumulative(self) -> list[tuple[float, int]]:
+        """``(le, count <= le)`` at every power-of-two bound (Prometheus buckets)."""
+        out = []
+        seen = 0
+        for i, n in enumerate(self.counts[:-1]):
+            seen += n
+            if i % self.SUB == 0:
+                out.append((self.upper(i), seen))
+        return out
 
 
 class MetricsRegistry:
     """In-process runtime metrics (spec 49).
 
-    Single-threaded asyncio process: plain dict counters are sufficient.
-    No Prometheus dependency in phase 1.
+    Counters and histograms carry optional labels (model / tool / agent /
+    status); a name without labels reads as the sum over its label sets.
+    Durations go into fixed-memory ``Histogram``s, so p50/p95/p99 cover
+    every sample since start-up. Recording is thread-safe (the DB pool
+    records from worker threads). ``render_prometheus`` produces the text
+    exposition format; no Prometheus client dependency.
     """
 
+    #: label sets kept per metric; further combinations fold into the unlabelled series
+    MAX_SERIES = 500
+    QUANTILES = (0.5, 0.95, 0.99)
+
     def __init__(self):
-        self._counters: dict[str, int] = defaultdict(int)
-        self._durations: dict[str, list[float]] = defaultdict(list)
+        self._counters: dict[str, dict[LabelKey, float]] = defaultdict(dict)
+        self._histograms: dict[str, dict[LabelKey, Histogram]] = defaultdict(dict)
+        self._gauges: dict[str, Callable[[], float]] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, series: dict, labels: dict[str, Any]) -> LabelKey:
+        key = tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None and v != ""))
+        if key and key not in series and len(series) >= self.MAX_SERIES:
+            return ()
+        return key
+
+    def inc(self, name: str, amount: float = 1, **labels: Any) -> None:
+        with self._lock:
+            series = self._counters[name]
+            key = self._key(series, labels)
+            series[key] = series.get(key, 0) + amount
 
-    def inc(self, name: str, amount: int = 1) -> None:
-        self._counters[name] += amount
+    def record(self, name: str, value: float, **labels: Any) -> None:
+        with self._lock:
+            series = self._histograms[name]
+            key = self._key(series, labels)
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(value)
 
-    MAX_DURATION_SAMPLES = 1000
+    def gauge(self, name: str, read: Callable[[], float]) -> None:
+        """Register a gauge sampled at snapshot / scrape time."""
+        self._gauges[name] = read
 
-    def record(self, name: str, value: float) -> None:
-        samples = self._durations[name]
-        samples.append(value)
-        if len(samples) > self.MAX_DURATION_SAMPLES:
-            # audit P0-3: bound memory growth in long-running processes
-            del samples[: len(samples) - self.MAX_DURATION_SAMPLES]
+    def count(self, name: str, **labels: Any) -> int:
+        with self._lock:
+            series = self._counters.get(name) or {}
+            if labels:
+                return int(series.get(self._key({}, labels), 0))
+            return int(sum(series.values()))
 
-    def count(self, name: str) -> int:
-        return self._counters.get(name, 0)
+    def histogram(self, name: str, **labels: Any) -> Histogram:
+        """Histogram for one label set, or merged over all of them when no labels are given."""
+        merged = Histogram()
+        with self._lock:
+            series = self._histograms.get(name) or {}
+            if labels:
+                found = series.get(self._key({}, labels))
+                if found is not None:
+                    merged.merge(found)
+            else:
+                for h in series.values():
+                    merged.merge(h)
+        return merged
+
+    def series(self, name: str) -> list[tuple[dict[str, str], Histogram]]:
+        """Every label set of histogram ``name`` with a copy of its histogram."""
+        out = []
+        with self._lock:
+            for key, h in (self._histograms.get(name) or {}).items():
+                copy = Histogram()
+                copy.merge(h)
+                out.append((dict(key), copy))
+        return out
 
     #: Canonical metric names (spec 49) - always present in snapshots.
     CANONICAL = (
         "agent_runs_total", "agent_runs_success", "agent_runs_failed",
         "agent_run_duration", "tool_calls_total", "tool_call_duration",
-        "llm_calls_total", "llm_tokens_total",
+        "llm_calls_total", "llm_tokens_total", "llm_request_duration",
+        "llm_time_to_first_token", "llm_cache_hits", "llm_cache_misses",
+        "run_queue_wait_duration", "runs_queued_total", "runs_rejected_total",
+        "db_session_wait_duration",
     )
 
+    def _is_histogram(self, name: str) -> bool:
+        return name.endswith("_duration") or name in self._histograms or name == "llm_time_to_first_token"
+
     def snapshot(self) -> dict[str, Any]:
         out: dict[str, Any] = {}
-        for name in self.CANONICAL:
-            if name.endswith("_duration"):
-                if name not in self._durations:
-                    self._durations[name] = []
-            elif name not in self._counters:
-                self._counters[name] = 0
-        for k in sorted(self._counters):
-            out[k] = self._counters[k]
-        for k in sorted(self._durations):
-            vals = self._durations[k]
-            out[k] = round(sum(vals), 4)
-            out[k + "_total"] = len(vals)
-            out[k + "_sum"] = round(sum(vals), 4)
-            out[k + "_avg"] = round(sum(vals) / len(vals), 4) if vals else 0.0
-            out[k + "_max"] = round(max(vals), 4) if vals else 0.0
+        names = set(self._counters) | set(self._histograms) | set(self.CANONICAL)
+        for name in sorted(n for n in names if not self._is_histogram(n)):
+            out[name] = self.count(name)
+        for name in sorted(n for n in names if self._is_histogram(n)):
+            h = self.histogram(name)
+            out[name] = round(h.sum, 4)
+            out[name + "_total"] = h.count
+            out[name + "_sum"] = round(h.sum, 4)
+            out[name + "_avg"] = round(h.sum / h.count, 4) if h.count else 0.0
+            out[name + "_max"] = round(h.max, 4) if h.count else 0.0
+            for q in self.QUANTILES:
+                out[f"{name}_p{round(q * 100)}"] = round(h.quantile(q), 4)
+        for name, read in self._gauges.items():
+            out[name] = read()
         return out
 
+    def render_prometheus(self, gauges: dict[str, float] | None = None, prefix: str = "modelforge_") -> str:
+        """Text exposition format (Prometheus 0.0.4 / OpenMetrics-compatible subset)."""
+        lines: list[str] = []
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {name: dict(series) for name, series in self._histograms.items()}
+        for name in sorted(counters):
+            metric = prefix + (name if name.endswith("_total") else name + "_total")
+            lines.append(f"# TYPE {metric} counter")
+            for key, value in sorted(counters[name].items()):
+                lines.append(f"{metric}{_labels(key)} {_number(value)}")
+        for name in sorted(histograms):
+            metric = prefix + name + ("_seconds" if name.endswith("_duration") or name == "llm_time_to_first_token" else "")
+            lines.append(f"# TYPE {metric} histogram")
+            for key, h in sorted(histograms[name].items()):
+                for le, seen in h.cumulative():
+                    lines.append(f"{metric}_bucket{_labels(key, le=_number(le))} {seen}")
+                lines.append(f"{metric}_bucket{_labels(key, le='+Inf')} {h.count}")
+                lines.append(f"{metric}_sum{_labels(key)} {_number(h.sum)}")
+                lines.append(f"{metric}_count{_labels(key)} {h.count}")
+        sampled = {name: read() for name, read in self._gauges.items()}
+        sampled.update(gauges or {})
+        for name in sorted(sampled):
+            value = sampled[name]
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            # sampled running totals (tool pool task counts) are counters by name
+            kind = "counter" if name.endswith("_total") else "gauge"
+            lines.append(f"# TYPE {prefix}{name} {kind}")
+            lines.append(f"{prefix}{name} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
     # --- agent run metrics (spec 49) ---
-    def on_run_finished(self, status: str, duration: float) -> None:
-        self.inc("agent_runs_total")
+    def on_run_finished(self, status: str, duration: float, agent: str | None = None) -> None:
+        self.inc("agent_runs_total", agent=agent, status=status)
         if status in ("COMPLETED",):
             self.inc("agent_runs_success")
         elif status in ("FAILED", "TIMEOUT"):
             self.inc("agent_runs_failed")
-        self.record("agent_run_duration", duration)
+        self.record("agent_run_duration", duration, agent=agent)
+
+    def on_tool_call(
+        self, duration: float, tool: str | None = None, agent: str | None = None, status: str = "ok",
+    ) -> None:
+        self.inc("tool_calls_total", tool=tool, agent=agent, status=status)
+        self.record("tool_call_duration", duration, tool=tool)
+
+    def on_llm_call(
+        self,
+        tokens: int = 0,
+        duration: float | None = None,
+        model: str | None = None,
+        agent: str | None = None,
+        status: str = "ok",
+    ) -> None:
+        self.inc("llm_calls_total", model=model, agent=agent, status=status)
+        if tokens:
+            self.inc("llm_tokens_total", tokens, model=model)
+        if duration is not None:
+            self.record("llm_request_duration", duration, model=model, status=status)
+
+
+async def timed_stream(
+    chunks: AsyncIterator[str], model: str | None = None, metrics: MetricsRegistry | None = None,
+) -> AsyncIterator[str]:
+    """Re-yield a streamed completion, recording time-to-first-token and total latency."""
+    metrics = metrics or get_metrics()
+    started = time.perf_counter()
+    first = True
+    status = "error"
+    try:
+        async for chunk in chunks:
+            if first:
+                metrics.record("llm_time_to_first_token", time.perf_counter() - started, model=model)
+                first = False
+            yield chunk
+        status = "ok"
+    finally:
+        metrics.on_llm_call(duration=time.perf_counter() - started, model=model, status=status)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(key: LabelKey, **extra: str) -> str:
+    pairs = list(key) + list(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _number(value: float) -> str:
+    if isinstance(value, int) or float(value).is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+_default: MetricsRegistry | None = None
+
+
+def get_metrics() -> MetricsRegistry:
+    """Process-wide registry shared by the runtime, services and the DB pool."""
+    global _default
+    if _default is None:
+        _default = MetricsRegistry()
+    return _default
 
-    def on_tool_call(self, duration: float) -> None:
-        self.inc("tool_calls_total")
-        self.record("tool_call_duration", duration)
 
-    def on_llm_call(self, tokens: int = 0) -> None:
-        self.inc("llm_calls_total")
-        self.inc("llm_tokens_total", tokens)
\ No newline at end of file
+def instrument_db_pool(metrics: MetricsRegistry | None = None) -> None:
+    """Record ``db_session_wait_duration`` for every pooled database checkout."""
+    from core.database import set_checkout_observer
+    registry = metrics or get_metrics()
+    set_checkout_observer(lambda seconds: registry.record("db_session_wait_duration", seconds))
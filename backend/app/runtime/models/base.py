@@ -32,6 +32,8 @@ class ModelResult:
     model: str = ""
     usage: dict[str, int] = field(default_factory=dict)
     raw: Any = None
+    #: Served from the response cache (no model round trip happened).
+    cached: bool = False
 
     @property
     def total_tokens(self) -> int:
@@ -0,0 +1,242 @@
+"""Opt-in LLM response cache (disk-backed, TTL, size-bounded).
+
+Scheduled agents and task-center retries often resend byte-identical
+prompts; a hit skips the model round trip entirely. Entries are keyed by a
+stable hash of (model, messages, tools, sampling params) and are only
+consulted when the call is deterministic (temperature 0) or the caller opts
+in explicitly - see ``cache_enabled_for``.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from .base import ModelProvider, ModelResult, ToolCall
+
+
+def cache_key(
+    model: str,
+    messages: list[dict[str, Any]],
+    tools: list[dict[str, Any]] | None = None,
+    params: dict[str, Any] | None = None,
+) -> str:
+    """Stable sha256 over the canonical JSON of the request."""
+    payload = {
+        "model": model,
+        "messages": messages,
+        "tools": tools or [],
+        "params": {k: v for k, v in sorted((params or {}).items()) if v is not None},
+    }
+    blob = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def cache_enabled_for(options: dict[str, Any] | None) -> bool:
+    """Honour the cache only for deterministic calls or explicit opt-in."""
+    options = options or {}
+    if options.get("response_cache") is not None:
+        return bool(options["response_cache"])
+    temperature = options.get("temperature")
+    try:
+        return temperature is not None and float(temperature) == 0.0
+    except (TypeError, ValueError):
+        return False
+
+
+class ResponseCache:
+    """JSON files under ``directory`` with an in-memory LRU index.
+
+    File IO is synchronous and small; async callers use ``aget`` / ``aput``
+    which run it in a worker thread. Hit / miss counters are mirrored into
+    an optional ``MetricsRegistry`` as ``llm_cache_*``.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        *,
+        ttl_seconds: float = 3600.0,
+        max_entries: int = 2000,
+        max_bytes: int = 256 * 1024 * 1024,
+        metrics: Any = None,
+    ):
+        self.directory = directory
+        self.ttl_seconds = float(ttl_seconds)
+        self.max_entries = int(max_entries)
+        self.max_bytes = int(max_bytes)
+        self.metrics = metrics
+        self.hits = 0
+        self.misses = 0
+        self._index: OrderedDict[str, tuple[float, int]] = OrderedDict()  # key -> (stored_at, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def _load_index(self) -> None:
+        found: list[tuple[float, str, int]] = []
+        for root, _dirs, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                try:
+                    st = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+                found.append((st.st_mtime, name[:-5], st.st_size))
+        for mtime, key, size in sorted(found):
+            self._index[key] = (mtime, size)
+            self._bytes += size
+        self._evict()
+
+    def _inc(self, name: str) -> None:
+        if self.metrics is not None:
+            self.metrics.inc(name)
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        with self._lock:
+            meta = self._index.get(key)
+            if meta is not None and time.time() - meta[0] > self.ttl_seconds:
+                self._drop(key)
+                meta = None
+            if meta is None:
+                self.misses += 1
+                self._inc("llm_cache_misses")
+                return None
+            self._index.move_to_end(key)
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self._drop(key)
+                self.misses += 1
+            self._inc("llm_cache_misses")
+            return None
+        with self._lock:
+            self.hits += 1
+        self._inc("llm_cache_hits")
+        return value
+
+    def put(self, key: str, value: dict[str, Any]) -> None:
+        data = json.dumps(value, ensure_ascii=False, default=str).encode("utf-8")
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self._lock:
+            if key in self._index:
+                self._bytes -= self._index.pop(key)[1]
+            self._index[key] = (time.time(), len(data))
+            self._bytes += len(data)
+            self._evict()
+        self._inc("llm_cache_stores")
+
+    async def aget(self, key: str) -> dict[str, Any] | None:
+        return await asyncio.to_thread(self.get, key)
+
+    async def aput(self, key: str, value: dict[str, Any]) -> None:
+        await asyncio.to_thread(self.put, key, value)
+
+    def _drop(self, key: str) -> None:
+        meta = self._index.pop(key, None)
+        if meta is not None:
+            self._bytes -= meta[1]
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _evict(self) -> None:
+        while self._index and (len(self._index) > self.max_entries or self._bytes > self.max_bytes):
+            key = next(iter(self._index))
+            self._drop(key)
+            self._inc("llm_cache_evictions")
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._index):
+                self._drop(key)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "entries": len(self._index),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+class CachedProvider(ModelProvider):
+    """ModelProvider decorator that serves repeated requests from a ResponseCache."""
+
+    def __init__(self, inner: ModelProvider, cache: ResponseCache, model: str,
+                 params: dict[str, Any] | None = None):
+        self.inner = inner
+        self.cache = cache
+        self.model = model
+        self.params = dict(params or {})
+        self.name = getattr(inner, "name", "base")
+
+    def capabilities(self) -> set:
+        return self.inner.capabilities()
+
+    def __getattr__(self, item: str) -> Any:
+        return getattr(self.inner, item)
+
+    async def chat(
+        self,
+        messages: list[dict[str, Any]],
+        *,
+        tools: list[dict[str, Any]] | None = None,
+        timeout: float | None = None,
+    ) -> ModelResult:
+        endpoint = getattr(self.inner, "base_url", "")
+        key = cache_key(f"{self.name}:{endpoint}:{self.model}", messages, tools, self.params)
+        hit = await self.cache.aget(key)
+        if hit is not None:
+            return ModelResult(
+                content=hit.get("content", ""),
+                tool_calls=[ToolCall(**{k: v for k, v in t.items() if k in ("id", "name", "arguments", "type")})
+                            for t in hit.get("tool_calls") or []],
+                model=hit.get("model", self.model),
+                usage=dict(hit.get("usage") or {}),
+                cached=True,
+            )
+        result = await self.inner.chat(messages, tools=tools, timeout=timeout)
+        await self.cache.aput(key, result.to_dict())
+        return result
+
+
+_cache: ResponseCache | None = None
+
+
+def get_response_cache() -> ResponseCache | None:
+    """Process-wide cache from ``settings.response_cache`` (None when disabled)."""
+    global _cache
+    from core.config import settings
+    cfg = settings.response_cache
+    if not cfg.enabled:
+        return None
+    if _cache is None:
+        _cache = ResponseCache(
+            cfg.directory or os.path.join(settings.data_dir, "llm_cache"),
+            ttl_seconds=cfg.ttl_seconds,
+            max_entries=cfg.max_entries,
+            max_bytes=cfg.max_size_mb * 1024 * 1024,
+        )
+    return _cache
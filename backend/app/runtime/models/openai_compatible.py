@@ -9,6 +9,7 @@ from typing import Any
 import httpx
 
 from .base import ModelProvider, ModelResult, ToolCall
+from .rate_limit import estimate_tokens, get_rate_limiter, send_limited
 
 
 class OpenAICompatibleProvider(ModelProvider):
@@ -16,11 +17,16 @@ class OpenAICompatibleProvider(ModelProvider):
 
     name = "openai-compatible"
 
-    def __init__(self, *, api_key: str, base_url: str, model: str, protocol: str):
+    def __init__(
+        self, *, api_key: str, base_url: str, model: str, protocol: str,
+        rate_limits: dict[str, Any] | None = None,
+    ):
         self.api_key = api_key
         self.base_url = base_url.rstrip("/")
         self.model = model
         self.protocol = protocol
+        # shared with every other caller of this provider credential
+        self.limiter = get_rate_limiter(self.base_url, api_key, rate_limits)
 
     def capabilities(self) -> set:
         return {"CHAT", "TOOL_CALLING"}
@@ -42,7 +48,13 @@ class OpenAICompatibleProvider(ModelProvider):
             payload["tools"] = tools
         headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
         async with httpx.AsyncClient(timeout=timeout or 120.0, follow_redirects=False) as client:
-            response = await client.post(endpoint, headers=headers, json=payload)
+            response = await send_limited(
+                self.limiter,
+                lambda: client.post(endpoint, headers=headers, json=payload),
+                tokens=estimate_tokens(messages),
+                timeout=timeout,
+                usage=lambda r: self._usage(r.json().get("usage") or {})["total_tokens"],
+            )
         response.raise_for_status()
         data = response.json()
         if self.protocol == "responses":
@@ -0,0 +1,433 @@
+"""Provider pools: balance one model across several endpoints.
+
+An agent (or chat) target may name a pool instead of a single endpoint -
+several Ollama hosts or OpenAI-compatible endpoints serving the same model.
+``EndpointBalancer`` is transport-agnostic and is shared by the agent-side
+``ProviderPool`` (ModelProvider) and the chat-side pool runtime:
+
+* selection by least outstanding requests, or latency EWMA x load
+* per-endpoint circuit breaker (open after N consecutive failures,
+  half-open single probe after the cooldown)
+* failover to the next endpoint on transport / 5xx / 429 errors
+* optional hedged requests: a second endpoint is tried when the first has
+  not answered within ``hedge_after`` seconds; the first success wins
+* piggy-backed health checks (at most one probe round per interval)
+
+Live pools are kept in a bounded :class:`PoolCache` so balancer state
+survives across requests; evicted pools stop their health checks, and the
+app lifespan closes the rest.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Awaitable, Callable
+from typing import Any, TypeVar
+
+import httpx
+
+from ..errors import ModelUnavailableError
+from .base import ModelProvider, ModelResult
+
+T = TypeVar("T")
+
+STRATEGIES = ("least_outstanding", "ewma")
+
+
+class PoolMember:
+    """One endpoint of a pool plus its load / latency / breaker state."""
+
+    def __init__(self, name: str, provider: Any):
+        self.name = name
+        self.provider = provider
+        self.outstanding = 0
+        self.ewma: float | None = None
+        self.failures = 0
+        self.open_until = 0.0
+        self.healthy = True
+        self.calls = 0
+        self.errors = 0
+
+    def to_dict(self, now: float) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "outstanding": self.outstanding,
+            "ewma_ms": round(self.ewma * 1000, 1) if self.ewma is not None else None,
+            "breaker": "open" if self.open_until > now else ("half-open" if self.failures else "closed"),
+            "healthy": self.healthy,
+            "calls": self.calls,
+            "errors": self.errors,
+        }
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Client errors (bad request, auth) fail the same everywhere - don't fail over."""
+    response = getattr(exc, "response", None)
+    status = getattr(response, "status_code", None)
+    if isinstance(status, int) and 400 <= status < 500:
+        return status in (408, 429)
+    return True
+
+
+class EndpointBalancer:
+    def __init__(
+        self,
+        members: list[PoolMember],
+        *,
+        strategy: str = "least_outstanding",
+        failure_threshold: int = 3,
+        cooldown: float = 30.0,
+        hedge_after: float | None = None,
+        health_interval: float = 30.0,
+        probe: Callable[[PoolMember], Awaitable[bool]] | None = None,
+        ewma_alpha: float = 0.3,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if not members:
+            raise ValueError("a pool needs at least one endpoint")
+        if strategy not in STRATEGIES:
+            raise ValueError(f"unknown pool strategy: {strategy}")
+        self.members = members
+        self.strategy = strategy
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.cooldown = float(cooldown)
+        self.hedge_after = hedge_after if hedge_after and hedge_after > 0 else None
+        self.health_interval = float(health_interval)
+        self.probe = probe
+        self.ewma_alpha = ewma_alpha
+        self.hedged = 0
+        self._clock = clock
+        self._last_health = clock()
+        self._health_task: asyncio.Task | None = None
+
+    # ---- selection ----
+    def _available(self, member: PoolMember, now: float) -> bool:
+        if not member.healthy:
+            return False
+        if member.failures >= self.failure_threshold:
+            # open -> wait out the cooldown; half-open -> exactly one probe in flight
+            return member.open_until <= now and member.outstanding == 0
+        return True
+
+    def _score(self, member: PoolMember) -> tuple:
+        if self.strategy == "ewma":
+            known = [m.ewma for m in self.members if m.ewma is not None]
+            # untried endpoints look as fast as the fastest so they get sampled
+            latency = member.ewma if member.ewma is not None else (min(known) if known else 0.0)
+            return (latency * (member.outstanding + 1), member.outstanding)
+        return (member.outstanding, member.ewma or 0.0)
+
+    def pick(self, exclude: set[str] | frozenset = frozenset()) -> PoolMember | None:
+        now = self._clock()
+        self._maybe_health_check(now)
+        candidates = [m for m in self.members if m.name not in exclude and self._available(m, now)]
+        if not candidates:
+            return None
+        return min(candidates, key=self._score)
+
+    # ---- outcomes ----
+    def on_success(self, member: PoolMember, latency: float) -> None:
+        member.failures = 0
+        member.open_until = 0.0
+        member.healthy = True
+        a = self.ewma_alpha
+        member.ewma = latency if member.ewma is None else a * latency + (1 - a) * member.ewma
+
+    def on_failure(self, member: PoolMember) -> None:
+        member.errors += 1
+        member.failures += 1
+        if member.failures >= self.failure_threshold:
+            member.open_until = self._clock() + self.cooldown
+
+    # ---- calls ----
+    async def _attempt(self, member: PoolMember, fn: Callable[[PoolMember], Awaitable[T]]) -> T:
+        member.outstanding += 1
+        member.calls += 1
+        started = self._clock()
+        try:
+            result = await fn(member)
+        except asyncio.CancelledError:
+            raise
+        except BaseException as exc:
+            if is_retryable(exc):
+                self.on_failure(member)
+            raise
+        finally:
+            member.outstanding -= 1
+        self.on_success(member, self._clock() - started)
+        return result
+
+    async def call(self, fn: Callable[[PoolMember], Awaitable[T]], *, hedge: bool = True) -> T:
+        """Run ``fn`` on the best endpoint, failing over (and hedging) as needed."""
+        tried: set[str] = set()
+        running: dict[asyncio.Task, PoolMember] = {}
+        last_error: BaseException | None = None
+
+        def launch() -> bool:
+            member = self.pick(exclude=tried)
+            if member is None:
+                return False
+            tried.add(member.name)
+            running[asyncio.ensure_future(self._attempt(member, fn))] = member
+            return True
+
+        if not launch():
+            raise ModelUnavailableError("no healthy endpoint in pool")
+        try:
+            while running:
+                hedge_wait = self.hedge_after if hedge and len(running) == 1 else None
+                done, _ = await asyncio.wait(set(running), timeout=hedge_wait,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if launch():
+                        self.hedged += 1
+                    else:
+                        hedge = False
+                    continue
+                for task in done:
+                    running.pop(task)
+                    exc = task.exception()
+                    if exc is None:
+                        return task.result()
+                    last_error = exc
+                    if not is_retryable(exc):
+                        raise exc
+                if not running:
+                    launch()
+        finally:
+            for task in running:
+                task.cancel()
+        if last_error is not None:
+            raise last_error
+        raise ModelUnavailableError("no healthy endpoint in pool")
+
+    async def stream(self, open_stream: Callable[[PoolMember], AsyncIterator[T]]) -> AsyncIterator[T]:
+        """Stream from one endpoint; fail over only before the first chunk."""
+        tried: set[str] = set()
+        last_error: BaseException | None = None
+        while True:
+            member = self.pick(exclude=tried)
+            if member is None:
+                if last_error is not None:
+                    raise last_error
+                raise ModelUnavailableError("no healthy endpoint in pool")
+            tried.add(member.name)
+            member.outstanding += 1
+            member.calls += 1
+            started = self._clock()
+            emitted = False
+            try:
+                async for chunk in open_stream(member):
+                    if not emitted:
+                        # EWMA tracks time to first chunk for streams
+                        self.on_success(member, self._clock() - started)
+                        emitted = True
+                    yield chunk
+                if not emitted:
+                    self.on_success(member, self._clock() - started)
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                if is_retryable(exc):
+                    self.on_failure(member)
+                if emitted or not is_retryable(exc):
+                    raise
+                last_error = exc
+            finally:
+                member.outstanding -= 1
+
+    # ---- health ----
+    def _maybe_health_check(self, now: float) -> None:
+        if self.probe is None or now - self._last_health < self.health_interval:
+            return
+        if self._health_task is not None and not self._health_task.done():
+            return
+        self._last_health = now
+        try:
+            self._health_task = asyncio.get_running_loop().create_task(self.check_health())
+        except RuntimeError:
+            self._health_task = None
+
+    async def check_health(self) -> dict[str, bool]:
+        if self.probe is None:
+            return {m.name: m.healthy for m in self.members}
+
+        async def one(member: PoolMember) -> None:
+            try:
+                member.healthy = bool(await self.probe(member))
+            except Exception:
+                member.healthy = False
+
+        await asyncio.gather(*(one(m) for m in self.members))
+        if not any(m.healthy for m in self.members):
+            # never strand every caller on a flaky probe; the breaker still applies
+            for m in self.members:
+                m.healthy = True
+        return {m.name: m.healthy for m in self.members}
+
+    def close(self) -> None:
+        """Stop a running health probe; the balancer stays usable."""
+        task, self._health_task = self._health_task, None
+        if task is not None and not task.done():
+            task.cancel()
+
+    def stats(self) -> dict[str, Any]:
+        now = self._clock()
+        return {
+            "strategy": self.strategy,
+            "hedged": self.hedged,
+            "members": [m.to_dict(now) for m in self.members],
+        }
+
+
+async def http_probe(member: PoolMember) -> bool:
+    """Cheap liveness probe: ``/models`` for OpenAI-compatible, ``/api/tags`` for Ollama."""
+    provider = member.provider
+    base_url = getattr(provider, "base_url", "")
+    api_key = getattr(provider, "api_key", None)
+    url = f"{base_url}/models" if api_key else f"{base_url}/api/tags"
+    headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+    async with httpx.AsyncClient(timeout=5.0, follow_redirects=False) as client:
+        response = await client.get(url, headers=headers)
+    return response.status_code < 500
+
+
+class ProviderPool(ModelProvider):
+    """ModelProvider that balances ``chat`` across interchangeable providers."""
+
+    name = "pool"
+
+    def __init__(self, providers: list[tuple[str, ModelProvider]], **balancer_options: Any):
+        balancer_options.setdefault("probe", http_probe)
+        self.balancer = EndpointBalancer(
+            [PoolMember(name, provider) for name, provider in providers], **balancer_options,
+        )
+
+    def capabilities(self) -> set:
+        caps = [m.provider.capabilities() for m in self.balancer.members]
+        return set.intersection(*caps) if caps else set()
+
+    async def chat(
+        self,
+        messages: list[dict[str, Any]],
+        *,
+        tools: list[dict[str, Any]] | None = None,
+        timeout: float | None = None,
+    ) -> ModelResult:
+        return await self.balancer.call(
+            lambda member: member.provider.chat(messages, tools=tools, timeout=timeout),
+        )
+
+    def stats(self) -> dict[str, Any]:
+        return self.balancer.stats()
+
+    def close(self) -> None:
+        self.balancer.close()
+
+
+class PoolCache:
+    """LRU of live pools keyed by their configuration; evicted pools are closed.
+
+    Ad-hoc keys embed every member's credential and quotas, so without a
+    bound each rotated key would pin another pool for the process lifetime.
+    """
+
+    def __init__(self, max_pools: int = 32):
+        self.max_pools = max_pools
+        self._pools: OrderedDict[tuple, Any] = OrderedDict()
+
+    def get(self, key: tuple, build: Callable[[], Any]) -> Any:
+        pool = self._pools.get(key)
+        if pool is not None:
+            self._pools.move_to_end(key)
+            return pool
+        pool = self._pools[key] = build()
+        while len(self._pools) > self.max_pools:
+            _, evicted = self._pools.popitem(last=False)
+            evicted.close()
+        return pool
+
+    def close(self) -> None:
+        pools, self._pools = list(self._pools.values()), OrderedDict()
+        for pool in pools:
+            pool.close()
+
+    def __len__(self) -> int:
+        return len(self._pools)
+
+
+def balancer_options(cfg: Any) -> dict[str, Any]:
+    """EndpointBalancer kwargs from a ``ModelPoolSettings``."""
+    return {
+        "strategy": cfg.strategy,
+        "failure_threshold": cfg.failure_threshold,
+        "cooldown": cfg.cooldown_seconds,
+        "hedge_after": cfg.hedge_after_ms / 1000.0 if cfg.hedge_after_ms else None,
+        "health_interval": cfg.health_interval_seconds,
+    }
+
+
+def pool_key(members: list[tuple[str, dict[str, Any]]], model: str) -> tuple:
+    """Cache key for an ad-hoc pool; rotating a credential or its quotas yields a new pool."""
+    from .rate_limit import limiter_key
+    return (model, tuple(
+        (name, limiter_key(cfg.get("base_url", ""), cfg.get("api_key", "")),
+         tuple(sorted((cfg.get("rate_limits") or {}).items())))
+        for name, cfg in members
+    ))
+
+
+_pools = PoolCache()
+
+
+def get_remote_pool(members: list[tuple[str, dict[str, Any]]], model: str) -> ProviderPool:
+    """Pool over resolved remote provider configs (``resolve_verified`` dicts).
+
+    Balancer state (EWMA, breakers) survives across runs for the same set.
+    """
+    def build() -> ProviderPool:
+        from core.config import ModelPoolSettings
+
+        from .openai_compatible import OpenAICompatibleProvider
+        return ProviderPool(
+            [(name, OpenAICompatibleProvider(**cfg)) for name, cfg in members],
+            **balancer_options(ModelPoolSettings()),
+        )
+
+    return _pools.get(("remote",) + pool_key(members, model), build)
+
+
+def get_model_pool(name: str, model: str) -> ProviderPool:
+    """Configured pool (``settings.model_pools``) serving ``model``; state is process-wide.
+
+    The key includes the pool settings, so an edited entry builds a fresh pool.
+    """
+    from core.config import settings
+    cfg = settings.model_pools.get(name)
+    if cfg is None or not cfg.endpoints:
+        raise ModelUnavailableError(f"model pool {name!r} is not configured")
+
+    def build() -> ProviderPool:
+        providers: list[tuple[str, ModelProvider]] = []
+        for endpoint in cfg.endpoints:
+            if endpoint.kind == "openai":
+                from .openai_compatible import OpenAICompatibleProvider
+                provider: ModelProvider = OpenAICompatibleProvider(
+                    api_key=os.environ.get(endpoint.api_key_env, "") if endpoint.api_key_env else "",
+                    base_url=endpoint.base_url, model=model, protocol=endpoint.protocol,
+                )
+            else:
+                from .ollama import OllamaProvider
+                provider = OllamaProvider(model, base_url=endpoint.base_url)
+            providers.append((endpoint.base_url.rstrip("/"), provider))
+        return ProviderPool(providers, **balancer_options(cfg))
+
+    return _pools.get(("config", name, model, cfg.model_dump_json()), build)
+
+
+def close_model_pools() -> None:
+    """Stop every cached agent pool (app shutdown)."""
+    _pools.close()
@@ -0,0 +1,331 @@
+"""Client-side rate limiting for remote (OpenAI-compatible) providers.
+
+Without a limiter every chat / agent / RAG call fired immediately, so load
+spikes turned into provider 429 storms and failed runs. One
+``ProviderLimiter`` is shared per provider credential (see
+``get_rate_limiter``; quotas come from the provider's own settings, falling
+back to ``settings.remote_rate_limit``) and combines:
+
+* token buckets for requests/min and tokens/min (estimated up front,
+  corrected with the reported usage afterwards)
+* AIMD concurrency - +1/limit per success, halved on a 429
+* ``Retry-After`` - a 429 pauses the whole provider for the advertised time
+* a FIFO wait queue with a deadline (``ModelRateLimitedError`` on expiry)
+"""
+from __future__ import annotations
+
+import asyncio
+import datetime
+import hashlib
+import json
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any
+
+from ..context.tokens import MESSAGE_OVERHEAD, HeuristicCounter
+from ..errors import ModelRateLimitedError
+
+#: Completion reserve charged up front when the caller sets no max_tokens.
+DEFAULT_COMPLETION_RESERVE = 256
+
+_estimator = HeuristicCounter()
+
+
+def estimate_tokens(messages: list[dict[str, Any]], max_tokens: int | None = None) -> int:
+    """Prompt estimate plus completion reserve, as providers charge quotas."""
+    total = 0
+    for message in messages:
+        content = message.get("content")
+        text = content if isinstance(content, str) else json.dumps(content, ensure_ascii=False, default=str)
+        total += _estimator.count(text or "") + MESSAGE_OVERHEAD
+    return total + int(max_tokens or DEFAULT_COMPLETION_RESERVE)
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """``Retry-After`` as seconds (delta-seconds or HTTP-date form)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=datetime.timezone.utc)
+    return max(0.0, (when - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+
+
+class TokenBucket:
+    """Per-minute quota refilled continuously; ``capacity <= 0`` = unlimited.
+
+    The level may go negative when actual usage exceeds the estimate; later
+    callers then wait until the debt is paid back.
+    """
+
+    def __init__(self, per_minute: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self._clock = clock
+        self._updated = clock()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.capacity <= 0
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        if self.unlimited or amount <= 0:
+            return 0.0
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float, now: float) -> None:
+        if self.unlimited or amount <= 0:
+            return
+        self._refill(now)
+        self.level -= amount
+
+
+class Permit:
+    """One admitted request; callers report the outcome via ``record``."""
+
+    def __init__(self, tokens: int):
+        self.tokens = tokens
+        self.used_tokens: int | None = None
+        self.ok = False
+        self.throttled = False
+        self.retry_after: float | None = None
+
+    def record(self, status_code: int, headers: Any = None, used_tokens: int | None = None) -> None:
+        if status_code == 429:
+            self.throttled = True
+            self.retry_after = parse_retry_after((headers or {}).get("retry-after"))
+        elif status_code < 500:
+            self.ok = True
+        if used_tokens is not None:
+            self.used_tokens = used_tokens
+
+
+class ProviderLimiter:
+    """Shared admission for one provider: buckets + AIMD concurrency + FIFO queue."""
+
+    def __init__(
+        self,
+        *,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        max_concurrency: int = 8,
+        min_concurrency: int = 1,
+        max_wait: float = 60.0,
+        default_retry_after: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.requests = TokenBucket(requests_per_minute, clock)
+        self.tokens = TokenBucket(tokens_per_minute, clock)
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.min_concurrency = max(1, min(int(min_concurrency), self.max_concurrency))
+        self.concurrency = float(self.max_concurrency)
+        self.max_wait = float(max_wait)
+        self.default_retry_after = float(default_retry_after)
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.admitted = 0
+        self.throttled = 0
+        self.timeouts = 0
+        self._clock = clock
+        self._queue: deque[object] = deque()
+        self._changed: asyncio.Future | None = None
+
+    def configure(self, *, requests_per_minute: float, tokens_per_minute: float, max_concurrency: int) -> None:
+        """Apply edited quotas in place; waiters and AIMD state carry over."""
+        for bucket, per_minute in ((self.requests, requests_per_minute), (self.tokens, tokens_per_minute)):
+            bucket.capacity = float(per_minute)
+            bucket.rate = bucket.capacity / 60.0
+            bucket.level = min(bucket.level, bucket.capacity)
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.min_concurrency = min(self.min_concurrency, self.max_concurrency)
+        self.concurrency = min(self.concurrency, float(self.max_concurrency))
+        self._signal()
+
+    # ---- admission ----
+    def _delay(self, tokens: int, now: float) -> float | None:
+        """Seconds until the head caller may go; None = wait for a release."""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.in_flight >= max(self.min_concurrency, int(self.concurrency)):
+            return None
+        return max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+
+    def _changed_future(self) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        fut = self._changed
+        if fut is None or fut.done() or fut.get_loop() is not loop:
+            fut = self._changed = loop.create_future()
+        return fut
+
+    def _signal(self) -> None:
+        fut, self._changed = self._changed, None
+        if fut is not None and not fut.done():
+            fut.set_result(None)
+
+    async def acquire(self, tokens: int = 0, timeout: float | None = None) -> None:
+        deadline = self._clock() + (self.max_wait if timeout is None else timeout)
+        ticket = object()
+        self._queue.append(ticket)
+        try:
+            while True:
+                now = self._clock()
+                delay = self._delay(tokens, now) if self._queue[0] is ticket else None
+                if delay is not None and delay <= 0:
+                    self._queue.popleft()
+                    self.requests.take(1, now)
+                    self.tokens.take(tokens, now)
+                    self.in_flight += 1
+                    self.admitted += 1
+                    self._signal()  # next in line re-evaluates
+                    return
+                remaining = deadline - now
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise ModelRateLimitedError(details={"queued": len(self._queue)})
+                wait = remaining if delay is None else min(delay, remaining)
+                try:
+                    await asyncio.wait_for(asyncio.shield(self._changed_future()), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if ticket in self._queue:
+                self._queue.remove(ticket)
+                self._signal()
+
+    def release(self, permit: Permit) -> None:
+        self.in_flight = max(0, self.in_flight - 1)
+        now = self._clock()
+        if permit.throttled:
+            self.throttled += 1
+            self.concurrency = max(float(self.min_concurrency), self.concurrency / 2)
+            pause = self.default_retry_after if permit.retry_after is None else permit.retry_after
+            self.blocked_until = max(self.blocked_until, now + pause)
+        elif permit.ok:
+            self.concurrency = min(float(self.max_concurrency), self.concurrency + 1.0 / self.concurrency)
+        if permit.used_tokens is not None and permit.used_tokens > permit.tokens:
+            self.tokens.take(permit.used_tokens - permit.tokens, now)
+        self._signal()
+
+    @asynccontextmanager
+    async def slot(self, tokens: int = 0, timeout: float | None = None) -> AsyncIterator[Permit]:
+        await self.acquire(tokens, timeout)
+        permit = Permit(tokens)
+        try:
+            yield permit
+        finally:
+            self.release(permit)
+
+    async def request(
+        self,
+        send: Callable[[], Awaitable[Any]],
+        *,
+        tokens: int = 0,
+        timeout: float | None = None,
+        usage: Callable[[Any], int | None] | None = None,
+    ) -> Any:
+        """Send through the limiter, retrying 429s while the deadline allows.
+
+        Returns the last response; a 429 that cannot be retried in time is
+        handed back to the caller unchanged.
+        """
+        deadline = self._clock() + (self.max_wait if timeout is None else timeout)
+        while True:
+            async with self.slot(tokens, timeout=max(0.0, deadline - self._clock())) as permit:
+                response = await send()
+                used = None
+                if usage is not None and response.status_code < 400:
+                    try:
+                        used = usage(response)
+                    except Exception:
+                        used = None
+                permit.record(response.status_code, getattr(response, "headers", None), used)
+            if not permit.throttled:
+                return response
+            pause = self.default_retry_after if permit.retry_after is None else permit.retry_after
+            if self._clock() + pause >= deadline:
+                return response
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "queued": len(self._queue),
+            "concurrency": round(self.concurrency, 2),
+            "blocked_for": round(max(0.0, self.blocked_until - self._clock()), 3),
+            "admitted": self.admitted,
+            "throttled": self.throttled,
+            "timeouts": self.timeouts,
+        }
+
+
+async def send_limited(
+    limiter: ProviderLimiter | None,
+    send: Callable[[], Awaitable[Any]],
+    *,
+    tokens: int = 0,
+    timeout: float | None = None,
+    usage: Callable[[Any], int | None] | None = None,
+) -> Any:
+    if limiter is None:
+        return await send()
+    return await limiter.request(send, tokens=tokens, timeout=timeout, usage=usage)
+
+
+_limiters: dict[str, ProviderLimiter] = {}
+
+
+def limiter_key(base_url: str, api_key: str) -> str:
+    """Endpoint + credential fingerprint: quotas are accounted per API key."""
+    digest = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+    return f"{base_url.rstrip('/')}#{digest}"
+
+
+#: Quotas a provider may set for itself; unset ones use ``settings.remote_rate_limit``.
+PROVIDER_LIMIT_FIELDS = ("requests_per_minute", "tokens_per_minute", "max_concurrency")
+
+
+def get_rate_limiter(
+    base_url: str, api_key: str, limits: dict[str, Any] | None = None,
+) -> ProviderLimiter | None:
+    """Process-wide limiter for one remote provider (None when disabled).
+
+    ``limits`` are the provider's own quotas (``PROVIDER_LIMIT_FIELDS``);
+    missing or None values fall back to the global ``remote_rate_limit``
+    block. Edited quotas are applied to the shared limiter in place.
+    """
+    from core.config import settings
+    cfg = settings.remote_rate_limit
+    if not cfg.enabled:
+        return None
+    quotas = {name: getattr(cfg, name) for name in PROVIDER_LIMIT_FIELDS}
+    quotas.update({k: v for k, v in (limits or {}).items() if k in quotas and v is not None})
+    key = limiter_key(base_url, api_key)
+    limiter = _limiters.get(key)
+    if limiter is None:
+        limiter = _limiters[key] = ProviderLimiter(
+            **quotas,
+            min_concurrency=cfg.min_concurrency,
+            max_wait=cfg.max_wait_seconds,
+            default_retry_after=cfg.default_retry_after_seconds,
+        )
+    elif (limiter.requests.capacity, limiter.tokens.capacity, limiter.max_concurrency) != (
+        float(quotas["requests_per_minute"]), float(quotas["tokens_per_minute"]), max(1, int(quotas["max_concurrency"])),
+    ):
+        limiter.configure(**quotas)
+    return limiter
@@ -5,8 +5,17 @@ the single EventBus.
 """
 
 from .context import PluginContext
-from .manager import PLUGIN_LIFECYCLE_EVENTS, PluginManager
+from .lazy import LazyPluginTool
+from .manager import PLUGIN_LIFECYCLE_EVENTS, PluginManager, plugin_waves
 from .manifest import PluginManifest
 from .scope import PluginScope
 
-__all__ = ["PLUGIN_LIFECYCLE_EVENTS", "PluginContext", "PluginManager", "PluginManifest", "PluginScope"]
\ No newline at end of file
+__all__ = [
+    "PLUGIN_LIFECYCLE_EVENTS",
+    "LazyPluginTool",
+    "PluginContext",
+    "PluginManager",
+    "PluginManifest",
+    "PluginScope",
+    "plugin_waves",
+]
\ No newline at end of file
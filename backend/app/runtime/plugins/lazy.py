@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from typing import Any
+
+from ..errors import ToolDeniedError
+from ..tools.base import Tool, ToolResult
+
+
+class LazyPluginTool(Tool):
+    """Stand-in for a tool declared in a plugin manifest (``tools:`` descriptor).
+
+    It is mounted at load time with the manifest's name, description and
+    schema, so agents and capability discovery see the tool without the
+    plugin's entry module being imported. The first ``execute`` asks the
+    PluginManager to activate the plugin; the entry's real tools replace
+    the stand-ins in the registry and the call is forwarded once the run
+    policy has approved the real tool (its permissions, not the manifest's,
+    are authoritative).
+    """
+
+    source = "plugin"
+
+    def __init__(self, manager: Any, plugin: str, descriptor: dict[str, Any]):
+        self._manager = manager
+        self.plugin = plugin
+        self.descriptor = dict(descriptor)
+        self.name = descriptor["name"]
+        self.description = descriptor.get("description", "")
+        self.permissions = list(descriptor.get("permissions") or [])
+        self.aliases = list(descriptor.get("aliases") or [])
+        if descriptor.get("timeout") is not None:
+            self.timeout = float(descriptor["timeout"])
+        self.metadata = {"lazy": True}
+
+    def input_schema(self) -> dict[str, Any]:
+        return dict(
+            self.descriptor.get("input_schema")
+            or self.descriptor.get("parameters")
+            or {"type": "object", "properties": {}}
+        )
+
+    async def execute(self, arguments: dict[str, Any], context: Any = None) -> ToolResult:
+        try:
+            await self._manager.activate(self.plugin)
+        except Exception as e:
+            return ToolResult.err(f"plugin {self.plugin} failed to load: {e}")
+        state = self._manager.get(self.plugin)
+        tool = state["scope"].tools().get(self.name) if state is not None else None
+        if tool is None or tool is self:
+            return ToolResult.err(f"plugin {self.plugin} does not provide tool {self.name}")
+        policy = getattr(context, "policy", None) if context is not None else None
+        if policy is not None and hasattr(policy, "check_tool"):
+            decision = policy.check_tool(context, self.name, tool)
+            if not decision.allowed:
+                raise ToolDeniedError(decision.reason)
+        return await tool.execute(arguments, context)
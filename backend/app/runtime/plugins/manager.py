@@ -1,8 +1,11 @@
 from __future__ import annotations
 
+import asyncio
 import builtins
+import copy
 import importlib.util
 import os
+import time
 from typing import Any
 
 from ..logging import get_logger
@@ -19,6 +22,12 @@ class PluginManager:
 
     Lifecycle events are published on the SINGLE EventBus (spec 7 / audit §10.3);
     no second event system. Each plugin gets a PluginScope + PluginContext.
+
+    Parsed manifests are cached per file (mtime + size). ``load_all`` loads
+    dependency waves in parallel with entry imports off the event loop, and
+    tool plugins that declare their tools in the manifest are only imported
+    when one of those tools is first called. ``startup_report`` has the
+    per-plugin timings.
     """
 
     def __init__(
@@ -27,20 +36,39 @@ class PluginManager:
         plugins_dir: str | None = None,
         event_bus: Any = None,
         logger: Any = None,
+        lazy_import: bool = True,
     ):
         self._runtime = runtime
         self._plugins_dir = plugins_dir
         self._event_bus = event_bus or getattr(runtime, "event_bus", None)
         self._logger = logger or get_logger()
+        self._lazy_import = lazy_import
         self._plugins: dict[str, dict[str, Any]] = {}
+        # manifest path -> ((mtime_ns, size), parsed manifest)
+        self._manifests: dict[str, tuple[tuple[int, int], PluginManifest]] = {}
+        self._parse_ms: dict[str, float] = {}
+        self._activation_locks: dict[str, asyncio.Lock] = {}
+        self._startup: dict[str, Any] = {}
+        self._pending_events: set[asyncio.Task] = set()
 
     # ---- discovery (audit §16.9) ----
     def discover(self, directory: str | None = None) -> builtins.list[dict[str, Any]]:
         """Scan `*/plugin.yaml|plugin.json` under a directory."""
-        directory = directory or self._plugins_dir
         found = []
+        for entry, mpath in self._manifest_paths(directory):
+            try:
+                m = self.read_manifest(mpath)
+                problems = m.validate()
+                found.append({**m.to_dict(), "manifest_path": mpath, "problems": problems})
+            except Exception as e:
+                found.append({"name": entry, "version": "?", "problems": [f"manifest error: {e}"], "manifest_path": mpath})
+        return found
+
+    def _manifest_paths(self, directory: str | None) -> builtins.list[tuple[str, str]]:
+        directory = directory or self._plugins_dir
         if not directory or not os.path.isdir(directory):
-            return found
+            return []
+        paths = []
         for entry in sorted(os.listdir(directory)):
             pdir = os.path.join(directory, entry)
             if not os.path.isdir(pdir):
@@ -48,20 +76,138 @@ class PluginManager:
             for manifest_file in ("plugin.yaml", "plugin.yml", "plugin.json"):
                 mpath = os.path.join(pdir, manifest_file)
                 if os.path.exists(mpath):
-                    try:
-                        m = PluginManifest.from_file(mpath)
-                        problems = m.validate()
-                        found.append({**m.to_dict(), "manifest_path": mpath, "problems": problems})
-                    except Exception as e:
-                        found.append({"name": entry, "version": "?", "problems": [f"manifest error: {e}"], "manifest_path": mpath})
+                    paths.append((entry, mpath))
                     break
-        return found
+        return paths
+
+    def read_manifest(self, path: str) -> PluginManifest:
+        """Parse a manifest file, reusing the last parse while its mtime/size are unchanged."""
+        st = os.stat(path)
+        key = (st.st_mtime_ns, st.st_size)
+        cached = self._manifests.get(path)
+        if cached is not None and cached[0] == key:
+            return copy.deepcopy(cached[1])
+        started = time.perf_counter()
+        manifest = PluginManifest.from_file(path)
+        self._manifests[path] = (key, manifest)
+        self._parse_ms[manifest.name] = _ms(started)
+        return copy.deepcopy(manifest)
 
     # ---- lifecycle ----
     def load(self, manifest: PluginManifest) -> dict[str, Any]:
-        """Resolve dependencies, create scope/context, import entry, mount tools."""
+        """Resolve dependencies, create scope/context, import entry, mount tools.
+
+        Tool plugins whose manifest declares every tool are mounted as
+        stand-ins and their entry is imported on first use (``activate``).
+        """
         if manifest.name in self._plugins:
             return self._plugins[manifest.name]
+        started = time.perf_counter()
+        state = self._register(manifest)
+        if self._is_lazy(manifest):
+            self._mount_lazy(state)
+        elif manifest.entry:
+            self._import(state)
+            self._setup(state)
+        state["timings"]["load_ms"] = _ms(started)
+        return state
+
+    async def load_async(self, manifest: PluginManifest) -> dict[str, Any]:
+        """``load`` with the entry-module import run in a worker thread."""
+        if manifest.name in self._plugins:
+            return self._plugins[manifest.name]
+        started = time.perf_counter()
+        state = self._register(manifest)
+        if self._is_lazy(manifest):
+            self._mount_lazy(state)
+        elif manifest.entry:
+            await self._import_async(state)
+            self._setup(state)
+        state["timings"]["load_ms"] = _ms(started)
+        return state
+
+    async def load_all(
+        self,
+        manifests: builtins.list[PluginManifest] | None = None,
+        directory: str | None = None,
+    ) -> dict[str, Any]:
+        """Load many plugins: dependency waves in topological order, each wave in parallel.
+
+        Without ``manifests`` every plugin under ``directory`` (default:
+        plugins_dir) is loaded. A plugin that fails, or whose dependencies
+        are missing / failed / cyclic, is reported and skipped together
+        with its dependents; the rest still load. Returns the startup report.
+        """
+        started = time.perf_counter()
+        failed: dict[str, str] = {}
+        if manifests is None:
+            manifests = []
+            for entry, mpath in self._manifest_paths(directory):
+                try:
+                    manifests.append(self.read_manifest(mpath))
+                except Exception as e:
+                    failed[entry] = f"manifest error: {e}"
+        waves, unresolved = plugin_waves(manifests, loaded=set(self._plugins))
+        failed.update(unresolved)
+        for number, wave in enumerate(waves):
+            ready = []
+            for m in wave:
+                blocked = [dep for dep in m.dependencies if dep in failed]
+                if blocked:
+                    failed[m.name] = "dependency failed: " + ", ".join(blocked)
+                else:
+                    ready.append(m)
+            results = await asyncio.gather(*(self.load_async(m) for m in ready), return_exceptions=True)
+            for m, result in zip(ready, results):
+                if isinstance(result, Exception):
+                    failed[m.name] = str(result)
+                elif m.name in self._plugins:
+                    self._plugins[m.name]["timings"]["wave"] = number
+        self._startup = {"waves": [[m.name for m in wave] for wave in waves], "failed": failed, "total_ms": _ms(started)}
+        await self.flush_events()
+        return self.startup_report()
+
+    async def activate(self, name: str) -> dict[str, Any]:
+        """Import a lazily loaded plugin and run its setup (once; concurrent callers wait)."""
+        state = self._plugins.get(name)
+        if state is None:
+            raise KeyError(f"plugin {name} is not loaded")
+        if state["status"] == "failed":
+            raise RuntimeError(state["error"])
+        if state.get("imported") or not state["manifest"].entry:
+            return state
+        lock = self._activation_locks.setdefault(name, asyncio.Lock())
+        async with lock:
+            if not state.get("imported"):
+                started = time.perf_counter()
+                await self._import_async(state)
+                self._setup(state)
+                state["timings"]["activate_ms"] = _ms(started)
+        return state
+
+    def startup_report(self) -> dict[str, Any]:
+        """Per-plugin load timings (manifest parse, import, setup) plus the last ``load_all`` waves."""
+        plugins = []
+        for name, s in sorted(self._plugins.items()):
+            plugins.append({
+                "name": name,
+                "status": s["status"],
+                "lazy": s["lazy"],
+                "imported": s.get("imported", False),
+                "manifest_ms": self._parse_ms.get(name),
+                **s["timings"],
+                "error": s.get("error"),
+            })
+        for name, error in sorted(self._startup.get("failed", {}).items()):
+            if name not in self._plugins:
+                plugins.append({"name": name, "status": "failed", "lazy": False, "imported": False, "error": error})
+        return {
+            "plugins": plugins,
+            "waves": self._startup.get("waves", []),
+            "total_ms": self._startup.get("total_ms"),
+        }
+
+    def _register(self, manifest: PluginManifest) -> dict[str, Any]:
         problems = manifest.validate()
         if problems:
             raise ValueError(f"invalid plugin {manifest.name}: {problems}")
@@ -77,47 +223,89 @@ class PluginManager:
             "context": ctx,
             "status": "loaded",
             "error": None,
+            "lazy": self._is_lazy(manifest),
+            "timings": {},
         }
         self._plugins[manifest.name] = state
         self._emit("plugin.loaded", {"name": manifest.name, "version": manifest.version, "type": manifest.type})
+        return state
 
-        # import entry module (code stays on filesystem, audit §17)
-        if manifest.entry:
-            module = self._import_entry(manifest.entry)
-            state["module"] = module
-            try:
-                if hasattr(module, "setup"):
-                    result = module.setup(ctx)
-                    if isinstance(result, list):
-                        for tool in result:
-                            ctx.register_tool(tool)
-                if hasattr(module, "get_tools"):
-                    for tool in module.get_tools(ctx) or []:
+    def _is_lazy(self, manifest: PluginManifest) -> bool:
+        # skill/agent plugins contribute at load time, so only tool plugins defer;
+        # a descriptor must declare its permissions (even []) for the stand-in to be policy-checked
+        return (
+            self._lazy_import and manifest.type == "tool" and bool(manifest.entry)
+            and bool(manifest.tools)
+            and all(isinstance(t, dict) and t.get("name") and "permissions" in t for t in manifest.tools)
+        )
+
+    def _mount_lazy(self, state: dict[str, Any]) -> None:
+        from .lazy import LazyPluginTool
+        manifest = state["manifest"]
+        for descriptor in manifest.tools:
+            state["context"].register_tool(LazyPluginTool(self, manifest.name, descriptor))
+
+    async def _import_async(self, state: dict[str, Any]) -> None:
+        started = time.perf_counter()
+        try:
+            module = await asyncio.to_thread(self._import_entry, state["manifest"].entry)
+        except Exception as e:
+            self._fail(state, e)
+            raise
+        state["timings"]["import_ms"] = _ms(started)
+        state["module"] = module
+        state["imported"] = True
+
+    def _import(self, state: dict[str, Any]) -> None:
+        started = time.perf_counter()
+        try:
+            module = self._import_entry(state["manifest"].entry)
+        except Exception as e:
+            self._fail(state, e)
+            raise
+        state["timings"]["import_ms"] = _ms(started)
+        state["module"] = module
+        state["imported"] = True
+
+    def _fail(self, state: dict[str, Any], error: Exception) -> None:
+        state["status"] = "failed"
+        state["error"] = str(error)
+        self._emit("plugin.failed", {"name": state["manifest"].name, "error": str(error)})
+
+    def _setup(self, state: dict[str, Any]) -> None:
+        """Run the entry module hooks: setup / get_tools / contribute / extend_agent."""
+        manifest, ctx, module = state["manifest"], state["context"], state["module"]
+        started = time.perf_counter()
+        try:
+            if hasattr(module, "setup"):
+                result = module.setup(ctx)
+                if isinstance(result, list):
+                    for tool in result:
                         ctx.register_tool(tool)
-                # skill plugins: context contributions injected by the ContextBuilder (3.x-P4)
-                if manifest.type == "skill" and hasattr(module, "contribute"):
-                    contribs = module.contribute(ctx) or []
-                    state["contributions"] = [
-                        c.to_dict() if hasattr(c, "to_dict") else c for c in contribs
-                    ]
-                # agent plugins: behavior extension merged into the agent profile (3.x-P3)
-                if manifest.type == "agent" and hasattr(module, "extend_agent"):
-                    ext = module.extend_agent(ctx) or {}
-                    if isinstance(ext, dict):
-                        mounted_names = []
-                        for tool in ext.get("tools") or []:
-                            ctx.register_tool(tool)
-                            mounted_names.append(getattr(tool, "name", ""))
-                        ext["tool_names"] = mounted_names
-                        state["extension"] = ext
-            except Exception as e:
-                state["status"] = "failed"
-                state["error"] = str(e)
-                self._emit("plugin.failed", {"name": manifest.name, "error": str(e)})
-                raise
-        # manifest-declared tools with entry-provided schemas are registered by
-        # the entry itself; plain descriptors are informational here.
-        return state
+            if hasattr(module, "get_tools"):
+                for tool in module.get_tools(ctx) or []:
+                    ctx.register_tool(tool)
+            # skill plugins: context contributions injected by the ContextBuilder (3.x-P4)
+            if manifest.type == "skill" and hasattr(module, "contribute"):
+                contribs = module.contribute(ctx) or []
+                state["contributions"] = [
+                    c.to_dict() if hasattr(c, "to_dict") else c for c in contribs
+                ]
+            # agent plugins: behavior extension merged into the agent profile (3.x-P3)
+            if manifest.type == "agent" and hasattr(module, "extend_agent"):
+                ext = module.extend_agent(ctx) or {}
+                if isinstance(ext, dict):
+                    mounted_names = []
+                    for tool in ext.get("tools") or []:
+                        ctx.register_tool(tool)
+                        mounted_names.append(getattr(tool, "name", ""))
+                    ext["tool_names"] = mounted_names
+                    state["extension"] = ext
+        except Exception as e:
+            self._fail(state, e)
+            raise
+        finally:
+            state["timings"]["setup_ms"] = _ms(started)
 
     def start(self, name: str) -> bool:
         state = self._plugins.get(name)
@@ -155,6 +343,7 @@ class PluginManager:
         state = self._plugins.pop(name, None)
         if state is None:
             return False
+        self._activation_locks.pop(name, None)
         state["scope"].unmount()
         self._emit("plugin.unloaded", {"name": name})
         return True
@@ -192,9 +381,61 @@ class PluginManager:
     def _emit(self, event_type: str, payload: dict[str, Any]) -> None:
         if self._event_bus is None:
             return
-        import asyncio
         try:
             loop = asyncio.get_running_loop()
-            loop.create_task(self._event_bus.publish("plugin:manager", event_type, payload=payload, correlation_id="plugin-manager"))
         except RuntimeError:
-            pass
\ No newline at end of file
+            return
+        # keep a reference until published; flush_events() awaits the backlog
+        task = loop.create_task(self._event_bus.publish("plugin:manager", event_type, payload=payload, correlation_id="plugin-manager"))
+        self._pending_events.add(task)
+        task.add_done_callback(self._pending_events.discard)
+
+    async def flush_events(self) -> None:
+        """Wait until every lifecycle event emitted so far is published."""
+        while self._pending_events:
+            await asyncio.gather(*list(self._pending_events), return_exceptions=True)
+
+
+def plugin_waves(
+    manifests: list[PluginManifest], loaded: set[str] | None = None,
+) -> tuple[list[list[PluginManifest]], dict[str, str]]:
+    """Topologically sort manifests into waves whose members only depend on earlier waves.
+
+    Dependencies in ``loaded`` are already satisfied. Returns the waves and
+    ``{name: reason}`` for plugins that can never load (missing dependency
+    or dependency cycle).
+    """
+    loaded = set(loaded or ())
+    by_name = {m.name: m for m in manifests if m.name not in loaded}
+    unresolved: dict[str, str] = {}
+    for m in by_name.values():
+        missing = [d for d in m.dependencies if d not in by_name and d not in loaded]
+        if missing:
+            unresolved[m.name] = "depends on missing plugin: " + ", ".join(missing)
+    waves: list[list[PluginManifest]] = []
+    done = set(loaded)
+    pending = {name: m for name, m in by_name.items() if name not in unresolved}
+    while pending:
+        wave = [m for m in pending.values() if all(d in done for d in m.dependencies)]
+        if not wave:
+            break
+        waves.append(sorted(wave, key=lambda m: m.name))
+        for m in wave:
+            done.add(m.name)
+            del pending[m.name]
+    blocked = True
+    while blocked:
+        blocked = False
+        for name, m in list(pending.items()):
+            failed = [d for d in m.dependencies if d in unresolved]
+            if failed:
+                unresolved[name] = "dependency failed: " + ", ".join(failed)
+                del pending[name]
+                blocked = True
+    for name in pending:
+        unresolved[name] = "dependency cycle"
+    return waves, unresolved
+
+
+def _ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 3)
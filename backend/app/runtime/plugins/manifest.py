@@ -14,7 +14,7 @@ PLUGIN_TYPES = ("tool", "agent", "skill")
 class PluginManifest:
     """Plugin metadata (audit §16 / §17: filesystem-first).
 
-    `tools` is a list of tool descriptors `{name, description, input_schema}`;
+    `tools` is a list of tool descriptors `{name, description, input_schema, permissions}`;
     actual execution comes from the `entry` module (importable file exposing
     `get_tools(ctx)` and/or `setup(ctx)`), so code stays in files, not DB.
     """
@@ -6,7 +6,12 @@ from typing import Any, Protocol, runtime_checkable
 
 @runtime_checkable
 class RunStore(Protocol):
-    """Port: persistence for Run records (spec 30: Run -> DB)."""
+    """Port: persistence for Run records (spec 30: Run -> DB).
+
+    Stores shared by several workers also offer ``claim(run_id, owner, ttl)``
+    and ``renew(run_ids, owner, ttl)`` execution leases; without them every
+    run counts as owned by the local runtime.
+    """
 
     def create(self, run) -> Any: ...
     def get(self, run_id: str) -> Any | None: ...
@@ -52,4 +57,12 @@ class KnowledgeProvider(Protocol):
 class HistoryProvider(Protocol):
     """Port: long-term conversation history (Session) (spec 5)."""
 
-    async def load(self, session_id, limit: int = 20) -> list[dict[str, Any]]: ...
\ No newline at end of file
+    async def load(self, session_id, limit: int = 20) -> list[dict[str, Any]]: ...
+
+@runtime_checkable
+class CheckpointStore(Protocol):
+    """Port: latest AgentState snapshot per run, for resume after restart."""
+
+    def save(self, run_id: str, data: dict[str, Any]) -> None: ...
+    def load(self, run_id: str) -> dict[str, Any] | None: ...
+    def delete(self, run_id: str) -> None: ...
@@ -0,0 +1,88 @@
+"""Compiled agent profiles: per-agent run setup resolved once, reused by every run.
+
+A profile freezes everything a run needs that depends only on the agent
+definition, its plugins and the tool registry: the merged tool list and
+prompt, the resolved ``Policy``, the tool schemas sent to the model and a
+per-tool policy decision table. ``ProfileCache`` keys profiles by
+(agent version, plugin states, registry generation), so editing the
+agent, (re)loading a plugin or (un)registering a tool recompiles lazily.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any
+
+from .policy.engine import Policy, PolicyDecision
+
+
+@dataclass(frozen=True)
+class CompiledProfile:
+    key: tuple
+    tools: tuple[str, ...]
+    system_prompt: str | None
+    knowledge_sources: tuple[str, ...]
+    memory_config: dict[str, Any] | None
+    contributions: tuple[dict[str, Any], ...]
+    policy: Any
+    tool_schemas: list[dict[str, Any]] | None
+    decisions: MappingProxyType
+
+    def decision(self, tool_name: str) -> PolicyDecision | None:
+        """Precomputed decision for ``tool_name`` (None: ask the policy)."""
+        return self.decisions.get(tool_name)
+
+
+def compile_profile(key: tuple, resolved: dict[str, Any], policy: Any, tool_runner: Any) -> CompiledProfile:
+    """Freeze a resolved profile dict (``AgentRuntime._resolve_agent_profile``)."""
+    tools = tuple(resolved["tools"])
+    schemas = None
+    if tool_runner is not None and tools and hasattr(tool_runner, "schema"):
+        schemas = [s for s in (tool_runner.schema(name) for name in tools) if s] or None
+    decisions: dict[str, PolicyDecision] = {}
+    # only the built-in Policy is known to ignore the run context; a subclass may
+    # override check_tool to read it, so its decisions are never frozen
+    if type(policy) is Policy:
+        registry = getattr(tool_runner, "registry", None)
+        for name in tools:
+            decisions[name] = policy.check_tool(None, name, registry.get(name) if registry is not None else None)
+    return CompiledProfile(
+        key=key,
+        tools=tools,
+        system_prompt=resolved["system_prompt"],
+        knowledge_sources=tuple(resolved["knowledge_sources"]),
+        memory_config=resolved["memory_config"],
+        contributions=tuple(resolved.get("contributions") or ()),
+        policy=policy,
+        tool_schemas=schemas,
+        decisions=MappingProxyType(decisions),
+    )
+
+
+class ProfileCache:
+    """Latest compiled profile per agent name; stale keys are replaced on lookup."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._profiles: dict[str, CompiledProfile] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name: str, key: tuple) -> CompiledProfile | None:
+        profile = self._profiles.get(name)
+        if profile is not None and profile.key == key:
+            self.hits += 1
+            return profile
+        self.misses += 1
+        return None
+
+    def put(self, name: str, profile: CompiledProfile) -> None:
+        if name not in self._profiles and len(self._profiles) >= self.max_entries:
+            self._profiles.pop(next(iter(self._profiles)))
+        self._profiles[name] = profile
+
+    def clear(self) -> None:
+        self._profiles.clear()
+
+    def __len__(self) -> int:
+        return len(self._profiles)
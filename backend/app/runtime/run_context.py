@@ -39,6 +39,10 @@ class RunContext:
     variables: dict[str, Any] = field(default_factory=dict)
     metadata: dict[str, Any] = field(default_factory=dict)
     started_at: float = 0.0
+    # system + session-history prefix, retrieved once per run by the ContextBuilder
+    context_prefix: list[dict[str, Any]] | None = None
+    # CompiledProfile of the agent: precomputed tool schemas + policy decisions
+    profile: Any | None = None
 
     def elapsed(self) -> float:
         import time
@@ -78,6 +82,8 @@ class ToolExecutionContext:
     permissions: list[str] = field(default_factory=list)
     timeout: float = 60.0
     policy: Any | None = None
+    # precomputed tool -> PolicyDecision of the run's CompiledProfile (engine path only)
+    decisions: Any | None = None
     cancellation_token: CancellationToken | None = None
     metadata: dict[str, Any] = field(default_factory=dict)
 
@@ -3,6 +3,8 @@ from __future__ import annotations
 import asyncio
 import datetime
 import inspect
+import os
+import socket
 import time
 import uuid
 from collections.abc import Callable
@@ -11,6 +13,7 @@ from typing import Any
 from core.config import RuntimeSettings, Settings
 from core.config import settings as global_settings
 
+from .admission import AdmissionController, RunClass
 from .cancellation import CancellationToken
 from .errors import (
     AgentNotFoundError,
@@ -23,14 +26,24 @@ from .execution import ExecutionEngine
 from .logging import get_logger, log_run
 from .metrics import MetricsRegistry
 from .models.base import ModelProvider
+from .models.cache import CachedProvider, cache_enabled_for
+from .profile import CompiledProfile, ProfileCache, compile_profile
 from .run_context import RunContext
+from .tracing import Tracer, breakdown
 from .types import AgentConfig, RunRecord, RunStatus
 
 ProviderFactory = Callable[..., ModelProvider]
 
 
 def default_provider_factory(model_name: str) -> ModelProvider:
-    """Default: Ollama-backed provider (spec 14). Overridable in tests."""
+    """Default: Ollama-backed provider (spec 14). Overridable in tests.
+
+    With ``settings.default_model_pool`` set, calls are balanced across that
+    pool's hosts instead of the single ``ollama_base_url``.
+    """
+    if global_settings.default_model_pool:
+        from .models.pool import get_model_pool
+        return get_model_pool(global_settings.default_model_pool, model_name)
     from .models.ollama import OllamaProvider
     return OllamaProvider(model_name)
 
@@ -61,14 +74,33 @@ class AgentRuntime:
         scheduler: Any = None,
         settings: Settings | None = None,
         logger: Any = None,
+        response_cache: Any = None,
+        admission: AdmissionController | None = None,
+        checkpoint_store: Any = None,
+        usage_recorder: Any = None,
+        tracer: Tracer | None = None,
     ):
         self.run_store = run_store
+        # latest AgentState snapshot per run; enables resume after restart
+        self.checkpoint_store = checkpoint_store
         self.agent_store = agent_store
         self.event_bus = event_bus
         self.event_store = getattr(event_bus, "store", None) if event_bus is not None else None
         self.settings = settings or global_settings
         self.logger = logger or get_logger()
         self.metrics = metrics or MetricsRegistry()
+        # run -> iteration -> context / model / tool spans (runtime/tracing.py)
+        self.tracer = tracer or Tracer.from_settings(self.settings.tracing, self.settings.data_dir)
+        # opt-in LLM response cache (agents enable it via runtime_config)
+        self.response_cache = response_cache
+        if response_cache is not None and getattr(response_cache, "metrics", None) is None:
+            response_cache.metrics = self.metrics
+        # run admission: global / per-user slots + fair priority queue (spec 58)
+        self.admission = admission or AdmissionController.from_settings(
+            self.settings.runtime, metrics=self.metrics,
+        )
+        if self.admission.metrics is None:
+            self.admission.metrics = self.metrics
 
         # Tool Registry (spec 8): default = builtin tools
         if tool_registry is None and tool_runner is None:
@@ -84,8 +116,9 @@ class AgentRuntime:
             )
         if self.tool_registry is not None:
             # multi-agent capability (spec 40 / 73)
-            from .tools.delegate import DelegateTool
+            from .tools.delegate import DelegateManyTool, DelegateTool
             self.tool_registry.register(DelegateTool(self))
+            self.tool_registry.register(DelegateManyTool(self))
         self.tool_runner = tool_runner
 
         self.provider_factory = provider_factory or default_provider_factory
@@ -107,6 +140,9 @@ class AgentRuntime:
             context_builder=context_builder,
             metrics=self.metrics,
             logger=self.logger,
+            checkpoints=checkpoint_store,
+            usage=usage_recorder,
+            tracer=self.tracer,
         )
 
         # per-run bookkeeping (no globals, spec 58)
@@ -116,10 +152,19 @@ class AgentRuntime:
         self._approval_grants: dict[str, bool] = {}
         self._created_events: set = set()
         self._delegation_counts: dict[str, int] = {}
+        # run_id -> future resolved with the terminal RunRecord (delegation waits)
+        self._completions: dict[str, asyncio.Future] = {}
         self._mcp_registry: Any = None
         self._scopes: dict[str, Any] = {}
         self.plugin_manager: Any = None
+        self.profiles = ProfileCache()
+        self._factory_signature: tuple[Any, bool] | None = None
         self._started = False
+        # execution leases (run stores with claim/renew): runs this worker holds
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}"
+        self._leases: set[str] = set()
+        self._lease_task: asyncio.Task | None = None
+        self._resume_pending = False
 
     # ---- lifecycle (spec 64) ----
     def start(self) -> None:
@@ -136,12 +181,28 @@ class AgentRuntime:
         if not self._started:
             return
         self._started = False
+        # in-flight runs end cleanly; checkpoints only serve runs orphaned by a crash
         for token in list(self._cancellations.values()):
             token.cancel()
+        if self._lease_task is not None:
+            self._lease_task.cancel()
+            await asyncio.gather(self._lease_task, return_exceptions=True)
+            self._lease_task = None
         if self.scheduler is not None and hasattr(self.scheduler, "stop"):
             await self.scheduler.stop()
+        flush = getattr(self.run_store, "flush", None)
+        if callable(flush):
+            # write-behind run stores: persist coalesced transitions
+            flush()
+        if self._mcp_registry is not None:
+            for name in self._mcp_registry.names():
+                close = getattr(self._mcp_registry.get(name), "close", None)
+                if close is not None:
+                    await close()
         if self.event_bus is not None:
             await self.event_bus.shutdown()
+        # exporter threads append queued traces; joining them blocks
+        await asyncio.to_thread(self.tracer.close)
         log_run(self.logger, 20, "agent runtime stopped")
 
     # ---- run lifecycle (spec 65) ----
@@ -155,10 +216,21 @@ class AgentRuntime:
         parent_run_id: str | None = None,
         metadata: dict[str, Any] | None = None,
         execute: bool = True,
+        run_class: str | None = None,
     ) -> RunRecord:
+        """Create a run; with ``execute`` it is admitted or queued (PENDING).
+
+        ``run_class`` picks the admission priority (``RunClass``); children of
+        a delegation default to ``delegated``, everything else to
+        ``interactive``. Raises RunQueueFullError when the queue is full.
+        """
         agent = self.agent_store.get(agent_id)
         if agent is None:
             raise AgentNotFoundError(agent_id)
+        if run_class is None:
+            run_class = RunClass.DELEGATED if parent_run_id else RunClass.INTERACTIVE
+        if execute:
+            self.admission.check(user_id, run_class)
         run = RunRecord(
             run_id=uuid.uuid4().hex,
             agent_id=agent_id,
@@ -173,18 +245,118 @@ class AgentRuntime:
         self.run_store.create(run)
         self._spawn(self._emit_created(run))
         if execute:
-            self._spawn(self.execute_run(run.run_id))
+            run_id = run.run_id
+            position = self.admission.submit(
+                run_id, user_id, run_class,
+                lambda: self._spawn(self._execute_admitted(run_id)),
+            )
+            if position:
+                log_run(self.logger, 20, "run queued", run_id=run_id, position=position)
         log_run(self.logger, 20, "run created", run_id=run.run_id, agent_id=agent_id)
         return run
 
-    async def execute_run(self, run_id: str) -> dict[str, Any]:
+    async def _execute_admitted(self, run_id: str, resume: bool = False) -> None:
+        try:
+            await self.execute_run(run_id, resume=resume)
+        finally:
+            self.admission.release(run_id)
+
+    async def resume_runs(self) -> list[str]:
+        """Re-admit runs a previous process left RUNNING / WAITING_* (spec 65).
+
+        Each continues from its last checkpoint. Delegated children are
+        cancelled instead: their parent resumes and re-issues the pending
+        ``agent.delegate`` call, so resuming both would duplicate the work.
+        A run is only taken once its execution lease is claimed; runs whose
+        lease another live worker holds are retried after the lease period.
+        """
+        resumed: list[str] = []
+        held = 0
+        for status in (RunStatus.RUNNING, RunStatus.WAITING_TOOL, RunStatus.WAITING_HUMAN):
+            for run in self.run_store.list(status=status.value, limit=10_000):
+                run_id = run.run_id
+                if run_id in self._running or self.admission.is_queued(run_id):
+                    continue
+                if not self._claim(run_id):
+                    held += 1
+                    continue
+                if run.parent_run_id:
+                    await self._interrupt(run_id)
+                    continue
+                run_class = RunClass.SCHEDULED if (run.metadata or {}).get("schedule_id") else RunClass.INTERACTIVE
+                self.admission.submit(
+                    run_id, run.user_id, run_class,
+                    lambda rid=run_id: self._spawn(self._execute_admitted(rid, resume=True)),
+                )
+                resumed.append(run_id)
+        self._resume_pending = held > 0
+        if resumed or held:
+            log_run(self.logger, 20, "runs resumed", count=len(resumed), held_elsewhere=held)
+        return resumed
+
+    def _claim(self, run_id: str) -> bool:
+        """Take the run's execution lease (always granted by stores without leases)."""
+        claim = getattr(self.run_store, "claim", None)
+        if claim is None:
+            return True
+        if not claim(run_id, self.worker_id, self.settings.runtime.run_lease_seconds):
+            return False
+        self._leases.add(run_id)
+        if self._lease_task is None or self._lease_task.done():
+            try:
+                self._lease_task = asyncio.get_running_loop().create_task(self._renew_leases())
+            except RuntimeError:
+                pass  # no loop: the lease simply lapses after run_lease_seconds
+        return True
+
+    def _release(self, run_id: str) -> None:
+        self._leases.discard(run_id)
+
+    async def _renew_leases(self) -> None:
+        """Heartbeat: extend held leases; retry resuming runs whose lease was busy."""
+        ttl = self.settings.runtime.run_lease_seconds
+        while True:
+            await asyncio.sleep(max(1.0, ttl / 3))
+            try:
+                if self._leases:
+                    await asyncio.to_thread(self.run_store.renew, list(self._leases), self.worker_id, ttl)
+                if self._resume_pending:
+                    await self.resume_runs()
+            except Exception as e:
+                log_run(self.logger, 30, "run lease renewal failed", error=str(e))
+
+    async def _interrupt(self, run_id: str) -> None:
+        self.run_store.update(run_id, status="CANCELLED", error="interrupted by restart",
+                              finished_at=datetime.datetime.utcnow())
+        self._release(run_id)
+        self._drop_checkpoint(run_id)
+        await self._publish(run_id, "run.cancelled", {"reason": "interrupted by restart"})
+
+    def _drop_checkpoint(self, run_id: str) -> None:
+        if self.checkpoint_store is not None:
+            try:
+                self.checkpoint_store.delete(run_id)
+            except Exception as e:
+                log_run(self.logger, 30, "checkpoint delete failed", run_id=run_id, error=str(e))
+
+    def queue_position(self, run_id: str) -> int | None:
+        """1-based admission queue position of a PENDING run (None once started)."""
+        return self.admission.position(run_id)
+
+    async def execute_run(self, run_id: str, resume: bool = False) -> dict[str, Any]:
+        """Execute an admitted run; ``resume`` continues one orphaned by a restart."""
         run = self.run_store.get(run_id)
         if run is None:
             raise RunNotFoundError(run_id)
         if run.status in RunStatus.terminal():
+            self._settle(run_id)
             return {"status": run.status, "output": run.output, "error": run.error}
         # idempotency: another task may already be executing this run (spec 58)
-        if run.status == "RUNNING" or run_id in self._running:
+        if (run.status == "RUNNING" and not resume) or run_id in self._running:
+            return {"status": run.status, "output": run.output, "error": run.error}
+        # another worker holds the run's lease (multi-worker / rolling deploy)
+        if not self._claim(run_id):
+            log_run(self.logger, 30, "run leased by another worker", run_id=run_id)
             return {"status": run.status, "output": run.output, "error": run.error}
 
         agent = self.agent_store.get(run.agent_id)
@@ -196,9 +368,11 @@ class AgentRuntime:
         self._cancellations[run_id] = token
         self._running.add(run_id)
         await self._emit_created(run)
-        now = datetime.datetime.utcnow()
-        self.run_store.update(run_id, status="RUNNING", started_at=now)
-        await self._publish(run_id, "run.started", {"agent_id": run.agent_id, "model": run.model})
+        if resume and run.started_at is not None:
+            self.run_store.update(run_id, status="RUNNING")
+        else:
+            self.run_store.update(run_id, status="RUNNING", started_at=datetime.datetime.utcnow())
+        await self._publish(run_id, "run.started", {"agent_id": run.agent_id, "model": run.model, "resumed": resume})
 
         try:
             provider = self._make_provider(run, agent)
@@ -210,8 +384,21 @@ class AgentRuntime:
         started = time.monotonic()
         outcome = None
         duration = 0.0
+        queue_wait = self.admission.queue_wait(run_id)
         try:
-            outcome = await self.engine.execute(ctx, provider)
+            # delegated children nest under the parent's delegate tool.call span
+            with self.tracer.span(
+                "agent.run", root=not run.parent_run_id, run_id=run_id, agent_id=run.agent_id,
+                user_id=run.user_id, model=ctx.model, resumed=resume,
+                queue_wait_ms=round(queue_wait * 1000, 3) if queue_wait is not None else None,
+            ) as span:
+                outcome = await self.engine.execute(ctx, provider)
+                if span is not None:
+                    span.set(
+                        status=outcome["status"], iterations=outcome.get("iteration", 0),
+                        tool_calls=outcome.get("tool_call_count", 0),
+                        **{f"tokens.{k}": v for k, v in (outcome.get("token_usage") or {}).items()},
+                    )
             duration = time.monotonic() - started
             status = outcome["status"]
             self.run_store.update(
@@ -224,11 +411,16 @@ class AgentRuntime:
                 iteration_count=outcome.get("iteration", 0),
                 finished_at=datetime.datetime.utcnow(),
             )
-            self.metrics.on_run_finished(status, duration)
+            self._drop_checkpoint(run_id)
+            self.metrics.on_run_finished(status, duration, agent=run.agent_id)
+        except BaseException:
+            self._settle(run_id)
+            raise
         finally:
             # audit P0-5: run bookkeeping is always released even if finalize throws
             self._cancellations.pop(run_id, None)
             self._running.discard(run_id)
+            self._release(run_id)
             self._created_events.discard(run_id)
             self._delegation_counts.pop(run_id, None)
 
@@ -259,6 +451,7 @@ class AgentRuntime:
                 self.event_bus.prune(run_id)
             except Exception:
                 pass
+        self._settle(run_id)
         log_run(self.logger, 20, "run executed", run_id=run_id,
                 status=status, duration_ms=round(duration * 1000))
         return outcome
@@ -271,16 +464,20 @@ class AgentRuntime:
             raise RunNotFoundError(run_id)
         if run.status in RunStatus.terminal():
             return run
+        self.admission.remove(run_id)
         token = self._cancellations.get(run_id)
         if token is not None:
             token.cancel()
         finished = datetime.datetime.utcnow()
         self.run_store.update(run_id, status="CANCELLED", finished_at=finished)
+        self._drop_checkpoint(run_id)
         self._cancellations.pop(run_id, None)
         self._running.discard(run_id)
+        self._release(run_id)
         self._delegation_counts.pop(run_id, None)
         await self._publish(run_id, "run.cancelled", {"reason": "user requested", "output": run.output})
-        self.metrics.on_run_finished("CANCELLED", 0.0)
+        self.metrics.on_run_finished("CANCELLED", 0.0, agent=run.agent_id)
+        self._settle(run_id)
         # 3.x-P5: cancellation propagates to children (recursively)
         children = self.run_store.list(parent_run_id=run_id)
         for child in children:
@@ -291,6 +488,71 @@ class AgentRuntime:
                     continue
         return self.run_store.get(run_id)
 
+    def completion(self, run_id: str) -> asyncio.Future:
+        """Future resolved with the RunRecord once ``run_id`` reaches a terminal state.
+
+        Resolved by ``execute_run`` / ``cancel_run`` / failure paths, so
+        waiters (delegation) need no store polling. Already-terminal runs
+        resolve immediately.
+        """
+        fut = self._completions.get(run_id)
+        if fut is None or fut.done():
+            fut = asyncio.get_running_loop().create_future()
+            self._completions[run_id] = fut
+            run = self.run_store.get(run_id)
+            if run is None:
+                self._completions.pop(run_id, None)
+                fut.set_exception(RunNotFoundError(run_id))
+            elif run.status in RunStatus.terminal():
+                self._completions.pop(run_id, None)
+                fut.set_result(run)
+        return fut
+
+    async def wait_for_run(
+        self,
+        run_id: str,
+        timeout: float | None = None,
+        cancellation: CancellationToken | None = None,
+    ) -> RunRecord:
+        """Await a run's terminal record, bounded by ``timeout`` and ``cancellation``.
+
+        On timeout or cancellation the current (non-terminal) record is
+        returned; the run itself is left alone.
+        """
+        fut = self.completion(run_id)
+        if fut.done():
+            return fut.result()
+        loop = asyncio.get_running_loop()
+        cancelled = loop.create_future()
+
+        def on_cancel() -> None:
+            loop.call_soon_threadsafe(lambda: cancelled.done() or cancelled.set_result(None))
+
+        if cancellation is not None:
+            cancellation.add_callback(on_cancel)
+        try:
+            # shield the shared future: one waiter's timeout must not cancel it for others
+            await asyncio.wait({asyncio.shield(fut), cancelled},
+                               timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            if cancellation is not None:
+                cancellation.remove_callback(on_cancel)
+            if not cancelled.done():
+                cancelled.cancel()
+        if fut.done():
+            return fut.result()
+        return self.get_run(run_id)
+
+    def _settle(self, run_id: str) -> None:
+        fut = self._completions.pop(run_id, None)
+        if fut is None or fut.done():
+            return
+        run = self.run_store.get(run_id)
+        if run is None:
+            fut.set_exception(RunNotFoundError(run_id))
+        else:
+            fut.set_result(run)
+
     def get_run(self, run_id: str, user_id: int | None = None) -> RunRecord:
         run = self.run_store.get(run_id)
         if run is None:
@@ -311,8 +573,39 @@ class AgentRuntime:
             user_id=user_id, agent_id=agent_id, status=status, limit=limit, offset=offset,
         )
 
+    def run_trace(self, run_id: str, user_id: int | None = None) -> dict[str, Any]:
+        """Spans of the run's trace plus a per-name time breakdown (flame view)."""
+        run = self.get_run(run_id, user_id=user_id)
+        spans = self.tracer.trace_for_run(run.run_id)
+        return {
+            "run_id": run.run_id,
+            "trace_id": spans[0].trace_id if spans else None,
+            "spans": [s.to_dict() for s in spans],
+            "breakdown": breakdown(spans),
+        }
+
     def metrics_snapshot(self) -> dict[str, Any]:
-        return self.metrics.snapshot()
+        return {**self.metrics.snapshot(), **self._metric_gauges()}
+
+    def metrics_prometheus(self) -> str:
+        """Metrics in the Prometheus text exposition format."""
+        return self.metrics.render_prometheus(gauges=self._metric_gauges())
+
+    def _metric_gauges(self) -> dict[str, Any]:
+        queue = self.admission.status()
+        gauges: dict[str, Any] = {
+            "runs_active": queue["active"],
+            "run_queue_depth": queue["queued"],
+            "event_queue_depth": getattr(self.event_bus, "queue_depth", 0),
+        }
+        from .tools.pool import peek_tool_pools
+        pools = peek_tool_pools()
+        if pools is not None:
+            for execution_class, stats in pools.stats().items():
+                prefix = "tool_pool_" + execution_class.replace("-", "_")
+                for key, value in stats.items():
+                    gauges[f"{prefix}_{key}"] = value
+        return gauges
 
     def is_running(self, run_id: str) -> bool:
         return run_id in self._running
@@ -329,6 +622,8 @@ class AgentRuntime:
         event = asyncio.Event()
         self._approvals[run_id] = event
         self._approval_grants[run_id] = False
+        # a person may take hours: the run must not hold an admission slot meanwhile
+        suspended = self.admission.suspend(run_id)
         try:
             timeout = getattr(ctx, "timeout_seconds", None) or 600
             await asyncio.wait_for(event.wait(), timeout=timeout)
@@ -336,8 +631,11 @@ class AgentRuntime:
             granted = False
         else:
             granted = bool(self._approval_grants.pop(run_id, False))
-        self._approvals.pop(run_id, None)
+        finally:
+            self._approvals.pop(run_id, None)
         self._approval_grants.pop(run_id, None)
+        if suspended:
+            await self.admission.reacquire(run_id)
         self.run_store.update(run_id, status="RUNNING")
         return granted
 
@@ -385,21 +683,51 @@ class AgentRuntime:
 
     # ---- MCP servers (spec 36 / 70) ----
     async def register_mcp_server(
-        self, name: str, endpoint: str, headers: dict[str, str] | None = None,
-        transport: Any = None,
+        self, name: str, endpoint: str | None = None, headers: dict[str, str] | None = None,
+        transport: Any = None, command: list[str] | None = None, env: dict[str, str] | None = None,
     ) -> dict[str, Any]:
+        """Connect an MCP server over HTTP (``endpoint``) or stdio (``command``)."""
         from .mcp import MCPClient, MCPRegistry
         if self._mcp_registry is None:
             self._mcp_registry = MCPRegistry()
-        client = MCPClient(name, endpoint, headers=headers)
+        cfg = self.settings.mcp
+        client = MCPClient(
+            name, endpoint, headers=headers, command=command, env=env,
+            timeout=cfg.timeout_seconds, max_retries=cfg.max_retries,
+            backoff_seconds=cfg.backoff_seconds, max_connections=cfg.http_max_connections,
+        )
         if transport is not None:
             client.with_transport(transport)
+        try:
+            await client.initialize()
+            await client.list_tools()
+        except BaseException:
+            await client.close()
+            raise
+        if self._mcp_registry.get(name) is not None:
+            await self.unregister_mcp_server(name)
+        client.on_tools_changed = lambda: self._refresh_mcp_tools(name)
         self._mcp_registry.register(client)
-        await client.initialize()
-        await client.list_tools()
         self._mcp_registry.sync_tools(self.tool_registry)
-        log_run(self.logger, 20, "mcp server registered", name=name, tools=len(client.tools))
-        return {"name": name, "endpoint": endpoint, "tools": len(client.tools), "server_info": client.server_info}
+        log_run(self.logger, 20, "mcp server registered", name=name, tools=len(client.tools),
+                transport=client.transport_kind)
+        return {"name": name, "endpoint": client.endpoint, "transport": client.transport_kind,
+                "tools": len(client.tools), "server_info": client.server_info}
+
+    async def _refresh_mcp_tools(self, name: str) -> None:
+        """Re-list a server's tools after ``notifications/tools/list_changed``."""
+        client = self._mcp_registry.get(name) if self._mcp_registry is not None else None
+        if client is None:
+            return
+        before = {t.get("name") for t in client.tools}
+        try:
+            await client.list_tools(refresh=True)
+        except Exception as e:
+            log_run(self.logger, 30, "mcp tool refresh failed", name=name, error=str(e))
+            return
+        for removed in before - {t.get("name") for t in client.tools}:
+            self.unregister_tool(removed)
+        self._mcp_registry.sync_tools(self.tool_registry)
 
     def list_mcp_servers(self) -> list[dict[str, Any]]:
         if self._mcp_registry is None:
@@ -414,7 +742,11 @@ class AgentRuntime:
             return False
         for tool_def in getattr(client, "tools", []) or []:
             self.unregister_tool(tool_def.get("name"))
-        return self._mcp_registry.unregister(name)
+        self._mcp_registry.unregister(name)
+        close = getattr(client, "close", None)
+        if close is not None:
+            await close()
+        return True
 
     # ---- events (spec 6 / 30 / 31) ----
     def list_events(self, run_id: str, after_sequence: int = 0, limit: int = 1000, user_id: int | None = None) -> list[Any]:
@@ -449,9 +781,11 @@ class AgentRuntime:
             if bus is None:
                 return
             while True:
-                terminal = self.run_store.get(run_id)
-                if terminal is not None and terminal.status in RunStatus.terminal() and queue.empty():
-                    break
+                # active runs are served from the run store's hot cache
+                if queue.empty():
+                    terminal = self.run_store.get(run_id)
+                    if terminal is not None and terminal.status in RunStatus.terminal():
+                        break
                 try:
                     event = await asyncio.wait_for(queue.get(), timeout=10.0)
                 except asyncio.TimeoutError:
@@ -489,6 +823,7 @@ class AgentRuntime:
             self.plugin_manager = PluginManager(
                 self, plugins_dir=getattr(self.settings, "plugins_dir", None),
                 event_bus=self.event_bus, logger=self.logger,
+                lazy_import=getattr(self.settings, "plugins_lazy_import", True),
             )
         return self.plugin_manager
 
@@ -536,6 +871,7 @@ class AgentRuntime:
             session_id=run_spec.get("session_id"),
             metadata=run_spec.get("metadata"),
             execute=True,
+            run_class=RunClass.SCHEDULED,
         )
 
     def schedule_once(self, delay: float, run_spec: dict[str, Any], user_id: int | None = None, callback=None) -> str:
@@ -562,12 +898,27 @@ class AgentRuntime:
         model = run.model or agent.model or ""
         if not model:
             raise ModelUnavailableError("agent has no model")
-        try:
-            parameters = inspect.signature(self.provider_factory).parameters.values()
-            accepts_agent = any(p.kind == inspect.Parameter.VAR_POSITIONAL for p in parameters) or len(parameters) >= 2
-        except (TypeError, ValueError):
-            accepts_agent = False
-        return self.provider_factory(model, agent) if accepts_agent else self.provider_factory(model)
+        provider = self.provider_factory(model, agent) if self._factory_accepts_agent() else self.provider_factory(model)
+        rt_cfg = agent.runtime_config or {}
+        if self.response_cache is not None and cache_enabled_for(rt_cfg):
+            target = agent.model_target or {}
+            provider = CachedProvider(
+                provider, self.response_cache, model,
+                params={"temperature": rt_cfg.get("temperature"), "target": target.get("provider_id")},
+            )
+        return provider
+
+    def _factory_accepts_agent(self) -> bool:
+        """Whether the provider factory takes ``(model, agent)``; inspected once per factory."""
+        factory = self.provider_factory
+        if self._factory_signature is None or self._factory_signature[0] is not factory:
+            try:
+                parameters = inspect.signature(factory).parameters.values()
+                accepts = any(p.kind == inspect.Parameter.VAR_POSITIONAL for p in parameters) or len(parameters) >= 2
+            except (TypeError, ValueError):
+                accepts = False
+            self._factory_signature = (factory, accepts)
+        return self._factory_signature[1]
 
     async def _flush_audit_events(self) -> None:
         """Make human-gate audit records visible before changing the gate state."""
@@ -586,17 +937,7 @@ class AgentRuntime:
         meta.setdefault("delegation_max_children", int(rt_cfg.get("delegation_max_children", 5)))
         base_timeout = int(rt_cfg.get("timeout_seconds", rs.timeout_seconds))
         meta.setdefault("remaining_seconds", float(base_timeout))
-        profile = self._resolve_agent_profile(agent)
-        tools = profile["tools"]
-        system_prompt = profile["system_prompt"]
-        policy = None
-        if self.policy_engine is not None:
-            merged_agent = agent
-            if profile["policy"]:
-                merged = dict(agent.policy or {})
-                merged.update(profile["policy"])
-                merged_agent = AgentConfig(**{**agent.to_dict(), "policy": merged})
-            policy = self.policy_engine.for_agent(merged_agent) if hasattr(self.policy_engine, "for_agent") else self.policy_engine
+        profile = self._compiled_profile(agent)
         return RunContext(
             approval_waiter=self._wait_for_approval,
             run_id=run.run_id,
@@ -605,9 +946,10 @@ class AgentRuntime:
             session_id=run.session_id,
             input_text=run.input or "",
             model=run.model or agent.model,
-            system_prompt=system_prompt,
-            tools=tools,
-            policy=policy,
+            system_prompt=profile.system_prompt,
+            tools=list(profile.tools),
+            policy=profile.policy,
+            profile=profile,
             cancellation=token,
             max_iterations=int(rt_cfg.get("max_iterations", rs.max_iterations)),
             max_tool_calls=int(rt_cfg.get("max_tool_calls", rs.max_tool_calls)),
@@ -617,13 +959,37 @@ class AgentRuntime:
             delegation_max_depth=meta["delegation_max_depth"],
             delegation_max_children=meta["delegation_max_children"],
             tool_timeout=float(self.settings.tools.default_timeout_seconds),
-            memory_config=profile["memory_config"],
-            knowledge_sources=profile["knowledge_sources"],
-            contributions=profile.get("contributions") or [],
+            memory_config=dict(profile.memory_config) if profile.memory_config is not None else None,
+            knowledge_sources=list(profile.knowledge_sources),
+            contributions=list(profile.contributions),
             metadata=meta,
             started_at=time.monotonic(),
         )
 
+    def _compiled_profile(self, agent: AgentConfig) -> CompiledProfile:
+        """Cached run setup for ``agent``; recompiled when the agent, its plugins or the tool registry change."""
+        plugins = self.plugin_manager
+        plugin_key = tuple(
+            (name, id(state), state.get("status")) if (state := plugins.get(name)) is not None else (name, None)
+            for name in agent.plugins
+        ) if agent.plugins and plugins is not None else ()
+        key = (agent.version or agent.fingerprint(), plugin_key, getattr(self.tool_registry, "generation", 0), id(self.policy_engine))
+        cached = self.profiles.get(agent.name, key)
+        if cached is not None:
+            return cached
+        resolved = self._resolve_agent_profile(agent)
+        policy = None
+        if self.policy_engine is not None:
+            merged_agent = agent
+            if resolved["policy"]:
+                merged = dict(agent.policy or {})
+                merged.update(resolved["policy"])
+                merged_agent = AgentConfig(**{**agent.to_dict(), "policy": merged})
+            policy = self.policy_engine.for_agent(merged_agent) if hasattr(self.policy_engine, "for_agent") else self.policy_engine
+        profile = compile_profile(key, resolved, policy, self.tool_runner)
+        self.profiles.put(agent.name, profile)
+        return profile
+
     @staticmethod
     def _budgeted_timeout(rt_cfg: dict[str, Any], meta: dict[str, Any], rs: RuntimeSettings) -> int:
         """Cap the child run timeout by the parent remaining budget (3.x-P5)."""
@@ -703,9 +1069,12 @@ class AgentRuntime:
         self.run_store.update(
             run_id, status=status, error=f"{code}: {message}", finished_at=datetime.datetime.utcnow(),
         )
+        self._drop_checkpoint(run_id)
         await self._publish(run_id, "run.failed", {"code": code, "error": message})
         self._cancellations.pop(run_id, None)
         self._running.discard(run_id)
+        self._release(run_id)
+        self._settle(run_id)
 
     async def _emit_created(self, run: RunRecord) -> None:
         """Idempotent run.created emission (first caller wins, spec 6)."""
@@ -720,13 +1089,14 @@ class AgentRuntime:
         if self.event_bus is not None:
             await self.event_bus.publish(run_id, event_type, payload=payload)
 
-    def _spawn(self, coro: Any) -> None:
+    def _spawn(self, coro: Any) -> bool:
         try:
             loop = asyncio.get_running_loop()
             task = loop.create_task(coro)
             task.add_done_callback(self._on_task_done)
         except RuntimeError:
-            pass
+            return False
+        return True
 
     def _on_task_done(self, task: asyncio.Task) -> None:
         if task.cancelled():
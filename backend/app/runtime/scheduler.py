@@ -2,6 +2,8 @@ from __future__ import annotations
 
 import asyncio
 import datetime
+import heapq
+import time
 from collections.abc import Callable
 from typing import Any
 
@@ -12,12 +14,20 @@ class Scheduler:
     schedule_once / schedule_interval / cancel. On trigger it CREATES an
     AgentRun through the runtime trigger; the scheduler never executes the
     agent itself (spec 72).
+
+    One timer task serves every job: due times sit in a min-heap and the
+    task sleeps until the earliest one (or until a new job wakes it), so
+    thousands of interval jobs cost one sleeping task, not thousands.
+    Cancelled jobs are dropped lazily when they reach the top of the heap.
     """
 
     def __init__(self, trigger: Callable | None = None):
         self._trigger = trigger
         self._jobs: dict[str, dict[str, Any]] = {}
-        self._tasks: dict[str, asyncio.Task] = {}
+        self._heap: list[tuple[float, int, str]] = []  # (due monotonic, seq, job_id)
+        self._timer: asyncio.Task | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._firing: set[asyncio.Task] = set()
         self._seq = 0
         self._started = False
 
@@ -34,11 +44,19 @@ class Scheduler:
 
     async def stop(self) -> None:
         self._started = False
-        for task in list(self._tasks.values()):
+        tasks = list(self._firing)
+        if self._timer is not None:
+            tasks.append(self._timer)
+        for task in tasks:
             task.cancel()
-        if self._tasks:
-            await asyncio.gather(*list(self._tasks.values()), return_exceptions=True)
-        self._tasks.clear()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._timer = None
+        self._firing.clear()
+        for job in self._jobs.values():
+            if job["status"] == "scheduled" and job["due"] is not None:
+                job["status"] = "cancelled"
+        self._heap.clear()
 
     def _new_id(self, kind: str) -> str:
         self._seq += 1
@@ -48,59 +66,74 @@ class Scheduler:
         """Run once after `delay` seconds (spec 38)."""
         job_id = self._new_id("once")
         self._jobs[job_id] = {"type": "once", "delay": delay, "run_spec": run_spec, "user_id": user_id, "status": "scheduled", "triggered_at": None, "callback": callback}
-        loop = asyncio.get_running_loop()
-        self._tasks[job_id] = loop.create_task(self._run_once(job_id, delay, run_spec))
+        self._arm(job_id, delay)
         return job_id
 
     def schedule_interval(self, interval: float, run_spec: dict[str, Any], user_id: int | None = None, callback: Callable | None = None) -> str:
         """Run every `interval` seconds while started (spec 38 / 39)."""
         job_id = self._new_id("interval")
         self._jobs[job_id] = {"type": "interval", "interval": interval, "run_spec": run_spec, "user_id": user_id, "status": "scheduled", "triggered_at": None, "callback": callback}
-        loop = asyncio.get_running_loop()
-        self._tasks[job_id] = loop.create_task(self._run_interval(job_id, interval, run_spec))
+        self._arm(job_id, interval)
         return job_id
 
     def cancel(self, job_id: str, user_id: int | None = None) -> bool:
         job = self._jobs.get(job_id)
         if job is None or (user_id is not None and job.get("user_id") != user_id):
             return False
-        task = self._tasks.pop(job_id, None)
-        if task is None:
+        if job["status"] != "scheduled" or job.get("due") is None:
             return False
-        task.cancel()
-        if job_id in self._jobs:
-            self._jobs[job_id]["status"] = "cancelled"
+        job["status"] = "cancelled"
+        job["due"] = None
         return True
 
     def jobs(self, user_id: int | None = None) -> list[dict[str, Any]]:
         return [
-            {"id": k, **dict(v)} for k, v in self._jobs.items()
-            if user_id is None or v.get("user_id") == user_id
+            {"id": k, **{f: v for f, v in job.items() if f != "due"}} for k, job in self._jobs.items()
+            if user_id is None or job.get("user_id") == user_id
         ]
 
     # ---- internals ----
-    async def _run_once(self, job_id: str, delay: float, run_spec: dict[str, Any]) -> None:
-        try:
-            await asyncio.sleep(delay)
-            await self._fire(job_id, run_spec)
-        except asyncio.CancelledError:
-            if job_id in self._jobs:
-                self._jobs[job_id]["status"] = "cancelled"
-        finally:
-            self._tasks.pop(job_id, None)
-
-    async def _run_interval(self, job_id: str, interval: float, run_spec: dict[str, Any]) -> None:
-        try:
-            while self._started:
-                await asyncio.sleep(interval)
+    def _arm(self, job_id: str, delay: float) -> None:
+        loop = asyncio.get_running_loop()
+        due = time.monotonic() + max(0.0, float(delay))
+        self._jobs[job_id]["due"] = due
+        heapq.heappush(self._heap, (due, self._seq, job_id))
+        self._seq += 1
+        if self._timer is None or self._timer.done():
+            self._wakeup = asyncio.Event()
+            self._timer = loop.create_task(self._run())
+        elif self._heap[0][2] == job_id and self._wakeup is not None:
+            self._wakeup.set()  # new earliest deadline
+
+    async def _run(self) -> None:
+        while self._heap:
+            due, _seq, job_id = self._heap[0]
+            job = self._jobs.get(job_id)
+            if job is None or job.get("due") != due:
+                heapq.heappop(self._heap)  # cancelled or re-armed
+                continue
+            delay = due - time.monotonic()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            heapq.heappop(self._heap)
+            job["due"] = None
+            if job["type"] == "interval":
                 if not self._started:
-                    break
-                await self._fire(job_id, run_spec)
-        except asyncio.CancelledError:
-            if job_id in self._jobs:
-                self._jobs[job_id]["status"] = "cancelled"
-        finally:
-            self._tasks.pop(job_id, None)
+                    job["status"] = "cancelled"
+                    continue
+                # next slot from the planned time, so cadence does not drift
+                next_due = due + float(job["interval"])
+                job["due"] = next_due
+                heapq.heappush(self._heap, (next_due, self._seq, job_id))
+                self._seq += 1
+            task = asyncio.get_running_loop().create_task(self._fire(job_id, job["run_spec"]))
+            self._firing.add(task)
+            task.add_done_callback(self._firing.discard)
 
     async def _fire(self, job_id: str, run_spec: dict[str, Any]) -> None:
         callback = self._jobs.get(job_id, {}).get("callback") or self._trigger
@@ -66,6 +66,8 @@ class Tool(ABC):
     source: str = "builtin"
     metadata: dict[str, Any] = {}
     aliases: list[str] = []
+    #: where blocking work runs: "io-thread" | "cpu-process" | "inline" (tools/pool.py)
+    execution_class: str = "io-thread"
 
     def input_schema(self) -> dict[str, Any]:
         return {"type": "object", "properties": {}}
@@ -96,6 +98,7 @@ class Tool(ABC):
             "source": self.source,
             "input_schema": self.input_schema(),
             "aliases": list(self.aliases),
+            "execution_class": self.execution_class,
             "metadata": self.metadata,
         }
 
@@ -5,7 +5,6 @@ timeout and retry. Legacy names (file_read, ...) remain as aliases.
 """
 from __future__ import annotations
 
-import asyncio
 from typing import Any
 
 from services.agent_tools import (
@@ -16,12 +15,18 @@ from services.agent_tools import (
     tool_web_search,
 )
 
+from ..errors import RunCancelledError
 from .base import PermissionLevel, Tool, ToolResult
+from .pool import CPU_PROCESS, EXECUTION_CLASSES, IO_THREAD, ToolPools, get_tool_pools
 from .registry import ToolRegistry
 
 
 class FunctionTool(Tool):
-    """Adapter: a plain sync function becomes a Tool (spec 80 BuiltinToolAdapter)."""
+    """Adapter: a plain sync function becomes a Tool (spec 80 BuiltinToolAdapter).
+
+    The function runs in the pool of its ``execution_class``; cpu-process
+    functions must be module-level so worker processes can unpickle them.
+    """
 
     def __init__(
         self,
@@ -36,7 +41,11 @@ class FunctionTool(Tool):
         retry_count: int = 0,
         retry_delay: float = 1.0,
         retryable_errors: list[str] | None = None,
+        execution_class: str = IO_THREAD,
+        pools: ToolPools | None = None,
     ):
+        if execution_class not in EXECUTION_CLASSES:
+            raise ValueError(f"unknown execution class: {execution_class}")
         self.name = name
         self.description = description
         self.func = func
@@ -48,6 +57,8 @@ class FunctionTool(Tool):
         self.retry_count = retry_count
         self.retry_delay = retry_delay
         self.retryable_errors = retryable_errors or []
+        self.execution_class = execution_class
+        self.pools = pools
 
     def input_schema(self) -> dict[str, Any]:
         return self._input_schema
@@ -58,7 +69,13 @@ class FunctionTool(Tool):
         context: Any = None,
     ) -> ToolResult:
         try:
-            output = await asyncio.to_thread(self.func, **arguments)
+            pools = self.pools or get_tool_pools()
+            output = await pools.run(
+                self.execution_class, self.func, arguments,
+                cancellation=getattr(context, "cancellation_token", None),
+            )
+        except RunCancelledError:
+            raise
         except TypeError as e:
             return ToolResult.err(f"invalid arguments for {self.name}: {e}")
         except Exception as e:
@@ -76,7 +93,13 @@ def register_builtin_tools(registry: ToolRegistry) -> ToolRegistry:
         "filesystem.read",
         "Read the contents of a file",
         tool_file_read,
-        _schema({"filepath": {"type": "string", "description": "Path of the file to read"}}, ["filepath"]),
+        _schema({
+            "filepath": {"type": "string", "description": "Path of the file to read"},
+            "offset": {"type": "integer", "description": "Byte offset to start reading at"},
+            "length": {"type": "integer", "description": "Bytes to read from offset (max ~5000 characters)"},
+            "start_line": {"type": "integer", "description": "First line to read (1-based)"},
+            "end_line": {"type": "integer", "description": "Last line to read (inclusive)"},
+        }, ["filepath"]),
         permissions=[PermissionLevel.READ], timeout=10.0,
         aliases=["file_read"],
     ))
@@ -86,10 +109,11 @@ def register_builtin_tools(registry: ToolRegistry) -> ToolRegistry:
         tool_code_search,
         _schema({
             "directory": {"type": "string", "description": "Directory to search in"},
-            "pattern": {"type": "string", "description": "Text pattern to find"},
+            "pattern": {"type": "string", "description": "Text pattern to find (case-insensitive)"},
+            "regex": {"type": "boolean", "description": "Treat pattern as a regular expression", "default": False},
         }, ["directory", "pattern"]),
         permissions=[PermissionLevel.READ], timeout=30.0,
-        aliases=["code_search"],
+        aliases=["code_search"], execution_class=CPU_PROCESS,
     ))
     registry.register(FunctionTool(
         "shell.execute",
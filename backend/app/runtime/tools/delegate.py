@@ -1,24 +1,33 @@
 from __future__ import annotations
 
 import asyncio
-import time
 from typing import Any
 
 from ..tools.base import Tool, ToolResult
 
+#: Hard ceiling on how long one delegation waits, whatever the parent budget.
+MAX_DELEGATION_WAIT = 300.0
+#: The child inherits the parent's remaining budget but starts a little later;
+#: this slack lets it report its own TIMEOUT instead of being seen mid-run.
+SETTLE_GRACE = 1.0
+_TERMINAL = ("COMPLETED", "FAILED", "CANCELLED", "TIMEOUT")
+
 
 class DelegateTool(Tool):
     """agent.delegate - run another agent and wait for its result (spec 40 / 41 / 73).
 
     The delegated run is a real nested AgentRun created through the runtime.
-    Phase 1 waits synchronously; async delegation comes later.
+    The wait is on the runtime's completion future for the child (no store
+    polling), bounded by the parent's remaining budget. The child's budget is
+    capped so that it settles, plus ``SETTLE_GRACE``, before this tool's own
+    timeout; a child still running when the wait ends is cancelled.
     """
 
     name = "agent.delegate"
     description = "Delegate a task to another agent and wait for its result"
     version = "1.0.0"
     source = "builtin"
-    timeout = 300.0
+    timeout = MAX_DELEGATION_WAIT
     permissions = []  # allowed by default; policy.allowed_tools still applies
 
     def __init__(self, runtime: Any):
@@ -36,14 +45,22 @@ class DelegateTool(Tool):
         }
 
     async def execute(self, arguments: dict[str, Any], context: Any = None) -> ToolResult:
+        spawned = self._spawn_child(arguments, context)
+        if isinstance(spawned, ToolResult):
+            return spawned
+        run, remaining = spawned
+        return await self._await_child(run, remaining, context)
+
+    def _spawn_child(self, arguments: dict[str, Any], context: Any) -> tuple[Any, float] | ToolResult:
+        """Apply the delegation guards and start the child run."""
         agent_id = str(arguments.get("agent_id", ""))
         task = str(arguments.get("task", ""))
         if not agent_id:
-            return ToolResult.err("agent.delegate: agent_id required")
+            return ToolResult.err(f"{self.name}: agent_id required")
         meta = (getattr(context, "metadata", None) or {}) if context is not None else {}
         my_agent = getattr(context, "agent_id", None) if context is not None else None
         if my_agent == agent_id:
-            return ToolResult.err("agent.delegate: cannot delegate to self")
+            return ToolResult.err(f"{self.name}: cannot delegate to self")
         user_id = getattr(context, "user_id", None) if context is not None else None
         session_id = getattr(context, "session_id", None) if context is not None else None
         parent_run_id = getattr(context, "run_id", None) if context is not None else None
@@ -53,15 +70,16 @@ class DelegateTool(Tool):
         if my_agent:
             ancestors = ancestors + [my_agent]
         if agent_id in ancestors:
-            return ToolResult.err("agent.delegate: delegation cycle detected")
+            return ToolResult.err(f"{self.name}: delegation cycle detected")
         depth = int(meta.get("depth") or 0)
         max_depth = int(meta.get("delegation_max_depth") or 3)
         if depth + 1 > max_depth:
-            return ToolResult.err(f"agent.delegate: max delegation depth {max_depth} exceeded")
+            return ToolResult.err(f"{self.name}: max delegation depth {max_depth} exceeded")
         max_children = int(meta.get("delegation_max_children") or 5)
         if parent_run_id and not self._runtime._register_child(parent_run_id, max_children):
-            return ToolResult.err(f"agent.delegate: max child runs {max_children} exceeded")
+            return ToolResult.err(f"{self.name}: max child runs {max_children} exceeded")
         remaining = float(meta.get("remaining_seconds") or 600.0)
+        remaining = min(remaining, float(self.timeout or MAX_DELEGATION_WAIT) - 2 * SETTLE_GRACE)
 
         child_meta = {
             "ancestors": ancestors,
@@ -81,24 +99,94 @@ class DelegateTool(Tool):
                 execute=True,
             )
         except Exception as e:
-            return ToolResult.err(f"agent.delegate: {e}")
-        # synchronous wait (spec 41 phase 1), bounded by the parent remaining budget
-        deadline = time.monotonic() + min(remaining, 300.0)
-        status = None
+            return ToolResult.err(f"{self.name}: {e}")
+        return run, remaining
+
+    async def _await_child(self, run: Any, remaining: float, context: Any) -> ToolResult:
         token = getattr(context, "cancellation_token", None) if context is not None else None
-        while time.monotonic() < deadline:
-            if token is not None and token.cancelled:
-                return ToolResult.err("agent.delegate: parent run cancelled while delegating")
-            await asyncio.sleep(0.05)
+        parent_run_id = getattr(context, "run_id", None) if context is not None else None
+        try:
+            run = await self._runtime.wait_for_run(
+                run.run_id, timeout=max(1.0, remaining) + SETTLE_GRACE, cancellation=token,
+            )
+        except Exception:
+            pass
+        if token is not None and token.cancelled:
+            return ToolResult.err(f"{self.name}: parent run cancelled while delegating")
+        if run.status not in _TERMINAL:
+            # nobody would wait for it any more
             try:
-                run = self._runtime.get_run(run.run_id, user_id=user_id)
+                run = await self._runtime.cancel_run(run.run_id)
             except Exception:
-                break
-            status = run.status
-            if status in ("COMPLETED", "FAILED", "CANCELLED", "TIMEOUT"):
-                break
+                pass
+        status = run.status if run.status in _TERMINAL else None
         return ToolResult.ok(
-            f"[delegated {agent_id} -> {status or str(None)}] {run.output or str(None)}",
+            f"[delegated {run.agent_id} -> {status or str(None)}] {run.output or str(None)}",
             delegated_run_id=run.run_id, delegated_status=status,
             parent_run_id=parent_run_id,
-        )
\ No newline at end of file
+        )
+
+
+class DelegateManyTool(DelegateTool):
+    """agent.delegate_many - fan a set of tasks out to agents concurrently (spec 40).
+
+    Each entry goes through the same guards as ``agent.delegate``; the child
+    runs execute in parallel and the tool returns once all have finished or
+    the parent's remaining budget is spent.
+    """
+
+    name = "agent.delegate_many"
+    description = "Delegate several tasks to agents concurrently and gather their results"
+
+    def input_schema(self) -> dict[str, Any]:
+        return {
+            "type": "object",
+            "properties": {
+                "tasks": {
+                    "type": "array",
+                    "description": "Tasks to run in parallel",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "agent_id": {"type": "string", "description": "Target agent name"},
+                            "task": {"type": "string", "description": "Task for the target agent"},
+                        },
+                        "required": ["agent_id", "task"],
+                    },
+                },
+            },
+            "required": ["tasks"],
+        }
+
+    async def execute(self, arguments: dict[str, Any], context: Any = None) -> ToolResult:
+        tasks = arguments.get("tasks")
+        if not isinstance(tasks, list) or not tasks:
+            return ToolResult.err(f"{self.name}: tasks must be a non-empty list")
+        spawned = [
+            self._spawn_child(t if isinstance(t, dict) else {}, context) for t in tasks
+        ]
+        waits = [
+            self._await_child(s[0], s[1], context) if not isinstance(s, ToolResult) else _done(s)
+            for s in spawned
+        ]
+        results: list[ToolResult] = list(await asyncio.gather(*waits))
+        token = getattr(context, "cancellation_token", None) if context is not None else None
+        if token is not None and token.cancelled:
+            return ToolResult.err(f"{self.name}: parent run cancelled while delegating")
+        lines = [
+            f"{i + 1}. {r.output if r.success else 'Error: ' + str(r.error)}"
+            for i, r in enumerate(results)
+        ]
+        return ToolResult.ok(
+            "\n".join(lines),
+            delegated=[{
+                "run_id": r.metadata.get("delegated_run_id"),
+                "status": r.metadata.get("delegated_status"),
+                "error": r.error,
+            } for r in results],
+            parent_run_id=getattr(context, "run_id", None) if context is not None else None,
+        )
+
+
+async def _done(result: ToolResult) -> ToolResult:
+    return result
@@ -3,7 +3,12 @@ from __future__ import annotations
 import asyncio
 from typing import Any
 
-from ..errors import ToolNotFoundError, ToolTimeoutError
+from ..errors import (
+    RunCancelledError,
+    ToolDeniedError,
+    ToolNotFoundError,
+    ToolTimeoutError,
+)
 from .base import Tool, ToolResult
 from .registry import ToolRegistry
 
@@ -56,7 +61,7 @@ class ToolExecutor:
                     await asyncio.sleep(tool.retry_delay)
                     continue
                 raise ToolTimeoutError(f"Tool {name} timed out after {timeout}s")
-            except ToolTimeoutError:
+            except (ToolTimeoutError, ToolDeniedError, RunCancelledError):
                 raise
             except Exception as e:
                 last_exc = e
@@ -71,9 +76,11 @@ class ToolExecutor:
         policy = getattr(ctx, "policy", None) if ctx is not None else None
         if policy is None or not hasattr(policy, "check_tool"):
             return
-        decision = policy.check_tool(ctx, name, tool)
+        decisions = getattr(ctx, "decisions", None)
+        decision = decisions.get(name) if decisions is not None else None
+        if decision is None:
+            decision = policy.check_tool(ctx, name, tool)
         if not decision.allowed:
-            from ..errors import ToolDeniedError
             raise ToolDeniedError(decision.reason)
 
     @staticmethod
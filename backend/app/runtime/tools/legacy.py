@@ -15,14 +15,21 @@ from ..errors import ToolNotFoundError, ToolTimeoutError
 LEGACY_TOOL_SCHEMAS: dict[str, dict[str, Any]] = {
     "file_read": {
         "type": "object",
-        "properties": {"filepath": {"type": "string", "description": "Path of the file to read"}},
+        "properties": {
+            "filepath": {"type": "string", "description": "Path of the file to read"},
+            "offset": {"type": "integer", "description": "Byte offset to start reading at"},
+            "length": {"type": "integer", "description": "Bytes to read from offset (max ~5000 characters)"},
+            "start_line": {"type": "integer", "description": "First line to read (1-based)"},
+            "end_line": {"type": "integer", "description": "Last line to read (inclusive)"},
+        },
         "required": ["filepath"],
     },
     "code_search": {
         "type": "object",
         "properties": {
             "directory": {"type": "string", "description": "Directory to search in"},
-            "pattern": {"type": "string", "description": "Text pattern to find"},
+            "pattern": {"type": "string", "description": "Text pattern to find (case-insensitive)"},
+            "regex": {"type": "boolean", "description": "Treat pattern as a regular expression", "default": False},
         },
         "required": ["directory", "pattern"],
     },
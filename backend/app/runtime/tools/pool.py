@@ -0,0 +1,247 @@
+"""Tool execution pools: where a tool's blocking work runs (execution classes).
+
+Every tool declares an ``execution_class``:
+
+- ``io-thread``   blocking I/O (files, sockets, subprocesses) on a bounded
+                  thread pool dedicated to tools, not the loop's default executor;
+- ``cpu-process`` pure-Python CPU work (directory walks, parsing) on a bounded
+                  ``ProcessPoolExecutor`` whose workers are spawned once and kept
+                  warm, so it never contends for the GIL with the event loop;
+- ``inline``      trivial work called directly on the event loop.
+
+Cancellation follows the run's ``CancellationToken`` (and the executor's
+timeout, which cancels the awaiting task): queued work is dropped, and a
+running ``cpu-process`` call has its worker pool recycled, terminating the
+process doing the work. Calls that shared the recycled pool are resubmitted
+once, so cpu-process functions must be side-effect free and module-level
+(picklable).
+"""
+from __future__ import annotations
+
+import asyncio
+import importlib
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable
+
+from ..errors import RunCancelledError
+
+IO_THREAD = "io-thread"
+CPU_PROCESS = "cpu-process"
+INLINE = "inline"
+EXECUTION_CLASSES = (IO_THREAD, CPU_PROCESS, INLINE)
+
+#: modules every cpu-process worker imports while warming up
+WARM_MODULES = ("services.agent_tools",)
+
+
+def _init_worker(modules: tuple[str, ...]) -> None:
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            pass  # the first call surfaces a real import error
+
+
+def _warm() -> bool:
+    return True
+
+
+def _call(func: Callable[..., Any], kwargs: dict[str, Any]) -> Any:
+    return func(**kwargs)
+
+
+class _ClassStats:
+    __slots__ = ("workers", "in_flight", "tasks", "cancelled", "recycled")
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.in_flight = 0
+        self.tasks = 0
+        self.cancelled = 0
+        self.recycled = 0
+
+    def to_dict(self) -> dict[str, Any]:
+        active = min(self.in_flight, self.workers) if self.workers else self.in_flight
+        return {
+            "workers": self.workers,
+            "active": active,
+            "queued": self.in_flight - active,
+            "utilization": round(active / self.workers, 4) if self.workers else 0.0,
+            "tasks_total": self.tasks,
+            "cancelled_total": self.cancelled,
+            "recycled_total": self.recycled,
+        }
+
+
+class ToolPools:
+    """Bounded executors per execution class; executors start lazily."""
+
+    def __init__(
+        self,
+        io_workers: int = 8,
+        cpu_workers: int = 2,
+        start_method: str = "spawn",
+        warm_modules: tuple[str, ...] = WARM_MODULES,
+    ):
+        self.io_workers = max(1, int(io_workers))
+        self.cpu_workers = max(1, int(cpu_workers))
+        self.start_method = start_method
+        self.warm_modules = tuple(warm_modules)
+        self._threads: ThreadPoolExecutor | None = None
+        self._processes: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._stats = {
+            IO_THREAD: _ClassStats(self.io_workers),
+            CPU_PROCESS: _ClassStats(self.cpu_workers),
+            INLINE: _ClassStats(0),
+        }
+
+    # ---- executors ----
+    def _thread_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._threads is None:
+                self._threads = ThreadPoolExecutor(self.io_workers, thread_name_prefix="tool-io")
+            return self._threads
+
+    def _process_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._processes is None:
+                import multiprocessing
+                self._processes = ProcessPoolExecutor(
+                    self.cpu_workers,
+                    mp_context=multiprocessing.get_context(self.start_method),
+                    initializer=_init_worker,
+                    initargs=(self.warm_modules,),
+                )
+            return self._processes
+
+    def warm(self) -> None:
+        """Spawn every cpu-process worker now instead of on the first tool call."""
+        pool = self._process_pool()
+        for _ in range(self.cpu_workers):
+            pool.submit(_warm)
+
+    def _recycle(self, pool: ProcessPoolExecutor) -> None:
+        """Terminate ``pool``'s workers; the next call starts a fresh pool."""
+        with self._lock:
+            if self._processes is not pool:
+                return
+            self._processes = None
+            self._stats[CPU_PROCESS].recycled += 1
+        self._terminate(pool)
+
+    @staticmethod
+    def _terminate(pool: ProcessPoolExecutor) -> None:
+        # ProcessPoolExecutor cannot cancel a running call; stop its workers instead
+        for process in list((getattr(pool, "_processes", None) or {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    # ---- execution ----
+    async def run(
+        self,
+        execution_class: str,
+        func: Callable[..., Any],
+        kwargs: dict[str, Any],
+        cancellation: Any = None,
+    ) -> Any:
+        """Run ``func(**kwargs)`` in the pool for ``execution_class``."""
+        if execution_class not in self._stats:
+            raise ValueError(f"unknown execution class: {execution_class}")
+        if cancellation is not None:
+            cancellation.check()
+        stats = self._stats[execution_class]
+        stats.tasks += 1
+        stats.in_flight += 1
+        try:
+            if execution_class == INLINE:
+                return func(**kwargs)
+            if execution_class == IO_THREAD:
+                return await self._await(self._thread_pool().submit(_call, func, kwargs), execution_class, cancellation)
+            try:
+                pool = self._process_pool()
+                return await self._await(pool.submit(_call, func, kwargs), execution_class, cancellation, pool)
+            except BrokenProcessPool:
+                # another call's cancellation recycled the pool under us: retry once
+                pool = self._process_pool()
+                return await self._await(pool.submit(_call, func, kwargs), execution_class, cancellation, pool)
+        finally:
+            stats.in_flight -= 1
+
+    async def _await(
+        self,
+        future: Future,
+        execution_class: str,
+        cancellation: Any,
+        pool: ProcessPoolExecutor | None = None,
+    ) -> Any:
+        waiter = asyncio.wrap_future(future)
+        loop = asyncio.get_running_loop()
+
+        def on_cancel() -> None:
+            loop.call_soon_threadsafe(waiter.cancel)
+
+        if cancellation is not None:
+            cancellation.add_callback(on_cancel)
+        try:
+            return await waiter
+        except asyncio.CancelledError:
+            self._stats[execution_class].cancelled += 1
+            if not future.cancel() and pool is not None and not future.done():
+                self._recycle(pool)
+            if cancellation is not None and cancellation.cancelled:
+                raise RunCancelledError()
+            raise
+        finally:
+            if cancellation is not None:
+                cancellation.remove_callback(on_cancel)
+
+    # ---- observability / lifecycle ----
+    def stats(self) -> dict[str, dict[str, Any]]:
+        return {name: s.to_dict() for name, s in self._stats.items()}
+
+    def shutdown(self) -> None:
+        with self._lock:
+            threads, self._threads = self._threads, None
+            processes, self._processes = self._processes, None
+        if threads is not None:
+            threads.shutdown(wait=False, cancel_futures=True)
+        if processes is not None:
+            self._terminate(processes)
+
+
+_pools: ToolPools | None = None
+
+
+def init_tool_pools(config: Any = None) -> ToolPools:
+    """Replace the process-wide pools (``settings.tools`` when no config is given)."""
+    global _pools
+    if config is None:
+        from core.config import settings
+        config = settings.tools
+    if _pools is not None:
+        _pools.shutdown()
+    _pools = ToolPools(
+        io_workers=config.io_thread_workers,
+        cpu_workers=config.cpu_process_workers,
+        start_method=config.cpu_process_start_method,
+    )
+    return _pools
+
+
+def get_tool_pools() -> ToolPools:
+    return _pools if _pools is not None else init_tool_pools()
+
+
+def peek_tool_pools() -> ToolPools | None:
+    """The pools if something started them (metrics must not spawn workers)."""
+    return _pools
+
+
+def shutdown_tool_pools() -> None:
+    global _pools
+    if _pools is not None:
+        _pools.shutdown()
+        _pools = None
@@ -16,13 +16,17 @@ class ToolRegistry:
     def __init__(self):
         self._tools: dict[str, Tool] = {}
         self._aliases: dict[str, str] = {}
+        # bumped on every (un)registration; compiled agent profiles key on it
+        self.generation = 0
 
     def register(self, tool: Tool, aliases: builtins.list[str] | None = None) -> None:
+        self.generation += 1
         self._tools[tool.name] = tool
         for alias in (aliases or []) + list(getattr(tool, "aliases", []) or []):
             self._aliases[alias] = tool.name
 
     def unregister(self, name: str) -> bool:
+        self.generation += 1
         canonical = self._aliases.pop(name, name)
         removed = self._tools.pop(canonical, None) is not None
         self._aliases = {k: v for k, v in self._aliases.items() if v != canonical}
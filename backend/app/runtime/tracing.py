@@ -0,0 +1,367 @@
+"""Span tracing for agent runs.
+
+A :class:`Tracer` records ``agent.run`` / ``agent.iteration`` / ``llm.request``
+/ ``tool.call`` spans in memory for the trace endpoint and hands each
+finished trace to an optional file exporter. Exporters format on the caller
+and write from a background thread, so a slow disk never stalls the event
+loop; files rotate by size like ``logging.handlers.RotatingFileHandler``.
+"""
+from __future__ import annotations
+
+import contextvars
+import json
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any
+
+_current: contextvars.ContextVar[Span | None] = contextvars.ContextVar("modelforge_span", default=None)
+
+
+@dataclass
+class Span:
+    """One timed operation of a trace (OpenTelemetry span data model)."""
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None = None
+    run_id: str | None = None
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: int | None = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+    status: str = "ok"
+    error: str | None = None
+    sampled: bool = True
+    tracer: Tracer | None = field(default=None, repr=False, compare=False)
+
+    def set(self, **attributes: Any) -> None:
+        for key, value in attributes.items():
+            if value is not None:
+                self.attributes[key] = value
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e6
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "run_id": self.run_id,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": dict(self.attributes),
+            "status": self.status,
+            "error": self.error,
+        }
+
+    def to_otlp(self) -> dict[str, Any]:
+        span: dict[str, Any] = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items()],
+            "status": {"code": 2, "message": self.error or ""} if self.status == "error" else {"code": 1},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if self.run_id:
+            span["attributes"].append(_otlp_attribute("run_id", self.run_id))
+        return span
+
+
+class JsonLinesExporter:
+    """Appends every span of a finished trace as one JSON object per line.
+
+    ``export`` only queues the formatted text; a daemon thread appends it,
+    rolling ``path`` over to ``path.1`` .. ``path.<backup_count>`` once it
+    would grow past ``max_bytes`` (0 = never rotate).
+    """
+
+    def __init__(self, path: str, *, max_bytes: int = 0, backup_count: int = 3):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.write_failures = 0
+        self._queue: queue.SimpleQueue[str | None] = queue.SimpleQueue()
+        self._pending = 0
+        self._idle = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def export(self, spans: list[Span]) -> None:
+        lines = "".join(json.dumps(s.to_dict(), ensure_ascii=False) + "\n" for s in spans)
+        self._write(lines)
+
+    def _write(self, text: str) -> None:
+        with self._idle:
+            self._pending += 1
+        self._queue.put(text)
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._drain, name="trace-exporter", daemon=True)
+                self._thread.start()
+
+    def flush(self, timeout: float | None = 5.0) -> bool:
+        """Wait until every queued trace is on disk; False on timeout."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self, timeout: float | None = 5.0) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def _drain(self) -> None:
+        while True:
+            text = self._queue.get()
+            if text is None:
+                return
+            batch = [text]
+            stop = False
+            while True:  # coalesce whatever queued up meanwhile into one write
+                try:
+                    more = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if more is None:
+                    stop = True
+                    break
+                batch.append(more)
+            try:
+                self._append("".join(batch))
+            except Exception:
+                # a broken trace file costs the traces, never the runs
+                self.write_failures += 1
+            with self._idle:
+                self._pending -= len(batch)
+                self._idle.notify_all()
+            if stop:
+                return
+
+    def _append(self, text: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        data = text.encode("utf-8")
+        if self.max_bytes > 0 and os.path.exists(self.path):
+            if os.path.getsize(self.path) + len(data) > self.max_bytes:
+                self._rotate()
+        with open(self.path, "ab") as f:
+            f.write(data)
+
+    def _rotate(self) -> None:
+        if self.backup_count <= 0:
+            os.remove(self.path)
+            return
+        for i in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{i}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+
+class OTLPFileExporter(JsonLinesExporter):
+    """One OTLP/JSON ``ExportTraceServiceRequest`` per finished trace and line.
+
+    The layout matches the OpenTelemetry Collector ``file`` exporter, so the
+    output can be replayed into any OTLP backend (``otlpjsonfile`` receiver).
+    """
+
+    def __init__(self, path: str, service_name: str = "modelforge", **rotation: Any):
+        super().__init__(path, **rotation)
+        self.service_name = service_name
+
+    def export(self, spans: list[Span]) -> None:
+        request = {"resourceSpans": [{
+            "resource": {"attributes": [_otlp_attribute("service.name", self.service_name)]},
+            "scopeSpans": [{
+                "scope": {"name": "modelforge.runtime"},
+                "spans": [s.to_otlp() for s in spans],
+            }],
+        }]}
+        self._write(json.dumps(request, ensure_ascii=False) + "\n")
+
+
+class Tracer:
+    """In-process span tracer for agent runs.
+
+    ``span()`` opens a child of the active span (tracked in a contextvar, so
+    it follows ``asyncio`` tasks such as delegated child runs) or a new
+    trace. Sampling is decided once per trace. Finished spans of the last
+    ``max_traces`` sampled traces stay in memory for ``trace_for_run``; a
+    trace is handed to the exporter when its root span ends.
+    """
+
+    def __init__(
+        self,
+        *,
+        enabled: bool = True,
+        sample_ratio: float = 1.0,
+        exporter: Any = None,
+        max_traces: int = 200,
+    ):
+        self.enabled = enabled
+        self.sample_ratio = sample_ratio
+        self.exporter = exporter
+        self.max_traces = max_traces
+        self._traces: OrderedDict[str, list[Span]] = OrderedDict()
+        self._runs: dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.export_failures = 0
+
+    @classmethod
+    def from_settings(cls, cfg: Any, data_dir: str = "./data") -> Tracer:
+        directory = cfg.directory or os.path.join(data_dir, "traces")
+        rotation = {"max_bytes": int(cfg.max_file_mb * 1024 * 1024), "backup_count": int(cfg.backup_count)}
+        exporter = None
+        if cfg.exporter == "jsonl":
+            exporter = JsonLinesExporter(os.path.join(directory, "spans.jsonl"), **rotation)
+        elif cfg.exporter == "otlp":
+            exporter = OTLPFileExporter(os.path.join(directory, "otlp.jsonl"), **rotation)
+        return cls(
+            enabled=cfg.enabled,
+            sample_ratio=float(cfg.sample_ratio),
+            exporter=exporter,
+            max_traces=int(cfg.max_traces),
+        )
+
+    @contextmanager
+    def span(self, name: str, *, root: bool = False, run_id: str | None = None, **attributes: Any) -> Iterator[Span | None]:
+        """Time the block as span ``name``; yields None when tracing is off.
+
+        ``root`` starts a new trace even inside another span (e.g. a queued
+        run that happens to be dispatched from a finishing run's task).
+        """
+        if not self.enabled:
+            yield None
+            return
+        parent = None if root else _current.get()
+        if parent is not None:
+            trace_id, sampled = parent.trace_id, parent.sampled
+            run_id = run_id or parent.run_id
+        else:
+            trace_id, sampled = uuid.uuid4().hex, random.random() < self.sample_ratio
+        span = Span(
+            name=name,
+            trace_id=trace_id,
+            span_id=uuid.uuid4().hex[:16],
+            parent_id=parent.span_id if parent is not None else None,
+            run_id=run_id,
+            sampled=sampled,
+            tracer=self,
+        )
+        span.set(**attributes)
+        if sampled and run_id and (parent is None or parent.run_id != run_id):
+            with self._lock:
+                self._runs[run_id] = trace_id
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.error = f"{type(e).__name__}: {e}"[:500]
+            raise
+        finally:
+            _current.reset(token)
+            span.end_ns = time.time_ns()
+            if sampled:
+                self._finish(span)
+
+    def _finish(self, span: Span) -> None:
+        with self._lock:
+            spans = self._traces.get(span.trace_id)
+            if spans is None:
+                spans = self._traces[span.trace_id] = []
+                while len(self._traces) > self.max_traces:
+                    evicted, _ = self._traces.popitem(last=False)
+                    self._runs = {r: t for r, t in self._runs.items() if t != evicted}
+            spans.append(span)
+            finished = list(spans) if span.parent_id is None else None
+        if finished is not None and self.exporter is not None:
+            try:
+                self.exporter.export(finished)
+            except Exception:
+                # a broken exporter costs the trace file, never the run
+                self.export_failures += 1
+
+    def close(self) -> None:
+        """Write out queued traces and stop the exporter thread."""
+        flush = getattr(self.exporter, "flush", None)
+        if callable(flush):
+            flush()
+        close = getattr(self.exporter, "close", None)
+        if callable(close):
+            close()
+
+    def trace_for_run(self, run_id: str) -> list[Span]:
+        """Finished spans of the trace ``run_id`` belongs to, in start order."""
+        with self._lock:
+            trace_id = self._runs.get(run_id)
+            spans = list(self._traces.get(trace_id) or []) if trace_id else []
+        return sorted(spans, key=lambda s: (s.start_ns, s.end_ns or 0))
+
+
+def current_span() -> Span | None:
+    return _current.get()
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span | None]:
+    """Child of the active span, opened on its tracer; a no-op outside a traced run.
+
+    Lets the context builder and tools add detail without being handed a
+    tracer.
+    """
+    parent = _current.get()
+    if parent is None or parent.tracer is None:
+        yield None
+        return
+    with parent.tracer.span(name, **attributes) as child:
+        yield child
+
+
+def breakdown(spans: list[Span]) -> list[dict[str, Any]]:
+    """Total and self time per span name (self = minus time spent in children)."""
+    children_ms: dict[str, float] = {}
+    for s in spans:
+        if s.parent_id:
+            children_ms[s.parent_id] = children_ms.get(s.parent_id, 0.0) + s.duration_ms
+    rows: dict[str, dict[str, Any]] = {}
+    for s in spans:
+        row = rows.setdefault(s.name, {"name": s.name, "count": 0, "total_ms": 0.0, "self_ms": 0.0})
+        row["count"] += 1
+        row["total_ms"] += s.duration_ms
+        # concurrent children (gathered retrievals) can exceed the parent
+        row["self_ms"] += max(0.0, s.duration_ms - children_ms.get(s.span_id, 0.0))
+    for row in rows.values():
+        row["total_ms"] = round(row["total_ms"], 3)
+        row["self_ms"] = round(row["self_ms"], 3)
+    return sorted(rows.values(), key=lambda r: r["self_ms"], reverse=True)
+
+
+def _otlp_attribute(key: str, value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
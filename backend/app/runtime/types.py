@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import datetime
+import hashlib
+import json
 from dataclasses import dataclass, field
 from enum import Enum
 from typing import Any
@@ -117,6 +119,8 @@ class AgentConfig:
     runtime_config: dict[str, Any] | None = None
     model_target: dict[str, Any] | None = None
     status: str = "active"
+    # store-assigned revision, changed by every edit (None: not tracked by the store)
+    version: str | None = None
 
     def to_dict(self) -> dict[str, Any]:
         return {
@@ -135,6 +139,11 @@ class AgentConfig:
             "status": self.status,
         }
 
+    def fingerprint(self) -> str:
+        """Digest of the definition; compiled profiles key on it when the store assigns no ``version``."""
+        raw = json.dumps(self.to_dict(), sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(raw.encode()).hexdigest()
+
     @classmethod
     def from_dict(cls, data: dict[str, Any]) -> AgentConfig:
         return cls(
@@ -7,12 +7,17 @@ from pydantic import BaseModel
 
 
 class AgentModelTarget(BaseModel):
-    """Credential-free, user-scoped route to a readiness-validated model."""
+    """Credential-free, user-scoped route to a readiness-validated model.
 
-    kind: Literal["local", "remote"]
+    ``kind="pool"`` names a configured ``model_pools`` entry in ``model_ref``;
+    remote targets may list further ``provider_ids`` serving the same model.
+    """
+
+    kind: Literal["local", "remote", "pool"]
     model_ref: str
     model_name: str
     provider_id: int | None = None
+    provider_ids: list[int] = []
 
 
 class AgentCreateRequest(BaseModel):
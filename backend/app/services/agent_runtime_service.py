@@ -7,10 +7,13 @@ from core.config import settings
 from core.database import SessionLocal
 from repositories.run_repository import SQLAlchemyRunStore
 from runtime.events import EventBus
-from runtime.metrics import MetricsRegistry
+from runtime.metrics import get_metrics
+from runtime.models.cache import get_response_cache
 from runtime.runtime import AgentRuntime, default_provider_factory
+from runtime.types import RunRecord
 from services.agent_store import DBAgentStore
-from services.remote_provider_service import RemoteProviderService
+from services.model_metrics import get_model_metrics
+from services.remote_provider_service import RemoteProviderError, RemoteProviderService
 
 _runtime: AgentRuntime | None = None
 
@@ -24,6 +27,44 @@ def get_agent_runtime() -> AgentRuntime | None:
     return _runtime
 
 
+def read_run(run_id: str, user_id: int | None = None) -> RunRecord | None:
+    """A run through the run store, so write-behind transitions not yet flushed are visible.
+
+    Prefer this to querying ``AgentRun`` directly; ``user_id`` scopes the lookup.
+    """
+    store = _runtime.run_store if _runtime is not None else SQLAlchemyRunStore()
+    run = store.get(run_id)
+    if run is None or (user_id is not None and run.user_id != user_id):
+        return None
+    return run
+
+
+def flush_run_writes() -> None:
+    """Persist coalesced run transitions before a bulk ``AgentRun`` query."""
+    flush = getattr(_runtime.run_store, "flush", None) if _runtime is not None else None
+    if callable(flush):
+        flush()
+
+
+def _resident_counter(model: str) -> Any:
+    """Token counter of a resident local model, so its context is budgeted exactly.
+
+    The counter lives on the residency entry: it is rebuilt for each load and
+    released with the weights on eviction.
+    """
+    from runtime.context.tokens import get_token_counter
+    from services.runtimes.model_residency import get_residency_manager
+    entry = get_residency_manager().lookup(model)
+    if entry is None:
+        return None
+    if entry.token_counter is None:
+        tokenizer = entry.tokenizer or (entry.model if entry.is_gguf else None)
+        if tokenizer is None:
+            return None
+        entry.token_counter = get_token_counter(model, tokenizer)
+    return entry.token_counter
+
+
 def build_agent_runtime(
     agent_engine: Any = None,
     provider_factory: Any = None,
@@ -41,6 +82,7 @@ def build_agent_runtime(
     Provider factory defaults to Ollama; tests / deployments override it.
     Events persist to the DB (spec 30) via the event store unless one is injected.
     """
+    from repositories.checkpoint_repository import SQLAlchemyCheckpointStore
     from repositories.event_repository import SQLAlchemyEventStore
     from runtime.scheduler import Scheduler
     from runtime.tools import ToolExecutor, ToolRegistry
@@ -48,7 +90,7 @@ def build_agent_runtime(
     from services.agent_engine import get_engine
     if scheduler is None:
         scheduler = Scheduler()
-    run_store = SQLAlchemyRunStore()
+    run_store = SQLAlchemyRunStore(flush_interval=settings.runtime.run_flush_interval_ms / 1000.0)
     agent_store = DBAgentStore(agent_engine or get_engine())
     bus = EventBus(store=event_store or SQLAlchemyEventStore())
     registry = register_builtin_tools(ToolRegistry())
@@ -60,19 +102,33 @@ def build_agent_runtime(
             memory_provider=memory_provider or DBMemoryProvider(),
             knowledge_provider=knowledge_provider or KBKnowledgeProvider(),
             history_provider=history_provider or SessionHistoryProvider(),
+            tokenizer_resolver=_resident_counter,
         )
     def routed_provider_factory(model: str, agent=None):
         target = getattr(agent, "model_target", None) or {}
+        if target.get("kind") == "pool":
+            from runtime.models.pool import get_model_pool
+            return get_model_pool(target.get("model_ref") or "", target.get("model_name") or model)
         if target.get("kind") != "remote":
             return default_provider_factory(model)
         user_id = getattr(agent, "user_id", None)
         provider_id = target.get("provider_id")
         if user_id is None or provider_id is None:
             raise ValueError("Remote Agent target is missing user or provider context.")
+        model_name = target.get("model_name") or model
+        extras = [int(pid) for pid in target.get("provider_ids") or [] if int(pid) != int(provider_id)]
         with SessionLocal() as db:
-            config = RemoteProviderService(db, settings.data_dir).resolve_verified(
-                user_id, int(provider_id), target.get("model_name") or model,
-            )
+            service = RemoteProviderService(db, settings.data_dir)
+            config = service.resolve_verified(user_id, int(provider_id), model_name)
+            members = [(str(provider_id), config)]
+            for pid in extras:
+                try:
+                    members.append((str(pid), service.resolve_verified(user_id, pid, model_name)))
+                except RemoteProviderError:
+                    continue  # a pool member that lost verification just drops out
+        if len(members) > 1:
+            from runtime.models.pool import get_remote_pool
+            return get_remote_pool(members, model_name)
         from runtime.models.openai_compatible import OpenAICompatibleProvider
         return OpenAICompatibleProvider(**config)
 
@@ -88,8 +144,11 @@ def build_agent_runtime(
         knowledge_provider=knowledge_provider,
         history_provider=history_provider,
         policy_engine=policy_engine,
-        metrics=MetricsRegistry(),
+        metrics=get_metrics(),
         scheduler=scheduler,
+        response_cache=get_response_cache(),
+        checkpoint_store=SQLAlchemyCheckpointStore() if settings.runtime.checkpoint_enabled else None,
+        usage_recorder=get_model_metrics(),
     )
     if scheduler is not None and runtime.scheduler is not None:
         runtime.scheduler.trigger = runtime._scheduler_trigger
@@ -2,6 +2,7 @@
 from __future__ import annotations
 
 import builtins
+import datetime
 import json
 from typing import Any
 
@@ -43,6 +44,7 @@ class DBAgentStore:
             model_target=(json.loads(row.runtime_config) if row.runtime_config else {}).get("model_target"),
             plugins=(json.loads(row.runtime_config) if row.runtime_config else {}).get("plugins", []),
             status=row.status or "active",
+            version=f"{row.id}:{row.updated_at.isoformat()}" if row.updated_at is not None else None,
         )
 
     def get(self, name: str, user_id: int | None = None) -> AgentConfig | None:
@@ -86,6 +88,8 @@ class DBAgentStore:
                 rc["model_target"] = dict(config.model_target)
             row.runtime_config = json.dumps(rc, ensure_ascii=False) if rc else None
             row.status = config.status or "active"
+            # a re-save counts as an edit, so rows from before the column existed get a version too
+            row.updated_at = datetime.datetime.utcnow()
             db.commit()
         return config
 
@@ -1,5 +1,6 @@
 """Agent tools: file_read, code_search, command_execute, web_search, knowledge_search."""
 import os
+import re
 import shlex
 import subprocess
 from pathlib import Path
@@ -7,47 +8,39 @@ from pathlib import Path
 from core.config import settings
 
 
-def tool_file_read(filepath: str) -> str:
-    """Read the contents of a file."""
+def tool_file_read(
+    filepath: str,
+    offset: int | None = None,
+    length: int | None = None,
+    start_line: int | None = None,
+    end_line: int | None = None,
+) -> str:
+    """Read a file: its head, a byte window or a line range (see services.file_reader)."""
+    from services.file_reader import read_window
     if not os.path.exists(filepath):
         return f"Error: File not found: {filepath}"
     try:
-        with open(filepath, "r", encoding="utf-8") as f:
-            content = f.read()
-        if len(content) > 5000:
-            content = content[:5000] + "\n... (truncated)"
-        return content
+        return read_window(filepath, offset=offset, length=length, start_line=start_line, end_line=end_line)
     except Exception as e:
         return f"Error reading file: {e}"
 
 
-def tool_code_search(directory: str, pattern: str) -> str:
-    """Search for a pattern in code files within a directory."""
+def tool_code_search(directory: str, pattern: str, regex: bool = False) -> str:
+    """Search code files within a directory (trigram-indexed, see services.code_index)."""
+    from services.code_index import get_code_index_cache
     if not os.path.isdir(directory):
         return f"Error: Directory not found: {directory}"
-    results = []
-    code_extensions = {".py", ".js", ".ts", ".java", ".go", ".rs", ".cpp", ".c", ".h"}
     try:
-        for root, dirs, files in os.walk(directory):
-            dirs[:] = [d for d in dirs if not d.startswith(".")]
-            for filename in files:
-                ext = os.path.splitext(filename)[1].lower()
-                if ext not in code_extensions:
-                    continue
-                filepath = os.path.join(root, filename)
-                try:
-                    with open(filepath, "r", encoding="utf-8", errors="ignore") as f:
-                        for lineno, line in enumerate(f, 1):
-                            if pattern.lower() in line.lower():
-                                results.append(f"{filepath}:{lineno}: {line.strip()[:120]}")
-                                if len(results) >= 20:
-                                    return "\n".join(results) + "\n... (max results)"
-                except Exception:
-                    continue
+        ranked, truncated = get_code_index_cache().get(directory).search(pattern, regex=regex)
+    except re.error as e:
+        return f"Error: invalid regex: {e}"
     except Exception as e:
         return f"Error during search: {e}"
-    if not results:
+    if not ranked:
         return f"No matches found for '{pattern}' in {directory}"
+    results = [f"{path}:{lineno}: {text}" for path, lines in ranked for lineno, text in lines]
+    if truncated:
+        return "\n".join(results) + "\n... (max results)"
     return "\n".join(results)
 
 
@@ -1,11 +1,15 @@
 """Unified chat service with optional user-scoped remote provider override."""
 from collections.abc import AsyncIterator
 
+from core.config import settings
 from models.records import User
 from services.memory_store import MemoryStore
-from services.runtime_registry import RuntimeRegistry
+from services.model_metrics import metered
+from services.runtime_registry import CachedRuntime, RuntimeRegistry
 from services.runtimes.openai_api_runtime import OpenAIRuntime
+from services.runtimes.pool_runtime import model_pool_runtime, remote_pool_runtime
 from services.session_service import SessionService
+from services.session_summary import get_summarizer, prompt_history
 from sqlalchemy.orm import Session as DBSession
 
 
@@ -17,13 +21,25 @@ def _memory_context(db: DBSession, user_id: int, query: str) -> str:
         return ""
 
 
-def _runtime(runtime: RuntimeRegistry, provider: dict | None):
-    if provider is None:
-        return runtime
-    return OpenAIRuntime(
-        api_key=provider["api_key"], base_url=provider["base_url"],
-        model=provider["default_model"], protocol=provider["protocol"],
-    )
+def _runtime(runtime: RuntimeRegistry, provider: dict | list[dict] | None, user: User | None = None, model_pool: str | None = None):
+    if provider is not None and model_pool:
+        raise ValueError("choose either a remote provider or a model pool")
+    pool = model_pool or (settings.default_model_pool if provider is None else "")
+    if pool:
+        # configured model_pools entry; default_model_pool replaces ollama_base_url here as for agents
+        selected = CachedRuntime(model_pool_runtime(pool), f"pool:{pool}")
+    elif provider is None:
+        selected = runtime
+    elif isinstance(provider, list):
+        endpoints = ",".join(sorted(p["base_url"] for p in provider))
+        selected = CachedRuntime(remote_pool_runtime(provider), f"pool:{endpoints}")
+    else:
+        selected = CachedRuntime(OpenAIRuntime(
+            api_key=provider["api_key"], base_url=provider["base_url"],
+            model=provider["default_model"], protocol=provider["protocol"],
+            rate_limits=provider.get("rate_limits"),
+        ), provider["base_url"])
+    return metered(selected, user.id if user is not None else None)
 
 
 def _context(db: DBSession, user: User | None, session_id: int | None, messages: list[dict]):
@@ -37,14 +53,20 @@ def _context(db: DBSession, user: User | None, session_id: int | None, messages:
     user_message = messages[-1]["content"] if messages else ""
     if session is None:
         return session, messages, user_message
-    history = SessionService.get_session_history(db, session_id, limit=50)
+    history = prompt_history(db, session_id)
     mem_ctx = _memory_context(db, user.id, user_message)
     full_messages = ([{"role": "system", "content": mem_ctx}] if mem_ctx else []) + history + [{"role": "user", "content": user_message}]
     MemoryStore.extract_memories_from_message(db, user.id, user_message, session_id)
     return session, full_messages, user_message
 
 
-def _persist(db: DBSession, session, user_message: str, response: str) -> None:
+def _options(temperature: float | None, response_cache: bool | None) -> dict:
+    """Sampling / cache kwargs for the runtime; unset values keep the backend defaults."""
+    options = {"temperature": temperature, "response_cache": response_cache}
+    return {k: v for k, v in options.items() if v is not None}
+
+
+def _persist(db: DBSession, session, user_message: str, response: str, selected=None, model: str = "") -> None:
     if session is None:
         return
     SessionService.add_message(db, session.id, "user", user_message)
@@ -52,30 +74,28 @@ def _persist(db: DBSession, session, user_message: str, response: str) -> None:
     if SessionService.get_session_message_count(db, session.id) == 2:
         SessionService.auto_generate_title(db, session.id)
     db.commit()
+    if selected is not None:
+        # fold older turns into the rolling summary off the request path; the
+        # summary call is internal, so it bypasses the usage metering
+        get_summarizer().schedule(session.id, selected.inner.chat, model)
 
 
-async def run_chat(db: DBSession, runtime: RuntimeRegistry, model: str, messages: list[dict], user: User | None = None, session_id: int | None = None, provider: dict | None = None) -> dict:
+async def run_chat(db: DBSession, runtime: RuntimeRegistry, model: str, messages: list[dict], user: User | None = None, session_id: int | None = None, provider: dict | list[dict] | None = None, temperature: float | None = None, response_cache: bool | None = None, model_pool: str | None = None) -> dict:
     session, full_messages, user_message = _context(db, user, session_id, messages)
-    result = await _runtime(runtime, provider).chat(model, full_messages)
+    selected = _runtime(runtime, provider, user, model_pool)
+    result = await selected.chat(model, full_messages, **_options(temperature, response_cache))
     response = result.get("content", "")
-    _persist(db, session, user_message, response)
+    _persist(db, session, user_message, response, selected, model)
     return {"response": response, "session_id": session.id if session else None, **result}
 
 
-async def stream_chat(db: DBSession, runtime: RuntimeRegistry, model: str, messages: list[dict], user: User | None = None, session_id: int | None = None, provider: dict | None = None) -> AsyncIterator[dict]:
+async def stream_chat(db: DBSession, runtime: RuntimeRegistry, model: str, messages: list[dict], user: User | None = None, session_id: int | None = None, provider: dict | list[dict] | None = None, temperature: float | None = None, model_pool: str | None = None) -> AsyncIterator[dict]:
     session, full_messages, user_message = _context(db, user, session_id, messages)
-    selected = _runtime(runtime, provider)
-    stream_fn = getattr(selected, "stream_chat", None)
+    selected = _runtime(runtime, provider, user, model_pool)
     parts: list[str] = []
-    if stream_fn is not None:
-        async for chunk in stream_fn(model, full_messages):
-            parts.append(chunk)
-            yield {"type": "delta", "data": chunk}
-    else:
-        result = await selected.chat(model, full_messages)
-        content = result.get("content", "")
-        parts.append(content)
-        yield {"type": "delta", "data": content}
+    async for chunk in selected.stream_chat(model, full_messages, **_options(temperature, None)):
+        parts.append(chunk)
+        yield {"type": "delta", "data": chunk}
     full_response = "".join(parts)
-    _persist(db, session, user_message, full_response)
+    _persist(db, session, user_message, full_response, selected, model)
     yield {"type": "done", "data": {"response": full_response, "session_id": session.id if session else None}}
@@ -0,0 +1,391 @@
+"""Persistent trigram index behind the ``code_search`` agent tool.
+
+One ``CodeIndex`` per searched root maps every code file to the set of
+lowercased trigrams it contains. A search intersects the posting lists of
+the pattern's trigrams (regexes contribute their required literal runs) and
+only opens the surviving candidates, instead of reading the whole tree.
+
+The index refreshes lazily: at most every ``refresh_seconds`` a stat-only walk
+compares each file's (mtime, size) with the indexed entry and re-reads just
+the changed files. Between walks only the directories are stat-ed, so a file
+created, renamed or deleted since the last walk (a directory mtime change)
+forces the walk early; in-place edits wait for the next one. Indexes are kept in process memory and persisted as
+zlib-compressed JSON under ``<data_dir>/code_index`` so worker processes and
+restarts start warm.
+
+The first build of a root runs on a background thread; until it finishes,
+and for patterns without a three-character literal, searches stream the
+tree directly and stop at the result limit, so a cold index never spends
+the tool timeout.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from collections.abc import Callable, Iterable, Iterator
+
+try:  # Python 3.11+ deprecates the public aliases
+    from re import _constants as sre_constants
+    from re import _parser as sre_parse
+except ImportError:  # pragma: no cover
+    import sre_constants
+    import sre_parse
+
+INDEX_VERSION = 1
+CODE_EXTENSIONS = frozenset({".py", ".js", ".ts", ".java", ".go", ".rs", ".cpp", ".c", ".h"})
+#: files larger than this are not indexed; they stay candidates for every search
+MAX_INDEXED_BYTES = 2 * 1024 * 1024
+SAVE_INTERVAL_SECONDS = 5.0
+
+
+def trigrams(text: str) -> set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _literal_runs(pattern: str) -> list[str] | None:
+    """Literal substrings every match of ``pattern`` must contain.
+
+    Returns None when no safe requirement can be derived (top-level
+    alternation, or no literal run of at least three characters).
+    """
+    try:
+        parsed = sre_parse.parse(pattern)
+    except re.error:
+        return None
+    runs: list[str] = []
+    current: list[str] = []
+    for op, arg in parsed:
+        if op is sre_constants.LITERAL:
+            current.append(chr(arg))
+            continue
+        if op is sre_constants.BRANCH:
+            return None
+        if current:
+            runs.append("".join(current))
+            current = []
+    if current:
+        runs.append("".join(current))
+    runs = [r.lower() for r in runs if len(r) >= 3]
+    return runs or None
+
+
+class CodeIndex:
+    """Trigram index of the code files below one root directory."""
+
+    def __init__(self, root: str, index_path: str | None = None, refresh_seconds: float = 2.0):
+        self.root = os.path.abspath(root)
+        self.index_path = index_path
+        self.refresh_seconds = refresh_seconds
+        # relpath -> (mtime_ns, size, trigrams or None when too large to index)
+        self.files: dict[str, tuple[int, int, frozenset[str] | None]] = {}
+        self.postings: dict[str, set[str]] = {}
+        self.unindexed: set[str] = set()
+        # absolute dir -> mtime_ns seen by the last walk
+        self.dirs: dict[str, int] = {}
+        self.refreshed_at = 0.0
+        self._lock = threading.Lock()
+        # set once a full refresh has completed; searches stream the tree until then
+        self._ready = threading.Event()
+        self._builder: threading.Thread | None = None
+        self._builder_lock = threading.Lock()
+        if index_path:
+            self._load()
+
+    # ---- persistence ----
+    def _load(self) -> None:
+        try:
+            with open(self.index_path, "rb") as f:
+                data = json.loads(zlib.decompress(f.read()))
+        except (OSError, zlib.error, ValueError):
+            return
+        if data.get("version") != INDEX_VERSION or data.get("root") != self.root:
+            return
+        for rel, (mtime, size, grams) in data["files"].items():
+            self._add(rel, mtime, size, frozenset(grams) if grams is not None else None)
+
+    def save(self) -> None:
+        if not self.index_path:
+            return
+        data = {
+            "version": INDEX_VERSION,
+            "root": self.root,
+            "files": {
+                rel: [mtime, size, sorted(grams) if grams is not None else None]
+                for rel, (mtime, size, grams) in self.files.items()
+            },
+        }
+        blob = zlib.compress(json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode(), 6)
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        tmp = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(blob)
+        os.replace(tmp, self.index_path)
+
+    # ---- maintenance ----
+    def _add(self, rel: str, mtime: int, size: int, grams: frozenset[str] | None) -> None:
+        self.files[rel] = (mtime, size, grams)
+        if grams is None:
+            self.unindexed.add(rel)
+            return
+        for gram in grams:
+            self.postings.setdefault(gram, set()).add(rel)
+
+    def _remove(self, rel: str) -> None:
+        _, _, grams = self.files.pop(rel)
+        if grams is None:
+            self.unindexed.discard(rel)
+            return
+        for gram in grams:
+            posting = self.postings.get(gram)
+            if posting is not None:
+                posting.discard(rel)
+                if not posting:
+                    del self.postings[gram]
+
+    def _scan(self) -> tuple[dict[str, tuple[int, int]], dict[str, int]]:
+        found: dict[str, tuple[int, int]] = {}
+        seen_dirs: dict[str, int] = {}
+        for root, dirs, names in os.walk(self.root):
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            try:
+                seen_dirs[root] = os.stat(root).st_mtime_ns
+            except OSError:
+                continue
+            for name in names:
+                if os.path.splitext(name)[1].lower() not in CODE_EXTENSIONS:
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                found[os.path.relpath(path, self.root)] = (st.st_mtime_ns, st.st_size)
+        return found, seen_dirs
+
+    def _dirs_changed(self) -> bool:
+        for path, mtime in self.dirs.items():
+            try:
+                if os.stat(path).st_mtime_ns != mtime:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def refresh(self, force: bool = False) -> int:
+        """Re-index files whose (mtime, size) changed; returns the number touched."""
+        with self._lock:
+            now = time.monotonic()
+            if (
+                not force and self.refreshed_at and now - self.refreshed_at < self.refresh_seconds
+                and not self._dirs_changed()
+            ):
+                return 0
+            found, self.dirs = self._scan()
+            changed = 0
+            saved_at = time.monotonic()
+            for rel in [rel for rel in self.files if rel not in found]:
+                self._remove(rel)
+                changed += 1
+            for rel, (mtime, size) in found.items():
+                entry = self.files.get(rel)
+                if entry is not None and entry[0] == mtime and entry[1] == size:
+                    continue
+                if entry is not None:
+                    self._remove(rel)
+                grams = None
+                if size <= MAX_INDEXED_BYTES:
+                    try:
+                        with open(os.path.join(self.root, rel), "r", encoding="utf-8", errors="ignore") as f:
+                            grams = frozenset(trigrams(f.read().lower()))
+                    except OSError:
+                        continue
+                self._add(rel, mtime, size, grams)
+                changed += 1
+                if time.monotonic() - saved_at > SAVE_INTERVAL_SECONDS:
+                    # a cold build cut short by the tool timeout resumes from here
+                    self._save_quietly()
+                    saved_at = time.monotonic()
+            self.refreshed_at = time.monotonic()
+            if changed:
+                self._save_quietly()
+        self._ready.set()
+        return changed
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def wait_ready(self, timeout: float | None = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def build_in_background(self) -> None:
+        """Start the initial refresh on a daemon thread (no-op when ready or running)."""
+        with self._builder_lock:
+            if self._ready.is_set() or (self._builder is not None and self._builder.is_alive()):
+                return
+            self._builder = threading.Thread(target=self._build, name="code-index-build", daemon=True)
+            self._builder.start()
+
+    def _build(self) -> None:
+        try:
+            self.refresh(force=True)
+        except Exception:
+            pass  # searches keep streaming; the next one starts another build
+
+    def _save_quietly(self) -> None:
+        try:
+            self.save()
+        except OSError:
+            pass  # a stale on-disk copy only costs a slower cold start
+
+    # ---- query ----
+    def candidates(self, required: list[str] | None) -> list[str]:
+        """Files that can contain every string in ``required`` (all files when None)."""
+        if not required:
+            return sorted(self.files)
+        grams = set().union(*(trigrams(r) for r in required))
+        result: set[str] | None = None
+        for gram in sorted(grams, key=lambda g: len(self.postings.get(g, ()))):
+            posting = self.postings.get(gram, set())
+            result = set(posting) if result is None else result & posting
+            if not result:
+                break
+        return sorted((result or set()) | self.unindexed)
+
+    def search(
+        self, pattern: str, regex: bool = False, max_results: int = 20,
+    ) -> tuple[list[tuple[str, list[tuple[int, str]]]], bool]:
+        """Matching lines grouped by file, files ranked by match count.
+
+        Returns ``(ranked, truncated)``; matching is case-insensitive. Reading
+        stops at ``max_results`` matching lines, so the ranking covers the
+        files read up to then. Without a usable index (still building, or no
+        three-character literal to prefilter on) the tree is streamed instead.
+        """
+        if regex:
+            matcher = re.compile(pattern, re.IGNORECASE)
+            required = _literal_runs(pattern)
+
+            def hit(line: str) -> bool:
+                return matcher.search(line) is not None
+        else:
+            needle = pattern.lower()
+            required = [needle] if len(needle) >= 3 else None
+
+            def hit(line: str) -> bool:
+                return needle in line.lower()
+
+        if required is None:
+            rels: list[str] | Iterator[str] = self._walk()
+        elif not self._ready.is_set():
+            self.build_in_background()
+            rels = self._walk()
+        else:
+            self.refresh()
+            with self._lock:
+                rels = self.candidates(required)
+        return self._collect((os.path.join(self.root, rel) for rel in rels), hit, max_results)
+
+    def _walk(self) -> Iterator[str]:
+        """Relative paths of the code files below the root, in a stable order."""
+        for root, dirs, names in os.walk(self.root):
+            dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+            for name in sorted(names):
+                if os.path.splitext(name)[1].lower() in CODE_EXTENSIONS:
+                    yield os.path.relpath(os.path.join(root, name), self.root)
+
+    @staticmethod
+    def _collect(
+        paths: Iterable[str], hit: Callable[[str], bool], max_results: int,
+    ) -> tuple[list[tuple[str, list[tuple[int, str]]]], bool]:
+        per_file: list[tuple[str, list[tuple[int, str]]]] = []
+        total = 0
+        truncated = False
+        for path in paths:
+            lines: list[tuple[int, str]] = []
+            try:
+                with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                    for lineno, line in enumerate(f, 1):
+                        if hit(line):
+                            if total + len(lines) >= max_results:
+                                truncated = True
+                                break
+                            lines.append((lineno, line.strip()[:120]))
+            except OSError:
+                continue
+            if lines:
+                per_file.append((path, lines))
+                total += len(lines)
+            if truncated:
+                break
+        per_file.sort(key=lambda item: (-len(item[1]), item[0]))
+        return per_file, truncated
+
+
+class CodeIndexCache:
+    """Most recently used ``CodeIndex`` per root, persisted under ``directory``."""
+
+    def __init__(self, directory: str | None, max_indexes: int = 16, refresh_seconds: float = 2.0):
+        self.directory = directory
+        self.max_indexes = max_indexes
+        self.refresh_seconds = refresh_seconds
+        self._indexes: OrderedDict[str, CodeIndex] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def index_path(self, root: str) -> str | None:
+        if not self.directory:
+            return None
+        digest = hashlib.sha1(os.path.abspath(root).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.idx")
+
+    def get(self, root: str) -> CodeIndex:
+        root = os.path.abspath(root)
+        with self._lock:
+            index = self._indexes.get(root)
+            if index is not None:
+                self._indexes.move_to_end(root)
+                return index
+            index = CodeIndex(root, self.index_path(root), refresh_seconds=self.refresh_seconds)
+            self._indexes[root] = index
+            while len(self._indexes) > self.max_indexes:
+                self._indexes.popitem(last=False)
+        self._prune_disk()
+        return index
+
+    def _prune_disk(self) -> None:
+        """Keep at most ``max_indexes`` persisted indexes, dropping the oldest."""
+        if not self.directory or not os.path.isdir(self.directory):
+            return
+        try:
+            entries = [e for e in os.scandir(self.directory) if e.name.endswith(".idx")]
+        except OSError:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+        for entry in entries[self.max_indexes:]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+
+_cache: CodeIndexCache | None = None
+
+
+def get_code_index_cache() -> CodeIndexCache:
+    """Process-wide cache from ``settings.tools`` (one per worker process)."""
+    global _cache
+    if _cache is None:
+        from core.config import settings
+        cfg = settings.tools
+        _cache = CodeIndexCache(
+            cfg.code_index_dir or os.path.join(settings.data_dir, "code_index"),
+            max_indexes=cfg.code_index_max_roots,
+            refresh_seconds=cfg.code_index_refresh_seconds,
+        )
+    return _cache
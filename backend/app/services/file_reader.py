@@ -0,0 +1,252 @@
+"""Ranged file reads behind the ``file_read`` agent tool.
+
+Files are memory-mapped, so a window of a multi-GB log costs only the pages
+it touches. Binary detection and encoding sniffing look at the first block
+only. Line ranges use a sparse line-offset index: the cumulative newline
+count at every ``CHUNK``-byte boundary, built lazily up to the furthest line
+requested and cached per (path, mtime, size), so paging forward through a
+file never rescans what was already counted. Line ranges need a one-byte
+newline, so UTF-16 files page by byte offset only. Pseudo files that report
+size 0 (procfs, sysfs) are read whole, up to ``PSEUDO_LIMIT`` bytes.
+"""
+from __future__ import annotations
+
+import codecs
+import mmap
+import os
+import threading
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+
+BLOCK = 8192
+CHUNK = 64 * 1024
+#: characters returned per call; the footer tells the model how to page on
+MAX_CHARS = 5000
+#: bytes read from a file whose stat size is 0
+PSEUDO_LIMIT = 4 * 1024 * 1024
+
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+)
+
+
+def sniff(block: bytes) -> str | None:
+    """Encoding of a file from its first block; None for binary content."""
+    for bom, encoding in _BOMS:
+        if block.startswith(bom):
+            return encoding
+    if b"\x00" in block:
+        return None
+    try:
+        # a multi-byte sequence may be cut at the block edge
+        codecs.getincrementaldecoder("utf-8")().decode(block, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "latin-1"
+
+
+class LineIndex:
+    """Newline counts at chunk boundaries of one file version."""
+
+    def __init__(self, size: int):
+        self.size = size
+        # counts[i] = newlines in bytes [0, i * CHUNK)
+        self.counts = array("q", [0])
+        self.lock = threading.Lock()
+
+    @property
+    def complete(self) -> bool:
+        return (len(self.counts) - 1) * CHUNK >= self.size
+
+    def total_lines(self, mm: mmap.mmap) -> int | None:
+        """Line count once the whole file is indexed (a trailing newline ends the last line)."""
+        if not self.complete:
+            return None
+        return self.counts[-1] + (0 if mm[self.size - 1:self.size] == b"\n" else 1)
+
+    def _extend(self, mm: mmap.mmap, newlines: int) -> None:
+        """Count chunks until at least ``newlines`` newlines are covered (or EOF)."""
+        while not self.complete and self.counts[-1] < newlines:
+            start = (len(self.counts) - 1) * CHUNK
+            self.counts.append(self.counts[-1] + mm[start:start + CHUNK].count(b"\n"))
+
+    def line_offset(self, mm: mmap.mmap, line: int) -> int | None:
+        """Byte offset where 1-based ``line`` starts; None past the end."""
+        if line <= 1:
+            return 0
+        target = line - 1  # newlines before the line
+        with self.lock:
+            self._extend(mm, target)
+            chunk = bisect_right(self.counts, target - 1) - 1
+            seen = self.counts[chunk]
+        pos = chunk * CHUNK
+        while seen < target:
+            pos = mm.find(b"\n", pos)
+            if pos < 0:
+                return None
+            pos += 1
+            seen += 1
+        return pos if pos <= self.size else None
+
+
+class _IndexCache:
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, LineIndex] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: str, st: os.stat_result) -> LineIndex:
+        key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+        with self._lock:
+            index = self._entries.get(key)
+            if index is None:
+                index = LineIndex(st.st_size)
+                self._entries[key] = index
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            else:
+                self._entries.move_to_end(key)
+            return index
+
+
+line_indexes = _IndexCache()
+
+
+def _decode(data: bytes, encoding: str) -> str:
+    return data.decode(encoding, errors="replace")
+
+
+def _decode_window(data: bytes, encoding: str, max_chars: int, final: bool) -> tuple[str, int]:
+    """Decode at most ``max_chars`` characters of ``data``.
+
+    Returns the text and the number of bytes it was decoded from, counted
+    by the incremental decoder (a BOM or an undecodable byte does not
+    round-trip through ``encode``). Unless ``final``, a character cut at
+    the end of ``data`` is left for the next window.
+    """
+    def prefix(n: int, last: bool = False) -> tuple[str, int]:
+        decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        text = decoder.decode(data[:n], last)
+        return text, n - len(decoder.getstate()[0])
+
+    text, used = prefix(len(data), final)
+    if len(text) > max_chars:
+        # largest prefix that still fits; decoded length grows with the prefix
+        lo, hi = 0, len(data)
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if len(prefix(mid)[0]) <= max_chars:
+                lo = mid
+            else:
+                hi = mid - 1
+        text, used = prefix(lo)
+    if used == 0 and data:  # a lone partial character: emit it replaced rather than stall
+        text, used = prefix(len(data), True)
+    return text, used
+
+
+def _bom_skip(encoding: str, offset: int) -> int:
+    # utf-8-sig drops its BOM while decoding; the UTF-16 codecs keep it as U+FEFF
+    return 2 if encoding.startswith("utf-16") and offset < 2 else 0
+
+
+def read_window(
+    filepath: str,
+    offset: int | None = None,
+    length: int | None = None,
+    start_line: int | None = None,
+    end_line: int | None = None,
+) -> str:
+    """Read part of a file: a byte window, a line range, or the head."""
+    st = os.stat(filepath)
+    with open(filepath, "rb") as f:
+        if st.st_size == 0:
+            data = f.read(PSEUDO_LIMIT)
+            if not data:
+                return ""
+            index = LineIndex(len(data))  # content may change between reads: never cached
+            return _read_view(filepath, data, len(data), index, offset, length, start_line, end_line)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return _read_view(filepath, mm, st.st_size, None, offset, length, start_line, end_line, st)
+
+
+def _read_view(
+    filepath: str,
+    view: mmap.mmap | bytes,
+    size: int,
+    index: LineIndex | None,
+    offset: int | None,
+    length: int | None,
+    start_line: int | None,
+    end_line: int | None,
+    st: os.stat_result | None = None,
+) -> str:
+    encoding = sniff(view[:BLOCK])
+    if encoding is None:
+        return f"Error: {filepath} looks like a binary file ({size} bytes)"
+    if start_line is not None or end_line is not None:
+        if encoding.startswith("utf-16"):
+            return f"Error: line ranges are not supported for {encoding} files; page with offset/length instead"
+        if index is None:
+            index = line_indexes.get(filepath, st)
+        return _read_lines(view, size, index, encoding, start_line or 1, end_line)
+    if offset is None and length is None:
+        return _read_head(view, encoding, size)
+    return _read_bytes(view, encoding, size, offset or 0, length)
+
+
+def _read_head(mm: mmap.mmap | bytes, encoding: str, size: int) -> str:
+    # 4 bytes per character bounds the slice for any UTF-8 text
+    skip = _bom_skip(encoding, 0)
+    text = _decode(mm[skip:MAX_CHARS * 4 + 4], encoding)
+    if len(text) > MAX_CHARS or size > MAX_CHARS * 4 + 4:
+        return text[:MAX_CHARS] + "\n... (truncated; pass offset/length or start_line/end_line to read more)"
+    return text
+
+
+def _read_bytes(mm: mmap.mmap | bytes, encoding: str, size: int, offset: int, length: int | None) -> str:
+    if offset < 0 or offset >= size:
+        return f"Error: offset {offset} is outside the file (0-{size})"
+    if encoding.startswith("utf-16"):
+        offset -= offset % 2  # stay on code-unit boundaries
+    start = offset + _bom_skip(encoding, offset)
+    end = min(size, offset + (length if length is not None and length > 0 else MAX_CHARS))
+    text, used = _decode_window(mm[start:end], encoding, MAX_CHARS, final=end >= size)
+    end = start + used
+    footer = f"[bytes {offset}-{end} of {size}" + (f"; next offset={end}]" if end < size else "]")
+    return f"{text}\n{footer}"
+
+
+def _read_lines(
+    mm: mmap.mmap | bytes, size: int, index: LineIndex, encoding: str, start: int, end: int | None,
+) -> str:
+    if start < 1 or (end is not None and end < start):
+        return f"Error: invalid line range {start}-{end}"
+    begin = index.line_offset(mm, start)
+    if begin is None or begin >= size:
+        total = index.total_lines(mm)
+        return f"Error: line {start} is past the end of the file" + (f" ({total} lines)" if total else "")
+    stop = index.line_offset(mm, end + 1) if end is not None else None
+    if stop is None:
+        stop = size
+    limit = min(stop, begin + MAX_CHARS * 4)
+    text = _decode(mm[begin:limit], encoding)
+    truncated = limit < stop or len(text) > MAX_CHARS
+    if truncated:
+        # end on a complete line so the next page starts cleanly
+        cut = text.rfind("\n", 0, MAX_CHARS)
+        if cut < 0:
+            # line ``start`` alone overflows the page: continue it by byte offset
+            text, used = _decode_window(mm[begin:limit], encoding, MAX_CHARS, final=limit >= size)
+            return f"{text}\n[line {start} continues; bytes {begin}-{begin + used} of {size}; next offset={begin + used}]"
+        text = text[:cut + 1]
+    last = start + text.count("\n") - (1 if text.endswith("\n") else 0)
+    total = index.total_lines(mm)
+    footer = f"[lines {start}-{last}" + (f" of {total}" if total else "")
+    if truncated or (total is not None and last < total) or (total is None and end is not None):
+        footer += f"; next start_line={last + 1}"
+    body = text.rstrip("\n")
+    return f"{body}\n{footer}]"
@@ -0,0 +1,296 @@
+"""Per-minute model usage buckets behind ``GET /workspaces/insights``.
+
+Chat, ``/v1/chat/completions`` and agent model calls are aggregated in
+memory per (user, model, minute): request count, outcome class, latency
+sum and token estimates. A background thread flushes the pending buckets
+to ``model_metric_buckets`` in one batched upsert, so recording a request
+never touches the database.
+"""
+from __future__ import annotations
+
+import asyncio
+import datetime
+import threading
+import time
+import uuid
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from typing import Any
+
+import httpx
+from core.config import settings
+from core.database import SessionLocal
+from models.records import ModelMetricBucket
+from runtime.context.tokens import MESSAGE_OVERHEAD, HeuristicCounter
+from runtime.errors import ModelRateLimitedError, RunTimeoutError
+from runtime.metrics import get_metrics, timed_stream
+from sqlalchemy import and_, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+_counter = HeuristicCounter()
+
+#: outcome -> bucket column incremented next to request_count
+OUTCOME_COLUMNS = {
+    "ok": "success_count",
+    "4xx": "error_4xx_count",
+    "429": "error_429_count",
+    "5xx": "error_5xx_count",
+    "timeout": "timeout_count",
+}
+
+_SUMMED = (
+    "request_count", "success_count", "error_4xx_count", "error_429_count", "error_5xx_count",
+    "timeout_count", "latency_sum_ms", "input_tokens_estimate", "output_tokens_estimate", "cost_estimate",
+)
+
+
+def classify(error: BaseException | None) -> str:
+    """Outcome class of a model call: ok / 4xx / 429 / 5xx / timeout."""
+    if error is None:
+        return "ok"
+    if isinstance(error, (asyncio.TimeoutError, httpx.TimeoutException, RunTimeoutError)):
+        return "timeout"
+    if isinstance(error, ModelRateLimitedError):
+        return "429"
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        if status == 429:
+            return "429"
+        return "4xx" if 400 <= status < 500 else "5xx"
+    if isinstance(error, (ValueError, PermissionError)):
+        return "4xx"
+    return "5xx"
+
+
+def estimate_input(messages: list[dict[str, Any]]) -> int:
+    total = 0
+    for message in messages or []:
+        content = message.get("content")
+        total += _counter.count(content if isinstance(content, str) else str(content or "")) + MESSAGE_OVERHEAD
+    return total
+
+
+def estimate_output(text: str) -> int:
+    return _counter.count(text or "")
+
+
+@dataclass
+class _Bucket:
+    request_count: int = 0
+    success_count: int = 0
+    error_4xx_count: int = 0
+    error_429_count: int = 0
+    error_5xx_count: int = 0
+    timeout_count: int = 0
+    latency_sum_ms: float = 0.0
+    input_tokens_estimate: int = 0
+    output_tokens_estimate: int = 0
+    cost_estimate: float = 0.0
+
+
+class ModelMetricsRecorder:
+    """In-memory per-minute aggregation with periodic batched upserts."""
+
+    def __init__(self, flush_interval: float = 15.0, session_factory: Any = None):
+        self.flush_interval = flush_interval
+        self._session_factory = session_factory or SessionLocal
+        self._buckets: dict[tuple[int, str, datetime.datetime], _Bucket] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.flushed_rows = 0
+        self.flush_failures = 0
+
+    def record(
+        self,
+        user_id: int | None,
+        model_ref: str | None,
+        latency_ms: float,
+        error: BaseException | None = None,
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+        cost: float = 0.0,
+        outcome: str | None = None,
+    ) -> None:
+        if user_id is None or not model_ref:
+            return  # buckets are per user; anonymous calls only reach the Prometheus metrics
+        outcome = outcome or classify(error)
+        minute = datetime.datetime.utcnow().replace(second=0, microsecond=0)
+        key = (int(user_id), str(model_ref)[:255], minute)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = _Bucket()
+            bucket.request_count += 1
+            column = OUTCOME_COLUMNS.get(outcome, "error_5xx_count")
+            setattr(bucket, column, getattr(bucket, column) + 1)
+            bucket.latency_sum_ms += latency_ms
+            bucket.input_tokens_estimate += int(input_tokens or 0)
+            bucket.output_tokens_estimate += int(output_tokens or 0)
+            bucket.cost_estimate += cost
+
+    def pending(self) -> int:
+        return len(self._buckets)
+
+    def flush(self) -> int:
+        """Upsert every pending bucket in one statement; returns the rows written."""
+        with self._lock:
+            buckets, self._buckets = self._buckets, {}
+        if not buckets:
+            return 0
+        rows = [
+            {"id": uuid.uuid4().hex, "user_id": user_id, "model_ref": model_ref, "bucket_start": minute, **vars(b)}
+            for (user_id, model_ref, minute), b in buckets.items()
+        ]
+        db = self._session_factory()
+        try:
+            _upsert(db, rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            self.flush_failures += 1
+            self._restore(buckets)
+            return 0
+        finally:
+            db.close()
+        self.flushed_rows += len(rows)
+        return len(rows)
+
+    def _restore(self, buckets: dict) -> None:
+        # keep the counts for the next flush instead of dropping them
+        with self._lock:
+            for key, b in buckets.items():
+                current = self._buckets.get(key)
+                if current is None:
+                    self._buckets[key] = b
+                    continue
+                for name in _SUMMED:
+                    setattr(current, name, getattr(current, name) + getattr(b, name))
+
+    # ---- background flusher ----
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="model-metrics-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+        self.flush()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+
+_UPSERT_DIALECTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def _upsert(db: Any, rows: list[dict[str, Any]]) -> None:
+    """Add ``rows`` onto existing buckets with the bind's native upsert.
+
+    SQLite and PostgreSQL share ``ON CONFLICT DO UPDATE``; other dialects
+    fall back to update-then-insert per row inside the same transaction.
+    """
+    table = ModelMetricBucket.__table__
+    insert = _UPSERT_DIALECTS.get(db.get_bind().dialect.name)
+    if insert is not None:
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "model_ref", "bucket_start"],
+            set_={name: table.c[name] + stmt.excluded[name] for name in _SUMMED},
+        )
+        db.execute(stmt, rows)
+        return
+    for row in rows:
+        matched = db.execute(
+            update(table)
+            .where(and_(table.c.user_id == row["user_id"], table.c.model_ref == row["model_ref"],
+                        table.c.bucket_start == row["bucket_start"]))
+            .values({name: table.c[name] + row[name] for name in _SUMMED})
+        ).rowcount
+        if not matched:
+            db.execute(table.insert().values(row))
+
+
+class MeteredRuntime:
+    """Wraps a chat runtime (registry, OpenAIRuntime, pool) and records each call.
+
+    Latency / time-to-first-token go to the Prometheus metrics; the usage
+    bucket is recorded when a ``recorder`` is configured. Other attributes
+    pass through to the wrapped runtime; internal calls (e.g. the session
+    summarizer) go through ``inner`` so they are not counted as requests.
+    """
+
+    def __init__(self, inner: Any, user_id: int | None, recorder: ModelMetricsRecorder | None = None):
+        self.inner = inner
+        self.user_id = user_id
+        self.recorder = recorder
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.inner, name)
+
+    def _record(self, model: str, started: float, messages: list[dict], error=None, output: str = "") -> None:
+        if self.recorder is None:
+            return
+        self.recorder.record(
+            self.user_id, model, (time.perf_counter() - started) * 1000, error=error,
+            input_tokens=estimate_input(messages), output_tokens=estimate_output(output),
+        )
+
+    async def chat(self, model_name: str, messages: list[dict], **kwargs) -> dict:
+        started = time.perf_counter()
+        try:
+            result = await self.inner.chat(model_name, messages, **kwargs)
+        except Exception as e:
+            get_metrics().on_llm_call(duration=time.perf_counter() - started, model=model_name, status=classify(e))
+            self._record(model_name, started, messages, error=e)
+            raise
+        if not result.get("cached"):
+            get_metrics().on_llm_call(duration=time.perf_counter() - started, model=model_name)
+            self._record(model_name, started, messages, output=result.get("content") or "")
+        return result
+
+    async def stream_chat(self, model_name: str, messages: list[dict], **kwargs) -> AsyncIterator[str]:
+        started = time.perf_counter()
+        parts: list[str] = []
+        stream_fn = getattr(self.inner, "stream_chat", None)
+        try:
+            if stream_fn is None:
+                result = await self.inner.chat(model_name, messages, **kwargs)
+                chunks = _single(result.get("content") or "")
+            else:
+                chunks = stream_fn(model_name, messages, **kwargs)
+            async for chunk in timed_stream(chunks, model=model_name):
+                parts.append(chunk)
+                yield chunk
+        except Exception as e:
+            self._record(model_name, started, messages, error=e, output="".join(parts))
+            raise
+        self._record(model_name, started, messages, output="".join(parts))
+
+
+async def _single(text: str) -> AsyncIterator[str]:
+    yield text
+
+
+_recorder: ModelMetricsRecorder | None = None
+
+
+def init_model_metrics(config: Any = None) -> ModelMetricsRecorder | None:
+    """Create (or disable) the process-wide recorder from ``settings.model_metrics``."""
+    global _recorder
+    cfg = config or settings.model_metrics
+    _recorder = ModelMetricsRecorder(flush_interval=cfg.flush_interval_seconds) if cfg.enabled else None
+    return _recorder
+
+
+def get_model_metrics() -> ModelMetricsRecorder | None:
+    return _recorder
+
+
+def metered(runtime: Any, user_id: int | None) -> MeteredRuntime:
+    return MeteredRuntime(runtime, user_id, get_model_metrics())
@@ -40,7 +40,7 @@ class OllamaRuntime(RuntimeEngine):
                 "messages": messages,
                 "stream": False,
             }
-            payload.update(kwargs)
+            payload.update(_ollama_options(kwargs))
             resp = await client.post(f"{self.base_url}/api/chat", json=payload)
             resp.raise_for_status()
             result = resp.json()
@@ -54,7 +54,7 @@ class OllamaRuntime(RuntimeEngine):
         """Stream chat deltas from Ollama (NDJSON lines)."""
         async with httpx.AsyncClient(timeout=120.0) as client:
             payload = {"model": model_name, "messages": messages, "stream": True}
-            payload.update(kwargs)
+            payload.update(_ollama_options(kwargs))
             async with client.stream(
                 "POST", f"{self.base_url}/api/chat", json=payload
             ) as resp:
@@ -74,4 +74,19 @@ class OllamaRuntime(RuntimeEngine):
 
     async def stop(self, model_name: str) -> dict:
         """Unload a model from memory (Ollama handles this implicitly)."""
-        return {"status": "stopped", "model": model_name}
\ No newline at end of file
+        return {"status": "stopped", "model": model_name}
+
+#: sampling parameters Ollama reads from ``options`` rather than the top level
+_SAMPLING_OPTIONS = {"temperature": "temperature", "top_p": "top_p", "top_k": "top_k", "seed": "seed", "max_tokens": "num_predict"}
+
+
+def _ollama_options(kwargs: dict) -> dict:
+    """Request fields for ``/api/chat``: sampling kwargs move under ``options``."""
+    fields = {k: v for k, v in kwargs.items() if k not in _SAMPLING_OPTIONS}
+    options = dict(fields.pop("options", None) or {})
+    for key, name in _SAMPLING_OPTIONS.items():
+        if kwargs.get(key) is not None:
+            options[name] = kwargs[key]
+    if options:
+        fields["options"] = options
+    return fields
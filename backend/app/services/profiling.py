@@ -0,0 +1,303 @@
+"""Opt-in backend profiling behind the admin ``/system/profiling`` routes.
+
+* ``RouteTimingMiddleware`` records time-to-response-start per route
+  template into the shared metrics registry (``http_request_duration``).
+* ``LoopMonitor`` measures event-loop lag with a probe task; a watchdog
+  thread grabs the loop thread's stack when the loop stalls longer than
+  the threshold, which names the blocking callback.
+* ``StackSampler`` is an on-demand sampling profiler thread producing
+  collapsed stacks (``frame;frame;frame count``) for flamegraph tools.
+"""
+from __future__ import annotations
+
+import asyncio
+import collections
+import datetime
+import sys
+import threading
+import time
+import traceback
+import uuid
+from typing import Any
+
+from core.config import settings
+from runtime.metrics import get_metrics
+
+ROUTE_METRIC = "http_request_duration"
+LAG_METRIC = "event_loop_lag_duration"
+
+
+class RouteTimingMiddleware:
+    """ASGI middleware timing each HTTP request until its response starts.
+
+    Streaming responses (SSE) are measured to their first byte, so a
+    long-lived stream does not read as a slow route. Requests that match no
+    route share one ``unmatched`` label to bound cardinality.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        profiler = get_profiler()
+        if scope["type"] != "http" or profiler is None or not profiler.enabled:
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        recorded = False
+
+        def record(status: int) -> None:
+            nonlocal recorded
+            if recorded:
+                return
+            recorded = True
+            get_metrics().record(
+                ROUTE_METRIC, time.perf_counter() - started,
+                method=scope.get("method", ""), route=_route_template(scope), status=f"{status // 100}xx",
+            )
+
+        async def timed_send(message: dict) -> None:
+            if message["type"] == "http.response.start":
+                record(int(message.get("status", 0)))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timed_send)
+        except BaseException:
+            record(500)
+            raise
+
+
+def _route_template(scope: dict) -> str:
+    """Matched path template, including the prefix of included routers."""
+    # FastAPI resolves included routers lazily and keeps the prefixed path
+    # on the effective route context; plain Starlette sets ``route`` only
+    effective = (scope.get("fastapi") or {}).get("effective_route_context")
+    path = getattr(effective, "path", None) or getattr(scope.get("route"), "path", None)
+    return path or "unmatched"
+
+
+class LoopMonitor:
+    """Event-loop lag probe plus a stall watchdog.
+
+    The probe coroutine sleeps ``interval`` and records how late it woke up.
+    The watchdog thread checks the probe's heartbeat; once the loop has been
+    silent for ``threshold`` it captures the loop thread's current stack -
+    the callback that is blocking - and records the stall when it ends.
+    """
+
+    def __init__(self, threshold: float = 0.2, interval: float = 0.05, max_stalls: int = 50):
+        self.threshold = threshold
+        self.interval = interval
+        self.stalls: collections.deque[dict[str, Any]] = collections.deque(maxlen=max_stalls)
+        self._heartbeat = time.monotonic()
+        self._loop_thread: int | None = None
+        self._task: asyncio.Task | None = None
+        self._stop = threading.Event()
+        self._watchdog: threading.Thread | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start on the running loop (call from a coroutine)."""
+        if self.running:
+            return
+        self._loop_thread = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._probe())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-stall-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1.0)
+            self._watchdog = None
+
+    async def _probe(self) -> None:
+        metrics = get_metrics()
+        while True:
+            before = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._heartbeat = now
+            metrics.record(LAG_METRIC, max(0.0, now - before - self.interval))
+
+    def _watch(self) -> None:
+        stall: dict[str, Any] | None = None
+        while not self._stop.wait(self.interval / 2):
+            silent = time.monotonic() - self._heartbeat
+            if stall is None and silent >= self.threshold:
+                frame = sys._current_frames().get(self._loop_thread)
+                stall = {
+                    "at": datetime.datetime.utcnow().isoformat(),
+                    "lag_ms": round(silent * 1000, 1),
+                    "stack": traceback.format_stack(frame) if frame is not None else [],
+                }
+                self.stalls.append(stall)
+            elif stall is not None:
+                if silent < self.threshold:
+                    stall = None
+                else:
+                    stall["lag_ms"] = round(silent * 1000, 1)
+
+
+class StackSampler:
+    """Samples every thread's stack at ``interval`` for ``duration`` seconds.
+
+    Stacks are folded root-first into Brendan Gregg's collapsed format, the
+    input of ``flamegraph.pl`` / speedscope. The sampler's own thread is
+    skipped.
+    """
+
+    def __init__(self, duration: float, interval: float = 0.01):
+        self.id = uuid.uuid4().hex[:12]
+        self.duration = duration
+        self.interval = interval
+        self.samples = 0
+        self.stacks: collections.Counter[str] = collections.Counter()
+        self.started_at = datetime.datetime.utcnow()
+        self.finished_at: datetime.datetime | None = None
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"stack-sampler-{self.id}", daemon=True)
+
+    @property
+    def done(self) -> bool:
+        return self.finished_at is not None
+
+    def start(self) -> StackSampler:
+        self._thread.start()
+        return self
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    def join(self, timeout: float | None = None) -> None:
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        names = {}
+        deadline = time.monotonic() + self.duration
+        while time.monotonic() < deadline and not self._cancel.is_set():
+            if len(names) != threading.active_count():
+                names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                self.stacks[self._fold(names.get(ident, str(ident)), frame)] += 1
+            self.samples += 1
+            self._cancel.wait(self.interval)
+        self.finished_at = datetime.datetime.utcnow()
+
+    @staticmethod
+    def _fold(thread_name: str, frame: Any) -> str:
+        frames = []
+        while frame is not None:
+            code = frame.f_code
+            frames.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+            frame = frame.f_back
+        frames.append(thread_name.replace(";", ":"))
+        return ";".join(reversed(frames))
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "started_at": self.started_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "duration_seconds": self.duration,
+            "interval_ms": round(self.interval * 1000, 3),
+            "samples": self.samples,
+            "stacks": len(self.stacks),
+        }
+
+
+class Profiler:
+    """Process-wide profiling state; disabled until ``profiling.enabled`` or an admin turns it on."""
+
+    MAX_CAPTURES = 5
+
+    def __init__(self, cfg: Any):
+        self.cfg = cfg
+        self.enabled = bool(cfg.enabled)
+        self.loop = LoopMonitor(
+            threshold=cfg.loop_stall_threshold_ms / 1000,
+            interval=cfg.loop_probe_interval_ms / 1000,
+        )
+        self.captures: collections.OrderedDict[str, StackSampler] = collections.OrderedDict()
+
+    async def set_enabled(self, enabled: bool) -> None:
+        self.enabled = enabled
+        if enabled:
+            self.loop.start()
+        else:
+            await self.loop.stop()
+
+    def capture(self, seconds: float, interval_ms: float | None = None) -> StackSampler:
+        """Start a sampling capture; raises ValueError while another one runs."""
+        if any(not c.done for c in self.captures.values()):
+            raise ValueError("a capture is already running")
+        seconds = max(0.1, min(float(seconds), float(self.cfg.max_capture_seconds)))
+        interval = max(1.0, float(interval_ms or self.cfg.sample_interval_ms)) / 1000
+        sampler = StackSampler(seconds, interval).start()
+        self.captures[sampler.id] = sampler
+        while len(self.captures) > self.MAX_CAPTURES:
+            self.captures.popitem(last=False)
+        return sampler
+
+    def routes(self) -> list[dict[str, Any]]:
+        """Latency per (method, route, status class), slowest p95 first."""
+        rows = []
+        for labels, h in get_metrics().series(ROUTE_METRIC):
+            rows.append({
+                **labels,
+                "count": h.count,
+                "avg_ms": round(h.sum / h.count * 1000, 2) if h.count else 0.0,
+                "p50_ms": round(h.quantile(0.5) * 1000, 2),
+                "p95_ms": round(h.quantile(0.95) * 1000, 2),
+                "p99_ms": round(h.quantile(0.99) * 1000, 2),
+                "max_ms": round(h.max * 1000, 2) if h.count else 0.0,
+            })
+        return sorted(rows, key=lambda r: r["p95_ms"], reverse=True)
+
+    def status(self) -> dict[str, Any]:
+        lag = get_metrics().histogram(LAG_METRIC)
+        return {
+            "enabled": self.enabled,
+            "routes": self.routes(),
+            "event_loop": {
+                "monitoring": self.loop.running,
+                "stall_threshold_ms": round(self.loop.threshold * 1000, 1),
+                "lag_p50_ms": round(lag.quantile(0.5) * 1000, 2),
+                "lag_p99_ms": round(lag.quantile(0.99) * 1000, 2),
+                "lag_max_ms": round(lag.max * 1000, 2) if lag.count else 0.0,
+                "stalls": list(self.loop.stalls),
+            },
+            "captures": [c.summary() for c in reversed(self.captures.values())],
+        }
+
+
+_profiler: Profiler | None = None
+
+
+def init_profiler(config: Any = None) -> Profiler:
+    global _profiler
+    _profiler = Profiler(config or settings.profiling)
+    return _profiler
+
+
+def get_profiler() -> Profiler | None:
+    return _profiler
@@ -72,7 +72,11 @@ class RemoteProviderService:
         rows = self.db.query(RemoteProviderConfig).filter(RemoteProviderConfig.user_id == user_id).order_by(RemoteProviderConfig.name).all()
         return [row.to_public_dict() for row in rows]
 
-    def save(self, user_id: int, *, name: str, base_url: str, protocol: str, default_model: str, api_key: str | None) -> dict:
+    def save(
+        self, user_id: int, *, name: str, base_url: str, protocol: str, default_model: str, api_key: str | None,
+        requests_per_minute: int | None = None, tokens_per_minute: int | None = None, max_concurrency: int | None = None,
+    ) -> dict:
+        """Create or update a provider; unset quotas fall back to ``remote_rate_limit``."""
         name = name.strip()
         if not name or len(name) > 100:
             raise RemoteProviderError("Provider name must contain 1–100 characters.")
@@ -80,6 +84,10 @@ class RemoteProviderService:
             raise RemoteProviderError("Protocol must be responses or chat_completions.")
         if not default_model.strip():
             raise RemoteProviderError("A default model is required.")
+        if any(v is not None and v < 0 for v in (requests_per_minute, tokens_per_minute)) or (
+            max_concurrency is not None and max_concurrency < 1
+        ):
+            raise RemoteProviderError("Rate limits must be non-negative and concurrency at least 1.")
         base_url = normalize_base_url(base_url)
         row = self.db.query(RemoteProviderConfig).filter(RemoteProviderConfig.user_id == user_id, RemoteProviderConfig.name == name).one_or_none()
         if row is None:
@@ -88,6 +96,8 @@ class RemoteProviderService:
             row = RemoteProviderConfig(user_id=user_id, name=name)
             self.db.add(row)
         row.base_url, row.protocol, row.default_model, row.enabled = base_url, protocol, default_model.strip(), True
+        row.requests_per_minute, row.tokens_per_minute = requests_per_minute, tokens_per_minute
+        row.max_concurrency = max_concurrency
         if api_key:
             row.key_ciphertext = self.cipher.encrypt(api_key.strip())
         self.db.commit()
@@ -149,7 +159,7 @@ class RemoteProviderService:
         row = self.db.query(RemoteProviderConfig).filter(RemoteProviderConfig.user_id == user_id, RemoteProviderConfig.id == provider_id, RemoteProviderConfig.enabled.is_(True)).one_or_none()
         if row is None:
             raise RemoteProviderError("Provider not found or disabled.")
-        return {"base_url": row.base_url, "protocol": row.protocol, "default_model": row.default_model, "api_key": self.cipher.decrypt(row.key_ciphertext)}
+        return {"id": row.id, "base_url": row.base_url, "protocol": row.protocol, "default_model": row.default_model, "api_key": self.cipher.decrypt(row.key_ciphertext), "rate_limits": row.rate_limits()}
 
     def resolve_verified(self, user_id: int, provider_id: int, model_name: str) -> dict:
         """Resolve a ready remote target for internal runtime use only.
@@ -175,6 +185,7 @@ class RemoteProviderService:
             "protocol": row.protocol,
             "model": model_name,
             "api_key": self.cipher.decrypt(row.key_ciphertext),
+            "rate_limits": row.rate_limits(),
         }
 
     @staticmethod
@@ -1,35 +1,89 @@
-"""Runtime registry: lazy per-backend runtime instances with LRU-ish eviction."""
+"""Runtime registry: lazy per-backend runtime instances with LRU eviction."""
+
+from collections import OrderedDict
+from collections.abc import AsyncIterator
 
 from core.config import settings
+from runtime.models.cache import cache_enabled_for, cache_key, get_response_cache
 from services.ollama_runtime import OllamaRuntime
 
+#: Backend aliases that share one runtime instance (and one resident model set).
+_ALIASES = {"local-gguf": "local", "local-transformers": "local"}
+
+
+async def cached_chat(chat, namespace: str, model_name: str, messages: list, kwargs: dict) -> dict:
+    """``chat(model_name, messages, **kwargs)`` answered from the response cache when it applies."""
+    opt_in = kwargs.pop("response_cache", None)
+    cache = get_response_cache()
+    if cache is None or not cache_enabled_for({**kwargs, "response_cache": opt_in}):
+        return await chat(model_name, messages, **kwargs)
+    key = cache_key(f"{namespace}:{model_name}", messages, params=kwargs)
+    hit = await cache.aget(key)
+    if hit is not None:
+        return {**hit, "cached": True}
+    result = await chat(model_name, messages, **kwargs)
+    if result.get("content"):
+        await cache.aput(key, {k: v for k, v in result.items() if k != "raw"})
+    return result
+
+
+class CachedRuntime:
+    """Runtime decorator with the registry's response-cache rules (remote chat providers)."""
+
+    def __init__(self, inner: object, namespace: str):
+        self.inner = inner
+        self.namespace = namespace
+
+    def __getattr__(self, name: str):
+        return getattr(self.inner, name)
+
+    async def chat(self, model_name: str, messages: list, **kwargs) -> dict:
+        return await cached_chat(self.inner.chat, self.namespace, model_name, messages, kwargs)
+
+    async def stream_chat(self, model_name: str, messages: list, **kwargs) -> AsyncIterator[str]:
+        kwargs.pop("response_cache", None)
+        async for chunk in self.inner.stream_chat(model_name, messages, **kwargs):
+            yield chunk
+
 
 class RuntimeRegistry:
     """Registry that lazily creates runtime engines by name and delegates calls.
 
     Default runtime is Ollama. Local (transformers/gguf) and OpenAI-compatible
     runtimes are created on demand without importing heavy deps at startup.
+    Evicted runtimes are released so their loaded models do not leak.
     """
 
     MAX_RUNTIMES = 3
 
     def __init__(self):
-        self._runtimes: dict[str, object] = {}
+        self._runtimes: OrderedDict[str, object] = OrderedDict()
         self._default = "ollama"
 
     def get(self, name: str | None = None) -> object:
-        name = name or self._default
-        if name not in self._runtimes:
-            if len(self._runtimes) >= self.MAX_RUNTIMES:
-                # evict the first (oldest) runtime
-                self._runtimes.pop(next(iter(self._runtimes)))
-            self._runtimes[name] = self._create(name)
+        name = _ALIASES.get(name or self._default, name or self._default)
+        if name in self._runtimes:
+            self._runtimes.move_to_end(name)
+            return self._runtimes[name]
+        if len(self._runtimes) >= self.MAX_RUNTIMES:
+            _, evicted = self._runtimes.popitem(last=False)
+            self._release(evicted)
+        self._runtimes[name] = self._create(name)
         return self._runtimes[name]
 
+    @staticmethod
+    def _release(runtime: object) -> None:
+        release = getattr(runtime, "release", None)
+        if callable(release):
+            try:
+                release()
+            except Exception:
+                pass
+
     def _create(self, name: str) -> object:
         if name == "ollama":
             return OllamaRuntime(settings.ollama_base_url)
-        if name in ("local", "local-gguf", "local-transformers"):
+        if name == "local":
             from services.runtimes.local_runtime import LocalRuntime
             return LocalRuntime()
         if name == "openai":
@@ -41,19 +95,49 @@ class RuntimeRegistry:
         return await self.get().load(model_name, **kwargs)
 
     async def chat(self, model_name: str, messages: list, **kwargs) -> dict:
-        return await self.get().chat(model_name, messages, **kwargs)
+        """Delegate to the default runtime, via the response cache when it applies.
+
+        The cache (``response_cache`` settings) is consulted for temperature-0
+        calls or when the caller passes ``response_cache=True``.
+        """
+        return await cached_chat(self.get().chat, self._default, model_name, messages, kwargs)
+
+    async def stream_chat(self, model_name: str, messages: list, **kwargs) -> AsyncIterator[str]:
+        """Stream from the default runtime; runtimes without streaming yield one chunk."""
+        kwargs.pop("response_cache", None)  # streams are never cached
+        runtime = self.get()
+        stream_fn = getattr(runtime, "stream_chat", None)
+        if stream_fn is None:
+            result = await self.chat(model_name, messages, **kwargs)
+            yield result.get("content", "")
+            return
+        async for chunk in stream_fn(model_name, messages, **kwargs):
+            yield chunk
 
     async def stop(self, model_name: str, **kwargs) -> dict:
         return await self.get().stop(model_name, **kwargs)
 
+    def prewarm(self, model_name: str, pin: bool = False) -> dict:
+        """Background-load a local model into the resident set."""
+        return self.get("local").prewarm(model_name, pin=pin)
+
+    def residency(self) -> dict:
+        """Resident-model status; read-only, so it never creates or evicts a runtime."""
+        if "local" not in self._runtimes:
+            return {"models": [], "loading": [], "local_runtime": False}
+        return self._runtimes["local"].status()
+
     def status(self) -> dict:
-        return {
+        out = {
             "default": self._default,
             "runtimes": {k: type(v).__name__ for k, v in self._runtimes.items()},
         }
+        if "local" in self._runtimes:
+            out["residency"] = self._runtimes["local"].status()
+        return out
 
 
 registry = RuntimeRegistry()
 
 def get_runtime() -> RuntimeRegistry:
-    return registry
\ No newline at end of file
+    return registry
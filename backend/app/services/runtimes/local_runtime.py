@@ -1,101 +1,89 @@
 """Local inference runtime: transformers + GGUF (llama-cpp), ported from legacy model_generate."""
 
 from services.runtime import RuntimeEngine
+from services.runtimes.model_residency import (
+    ModelResidencyManager,
+    get_residency_manager,
+    is_gguf_model,
+)
 
 
 class LocalRuntime(RuntimeEngine):
     """Local model inference via transformers / llama-cpp-python.
 
     Heavy imports (torch, transformers, llama_cpp) happen lazily on first load
-    so this module can be imported without the AI stack installed.
+    so this module can be imported without the AI stack installed. Loaded
+    weights live in the shared ModelResidencyManager keyed by model path, so
+    several models stay hot and ``model_name`` always selects its own weights.
     """
 
-    def __init__(self, model_path: str | None = None):
+    def __init__(self, model_path: str | None = None, residency: ModelResidencyManager | None = None):
         self.model_path = model_path
-        self._model = None
-        self._tokenizer = None
-        self._is_gguf = False
+        self.residency = residency or get_residency_manager()
 
     @staticmethod
     def _is_gguf_model(path: str) -> bool:
-        import os
-        if os.path.isfile(path) and path.lower().endswith(".gguf"):
-            return True
-        if os.path.isdir(path):
-            return any(f.lower().endswith(".gguf") for f in os.listdir(path))
-        return False
+        return is_gguf_model(path)
+
+    def _path(self, model_name: str) -> str:
+        return self.model_path or model_name
 
     async def load(self, model_name: str, **kwargs) -> dict:
-        """Load a local model (directory or .gguf file)."""
-        path = self.model_path or model_name
-        self._is_gguf = self._is_gguf_model(path)
-        if self._is_gguf:
-            from llama_cpp import Llama
-            gguf_path = path if path.lower().endswith(".gguf") else None
-            if gguf_path is None:
-                import os
-                gguf_path = os.path.join(
-                    path,
-                    [f for f in os.listdir(path) if f.lower().endswith(".gguf")][0],
-                )
-            self._model = Llama(model_path=gguf_path, n_ctx=kwargs.get("input_max_length", 4096))
-            self._tokenizer = None
-        else:
-            import torch
-            from transformers import AutoModelForCausalLM, AutoTokenizer
-            # Model repositories and local model directories are untrusted input.
-            # Keep custom repository code disabled; supported architectures must
-            # use Transformers' built-in implementations.
-            self._tokenizer = AutoTokenizer.from_pretrained(path, trust_remote_code=False)
-            device = "cuda" if torch.cuda.is_available() else "cpu"
-            self._model = AutoModelForCausalLM.from_pretrained(
-                path, trust_remote_code=False,
-                torch_dtype=torch.float16 if device == "cuda" else torch.float32,
-            ).to(device)
-            self._model.eval()
-        return {"status": "loaded", "model": model_name}
+        """Load a local model (directory or .gguf file) into the resident set."""
+        entry = await self.residency.acquire(self._path(model_name), **kwargs)
+        return {"status": "loaded", "model": model_name, "device": entry.device,
+                "footprint_mb": entry.to_dict()["footprint_mb"]}
 
     async def chat(self, model_name: str, messages: list, **kwargs) -> dict:
         """Run a chat turn locally."""
-        if self._model is None:
-            await self.load(model_name)
+        entry = await self.residency.acquire(self._path(model_name))
         prompt = self._build_prompt(messages)
         max_tokens = int(kwargs.get("max_new_tokens", 2048))
         temperature = float(kwargs.get("temperature", 0.7))
-        if self._is_gguf:
-            output = self._model(
+        if entry.is_gguf:
+            output = entry.model(
                 prompt, max_tokens=max_tokens, temperature=temperature, stop=["User:"]
             )
             content = output["choices"][0]["text"].strip()
         else:
             import torch
-            inputs = self._tokenizer(
+            inputs = entry.tokenizer(
                 prompt, return_tensors="pt", max_length=4096, truncation=True
-            ).to(self._model.device)
+            ).to(entry.model.device)
             with torch.inference_mode():
-                outputs = self._model.generate(
+                outputs = entry.model.generate(
                     **inputs, max_new_tokens=max_tokens, temperature=temperature,
                     do_sample=True, top_k=int(kwargs.get("top_k", 50)),
                 )
-            content = self._tokenizer.decode(
+            content = entry.tokenizer.decode(
                 outputs[0], skip_special_tokens=True, clean_up_tokenization_spaces=True
             )
             content = self._release_response(content)
         return {"model": model_name, "content": content, "raw": None}
 
     async def stop(self, model_name: str) -> dict:
-        try:
-            if self._model is not None:
-                if not self._is_gguf:
-                    self._model.to("cpu")
-                del self._model
-                self._model = None
-            if self._tokenizer is not None:
-                del self._tokenizer
-                self._tokenizer = None
-        except Exception:
-            pass
-        return {"status": "stopped", "model": model_name}
+        unloaded = self.residency.unload(self._path(model_name))
+        return {"status": "stopped", "model": model_name, "unloaded": unloaded}
+
+    def prewarm(self, model_name: str, pin: bool = False, **kwargs) -> dict:
+        """Load in the background so the first chat finds the model resident."""
+        path = self._path(model_name)
+        if pin:
+            self.residency.pin(path)
+        return {"model": model_name, **self.residency.prewarm(path, **kwargs)}
+
+    def pin(self, model_name: str) -> None:
+        self.residency.pin(self._path(model_name))
+
+    def unpin(self, model_name: str) -> None:
+        self.residency.unpin(self._path(model_name))
+
+    def release(self) -> int:
+        """Unload every unpinned model (called when the registry retires this runtime)."""
+        return self.residency.unload_all(include_pinned=False)
+
+    def status(self) -> dict:
+        return self.residency.status()
 
     @staticmethod
     def _build_prompt(messages: list) -> str:
@@ -112,4 +100,4 @@ class LocalRuntime(RuntimeEngine):
             return full_output.strip()
         after = full_output[idx + len("User:"):]
         a_idx = after.find("Assistant:")
-        return after[a_idx + len("Assistant:"):].strip() if a_idx != -1 else after.strip()
\ No newline at end of file
+        return after[a_idx + len("Assistant:"):].strip() if a_idx != -1 else after.strip()
@@ -0,0 +1,392 @@
+"""Model residency: keep several local models loaded under a memory budget.
+
+Local runtimes used to hold exactly one model, so switching between two
+models either reused the wrong weights or paid a full reload. The residency
+manager keeps a small hot set keyed by model path, accounts the RAM / VRAM
+footprint of each entry and evicts least-recently-used, unpinned models when
+a new load would exceed the budget. Heavy imports stay inside the loaders.
+"""
+from __future__ import annotations
+
+import asyncio
+import gc
+import logging
+import os
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from core.config import settings
+
+logger = logging.getLogger("modelforge.runtime.residency")
+
+_MB = 1024 * 1024
+#: Share of host memory a derived budget may claim.
+AUTO_RAM_SHARE = 0.5
+AUTO_VRAM_SHARE = 0.9
+
+
+@dataclass
+class ResidentModel:
+    """One loaded local model with its accounted footprint."""
+
+    path: str
+    model: Any
+    tokenizer: Any = None
+    is_gguf: bool = False
+    device: str = "cpu"
+    footprint_bytes: int = 0
+    pinned: bool = False
+    loaded_at: float = 0.0
+    last_used: float = 0.0
+    hits: int = 0
+    # token counter built from this model's tokenizer; dropped with the entry
+    token_counter: Any = None
+
+    @property
+    def pool(self) -> str:
+        """Memory pool the footprint is charged to: ``vram`` or ``ram``."""
+        return "vram" if str(self.device).startswith("cuda") else "ram"
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "path": self.path,
+            "format": "gguf" if self.is_gguf else "transformers",
+            "device": self.device,
+            "pool": self.pool,
+            "footprint_mb": round(self.footprint_bytes / _MB, 1),
+            "pinned": self.pinned,
+            "hits": self.hits,
+            "idle_seconds": round(time.monotonic() - self.last_used, 1) if self.last_used else None,
+        }
+
+
+def is_gguf_model(path: str) -> bool:
+    if os.path.isfile(path) and path.lower().endswith(".gguf"):
+        return True
+    if os.path.isdir(path):
+        return any(f.lower().endswith(".gguf") for f in os.listdir(path))
+    return False
+
+
+def estimate_footprint(path: str) -> int:
+    """On-disk weight size: a cheap pre-load estimate of the resident footprint."""
+    weight_ext = (".gguf", ".safetensors", ".bin", ".pt", ".pth")
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    if os.path.isdir(path):
+        for name in os.listdir(path):
+            full = os.path.join(path, name)
+            if name.lower().endswith(weight_ext) and os.path.isfile(full):
+                total += os.path.getsize(full)
+    return total
+
+
+def _measured_footprint(model: Any, path: str) -> int:
+    getter = getattr(model, "get_memory_footprint", None)
+    if callable(getter):
+        try:
+            return int(getter())
+        except Exception:
+            pass
+    params = getattr(model, "parameters", None)
+    if callable(params):
+        try:
+            return int(sum(p.numel() * p.element_size() for p in params()))
+        except Exception:
+            pass
+    return estimate_footprint(path)
+
+
+def load_local_model(path: str, **kwargs: Any) -> ResidentModel:
+    """Load a local model directory or .gguf file (blocking; run off-loop)."""
+    if is_gguf_model(path):
+        from llama_cpp import Llama
+        gguf_path = path if path.lower().endswith(".gguf") else os.path.join(
+            path, [f for f in os.listdir(path) if f.lower().endswith(".gguf")][0],
+        )
+        model = Llama(model_path=gguf_path, n_ctx=kwargs.get("input_max_length", 4096))
+        return ResidentModel(path=path, model=model, is_gguf=True, device="cpu",
+                             footprint_bytes=estimate_footprint(gguf_path))
+    import torch
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+    # Model repositories and local model directories are untrusted input.
+    # Keep custom repository code disabled; supported architectures must
+    # use Transformers' built-in implementations.
+    tokenizer = AutoTokenizer.from_pretrained(path, trust_remote_code=False)
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    model = AutoModelForCausalLM.from_pretrained(
+        path, trust_remote_code=False,
+        torch_dtype=torch.float16 if device == "cuda" else torch.float32,
+    ).to(device)
+    model.eval()
+    return ResidentModel(path=path, model=model, tokenizer=tokenizer, device=device,
+                         footprint_bytes=_measured_footprint(model, path))
+
+
+def unload_local_model(entry: ResidentModel) -> None:
+    """Release weights and allocator caches of an evicted model."""
+    try:
+        if entry.is_gguf:
+            close = getattr(entry.model, "close", None)
+            if callable(close):
+                close()
+        elif entry.model is not None and hasattr(entry.model, "to"):
+            entry.model.to("cpu")
+    except Exception:
+        pass
+    entry.model = None
+    entry.tokenizer = None
+    gc.collect()
+    if entry.pool == "vram":
+        try:
+            import torch
+            torch.cuda.empty_cache()
+        except Exception:
+            pass
+
+
+def _predict_pool(path: str) -> str:
+    """Pool a model will land in, decided before the (blocking) load."""
+    if is_gguf_model(path):
+        return "ram"
+    try:
+        import torch
+        return "vram" if torch.cuda.is_available() else "ram"
+    except Exception:
+        return "ram"
+
+
+def _auto_budget(pool: str) -> int:
+    if pool == "ram":
+        try:
+            import psutil
+            return int(psutil.virtual_memory().total * AUTO_RAM_SHARE)
+        except Exception:
+            return 0
+    try:
+        import torch
+        if torch.cuda.is_available():
+            return int(torch.cuda.get_device_properties(0).total_memory * AUTO_VRAM_SHARE)
+    except Exception:
+        pass
+    return 0
+
+
+class ModelResidencyManager:
+    """LRU set of loaded local models bounded by count and RAM / VRAM budgets.
+
+    Budgets are soft: when every resident model is pinned the new load still
+    proceeds (with a warning) rather than failing the request.
+    """
+
+    def __init__(
+        self,
+        *,
+        ram_budget_bytes: int | None = None,
+        vram_budget_bytes: int | None = None,
+        max_resident: int = 3,
+        pinned: list[str] | None = None,
+        loader: Callable[..., ResidentModel] | None = None,
+        unloader: Callable[[ResidentModel], None] | None = None,
+    ):
+        self._budgets: dict[str, int | None] = {"ram": ram_budget_bytes, "vram": vram_budget_bytes}
+        self.max_resident = max(1, int(max_resident))
+        self._pinned: set[str] = {self.key(p) for p in (pinned or [])}
+        self._models: OrderedDict[str, ResidentModel] = OrderedDict()
+        self._loading: dict[str, asyncio.Task] = {}
+        self._prewarms: dict[str, asyncio.Task] = {}
+        self._loader = loader or load_local_model
+        self._unloader = unloader or unload_local_model
+        self.loads = 0
+        self.hits = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(path: str) -> str:
+        return os.path.normpath(str(path))
+
+    def budget(self, pool: str) -> int:
+        """Effective budget in bytes for ``ram`` / ``vram`` (0 = unbounded)."""
+        value = self._budgets.get(pool)
+        if value is None:
+            value = _auto_budget(pool)
+            self._budgets[pool] = value
+        return value
+
+    def used(self, pool: str) -> int:
+        return sum(m.footprint_bytes for m in self._models.values() if m.pool == pool)
+
+    def get(self, path: str) -> ResidentModel | None:
+        return self._models.get(self.key(path))
+
+    def lookup(self, model: str) -> ResidentModel | None:
+        """Resident entry for a model path or a bare model name (file / directory name)."""
+        entry = self.get(model)
+        if entry is not None:
+            return entry
+        name = os.path.basename(self.key(model))
+        for key, candidate in self._models.items():
+            base = os.path.basename(key)
+            if name in (base, os.path.splitext(base)[0]):
+                return candidate
+        return None
+
+    def is_resident(self, path: str) -> bool:
+        return self.key(path) in self._models
+
+    # ---- load / evict ----
+    async def acquire(self, path: str, **kwargs: Any) -> ResidentModel:
+        """Return the resident model for ``path``, loading it on a miss.
+
+        Concurrent callers for the same path share one in-flight load.
+        """
+        key = self.key(path)
+        entry = self._models.get(key)
+        if entry is not None:
+            self._touch(key, entry)
+            self.hits += 1
+            return entry
+        task = self._loading.get(key)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._load(key, path, kwargs))
+            self._loading[key] = task
+            task.add_done_callback(lambda _t, k=key: self._loading.pop(k, None))
+        entry = await asyncio.shield(task)
+        self._touch(key, entry)
+        return entry
+
+    async def _load(self, key: str, path: str, kwargs: dict[str, Any]) -> ResidentModel:
+        # both stat the weights and the pool probe imports torch: keep them off the loop
+        needed, pool = await asyncio.to_thread(lambda: (estimate_footprint(path), _predict_pool(path)))
+        self._make_room(needed, pool)
+        started = time.monotonic()
+        entry = await asyncio.to_thread(self._loader, path, **kwargs)
+        entry.path = key
+        entry.pinned = key in self._pinned
+        entry.loaded_at = time.monotonic()
+        self._models[key] = entry
+        self.loads += 1
+        # the real footprint is only known after loading: re-check the budget
+        self._make_room(0, entry.pool, exclude=key)
+        logger.info("model resident path=%s device=%s footprint_mb=%.1f load_s=%.2f",
+                    key, entry.device, entry.footprint_bytes / _MB, time.monotonic() - started)
+        return entry
+
+    def _touch(self, key: str, entry: ResidentModel) -> None:
+        entry.last_used = time.monotonic()
+        entry.hits += 1
+        if key in self._models:
+            self._models.move_to_end(key)
+
+    def _victim(self, pool: str | None, exclude: str | None) -> str | None:
+        """Least-recently-used unpinned model, optionally restricted to a pool."""
+        for key, entry in self._models.items():  # oldest first
+            if key == exclude or entry.pinned:
+                continue
+            if pool is None or entry.pool == pool:
+                return key
+        return None
+
+    def _count_bound(self, exclude: str | None) -> bool:
+        return len(self._models) + (0 if exclude is not None else 1) > self.max_resident
+
+    def _memory_bound(self, needed: int, pool: str) -> bool:
+        limit = self.budget(pool)
+        return bool(limit) and self.used(pool) + needed > limit
+
+    def _make_room(self, needed: int, pool: str, exclude: str | None = None) -> None:
+        while self._count_bound(exclude) or self._memory_bound(needed, pool):
+            victim = self._victim(None if self._count_bound(exclude) else pool, exclude)
+            if victim is None:
+                logger.warning("model residency over budget; all resident models are pinned")
+                return
+            self.evict(victim)
+
+    def evict(self, path: str) -> bool:
+        entry = self._models.pop(self.key(path), None)
+        if entry is None:
+            return False
+        self.evictions += 1
+        entry.token_counter = None
+        self._unloader(entry)
+        logger.info("model evicted path=%s footprint_mb=%.1f", entry.path, entry.footprint_bytes / _MB)
+        return True
+
+    def unload(self, path: str) -> bool:
+        """Explicit stop: unload even if pinned (pinning survives for the next load)."""
+        return self.evict(path)
+
+    def unload_all(self, include_pinned: bool = False) -> int:
+        victims = [k for k, m in self._models.items() if include_pinned or not m.pinned]
+        for key in victims:
+            self.evict(key)
+        return len(victims)
+
+    # ---- pinning / pre-warm ----
+    def pin(self, path: str) -> None:
+        key = self.key(path)
+        self._pinned.add(key)
+        if key in self._models:
+            self._models[key].pinned = True
+
+    def unpin(self, path: str) -> None:
+        key = self.key(path)
+        self._pinned.discard(key)
+        if key in self._models:
+            self._models[key].pinned = False
+
+    def prewarm(self, path: str, **kwargs: Any) -> dict[str, Any]:
+        """Start a background load so the first request finds the model hot."""
+        key = self.key(path)
+        if key in self._models:
+            return {"path": key, "status": "resident"}
+        if key in self._prewarms or key in self._loading:
+            return {"path": key, "status": "loading"}
+        task = asyncio.get_running_loop().create_task(self.acquire(path, **kwargs))
+        self._prewarms[key] = task
+        task.add_done_callback(lambda t, k=key: self._prewarm_done(k, t))
+        return {"path": key, "status": "loading"}
+
+    def _prewarm_done(self, key: str, task: asyncio.Task) -> None:
+        self._prewarms.pop(key, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("model prewarm failed path=%s error=%s", key, task.exception())
+
+    def status(self) -> dict[str, Any]:
+        return {
+            "max_resident": self.max_resident,
+            "pools": {
+                pool: {
+                    "used_mb": round(self.used(pool) / _MB, 1),
+                    "budget_mb": round(self.budget(pool) / _MB, 1) if self.budget(pool) else None,
+                }
+                for pool in ("ram", "vram")
+            },
+            "models": [m.to_dict() for m in reversed(self._models.values())],
+            "loading": sorted(set(self._loading) | set(self._prewarms)),
+            "pinned": sorted(self._pinned),
+            "loads": self.loads,
+            "hits": self.hits,
+            "evictions": self.evictions,
+        }
+
+
+_manager: ModelResidencyManager | None = None
+
+
+def get_residency_manager() -> ModelResidencyManager:
+    """Process-wide residency manager configured from ``settings.local_models``."""
+    global _manager
+    if _manager is None:
+        cfg = settings.local_models
+        _manager = ModelResidencyManager(
+            ram_budget_bytes=cfg.memory_budget_mb * _MB if cfg.memory_budget_mb else None,
+            vram_budget_bytes=cfg.vram_budget_mb * _MB if cfg.vram_budget_mb else None,
+            max_resident=cfg.max_resident,
+            pinned=list(cfg.pinned),
+        )
+    return _manager
@@ -2,20 +2,27 @@
 from __future__ import annotations
 
 from collections.abc import AsyncIterator
+from contextlib import nullcontext
 from typing import Any
 
 import httpx
+from runtime.models.rate_limit import estimate_tokens, get_rate_limiter, send_limited
 from services.runtime import RuntimeEngine
 
 
 class OpenAIRuntime(RuntimeEngine):
     """Call one user-selected OpenAI-compatible provider without persisting its key."""
 
-    def __init__(self, api_key: str, base_url: str, model: str, protocol: str = "responses"):
+    def __init__(
+        self, api_key: str, base_url: str, model: str, protocol: str = "responses",
+        rate_limits: dict[str, Any] | None = None,
+    ):
         self.api_key = api_key
         self.base_url = base_url.rstrip("/")
         self.default_model = model
         self.protocol = protocol
+        # one limiter per provider credential, shared with agent runs and RAG
+        self.limiter = get_rate_limiter(self.base_url, api_key, rate_limits)
 
     @property
     def _headers(self) -> dict[str, str]:
@@ -27,6 +34,14 @@ class OpenAIRuntime(RuntimeEngine):
     def _endpoint(self) -> str:
         return f"{self.base_url}/responses" if self.protocol == "responses" else f"{self.base_url}/chat/completions"
 
+    @staticmethod
+    def _usage_tokens(response: Any) -> int | None:
+        usage = response.json().get("usage") or {}
+        total = usage.get("total_tokens")
+        if total is None:
+            total = int(usage.get("input_tokens") or 0) + int(usage.get("output_tokens") or 0)
+        return int(total) or None
+
     @staticmethod
     def _can_fallback(exc: httpx.HTTPStatusError, protocol: str) -> bool:
         return protocol == "responses" and exc.response.status_code in {404, 405, 501}
@@ -76,7 +91,12 @@ class OpenAIRuntime(RuntimeEngine):
                     payload[key] = kwargs[key]
         async with httpx.AsyncClient(timeout=90.0, follow_redirects=False) as client:
             endpoint = f"{self.base_url}/responses" if protocol == "responses" else f"{self.base_url}/chat/completions"
-            response = await client.post(endpoint, headers=self._headers, json=payload)
+            response = await send_limited(
+                self.limiter,
+                lambda: client.post(endpoint, headers=self._headers, json=payload),
+                tokens=estimate_tokens(messages, kwargs.get("max_tokens")),
+                usage=self._usage_tokens,
+            )
         response.raise_for_status()
         data = response.json()
         content = self._responses_text(data) if protocol == "responses" else ((data.get("choices") or [{}])[0].get("message") or {}).get("content", "")
@@ -109,9 +129,14 @@ class OpenAIRuntime(RuntimeEngine):
             for key in ("temperature", "top_p", "max_tokens"):
                 if kwargs.get(key) is not None:
                     payload[key] = kwargs[key]
-        async with httpx.AsyncClient(timeout=None, follow_redirects=False) as client:
+        tokens = estimate_tokens(messages, kwargs.get("max_tokens"))
+        slot = self.limiter.slot(tokens) if self.limiter is not None else nullcontext(None)
+        async with slot as permit, httpx.AsyncClient(timeout=None, follow_redirects=False) as client:
             endpoint = f"{self.base_url}/responses" if protocol == "responses" else f"{self.base_url}/chat/completions"
             async with client.stream("POST", endpoint, headers=self._headers, json=payload) as response:
+                if permit is not None:
+                    # the stream holds its concurrency slot until it ends
+                    permit.record(response.status_code, response.headers)
                 response.raise_for_status()
                 async for line in response.aiter_lines():
                     if not line.startswith("data:"):
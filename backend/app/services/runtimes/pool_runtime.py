@@ -0,0 +1,85 @@
+"""Chat runtime that balances one model across several remote providers or a configured pool."""
+from __future__ import annotations
+
+import os
+from collections.abc import AsyncIterator
+
+from core.config import ModelPoolSettings, settings
+from runtime.models.pool import (
+    EndpointBalancer,
+    PoolCache,
+    PoolMember,
+    balancer_options,
+    http_probe,
+    pool_key,
+)
+from services.ollama_runtime import OllamaRuntime
+from services.runtime import RuntimeEngine
+from services.runtimes.openai_api_runtime import OpenAIRuntime
+
+
+class RemotePoolRuntime(RuntimeEngine):
+    """Least-outstanding / EWMA selection with failover over OpenAI-compatible endpoints."""
+
+    def __init__(self, members: list[tuple[str, RuntimeEngine]], **options):
+        options.setdefault("probe", http_probe)
+        self.balancer = EndpointBalancer([PoolMember(name, rt) for name, rt in members], **options)
+
+    async def load(self, model_name: str, **kwargs) -> dict:
+        return {"status": "ready", "model": model_name, "remote": True, "pool": len(self.balancer.members)}
+
+    async def stop(self, model_name: str) -> dict:
+        return {"status": "detached", "model": model_name, "remote": True}
+
+    async def chat(self, model_name: str, messages: list[dict], **kwargs) -> dict:
+        return await self.balancer.call(lambda m: m.provider.chat(model_name, messages, **kwargs))
+
+    async def stream_chat(self, model_name: str, messages: list[dict], **kwargs) -> AsyncIterator[str]:
+        async for delta in self.balancer.stream(lambda m: m.provider.stream_chat(model_name, messages, **kwargs)):
+            yield delta
+
+
+    def close(self) -> None:
+        self.balancer.close()
+
+
+_pools = PoolCache()
+
+
+def remote_pool_runtime(providers: list[dict]) -> RemotePoolRuntime:
+    """Pool for resolved provider dicts (``RemoteProviderService.resolve``), reused across requests."""
+    members = [(str(p.get("id") or p["base_url"]), p) for p in providers]
+    return _pools.get(pool_key(members, providers[0].get("default_model", "")), lambda: RemotePoolRuntime(
+        [(name, OpenAIRuntime(
+            api_key=p["api_key"], base_url=p["base_url"],
+            model=p["default_model"], protocol=p["protocol"], rate_limits=p.get("rate_limits"),
+        )) for name, p in members],
+        **balancer_options(ModelPoolSettings()),
+    ))
+
+
+def model_pool_runtime(name: str) -> RemotePoolRuntime:
+    """Chat runtime over the ``settings.model_pools`` entry ``name``; the model is chosen per call."""
+    cfg = settings.model_pools.get(name)
+    if cfg is None or not cfg.endpoints:
+        raise ValueError(f"model pool {name!r} is not configured")
+
+    def build() -> RemotePoolRuntime:
+        members: list[tuple[str, RuntimeEngine]] = []
+        for endpoint in cfg.endpoints:
+            if endpoint.kind == "openai":
+                runtime: RuntimeEngine = OpenAIRuntime(
+                    api_key=os.environ.get(endpoint.api_key_env, "") if endpoint.api_key_env else "",
+                    base_url=endpoint.base_url, model="", protocol=endpoint.protocol,
+                )
+            else:
+                runtime = OllamaRuntime(endpoint.base_url)
+            members.append((endpoint.base_url.rstrip("/"), runtime))
+        return RemotePoolRuntime(members, **balancer_options(cfg))
+
+    return _pools.get(("config", name, cfg.model_dump_json()), build)
+
+
+def close_chat_pools() -> None:
+    """Stop every cached chat pool (app shutdown)."""
+    _pools.close()
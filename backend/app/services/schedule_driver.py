@@ -0,0 +1,255 @@
+"""Durable schedule driver: fires persistent ``ScheduledJob`` rows.
+
+One asyncio task per worker sleeps until the earliest ``next_run_at`` (capped
+by ``poll_interval_seconds`` so edits from other workers are picked up). A
+row in ``scheduler_leases`` elects the leader; only the leader fires, so
+several API workers never trigger the same slot twice. Missed slots after a
+restart are handled by each job's ``misfire_policy``; catch-up slots of a job
+that must not overlap (``concurrency_policy`` skip / replace) are fired one
+after another, each once the previous run has ended.
+
+To flatten top-of-the-hour spikes, ``coalesce_window_seconds`` batches every
+job due within one window into a single pass, and ``dispatch_rate_per_second``
+releases that batch into the admission queue at a fixed rate instead of all
+at once (pending fires live in memory; a crash drops them like a misfire).
+"""
+from __future__ import annotations
+
+import asyncio
+import datetime
+import logging
+import os
+import socket
+from collections import deque
+from typing import Any
+
+from core.config import ScheduleSettings, settings
+from core.database import SessionLocal
+from models.records import ScheduledJob, SchedulerLease
+from services.schedule_service import ScheduleService
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+LEASE_NAME = "schedule-driver"
+
+
+class ScheduleDriver:
+    """Leader-elected loop that turns due schedule rows into Agent Runs."""
+
+    def __init__(
+        self,
+        runtime: Any,
+        session_factory: Any = SessionLocal,
+        config: ScheduleSettings | None = None,
+        worker_id: str | None = None,
+    ) -> None:
+        self.runtime = runtime
+        self.session_factory = session_factory
+        self.config = config or settings.schedules
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.is_leader = False
+        self._task: asyncio.Task | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._pending: deque[str] = deque()  # job ids awaiting rate-limited dispatch
+        self._dispatcher: asyncio.Task | None = None
+        self._catch_ups: set[asyncio.Task] = set()
+
+    def start(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self) -> None:
+        tasks = [t for t in (self._task, self._dispatcher, *self._catch_ups) if t is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = self._dispatcher = None
+        self._pending.clear()
+        if self.is_leader:
+            db = self.session_factory()
+            try:
+                lease = db.get(SchedulerLease, LEASE_NAME)
+                if lease is not None and lease.holder == self.worker_id:
+                    db.delete(lease)
+                    db.commit()
+            finally:
+                db.close()
+            self.is_leader = False
+
+    def nudge(self) -> None:
+        """Re-evaluate now (a schedule was enabled or changed)."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                delay = await self.tick()
+            except Exception:
+                logger.exception("schedule driver tick failed")
+                delay = self.config.poll_interval_seconds
+            self._wakeup.clear()
+            deadline = loop.time() + max(0.05, delay)
+            # the lease is renewed on its own cadence, however long the sleep
+            renew_every = max(0.05, self.config.lease_ttl_seconds / 3)
+            while (remaining := deadline - loop.time()) > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=min(remaining, renew_every))
+                    break
+                except asyncio.TimeoutError:
+                    if self.is_leader and loop.time() < deadline:
+                        self._renew_lease()
+
+    def _renew_lease(self) -> None:
+        db = self.session_factory()
+        try:
+            self.is_leader = self._acquire_lease(db, datetime.datetime.utcnow())
+        except Exception:
+            logger.exception("schedule lease renewal failed")
+        finally:
+            db.close()
+
+    async def tick(self, now: datetime.datetime | None = None) -> float:
+        """Fire due jobs if leader; return seconds until the next check."""
+        now = now or datetime.datetime.utcnow()
+        poll = self.config.poll_interval_seconds
+        db = self.session_factory()
+        try:
+            self.is_leader = self._acquire_lease(db, now)
+            if not self.is_leader:
+                self._pending.clear()
+                return poll
+            service = ScheduleService(db)
+            self._rehydrate(db, service, now)
+            due = (
+                db.query(ScheduledJob)
+                .filter(ScheduledJob.enabled.is_(True), ScheduledJob.next_run_at <= now)
+                .order_by(ScheduledJob.next_run_at)
+                .all()
+            )
+            for job in due:
+                runs = service.advance(job, now, self.config.misfire_grace_seconds, self.config.max_catch_up)
+                db.commit()
+                if runs == 0:
+                    service.record_execution(job, None, "missed")
+                elif runs > 1 and job.concurrency_policy != "allow":
+                    # back-to-back fires would only skip or cancel each other
+                    self._start_catch_up(job.id, runs)
+                elif self.config.dispatch_rate_per_second > 0:
+                    self._pending.extend([job.id] * runs)
+                else:
+                    for _ in range(runs):
+                        await service.fire(job, self.runtime)
+            upcoming = (
+                db.query(ScheduledJob.next_run_at)
+                .filter(ScheduledJob.enabled.is_(True), ScheduledJob.next_run_at.isnot(None))
+                .order_by(ScheduledJob.next_run_at)
+                .first()
+            )
+        finally:
+            db.close()
+        if self._pending and (self._dispatcher is None or self._dispatcher.done()):
+            self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch())
+        delay = poll if upcoming is None else max(0.0, min(poll, (upcoming[0] - now).total_seconds()))
+        return max(delay, self.config.coalesce_window_seconds)
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def _start_catch_up(self, job_id: str, runs: int) -> None:
+        task = asyncio.get_running_loop().create_task(self._catch_up(job_id, runs))
+        self._catch_ups.add(task)
+        task.add_done_callback(self._catch_ups.discard)
+
+    async def _catch_up(self, job_id: str, runs: int) -> None:
+        """Fire ``runs`` missed slots of one job serially."""
+        for _ in range(runs):
+            try:
+                db = self.session_factory()
+                try:
+                    job = db.get(ScheduledJob, job_id)
+                    active = ScheduleService(db).active_run(job, self.runtime) if job is not None else None
+                finally:
+                    db.close()
+                if job is None:
+                    return
+                if active is not None:
+                    await self.runtime.wait_for_run(active.run_id)
+                db = self.session_factory()
+                try:
+                    job = db.get(ScheduledJob, job_id)
+                    if job is None or not job.enabled:  # deleted or paused meanwhile
+                        return
+                    await ScheduleService(db).fire(job, self.runtime)
+                finally:
+                    db.close()
+            except Exception:
+                logger.exception("catch-up fire failed for %s", job_id)
+                return
+
+    async def _dispatch(self) -> None:
+        """Drain coalesced fires into the runtime at ``dispatch_rate_per_second``."""
+        spacing = 1.0 / self.config.dispatch_rate_per_second
+        while self._pending:
+            job_id = self._pending.popleft()
+            db = self.session_factory()
+            try:
+                job = db.get(ScheduledJob, job_id)
+                if job is not None and job.enabled:  # deleted or paused within the window
+                    await ScheduleService(db).fire(job, self.runtime)
+            except Exception:
+                logger.exception("scheduled fire failed for %s", job_id)
+            finally:
+                db.close()
+            if self._pending:
+                await asyncio.sleep(spacing)
+
+    def _acquire_lease(self, db: Session, now: datetime.datetime) -> bool:
+        """Take or renew the leader lease; a lapsed lease may be taken over."""
+        expires = now + datetime.timedelta(seconds=self.config.lease_ttl_seconds)
+        taken = (
+            db.query(SchedulerLease)
+            .filter(SchedulerLease.name == LEASE_NAME)
+            .filter((SchedulerLease.holder == self.worker_id) | (SchedulerLease.expires_at < now))
+            .update({"holder": self.worker_id, "expires_at": expires}, synchronize_session=False)
+        )
+        if taken:
+            db.commit()
+            return True
+        if db.get(SchedulerLease, LEASE_NAME) is not None:
+            db.rollback()
+            return False
+        db.add(SchedulerLease(name=LEASE_NAME, holder=self.worker_id, expires_at=expires))
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            return False
+        return True
+
+    @staticmethod
+    def _rehydrate(db: Session, service: ScheduleService, now: datetime.datetime) -> None:
+        """Enabled rows without a due time (legacy or crashed mid-update) get one."""
+        stale = db.query(ScheduledJob).filter(ScheduledJob.enabled.is_(True), ScheduledJob.next_run_at.is_(None)).all()
+        for job in stale:
+            job.next_run_at = service.first_due(job, now)
+        if stale:
+            db.commit()
+
+
+_driver: ScheduleDriver | None = None
+
+
+def init_schedule_driver(driver: ScheduleDriver | None) -> None:
+    global _driver
+    _driver = driver
+
+
+def get_schedule_driver() -> ScheduleDriver | None:
+    return _driver
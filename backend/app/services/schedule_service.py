@@ -1,30 +1,78 @@
-"""Persistent, user-scoped schedule definitions layered on the runtime scheduler."""
+"""Persistent, user-scoped schedule definitions.
+
+``ScheduledJob.next_run_at`` is the source of truth: ``services.schedule_driver``
+fires due rows, so schedules survive restarts and only the leader fires.
+"""
 from __future__ import annotations
 
 import datetime
+import hashlib
 import json
 import uuid
-from collections.abc import Callable
 from typing import Any
 
 from models.records import ScheduleExecution, ScheduledJob
+from runtime.cron import CronExpression, get_zone
 from sqlalchemy.orm import Session
 
+CONCURRENCY_POLICIES = ("skip", "allow", "replace")
+MISFIRE_POLICIES = ("skip", "catch_up")
+MAX_JITTER_SECONDS = 3600.0
+_TERMINAL_RUN_STATES = ("COMPLETED", "FAILED", "CANCELLED", "TIMEOUT")
+
 
 class ScheduleService:
-    """Create explicit schedule drafts and attach them to an AgentRuntime on enable."""
+    """Create explicit schedule drafts; enabled rows are fired by the schedule driver."""
 
     def __init__(self, db: Session):
         self.db = db
 
     @staticmethod
-    def _validate(kind: str, delay: float | None, interval: float | None) -> None:
-        if kind not in {"once", "interval"}:
-            raise ValueError("schedule_kind must be once or interval")
+    def _validate(kind: str, delay: float | None, interval: float | None, cron: str | None = None) -> None:
+        if kind not in {"once", "interval", "cron"}:
+            raise ValueError("schedule_kind must be once, interval or cron")
         if kind == "once" and (delay is None or delay <= 0):
             raise ValueError("once schedules require a positive delay_seconds")
         if kind == "interval" and (interval is None or interval < 60):
             raise ValueError("interval schedules require interval_seconds >= 60")
+        if kind == "cron":
+            if not cron:
+                raise ValueError("cron schedules require cron_expression")
+            CronExpression(cron)
+
+    @staticmethod
+    def _jitter(value: Any) -> float:
+        jitter = float(value or 0.0)
+        if not 0.0 <= jitter <= MAX_JITTER_SECONDS:
+            raise ValueError(f"jitter_seconds must be between 0 and {MAX_JITTER_SECONDS:.0f}")
+        return jitter
+
+    @staticmethod
+    def jitter_offset(job: ScheduledJob) -> datetime.timedelta:
+        """Stable per-job offset in ``[0, jitter_seconds)``.
+
+        Derived from the job id, so schedules sharing a cadence spread over
+        the window while each job keeps a predictable time.
+        """
+        if not job.jitter_seconds:
+            return datetime.timedelta(0)
+        digest = int(hashlib.sha256(job.id.encode()).hexdigest()[:8], 16)
+        return datetime.timedelta(seconds=(digest / 0x100000000) * job.jitter_seconds)
+
+    def first_due(self, job: ScheduledJob, now: datetime.datetime) -> datetime.datetime:
+        """Next due time when (re-)arming a job at ``now``."""
+        if job.schedule_kind == "once":
+            return now + datetime.timedelta(seconds=job.delay_seconds or 60.0)
+        if job.schedule_kind == "cron":
+            return CronExpression(job.cron_expression).next_fire(now, job.timezone) + self.jitter_offset(job)
+        return now + datetime.timedelta(seconds=job.interval_seconds or 60.0) + self.jitter_offset(job)
+
+    @staticmethod
+    def _policy(value: Any, allowed: tuple[str, ...], field: str) -> str:
+        policy = str(value or allowed[0])
+        if policy not in allowed:
+            raise ValueError(f"{field} must be one of {', '.join(allowed)}")
+        return policy
 
     def create_draft(self, user_id: int, payload: dict[str, Any]) -> ScheduledJob:
         kind = str(payload.get("schedule_kind") or payload.get("type") or "")
@@ -32,12 +80,13 @@ class ScheduleService:
         interval = payload.get("interval_seconds")
         delay = float(delay) if delay is not None else None
         interval = float(interval) if interval is not None else None
-        self._validate(kind, delay, interval)
+        cron = str(payload.get("cron_expression") or "").strip() or None
+        self._validate(kind, delay, interval, cron)
+        timezone = str(payload.get("timezone") or "UTC")
+        get_zone(timezone)
         agent_id = str(payload.get("agent_id") or "")
         if not agent_id:
             raise ValueError("agent_id required")
-        now = datetime.datetime.utcnow()
-        next_run = now + datetime.timedelta(seconds=delay) if kind == "once" else now + datetime.timedelta(seconds=interval or 0)
         run_spec = {
             "agent_id": agent_id,
             "input": str(payload.get("input") or ""),
@@ -53,12 +102,15 @@ class ScheduleService:
             schedule_kind=kind,
             delay_seconds=delay,
             interval_seconds=interval,
-            timezone=str(payload.get("timezone") or "UTC"),
+            cron_expression=cron if kind == "cron" else None,
+            jitter_seconds=self._jitter(payload.get("jitter_seconds")),
+            timezone=timezone,
             run_spec=json.dumps(run_spec, ensure_ascii=False),
-            concurrency_policy=str(payload.get("concurrency_policy") or "skip"),
+            concurrency_policy=self._policy(payload.get("concurrency_policy"), CONCURRENCY_POLICIES, "concurrency_policy"),
+            misfire_policy=self._policy(payload.get("misfire_policy"), MISFIRE_POLICIES, "misfire_policy"),
             max_failures=max(1, int(payload.get("max_failures") or 3)),
-            next_run_at=next_run,
         )
+        job.next_run_at = self.first_due(job, datetime.datetime.utcnow())
         self.db.add(job)
         self.db.commit()
         self.db.refresh(job)
@@ -76,9 +128,21 @@ class ScheduleService:
         if "name" in payload:
             job.name = str(payload["name"] or job.name)
         if "timezone" in payload:
+            get_zone(payload["timezone"])
             job.timezone = str(payload["timezone"] or "UTC")
+        if "cron_expression" in payload:
+            if job.schedule_kind != "cron":
+                raise ValueError("cron_expression only applies to cron schedules")
+            self._validate("cron", None, None, payload["cron_expression"])
+            job.cron_expression = str(payload["cron_expression"]).strip()
+        if "jitter_seconds" in payload:
+            job.jitter_seconds = self._jitter(payload["jitter_seconds"])
+        if {"timezone", "cron_expression", "jitter_seconds"} & payload.keys():
+            job.next_run_at = self.first_due(job, datetime.datetime.utcnow())
         if "concurrency_policy" in payload:
-            job.concurrency_policy = str(payload["concurrency_policy"] or "skip")
+            job.concurrency_policy = self._policy(payload["concurrency_policy"], CONCURRENCY_POLICIES, "concurrency_policy")
+        if "misfire_policy" in payload:
+            job.misfire_policy = self._policy(payload["misfire_policy"], MISFIRE_POLICIES, "misfire_policy")
         if "max_failures" in payload:
             job.max_failures = max(1, int(payload["max_failures"]))
         if any(key in payload for key in {"input", "session_id", "metadata"}):
@@ -91,36 +155,106 @@ class ScheduleService:
         self.db.refresh(job)
         return job
 
-    def enable(self, job: ScheduledJob, runtime: Any, callback: Callable[[dict[str, Any]], Any]) -> ScheduledJob:
+    def enable(self, job: ScheduledJob) -> ScheduledJob:
+        """Arm the row; a stale ``next_run_at`` restarts from now (no misfire on enable)."""
         if job.enabled:
             return job
-        spec = json.loads(job.run_spec or "{}")
-        if job.schedule_kind == "once":
-            remaining = max(1.0, (job.next_run_at - datetime.datetime.utcnow()).total_seconds()) if job.next_run_at else job.delay_seconds or 1.0
-            runtime_job_id = runtime.schedule_once(remaining, spec, user_id=job.user_id, callback=callback)
-        else:
-            runtime_job_id = runtime.schedule_interval(job.interval_seconds or 60.0, spec, user_id=job.user_id, callback=callback)
+        now = datetime.datetime.utcnow()
+        if job.next_run_at is None or job.next_run_at < now:
+            job.next_run_at = self.first_due(job, now)
         job.enabled = True
-        job.runtime_job_id = runtime_job_id
+        job.runtime_job_id = None
         self.db.commit()
         self.db.refresh(job)
         return job
 
-    def pause(self, job: ScheduledJob, runtime: Any) -> ScheduledJob:
-        if job.runtime_job_id:
-            runtime.cancel_schedule(job.runtime_job_id, user_id=job.user_id)
+    def pause(self, job: ScheduledJob) -> ScheduledJob:
         job.enabled = False
         job.runtime_job_id = None
         self.db.commit()
         self.db.refresh(job)
         return job
 
-    def delete(self, job: ScheduledJob, runtime: Any) -> None:
-        if job.runtime_job_id:
-            runtime.cancel_schedule(job.runtime_job_id, user_id=job.user_id)
+    def delete(self, job: ScheduledJob) -> None:
         self.db.delete(job)
         self.db.commit()
 
+    # ---- firing (schedule driver / run-now) ----
+    def advance(self, job: ScheduledJob, now: datetime.datetime, grace: float, max_catch_up: int) -> int:
+        """Move ``next_run_at`` past ``now``; return how many runs to create.
+
+        On time (within ``grace``) a job fires once. Later than that it is a
+        misfire: ``skip`` drops the missed slots, ``catch_up`` fires each
+        missed slot (capped). Once jobs are disarmed after their slot.
+        Interval jobs stay on their grid; cron jobs step through their
+        expression (jitter offset re-applied to every slot).
+        """
+        due = job.next_run_at or now
+        late = (now - due).total_seconds()
+        if job.schedule_kind == "once":
+            job.enabled = False
+            job.next_run_at = None
+            return 1 if late <= grace or job.misfire_policy == "catch_up" else 0
+        if job.schedule_kind == "cron":
+            cron, offset = CronExpression(job.cron_expression), self.jitter_offset(job)
+            slots, slot = 1, cron.next_fire(due - offset, job.timezone)
+            while slot + offset <= now and slots <= max_catch_up:
+                slots, slot = slots + 1, cron.next_fire(slot, job.timezone)
+            if slot + offset <= now:
+                slot = cron.next_fire(now - offset, job.timezone)
+            job.next_run_at = slot + offset
+        else:
+            interval = max(1.0, float(job.interval_seconds or 60.0))
+            slots = int(late // interval) + 1
+            job.next_run_at = due + datetime.timedelta(seconds=slots * interval)
+        if late <= grace:
+            return 1
+        return min(slots, max(1, max_catch_up)) if job.misfire_policy == "catch_up" else 0
+
+    def active_run(self, job: ScheduledJob, runtime: Any) -> Any:
+        """The job's last run while it is still running, else None."""
+        last = (
+            self.db.query(ScheduleExecution)
+            .filter(ScheduleExecution.schedule_id == job.id, ScheduleExecution.agent_run_id.isnot(None))
+            .order_by(ScheduleExecution.triggered_at.desc())
+            .first()
+        )
+        if last is None:
+            return None
+        try:
+            run = runtime.get_run(last.agent_run_id)
+        except Exception:
+            return None
+        return run if run.status not in _TERMINAL_RUN_STATES else None
+
+    async def fire(self, job: ScheduledJob, runtime: Any, trigger_kind: str = "schedule") -> ScheduleExecution:
+        """Create the scheduled Agent Run, honouring ``concurrency_policy``.
+
+        ``skip`` records a skipped execution while the previous run is still
+        active, ``replace`` cancels it first, ``allow`` overlaps. Manual
+        triggers bypass the policy.
+        """
+        if trigger_kind != "manual" and job.concurrency_policy != "allow":
+            active = self.active_run(job, runtime)
+            if active is not None:
+                if job.concurrency_policy == "skip":
+                    return self.record_execution(job, active.run_id, "skipped", trigger_kind)
+                await runtime.cancel_run(active.run_id)
+        spec = json.loads(job.run_spec or "{}")
+        try:
+            run = runtime.create_run(
+                agent_id=spec.get("agent_id", ""),
+                input_text=spec.get("input", ""),
+                user_id=job.user_id,
+                session_id=spec.get("session_id"),
+                metadata={**(spec.get("metadata") or {}), "schedule_id": job.id, "trigger_kind": trigger_kind},
+                execute=True,
+                run_class="interactive" if trigger_kind == "manual" else "scheduled",
+            )
+        except Exception as exc:
+            return self.record_execution(job, None, "failed", trigger_kind, error=exc)
+        return self.record_execution(job, run.run_id, "triggered", trigger_kind)
+
     def record_execution(self, job: ScheduledJob, run_id: str | None, outcome: str, trigger_kind: str = "schedule", error: Exception | None = None) -> ScheduleExecution:
         item = ScheduleExecution(
             id=uuid.uuid4().hex,
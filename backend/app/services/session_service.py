@@ -2,6 +2,7 @@
 from datetime import datetime, timezone
 
 from models.records import Message, Session
+from services.session_summary import invalidate_summary
 from sqlalchemy.orm import Session as DBSession
 
 
@@ -125,6 +126,7 @@ class SessionService:
         if not session:
             return False
         db.query(Message).filter(Message.session_id == session_id).delete()
+        invalidate_summary(db, session_id)
         session.updated_at = datetime.now(timezone.utc)
         db.commit()
         return True
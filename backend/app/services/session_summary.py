@@ -0,0 +1,183 @@
+"""Rolling session summaries: prompts carry summary + recent turns, not full history.
+
+Older turns are folded into ``Session.summary`` by a background job using a
+configurable (cheap) model; ``Session.summary_message_id`` is the last message
+the summary covers. Clearing history invalidates the summary, and a summary
+whose cursor message no longer exists is ignored.
+"""
+from __future__ import annotations
+
+import asyncio
+import datetime
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from core.config import SessionSummarySettings, settings
+from models.records import Message, Session
+from sqlalchemy.orm import Session as DBSession
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = (
+    "请将以下对话压缩为简洁的摘要，保留用户的目标、已确认的事实、做出的决定和未完成的事项。"
+    "如果提供了此前的摘要，请将其与新对话合并。只输出摘要正文。"
+)
+#: Per-message cap when building the summarization transcript.
+_TRANSCRIPT_CHARS = 1500
+
+ChatFn = Callable[[str, list[dict[str, Any]]], Awaitable[dict[str, Any]]]
+
+
+def _valid_summary(db: DBSession, session: Session | None) -> tuple[str | None, int | None]:
+    if session is None or not session.summary or session.summary_message_id is None:
+        return None, None
+    exists = (
+        db.query(Message.id)
+        .filter(Message.id == session.summary_message_id, Message.session_id == session.id)
+        .first()
+    )
+    if exists is None:
+        return None, None
+    return session.summary, session.summary_message_id
+
+
+def prompt_history(
+    db: DBSession,
+    session_id: int,
+    *,
+    limit: int | None = None,
+    roles: tuple[str, ...] | None = None,
+    config: SessionSummarySettings | None = None,
+) -> list[dict[str, Any]]:
+    """Summary (as a system message) followed by the newest uncovered messages."""
+    cfg = config or settings.session_summary
+    limit = limit or cfg.max_history_messages
+    session = db.query(Session).filter(Session.id == session_id).first()
+    summary, cursor = _valid_summary(db, session) if cfg.enabled else (None, None)
+    query = db.query(Message).filter(Message.session_id == session_id)
+    if cursor is not None:
+        query = query.filter(Message.id > cursor)
+    if roles:
+        query = query.filter(Message.role.in_(roles))
+    recent = query.order_by(Message.timestamp.desc(), Message.id.desc()).limit(limit).all()
+    history = [{"role": m.role, "content": m.content} for m in reversed(recent)]
+    if summary:
+        history.insert(0, {"role": "system", "content": f"[会话摘要]\n{summary}"})
+    return history
+
+
+def invalidate_summary(db: DBSession, session_id: int) -> None:
+    """Drop the stored summary (history was edited or cleared); caller commits."""
+    db.query(Session).filter(Session.id == session_id).update({
+        Session.summary: None,
+        Session.summary_message_id: None,
+        Session.summary_updated_at: None,
+    })
+
+
+class SessionSummarizer:
+    """Background job that folds older session turns into the rolling summary."""
+
+    def __init__(self, session_factory: Callable[[], DBSession] | None = None,
+                 config: SessionSummarySettings | None = None):
+        self._session_factory = session_factory
+        self._config = config
+        self._inflight: dict[int, asyncio.Task] = {}
+
+    @property
+    def config(self) -> SessionSummarySettings:
+        return self._config or settings.session_summary
+
+    def _db(self) -> DBSession:
+        if self._session_factory is not None:
+            return self._session_factory()
+        from core.database import SessionLocal
+        return SessionLocal()
+
+    def schedule(self, session_id: int, chat: ChatFn, model: str) -> asyncio.Task | None:
+        """Start a refresh for ``session_id`` unless one is already running."""
+        if not self.config.enabled:
+            return None
+        task = self._inflight.get(session_id)
+        if task is not None and not task.done():
+            return task
+        try:
+            task = asyncio.get_running_loop().create_task(
+                self._run(session_id, chat, self.config.model or model)
+            )
+        except RuntimeError:
+            return None
+        self._inflight[session_id] = task
+        task.add_done_callback(lambda _t, sid=session_id: self._inflight.pop(sid, None))
+        return task
+
+    async def _run(self, session_id: int, chat: ChatFn, model: str) -> bool:
+        try:
+            return await self.refresh(session_id, chat, model)
+        except Exception as exc:
+            logger.warning("session %s summary refresh failed: %s", session_id, exc)
+            return False
+
+    async def refresh(self, session_id: int, chat: ChatFn, model: str) -> bool:
+        """Summarize uncovered turns older than the recent window; True if stored."""
+        plan = await asyncio.to_thread(self._plan, session_id)
+        if plan is None:
+            return False
+        cursor, previous, chunk = plan
+        transcript = "\n".join(
+            f"{m['role']}: {m['content'][:_TRANSCRIPT_CHARS]}" for m in chunk
+        )
+        body = f"[此前的摘要]\n{previous}\n\n[新对话]\n{transcript}" if previous else transcript
+        result = await chat(model, [
+            {"role": "system", "content": SUMMARY_PROMPT},
+            {"role": "user", "content": body},
+        ])
+        text = str((result or {}).get("content", "") or "").strip()[: self.config.max_summary_chars]
+        if not text:
+            return False
+        return await asyncio.to_thread(self._store, session_id, cursor, chunk[-1]["id"], text)
+
+    def _plan(self, session_id: int) -> tuple[int | None, str | None, list[dict[str, Any]]] | None:
+        cfg = self.config
+        with self._db() as db:
+            session = db.query(Session).filter(Session.id == session_id).first()
+            previous, cursor = _valid_summary(db, session)
+            query = db.query(Message).filter(Message.session_id == session_id)
+            if cursor is not None:
+                query = query.filter(Message.id > cursor)
+            uncovered = query.order_by(Message.timestamp.asc(), Message.id.asc()).all()
+            if len(uncovered) < cfg.recent_messages + cfg.batch_messages:
+                return None
+            # bounded per refresh; long backlogs catch up over several runs
+            chunk = uncovered[: len(uncovered) - cfg.recent_messages][: cfg.max_history_messages]
+            return cursor, previous, [
+                {"id": m.id, "role": m.role, "content": m.content} for m in chunk
+            ]
+
+    def _store(self, session_id: int, cursor: int | None, last_id: int, text: str) -> bool:
+        with self._db() as db:
+            session = db.query(Session).filter(Session.id == session_id).first()
+            if session is None:
+                return False
+            # history cleared / summary replaced while the model was running
+            _, current = _valid_summary(db, session)
+            if current != cursor:
+                return False
+            if db.query(Message.id).filter(Message.id == last_id).first() is None:
+                return False
+            session.summary = text
+            session.summary_message_id = last_id
+            session.summary_updated_at = datetime.datetime.utcnow()
+            db.commit()
+            return True
+
+
+_summarizer: SessionSummarizer | None = None
+
+
+def get_summarizer() -> SessionSummarizer:
+    global _summarizer
+    if _summarizer is None:
+        _summarizer = SessionSummarizer()
+    return _summarizer
@@ -8,8 +8,8 @@ from pathlib import Path
 from typing import Any
 
 from core.database import SessionLocal
-from models.records import AgentEventRecord, AgentRun, TaskRecord, TrainTask
-from services.agent_runtime_service import get_agent_runtime
+from models.records import AgentEventRecord, TaskRecord, TrainTask
+from services.agent_runtime_service import get_agent_runtime, read_run
 from services.downloader import get_downloader
 from services.task_service import (
     AGENT_STATUS,
@@ -90,11 +90,7 @@ class TaskExecutionService:
         )
 
     def _launch_agent(self, db: Session, task: TaskRecord) -> TaskRecord:
-        source = (
-            db.query(AgentRun)
-            .filter_by(run_id=task.source_task_id, user_id=task.user_id)
-            .first()
-        )
+        source = read_run(task.source_task_id, task.user_id)
         if source is None:
             raise RetryExecutionError("未找到原始 Agent 运行，无法恢复输入")
         runtime = get_agent_runtime()
@@ -200,7 +196,7 @@ class TaskExecutionService:
         )
 
     def _sync_agent(self, db: Session, task: TaskRecord) -> bool:
-        source = db.query(AgentRun).filter_by(run_id=task.source_task_id, user_id=task.user_id).first()
+        source = read_run(task.source_task_id, task.user_id)
         if source is None:
             return self._transition_if_changed(db, task, "FAILED", summary="Agent 重试源任务不可用。", error="Agent 运行记录不存在")
         status = AGENT_STATUS.get(source.status or "PENDING", "RUNNING")
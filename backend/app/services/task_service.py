@@ -62,6 +62,8 @@ def project_legacy_tasks(db: Session, user_id: int) -> list[TaskRecord]:
             retryable=status in {"FAILED", "CANCELLED"},
             metadata={"base_model": row.base_model, "method": row.method, "output_dir": row.output_dir},
         ))
+    from services.agent_runtime_service import flush_run_writes
+    flush_run_writes()  # the run store coalesces non-terminal transitions in memory
     for row in db.query(AgentRun).filter_by(user_id=user_id).all():
         status = AGENT_STATUS.get(row.status or "PENDING", "RUNNING")
         projected.append(service.project(
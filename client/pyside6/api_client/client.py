@@ -334,6 +334,10 @@ class ModelForgeClient:
         data = self._get(f"/api/v1/agent/runs/{run_id}/events", params={"after_sequence": after_sequence})
         return data.get("events", [])
 
+    def get_agent_run_trace(self, run_id: str) -> dict:
+        """Span tree and per-name time breakdown of a run (flame view)."""
+        return self._get(f"/api/v1/agent/runs/{run_id}/trace")
+
     def stream_agent_run(self, run_id: str, after_sequence: int = 0) -> Iterator[dict]:
         """Yield SSE events: {event_type, sequence, timestamp, payload} (spec 26)."""
         with httpx.Client(timeout=None) as client, client.stream(
@@ -43,6 +43,63 @@ class EventStreamWorker(QThread):
             self.failed.emit(str(e))
 
 
+SPAN_COLORS = {
+    "agent.run": "#1565C0",
+    "agent.iteration": "#90CAF9",
+    "context.build": "#8E24AA",
+    "llm.request": "#F57C00",
+    "tool.call": "#2E7D32",
+}
+
+
+def flame_html(trace: dict) -> str:
+    """Render a run trace (GET /agent/runs/{id}/trace) as flame-style HTML rows.
+
+    One row per span, depth-first; the bar's offset and width are the span's
+    start and duration relative to the whole trace.
+    """
+    spans = trace.get("spans") or []
+    if not spans:
+        return "<span style='color:#888'>暂无 trace（运行未结束、未采样或已过期）</span>"
+    start = min(s["start_ns"] for s in spans)
+    end = max(s.get("end_ns") or s["start_ns"] for s in spans)
+    total = max(end - start, 1)
+    children: dict = {}
+    ids = {s["span_id"] for s in spans}
+    for s in spans:
+        parent = s.get("parent_id") if s.get("parent_id") in ids else None
+        children.setdefault(parent, []).append(s)
+    rows = []
+
+    def walk(parent, depth):
+        for s in sorted(children.get(parent, []), key=lambda x: x["start_ns"]):
+            offset = (s["start_ns"] - start) * 100 / total
+            width = max((s.get("end_ns") or s["start_ns"]) - s["start_ns"], 0) * 100 / total
+            attrs = s.get("attributes") or {}
+            label = attrs.get("tool") or attrs.get("model") or attrs.get("agent_id") or ""
+            color = "#D32F2F" if s.get("status") == "error" else SPAN_COLORS.get(s["name"], "#78909C")
+            rows.append(
+                "<tr>"
+                f"<td>{'&nbsp;' * depth * 2}{s['name']} <span style='color:#888'>{label}</span></td>"
+                "<td width='60%'><table width='100%' cellspacing='0' cellpadding='0'><tr>"
+                f"<td width='{offset:.2f}%'></td>"
+                f"<td width='{max(width, 0.5):.2f}%' bgcolor='{color}'>&nbsp;</td>"
+                "<td></td></tr></table></td>"
+                f"<td align='right'>{s.get('duration_ms', 0):.1f} ms</td>"
+                "</tr>"
+            )
+            walk(s["span_id"], depth + 1)
+
+    walk(None, 0)
+    top = ", ".join(
+        f"{row['name']} {row['self_ms']:.0f} ms" for row in (trace.get("breakdown") or [])[:4]
+    )
+    return (
+        f"<b>耗时分析</b> <span style='color:#888'>{total / 1e6:.1f} ms · 自身耗时: {top}</span>"
+        f"<table width='100%' cellspacing='2'>{''.join(rows)}</table>"
+    )
+
+
 class ToolCallCard(QFrame):
     """One tool call card: name, arguments, result (spec 50)."""
 
@@ -92,6 +149,9 @@ class RunTimeline(QWidget, AsyncApiMixin):
         self.reject_btn.clicked.connect(self.reject)
         controls.addWidget(self.reject_btn)
         controls.addStretch()
+        self.trace_btn = QPushButton("⏱ 耗时分析")
+        self.trace_btn.clicked.connect(self.show_trace)
+        controls.addWidget(self.trace_btn)
         lay.addLayout(controls)
 
     def watch(self, run_id: str, after_sequence: int = 0):
@@ -158,6 +218,27 @@ class RunTimeline(QWidget, AsyncApiMixin):
         self.view.append("")
         self.view.append(str(card))
 
+    def show_trace(self):
+        """Fetch the run's span tree and append the flame breakdown."""
+        if not self.run_id:
+            return
+        run_id = self.run_id
+        self.trace_btn.setEnabled(False)
+        self._run_api(
+            lambda: self.api.get_agent_run_trace(run_id),
+            lambda trace: self._trace_loaded(run_id, trace),
+            lambda error: self._trace_loaded(run_id, None, error),
+        )
+
+    def _trace_loaded(self, run_id: str, trace: dict | None, error: str = ""):
+        self.trace_btn.setEnabled(True)
+        if run_id != self.run_id:
+            return
+        if trace is None:
+            self.view.append(f"<span style='color:#D32F2F'>[耗时分析失败] {error}</span>")
+            return
+        self.view.append(flame_html(trace))
+
     def approve(self):
         self._submit_approval(True)
 
@@ -103,6 +103,23 @@ class TestClientStructure:
         assert "class ToolCallCard" in src
         assert "class EventStreamWorker" in src
 
+    def test_run_trace_renders_flame_rows(self):
+        from pages.run_timeline import flame_html
+        trace = {
+            "spans": [
+                {"name": "agent.run", "span_id": "a", "parent_id": None, "start_ns": 0, "end_ns": 10_000_000,
+                 "duration_ms": 10.0, "attributes": {"agent_id": "bot"}, "status": "ok"},
+                {"name": "tool.call", "span_id": "b", "parent_id": "a", "start_ns": 5_000_000, "end_ns": 7_500_000,
+                 "duration_ms": 2.5, "attributes": {"tool": "filesystem.read"}, "status": "error"},
+            ],
+            "breakdown": [{"name": "agent.run", "self_ms": 7.5}],
+        }
+        html = flame_html(trace)
+        assert html.index("agent.run") < html.index("&nbsp;&nbsp;tool.call")
+        assert "width='50.00%'" in html and "width='25.00%' bgcolor='#D32F2F'" in html
+        assert "filesystem.read" in html and "2.5 ms" in html
+        assert "暂无 trace" in flame_html({"spans": []})
+
     def test_no_fake_thinking(self):
         path = os.path.join(self.BASE, "pages", "run_timeline.py")
         src = open(path, encoding="utf-8").read()
@@ -0,0 +1,139 @@
+"""Compiled agent profiles: reuse across runs, invalidation, precomputed schemas and policy."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend", "app"))
+
+from runtime.models import MockProvider
+from runtime.policy.engine import Policy, PolicyEngine
+from runtime.tools.base import Tool, ToolResult
+from runtime.tools.registry import ToolRegistry
+from runtime.types import AgentConfig
+
+
+class EchoTool(Tool):
+    description = "echo"
+
+    def __init__(self, name):
+        self.name = name
+        self.schema_calls = 0
+
+    def schema(self):
+        self.schema_calls += 1
+        return super().schema()
+
+    async def execute(self, arguments, context=None):
+        return ToolResult.ok(self.name)
+
+
+class CountingPolicy(Policy):
+    checks = 0
+
+    def check_tool(self, ctx, tool_name, tool=None):
+        CountingPolicy.checks += 1
+        return super().check_tool(ctx, tool_name, tool)
+
+
+class CountingEngine(PolicyEngine):
+    def for_agent(self, agent):
+        return CountingPolicy()
+
+
+class PlainEngine(PolicyEngine):
+    def for_agent(self, agent):
+        return Policy()
+
+
+@pytest.fixture
+def runtime():
+    from core.database import init_db
+    from repositories.run_repository import SQLAlchemyRunStore
+    from runtime.events import EventBus
+    from runtime.runtime import AgentRuntime
+    from services.agent_store import DBAgentStore
+    init_db()
+    registry = ToolRegistry()
+    echo = EchoTool("echo")
+    registry.register(echo)
+    calls = {"factory": 0}
+
+    def factory(model, agent=None):
+        calls["factory"] += 1
+        return MockProvider(script=[MockProvider.tool_call("echo", {}), MockProvider.tool_call("echo", {}),
+                                    MockProvider.final("ok")])
+
+    rt = AgentRuntime(
+        run_store=SQLAlchemyRunStore(),
+        agent_store=DBAgentStore(engine=None),
+        event_bus=EventBus(),
+        tool_registry=registry,
+        provider_factory=factory,
+        policy_engine=CountingEngine(settings=None, defaults=Policy()),
+    )
+    rt.create_agent(AgentConfig(name="profilebot", model="mock", tools=["echo"]))
+    rt.echo = echo
+    return rt
+
+
+async def run_once(rt):
+    run = rt.create_run(agent_id="profilebot", input_text="go", execute=False)
+    return await rt.execute_run(run.run_id)
+
+
+class TestCompiledProfiles:
+    @pytest.mark.asyncio
+    async def test_profile_is_compiled_once_and_reused(self, runtime, monkeypatch):
+        rt = runtime
+        rt.policy_engine = PlainEngine(settings=None, defaults=Policy())
+        checks = []
+        original = Policy.check_tool
+        monkeypatch.setattr(Policy, "check_tool", lambda self, *a: checks.append(a[1]) or original(self, *a))
+        for _ in range(3):
+            outcome = await run_once(rt)
+            assert outcome["status"] == "COMPLETED"
+        assert rt.profiles.misses == 1 and rt.profiles.hits == 2
+        assert rt.echo.schema_calls == 1
+        # one decision-table entry, none per tool call (6 calls over 3 runs)
+        assert checks == ["echo"]
+
+    @pytest.mark.asyncio
+    async def test_policy_subclasses_are_asked_on_every_call(self, runtime):
+        rt = runtime
+        CountingPolicy.checks = 0
+        await run_once(rt)
+        assert rt._compiled_profile(rt.get_agent("profilebot")).decisions == {}
+        assert CountingPolicy.checks >= 2  # both echo calls checked with their run context
+
+    @pytest.mark.asyncio
+    async def test_profiles_key_on_the_stored_version(self, runtime, monkeypatch):
+        rt = runtime
+        await run_once(rt)
+        monkeypatch.setattr(AgentConfig, "fingerprint", lambda self: pytest.fail("fingerprint recomputed"))
+        await run_once(rt)
+        assert rt.profiles.hits == 1
+        version = rt.get_agent("profilebot").version
+        rt.create_agent(AgentConfig(name="profilebot", model="mock", tools=["echo"], system_prompt="edited"))
+        assert rt.get_agent("profilebot").version != version
+
+    @pytest.mark.asyncio
+    async def test_tool_registration_and_agent_edits_invalidate(self, runtime):
+        rt = runtime
+        await run_once(rt)
+        rt.register_tool(EchoTool("other"))
+        await run_once(rt)
+        assert rt.profiles.misses == 2
+        rt.create_agent(AgentConfig(name="profilebot", model="mock", tools=["echo"], system_prompt="new"))
+        await run_once(rt)
+        assert rt.profiles.misses == 3
+        profile = rt._compiled_profile(rt.get_agent("profilebot"))
+        assert profile.system_prompt == "new" and profile.tools == ("echo",)
+
+    def test_denied_tools_are_frozen_in_the_table(self, runtime):
+        rt = runtime
+        rt.policy_engine = PolicyEngine(defaults=Policy(denied_tools=["echo"]))
+        profile = rt._compiled_profile(rt.get_agent("profilebot"))
+        assert profile.decision("echo").allowed is False
+        assert profile.tool_schemas[0]["function"]["name"] == "echo"
+        assert rt._factory_accepts_agent() is True
@@ -236,6 +236,131 @@ class TestAgentRuntime:
         assert snap["agent_runs_total"] >= 1
         assert snap["agent_runs_success"] >= 1
 
+class TestHotRunCache:
+    @pytest.fixture
+    def store(self):
+        from core.database import init_db
+        from models.records import AgentRun  # noqa: F401
+        from repositories.run_repository import SQLAlchemyRunStore
+        init_db()
+        return SQLAlchemyRunStore(flush_interval=0.05)
+
+    @staticmethod
+    def _db_status(run_id):
+        from core.database import SessionLocal
+        from models.records import AgentRun
+        with SessionLocal() as db:
+            return db.query(AgentRun).filter(AgentRun.run_id == run_id).first().status
+
+    @staticmethod
+    def _record():
+        import uuid
+
+        from runtime.types import RunRecord
+        return RunRecord(run_id=uuid.uuid4().hex, agent_id="bot", user_id=1, input="hi")
+
+    @pytest.mark.asyncio
+    async def test_transitions_written_behind_and_coalesced(self, store, monkeypatch):
+        import asyncio
+        run = store.create(self._record())
+        writes = []
+        original = store._write
+        monkeypatch.setattr(store, "_write", lambda batch, refresh=False: writes.append(batch) or original(batch, refresh))
+        store.update(run.run_id, status="RUNNING")
+        store.update(run.run_id, status="WAITING_HUMAN")
+        store.update(run.run_id, status="RUNNING", iteration_count=2)
+        assert store.get(run.run_id).status == "RUNNING"
+        assert self._db_status(run.run_id) == "PENDING"
+        await asyncio.sleep(0.15)
+        assert len(writes) == 1
+        assert writes[0][run.run_id]["iteration_count"] == 2
+        assert self._db_status(run.run_id) == "RUNNING"
+
+    @pytest.mark.asyncio
+    async def test_terminal_state_flushed_synchronously(self, store):
+        run = store.create(self._record())
+        store.update(run.run_id, status="RUNNING", metadata={"depth": 1})
+        store.update(run.run_id, status="COMPLETED", output="done")
+        assert self._db_status(run.run_id) == "COMPLETED"
+        assert run.run_id not in store._hot
+        stored = store.get(run.run_id)
+        assert stored.output == "done" and stored.metadata == {"depth": 1}
+
+    @pytest.mark.asyncio
+    async def test_hot_get_skips_db(self, store, monkeypatch):
+        import repositories.run_repository as repo
+        run = store.create(self._record())
+        store.update(run.run_id, status="RUNNING")
+        monkeypatch.setattr(repo, "SessionLocal", None)
+        got = store.get(run.run_id)
+        assert got.status == "RUNNING"
+        got.metadata["x"] = 1
+        assert "x" not in store.get(run.run_id).metadata
+
+    @pytest.mark.asyncio
+    async def test_list_sees_pending_transitions(self, store):
+        run = store.create(self._record())
+        store.update(run.run_id, status="WAITING_HUMAN")
+        waiting = store.list(status="WAITING_HUMAN", limit=500)
+        assert run.run_id in [r.run_id for r in waiting]
+
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_is_requeued_and_retried(self, store, monkeypatch, caplog):
+        import asyncio
+        run = store.create(self._record())
+        original = store._write
+        failures = [RuntimeError("database is locked")]
+
+        def flaky(batch, refresh=False):
+            if failures:
+                raise failures.pop()
+            return original(batch, refresh)
+        monkeypatch.setattr(store, "_write", flaky)
+        store.update(run.run_id, status="RUNNING", iteration_count=1)
+        await asyncio.sleep(0.08)  # first flush fails
+        assert "database is locked" in caplog.text
+        store.update(run.run_id, iteration_count=2)  # newer fields win over the requeued batch
+        assert store._dirty[run.run_id] == {"status": "RUNNING", "iteration_count": 2}
+        await asyncio.sleep(0.25)  # backoff: 0.05 * 2
+        assert self._db_status(run.run_id) == "RUNNING" and store._dirty == {}
+
+    @pytest.mark.asyncio
+    async def test_readers_outside_the_runtime_see_pending_transitions(self, store, monkeypatch):
+        import types
+
+        import services.agent_runtime_service as ars
+        from core.database import SessionLocal
+        from services.task_service import project_legacy_tasks
+        monkeypatch.setattr(ars, "_runtime", types.SimpleNamespace(run_store=store))
+        record = self._record()
+        record.user_id = 4242
+        run = store.create(record)
+        store.update(run.run_id, status="RUNNING")
+        assert self._db_status(run.run_id) == "PENDING"
+        assert ars.read_run(run.run_id, 4242).status == "RUNNING"
+        assert ars.read_run(run.run_id, 7) is None
+        with SessionLocal() as db:
+            projected = project_legacy_tasks(db, 4242)
+        [task] = [t for t in projected if t.source_task_id == run.run_id]
+        assert task.status == "RUNNING"
+
+    @pytest.mark.asyncio
+    async def test_failed_terminal_write_stays_cached_until_written(self, store, monkeypatch):
+        run = store.create(self._record())
+        original = store._write
+
+        def broken(batch, refresh=False):
+            raise RuntimeError("disk full")
+        monkeypatch.setattr(store, "_write", broken)
+        store.update(run.run_id, status="COMPLETED", output="done")
+        assert store.get(run.run_id).status == "COMPLETED"
+        assert self._db_status(run.run_id) == "PENDING"
+        monkeypatch.setattr(store, "_write", original)
+        assert store.flush() == 1
+        assert self._db_status(run.run_id) == "COMPLETED" and run.run_id not in store._hot
+
+
 class TestAgentRunApi:
     """End-to-end Agent Run API tests (spec 25 / 65)."""
 
@@ -366,3 +491,18 @@ class TestAgentRunApi:
         data = r.json()
         for name in ("agent_runs_total", "llm_calls_total", "tool_calls_total"):
             assert name in data
+
+    def test_prometheus_metrics_api(self, client):
+        from unittest.mock import patch
+
+        from core.config import settings
+        h = self._login(client, "apiboti")
+        client.post("/api/v1/agent/create", json={"name": "api-bot-i", "model": "mock"}, headers=h)
+        client.post("/api/v1/agent/runs", json={"agent_id": "api-bot-i", "input": "x"}, headers=h)
+        assert client.get("/api/v1/agent/metrics/prometheus", headers=h).status_code == 403
+        with patch.object(settings, "runtime_admin_usernames", "apiboti"):
+            r = client.get("/api/v1/agent/metrics/prometheus", headers=h)
+        assert r.status_code == 200 and r.headers["content-type"].startswith("text/plain")
+        assert 'modelforge_agent_runs_total{agent="api-bot-i",status="COMPLETED"}' in r.text
+        assert "# TYPE modelforge_db_session_wait_duration_seconds histogram" in r.text
+        assert "modelforge_event_queue_depth " in r.text
@@ -180,9 +180,10 @@ class TestBookkeepingPruning:
     def test_metrics_durations_capped(self):
         from runtime.metrics import MetricsRegistry
         m = MetricsRegistry()
-        for _i in range(m.MAX_DURATION_SAMPLES + 500):
+        for _i in range(5000):
             m.record("tool_call_duration", 0.001)
-        assert len(m._durations["tool_call_duration"]) == m.MAX_DURATION_SAMPLES
+        h = m.histogram("tool_call_duration")
+        assert h.count == 5000 and len(h.counts) == h.SLOTS  # fixed memory, nothing dropped
 
 
 class TestWriteFailureVisibility:
@@ -0,0 +1,476 @@
+"""Performance benchmarks for backend hot paths with regression budgets.
+
+The normal suite runs every benchmark once as a smoke test (``pytest.ini``
+passes ``--benchmark-disable``). Timed runs compare each median against
+``benchmark_baselines.json`` and fail when it exceeds the baseline by more
+than the budget::
+
+    pytest tests/test_benchmarks.py --benchmark-enable
+    BENCHMARK_BUDGET=0.5 pytest tests/test_benchmarks.py --benchmark-enable
+    BENCHMARK_SAVE=1 pytest tests/test_benchmarks.py --benchmark-enable  # re-record
+
+Medians are stored relative to a fixed calibration workload timed in the
+same process (``reference_ms``): each budget is scaled by how much faster or
+slower the current machine runs that workload, so one recording serves CI
+runners and laptops alike. Re-record after an intended performance change.
+Everything runs offline against the mock provider and a throwaway SQLite
+database.
+"""
+import asyncio
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend", "app"))
+
+from runtime.cancellation import CancellationToken
+from runtime.context.builder import ContextBuilder
+from runtime.events import EventBus
+from runtime.execution import ExecutionEngine
+from runtime.models import MockProvider
+from runtime.run_context import RunContext
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "benchmark_baselines.json")
+CORPUS_SIZES = [50, 200, 800]
+SSE_SUBSCRIBERS = 24
+
+
+def reference_workload():
+    """Fixed mix of interpreter and SQLite work the benchmarks are dominated by."""
+    rng = random.Random(1)
+    rows = [(i, "".join(rng.choice("abcdef") for _ in range(12))) for i in range(2000)]
+    conn = sqlite3.connect(":memory:")
+    try:
+        conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, v TEXT)")
+        conn.executemany("INSERT INTO t VALUES (?, ?)", rows)
+        conn.execute("SELECT v, COUNT(*) FROM t GROUP BY v ORDER BY 2 DESC").fetchall()
+    finally:
+        conn.close()
+    return json.loads(json.dumps(sorted(rows, key=lambda r: r[1])))
+
+
+def measure_reference(rounds=15):
+    """Fastest wall time of :func:`reference_workload` in milliseconds.
+
+    The minimum is the least noisy estimate of machine speed; scheduler
+    hiccups only ever add time.
+    """
+    reference_workload()
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        reference_workload()
+        samples.append((time.perf_counter() - started) * 1000)
+    return min(samples)
+
+
+class Baselines:
+    """Median budgets per benchmark name, loaded from ``benchmark_baselines.json``.
+
+    Recorded medians are scaled by ``current reference / recorded reference``
+    before the budget applies, which cancels out raw machine speed.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.data = json.load(f)
+        except FileNotFoundError:
+            self.data = {"budget": 0.5, "benchmarks": {}}
+        self.save = os.getenv("BENCHMARK_SAVE") == "1"
+        self.recorded = {}
+        self._reference = None
+
+    def reference_ms(self):
+        if self._reference is None:
+            self._reference = measure_reference()
+        return self._reference
+
+    def scale(self):
+        recorded = self.data.get("reference_ms")
+        return self.reference_ms() / recorded if recorded else 1.0
+
+    def check(self, benchmark):
+        stats = benchmark.stats
+        if stats is None:  # --benchmark-disable: smoke run, nothing timed
+            return
+        median_ms = stats.stats.median * 1000
+        if self.save:
+            entry = self.data["benchmarks"].get(benchmark.name, {})
+            self.recorded[benchmark.name] = {**entry, "median_ms": round(median_ms, 4)}
+            return
+        entry = self.data["benchmarks"].get(benchmark.name)
+        if entry is None:
+            return
+        budget = float(os.getenv("BENCHMARK_BUDGET") or entry.get("budget", self.data["budget"]))
+        scale = self.scale()
+        limit = entry["median_ms"] * scale * (1 + budget)
+        assert median_ms <= limit, (
+            f"{benchmark.name}: median {median_ms:.3f} ms exceeds baseline "
+            f"{entry['median_ms']:.3f} ms x{scale:.2f} machine scale + {budget:.0%} budget"
+        )
+
+    def write(self):
+        if not self.recorded:
+            return
+        self.data = {
+            "budget": self.data["budget"],
+            "machine": f"{platform.system()}-{platform.machine()}-py{platform.python_version()}",
+            "reference_ms": round(self.reference_ms(), 4),
+            "benchmarks": dict(sorted({**self.data["benchmarks"], **self.recorded}.items())),
+        }
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+
+
+@pytest.fixture(scope="module")
+def baselines():
+    b = Baselines(BASELINE_PATH)
+    yield b
+    b.write()
+
+
+@pytest.fixture(scope="module")
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    pending = asyncio.all_tasks(loop)  # e.g. EventBus writers parked on their queue
+    for task in pending:
+        task.cancel()
+
+    async def drain():
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    loop.run_until_complete(drain())
+    loop.close()
+
+
+@pytest.fixture(scope="module")
+def db_ready(tmp_path_factory):
+    """Point the shared session factory at a throwaway SQLite file for this module.
+
+    ``SessionLocal`` is rebound in place, so repositories that imported it at
+    module load see the benchmark database too; everything is restored after.
+    """
+    import core.database as database
+    from models.records import User  # noqa: F401
+    from sqlalchemy import create_engine
+    path = tmp_path_factory.mktemp("bench-db") / "bench.db"
+    engine = create_engine(
+        f"sqlite:///{path}",
+        poolclass=database.TimedQueuePool,
+        connect_args={"check_same_thread": False},
+        pool_size=database.DATABASE_POOL_SIZE,
+        max_overflow=database.DATABASE_MAX_OVERFLOW,
+        pool_timeout=database.DATABASE_POOL_TIMEOUT,
+    )
+    previous = database.SessionLocal.kw["bind"]
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(database, "engine", engine)
+        database.SessionLocal.configure(bind=engine)
+        try:
+            database.init_db()
+            yield
+        finally:
+            database.SessionLocal.configure(bind=previous)
+            engine.dispose()
+
+
+def make_user(prefix):
+    from core.database import SessionLocal
+    from models.records import User
+    db = SessionLocal()
+    try:
+        username = f"{prefix}-{uuid.uuid4().hex[:8]}"
+        user = User(username=username, email=username + "@x.com", password_hash="x")
+        db.add(user)
+        db.commit()
+        return user.id
+    finally:
+        db.close()
+
+
+def corpus(paragraphs, seed=7):
+    """Deterministic text of ``paragraphs`` ~400-char paragraphs (one KB chunk each)."""
+    rng = random.Random(seed)
+    vocab = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 9))) for _ in range(1500)]
+    return "\n\n".join(" ".join(rng.choice(vocab) for _ in range(60)) for _ in range(paragraphs))
+
+
+# ---- knowledge base -------------------------------------------------------
+
+@pytest.fixture(scope="module")
+def corpus_files(tmp_path_factory):
+    root = tmp_path_factory.mktemp("kb")
+    files = {}
+    for size in CORPUS_SIZES:
+        path = root / f"corpus-{size}.txt"
+        path.write_text(corpus(size), encoding="utf-8")
+        files[size] = str(path)
+    extra = root / "extra.txt"
+    extra.write_text(corpus(3, seed=11), encoding="utf-8")
+    files["extra"] = str(extra)
+    return files
+
+
+def loaded_kb(path):
+    from services.knowledge_base import KnowledgeBase
+    kb = KnowledgeBase()
+    kb.upload(path)
+    return kb
+
+
+class TestKnowledgeBase:
+    @pytest.mark.parametrize("size", CORPUS_SIZES)
+    def test_kb_upload(self, benchmark, baselines, corpus_files, size):
+        kb = loaded_kb(corpus_files[size])
+        documents, vectors = list(kb.vector_store.documents), list(kb.vector_store.vectors)
+
+        def reset():
+            kb.vector_store.documents, kb.vector_store.vectors = list(documents), list(vectors)
+
+        result = benchmark.pedantic(kb.upload, args=(corpus_files["extra"],), setup=reset, rounds=15)
+        assert result["status"] == "ingested" and len(kb.vector_store.documents) == len(documents) + result["chunks"]
+        baselines.check(benchmark)
+
+    @pytest.mark.parametrize("size", CORPUS_SIZES)
+    def test_kb_query(self, benchmark, baselines, corpus_files, size):
+        kb = loaded_kb(corpus_files[size])
+        question = kb.vector_store.documents[size // 2]["text"][:80]
+        result = benchmark(kb.query, question, top_k=5)
+        assert result["total_results"] == 5
+        baselines.check(benchmark)
+
+    @pytest.mark.parametrize("size", CORPUS_SIZES)
+    def test_kb_query_persisted(self, benchmark, baselines, corpus_files, db_ready, size):
+        from core.database import SessionLocal
+        from services.knowledge_base import KnowledgeBase
+        user_id = make_user("bench-kb")
+        db = SessionLocal()
+        try:
+            kb = KnowledgeBase()
+            kb.upload(corpus_files[size], db=db, user_id=user_id)
+            question = corpus(size).split("\n\n")[size // 2][:80]
+            result = benchmark(kb.query, question, top_k=5, db=db, user_id=user_id)
+        finally:
+            db.close()
+        assert result["total_results"] == 5
+        baselines.check(benchmark)
+
+
+# ---- agent runtime ----------------------------------------------------------
+
+class EchoTools:
+    def names(self):
+        return ["bench.echo"]
+
+    def schema(self, name):
+        return {"type": "function", "function": {"name": name, "parameters": {"type": "object"}}}
+
+    async def run(self, name, arguments, ctx=None):
+        return "echo " + json.dumps(arguments)
+
+
+def make_ctx(**kw):
+    defaults = dict(
+        run_id=uuid.uuid4().hex, agent_id="bench", user_id=1, input_text="benchmark the loop",
+        model="mock-model", tools=["bench.echo"], max_iterations=50, max_tool_calls=100,
+        timeout_seconds=60, cancellation=CancellationToken(),
+    )
+    defaults.update(kw)
+    ctx = RunContext(**defaults)
+    ctx.started_at = time.monotonic()
+    return ctx
+
+
+class History:
+    def __init__(self, turns):
+        text = corpus(turns, seed=3).split("\n\n")
+        self.messages = [{"role": "user" if i % 2 == 0 else "assistant", "content": t} for i, t in enumerate(text)]
+
+    async def load(self, session_id, limit=20):
+        return self.messages[-limit:]
+
+
+class Memories:
+    async def retrieve(self, user_id, query, top_k=3):
+        return [{"value": f"memory {i}: prefers concise answers"} for i in range(top_k)]
+
+
+class Knowledge:
+    async def retrieve(self, query, top_k=3):
+        return [{"source": "handbook.md", "text": corpus(1, seed=i)} for i in range(top_k)]
+
+
+class TestAgentRuntime:
+    ITERATIONS = 10
+
+    def test_execution_loop(self, benchmark, baselines, loop):
+        engine = ExecutionEngine(event_bus=EventBus(), tool_runner=EchoTools(), context_builder=ContextBuilder())
+
+        def script(messages, tools, call_index):
+            if call_index < self.ITERATIONS:
+                return MockProvider.tool_call("bench.echo", {"step": call_index}, call_id=f"call_{call_index}")
+            return MockProvider.final("done")
+
+        def run_once():
+            return loop.run_until_complete(engine.execute(make_ctx(), MockProvider(callback=script)))
+
+        outcome = benchmark(run_once)
+        assert outcome["status"] == "COMPLETED" and outcome["iteration"] == self.ITERATIONS
+        benchmark.extra_info["iterations"] = self.ITERATIONS
+        baselines.check(benchmark)
+
+    def test_context_build(self, benchmark, baselines, loop):
+        builder = ContextBuilder(memory_provider=Memories(), knowledge_provider=Knowledge(), history_provider=History(40))
+        working = History(12).messages
+
+        def build_once():
+            ctx = make_ctx(
+                session_id=1, memory_config={"enabled": True}, knowledge_sources=["kb"], max_context_tokens=2048,
+            )
+            return loop.run_until_complete(builder.build(ctx, working))
+
+        messages = benchmark(build_once)
+        assert messages[0]["role"] == "system" and "[知识库资料]" in messages[0]["content"]
+        baselines.check(benchmark)
+
+    def test_event_bus_publish_persist(self, benchmark, baselines, loop, db_ready):
+        from repositories.event_repository import SQLAlchemyEventStore
+        events = 100
+        bus = EventBus(store=SQLAlchemyEventStore())
+        delivered = []
+
+        async def subscriber(event):
+            delivered.append(event.sequence)
+
+        bus.subscribe(subscriber)
+
+        async def publish_all():
+            run_id = uuid.uuid4().hex
+            for i in range(events):
+                await bus.publish(run_id, "bench.tick", payload={"i": i})
+            await bus.flush()
+            bus.prune(run_id)
+
+        benchmark.pedantic(lambda: loop.run_until_complete(publish_all()), rounds=8, warmup_rounds=1)
+        assert bus.write_failures == 0 and delivered[-1] == events
+        benchmark.extra_info["events_per_round"] = events
+        baselines.check(benchmark)
+
+
+# ---- task center ----------------------------------------------------------
+
+@pytest.fixture(scope="module")
+def task_user(db_ready):
+    """A user with 300 tasks and 50 agent runs already projected."""
+    from core.database import SessionLocal
+    from models.records import AgentRun
+    from services.task_service import TaskService, project_legacy_tasks
+    user_id = make_user("bench-tasks")
+    service = TaskService()
+    db = SessionLocal()
+    try:
+        for i in range(300):
+            task = service.create(db, user_id=user_id, task_type="model_download", source="downloader", title=f"model-{i}")
+            if i % 3 == 0:
+                service.transition(db, task, "RUNNING")
+        for i in range(50):
+            db.add(AgentRun(
+                run_id=uuid.uuid4().hex, agent_id="bench", user_id=user_id,
+                status=random.Random(i).choice(["COMPLETED", "FAILED", "RUNNING"]), input=f"job {i}",
+            ))
+        db.commit()
+        project_legacy_tasks(db, user_id)
+    finally:
+        db.close()
+    return user_id
+
+
+class TestTaskCenter:
+    def _session_bench(self, benchmark, fn):
+        from core.database import SessionLocal
+        db = SessionLocal()
+        try:
+            return benchmark(fn, db)
+        finally:
+            db.close()
+
+    def test_task_list(self, benchmark, baselines, task_user):
+        from services.task_service import TaskService
+        tasks = self._session_bench(benchmark, lambda db: TaskService().list(db, task_user, limit=100))
+        assert len(tasks) == 100
+        baselines.check(benchmark)
+
+    def test_task_summary(self, benchmark, baselines, task_user):
+        from services.task_service import TaskService
+        summary = self._session_bench(benchmark, lambda db: TaskService().summary(db, task_user))
+        assert summary["total"] == 350
+        baselines.check(benchmark)
+
+    def test_task_projection(self, benchmark, baselines, task_user):
+        from services.task_service import project_legacy_tasks
+        projected = self._session_bench(benchmark, lambda db: project_legacy_tasks(db, task_user))
+        assert len(projected) == 50
+        baselines.check(benchmark)
+
+    def test_sse_fanout(self, benchmark, baselines, db_ready):
+        """One committed task event reaching every open stream of its user.
+
+        Mirrors ``GET /tasks/stream``: each subscriber blocks on the outbox hub
+        and then replays the cursor from the database.
+        """
+        from core.database import SessionLocal
+        from services.task_realtime import task_event_hub, task_outbox_publisher
+        from services.task_service import TaskService
+        user_id = make_user("bench-sse")
+        service = TaskService()
+        received = []
+
+        def subscriber(cursor):
+            task_event_hub.wait_for_user(user_id, cursor, timeout=5.0)
+            db = SessionLocal()
+            try:
+                received.append(len(service.events_after(db, user_id, cursor)))
+            finally:
+                db.close()
+
+        def open_streams():
+            while task_outbox_publisher.dispatch_once():
+                pass  # drain the backlog so the round publishes only its own row
+            db = SessionLocal()
+            try:
+                latest = service.events_after(db, user_id, 0, limit=500)
+            finally:
+                db.close()
+            cursor = latest[-1].id if latest else 0
+            received.clear()
+            threads = [threading.Thread(target=subscriber, args=(cursor,)) for _ in range(SSE_SUBSCRIBERS)]
+            for t in threads:
+                t.start()
+            return (threads,), {}
+
+        def publish(threads):
+            db = SessionLocal()
+            try:
+                service.create(db, user_id=user_id, task_type="model_download", source="downloader", title="fanout")
+            finally:
+                db.close()
+            task_outbox_publisher.dispatch_once()
+            for t in threads:
+                t.join()
+
+        benchmark.pedantic(publish, setup=open_streams, rounds=10)
+        assert received == [1] * SSE_SUBSCRIBERS
+        benchmark.extra_info["subscribers"] = SSE_SUBSCRIBERS
+        baselines.check(benchmark)
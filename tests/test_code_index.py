@@ -0,0 +1,139 @@
+"""code.search trigram index: incremental refresh, persistence, regex prefilter, ranking."""
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend", "app"))
+
+from services.code_index import CodeIndex, CodeIndexCache, _literal_runs
+
+
+def write(root, rel, text):
+    path = os.path.join(root, rel)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return path
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = str(tmp_path / "repo")
+    write(root, "a.py", "def load_config():\n    return load_config_file()\n")
+    write(root, "pkg/b.py", "import os\nvalue = load_config()\n")
+    write(root, "pkg/c.js", "function other() { return 1 }\n")
+    write(root, ".hidden/d.py", "load_config()\n")
+    write(root, "notes.txt", "load_config\n")
+    return root
+
+
+class TestCodeIndex:
+    def test_prefilter_opens_only_candidates(self, tree):
+        index = CodeIndex(tree, refresh_seconds=0)
+        assert index.refresh() == 3
+        assert index.candidates(["load_config"]) == ["a.py", os.path.join("pkg", "b.py")]
+        assert index.candidates(["nowhere_to_be_found"]) == []
+        ranked, truncated = index.search("LOAD_CONFIG")
+        # files ranked by match count, hidden dirs and non-code files skipped
+        assert [os.path.basename(p) for p, _ in ranked] == ["a.py", "b.py"]
+        assert [n for n, _ in ranked[0][1]] == [1, 2] and truncated is False
+
+    def test_regex_uses_required_literals(self, tree):
+        assert _literal_runs(r"def \w+_config\(") == ["def ", "_config("]
+        assert _literal_runs("foo|bar") is None
+        index = CodeIndex(tree, refresh_seconds=0)
+        ranked, _ = index.search(r"return \d", regex=True)
+        assert [os.path.basename(p) for p, _ in ranked] == ["c.js"]
+        ranked, _ = index.search("other|value", regex=True)
+        assert len(ranked) == 2
+
+    def test_incremental_refresh_by_mtime_and_size(self, tree):
+        index = CodeIndex(tree, refresh_seconds=0)
+        index.refresh()
+        assert index.refresh() == 0
+        write(tree, "pkg/b.py", "nothing here\n")
+        write(tree, "new.go", "func load_config() {}\n")
+        os.remove(os.path.join(tree, "pkg", "c.js"))
+        assert index.refresh() == 3
+        ranked, _ = index.search("load_config")
+        assert sorted(os.path.basename(p) for p, _ in ranked) == ["a.py", "new.go"]
+
+    def test_refresh_is_throttled(self, tree):
+        index = CodeIndex(tree, refresh_seconds=60)
+        index.refresh()
+        write(tree, "a.py", "rewritten in place\n")  # directory mtime unchanged
+        assert index.refresh() == 0
+        assert index.refresh(force=True) == 1
+
+    def test_new_files_bypass_the_throttle(self, tree):
+        index = CodeIndex(tree, refresh_seconds=60)
+        index.refresh()
+        write(tree, "pkg/late.py", "just_written()\n")
+        ranked, _ = index.search("just_written")
+        assert [os.path.basename(p) for p, _ in ranked] == ["late.py"]
+        os.remove(os.path.join(tree, "pkg", "late.py"))
+        assert index.search("just_written")[0] == []
+
+    def test_results_are_capped(self, tree):
+        write(tree, "many.py", "hit\n" * 30)
+        ranked, truncated = CodeIndex(tree, refresh_seconds=0).search("hit", max_results=20)
+        assert sum(len(lines) for _, lines in ranked) == 20 and truncated is True
+
+
+    def test_reading_stops_at_the_result_limit(self, tree, monkeypatch):
+        import builtins
+        for i in range(10):
+            write(tree, f"hits/h{i}.py", "needle_here\n")
+        index = CodeIndex(tree, refresh_seconds=60)
+        index.refresh()
+        opened = []
+        real_open = builtins.open
+        monkeypatch.setattr(builtins, "open", lambda path, *a, **kw: opened.append(path) or real_open(path, *a, **kw))
+        ranked, truncated = index.search("needle_here", max_results=3)
+        assert sum(len(lines) for _, lines in ranked) == 3 and truncated is True
+        assert len(opened) == 4  # the fourth file only proved there was more
+
+    def test_short_patterns_stream_the_tree(self, tree, monkeypatch):
+        index = CodeIndex(tree, refresh_seconds=0)
+        index.refresh()
+
+        def no_index(required):
+            raise AssertionError("short patterns cannot use the trigram index")
+        monkeypatch.setattr(index, "candidates", no_index)
+        ranked, _ = index.search("os")
+        assert [os.path.basename(p) for p, _ in ranked] == ["b.py"]
+
+    def test_cold_index_builds_in_background_and_streams_meanwhile(self, tree):
+        index = CodeIndex(tree, refresh_seconds=60)
+        assert not index.ready
+        ranked, _ = index.search("load_config")
+        assert sorted(os.path.basename(p) for p, _ in ranked) == ["a.py", "b.py"]
+        assert index.wait_ready(5) and set(index.files) == {"a.py", os.path.join("pkg", "b.py"), os.path.join("pkg", "c.js")}
+        assert index.search("load_config")[0] == ranked
+
+
+class TestPersistence:
+    def test_index_is_persisted_and_reloaded(self, tree, tmp_path):
+        cache = CodeIndexCache(str(tmp_path / "idx"), refresh_seconds=0)
+        index = cache.get(tree)
+        index.refresh()
+        path = cache.index_path(tree)
+        assert os.path.exists(path)
+
+        reloaded = CodeIndex(tree, path, refresh_seconds=0)
+        assert set(reloaded.files) == set(index.files)
+        started = time.monotonic()
+        assert reloaded.refresh() == 0  # nothing re-read after a restart
+        assert time.monotonic() - started < 5
+        assert CodeIndexCache(str(tmp_path / "idx")).get(tree).files.keys() == index.files.keys()
+
+    def test_disk_indexes_are_pruned(self, tmp_path):
+        cache = CodeIndexCache(str(tmp_path / "idx"), max_indexes=2, refresh_seconds=0)
+        for name in ("r1", "r2", "r3"):
+            root = str(tmp_path / name)
+            write(root, "x.py", "x = 1\n")
+            cache.get(root).refresh()
+        cache.get(str(tmp_path / "r1"))
+        assert len(os.listdir(tmp_path / "idx")) == 2
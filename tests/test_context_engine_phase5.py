@@ -133,6 +133,61 @@ class TestContextBuilder:
         assert len(prompt) >= 4
 
 
+class SlowProvider:
+    """Records overlap: every call sleeps, so sequential awaits take 3x longer."""
+
+    def __init__(self, log, name, result):
+        self.log, self.name, self.result = log, name, result
+        self.calls = 0
+
+    async def _call(self):
+        import asyncio
+        self.calls += 1
+        self.log.append(("start", self.name))
+        await asyncio.sleep(0.05)
+        self.log.append(("end", self.name))
+        return self.result
+
+    async def retrieve(self, *args, **kwargs):
+        return await self._call()
+
+    async def load(self, session_id, limit=20):
+        return await self._call()
+
+
+class TestContextPrefetch:
+    @pytest.mark.asyncio
+    async def test_retrievals_run_concurrently(self):
+        log = []
+        builder = ContextBuilder(
+            memory_provider=SlowProvider(log, "memory", [{"value": "m"}]),
+            knowledge_provider=SlowProvider(log, "knowledge", [{"text": "k", "source": "s"}]),
+            history_provider=SlowProvider(log, "history", [{"role": "user", "content": "h"}]),
+        )
+        ctx = make_ctx(session_id=1, memory_config={"type": "user"}, knowledge_sources=["docs"])
+        await builder.build(ctx, [{"role": "user", "content": "q"}])
+        # all three started before the first one finished
+        assert [kind for kind, _ in log[:3]] == ["start", "start", "start"]
+
+    @pytest.mark.asyncio
+    async def test_prefix_memoized_per_run(self):
+        log = []
+        memory = SlowProvider(log, "memory", [{"value": "m"}])
+        history = SlowProvider(log, "history", [{"role": "user", "content": "h"}])
+        builder = ContextBuilder(memory_provider=memory, history_provider=history)
+        ctx = make_ctx(session_id=1, memory_config={"type": "user"})
+        working = [{"role": "user", "content": "q"}]
+        first = await builder.build(ctx, working, 1)
+        working.append({"role": "assistant", "content": "a"})
+        second = await builder.build(ctx, working, 2)
+        assert memory.calls == 1 and history.calls == 1
+        assert second[:len(first)] == first
+        assert second[-1] == {"role": "assistant", "content": "a"}
+        # a new run retrieves again
+        await builder.build(make_ctx(session_id=1, memory_config={"type": "user"}), working)
+        assert memory.calls == 2
+
+
 class TestRuntimeContext:
     @pytest.mark.asyncio
     async def test_engine_uses_context_builder(self):
@@ -187,4 +242,75 @@ class TestRuntimeContext:
         from runtime.kb_provider import SessionHistoryProvider
         prov = SessionHistoryProvider()
         history = await prov.load(999999)
-        assert history == []
\ No newline at end of file
+        assert history == []
+
+class TestTokenBudget:
+    def test_heuristic_counts_cjk_per_character(self):
+        from runtime.context.tokens import HeuristicCounter
+        counter = HeuristicCounter()
+        assert counter.count("a" * 400) == 100
+        # ~1 token per ideograph, not len // 4
+        assert counter.count("中" * 400) >= 400
+
+    def test_message_tokens_are_cached(self):
+        from runtime.context.tokens import CachedCounter, HeuristicCounter
+        counter = CachedCounter(HeuristicCounter())
+        msg = {"role": "user", "content": "hello world"}
+        first = counter.message_tokens(msg)
+        assert counter.message_tokens(dict(msg)) == first
+        assert (counter.hits, counter.misses) == (1, 1)
+
+    def test_local_tokenizer_preferred(self):
+        from runtime.context.tokens import get_token_counter
+
+        class Tok:
+            def encode(self, text, add_special_tokens=False):
+                return text.split()
+
+        counter = get_token_counter("local-model", Tok())
+        assert counter.name == "tokenizer"
+        assert counter.count("a b c") == 3
+
+    @pytest.mark.asyncio
+    async def test_cjk_history_trimmed_to_budget(self):
+        builder = ContextBuilder()
+        working = [{"role": "user", "content": f"{i}" + "项目" * 100} for i in range(20)]
+        ctx = make_ctx(max_context_tokens=2000)
+        prompt = await builder.build(ctx, working)
+        counter = builder.counter_for(ctx.model)
+        assert sum(counter.message_tokens(m) for m in prompt) <= 2000
+        assert prompt[-1]["content"].startswith("19")
+        # contiguous recent suffix, no holes
+        contents = [m["content"] for m in prompt[1:]]
+        assert contents == [m["content"] for m in working[-len(contents):]]
+
+    @pytest.mark.asyncio
+    async def test_tool_result_kept_with_its_call(self):
+        builder = ContextBuilder()
+        builder.MIN_RECENT = 1
+        working = [
+            {"role": "user", "content": "x" * 400},
+            {"role": "assistant", "content": "", "tool_calls": [{"id": "c1", "function": {"name": "t"}}]},
+            {"role": "tool", "tool_call_id": "c1", "content": "y" * 400},
+        ]
+        ctx = make_ctx(max_context_tokens=60)
+        prompt = await builder.build(ctx, working)
+        assert [m["role"] for m in prompt] == ["system", "assistant", "tool"]
+
+    @pytest.mark.asyncio
+    async def test_dropped_history_summarized_once(self):
+        calls = []
+
+        async def summarize(dropped, max_tokens):
+            calls.append(len(dropped))
+            return f"{len(dropped)} earlier turns"
+
+        builder = ContextBuilder(summarizer=summarize)
+        working = [{"role": "user", "content": "msg" + str(i) * 400} for i in range(10)]
+        ctx = make_ctx(max_context_tokens=800)
+        prompt = await builder.build(ctx, working)
+        assert prompt[1]["role"] == "system"
+        assert "earlier turns" in prompt[1]["content"]
+        assert prompt[-1]["content"].startswith("msg9")
+        await builder.build(ctx, working)
+        assert len(calls) == 1
@@ -0,0 +1,152 @@
+"""filesystem.read ranged reads: byte windows, line ranges, sparse line index, sniffing."""
+import codecs
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend", "app"))
+
+from services import file_reader
+from services.agent_tools import tool_file_read
+from services.file_reader import LineIndex, line_indexes, read_window, sniff
+
+
+@pytest.fixture
+def log_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_reader, "CHUNK", 256)  # many chunks in a small file
+    path = tmp_path / "app.log"
+    path.write_text("".join(f"line {n}\n" for n in range(1, 1001)), encoding="utf-8")
+    return str(path)
+
+
+class TestSniffing:
+    def test_first_block_decides(self):
+        assert sniff(b"plain text") == "utf-8"
+        assert sniff("中文".encode("utf-8")[:-1]) == "utf-8"  # cut mid-character
+        assert sniff(codecs.BOM_UTF16_LE + "hi".encode("utf-16-le")) == "utf-16-le"
+        assert sniff(b"\xff\xfe"[1:] + b"caf\xe9") == "latin-1"
+        assert sniff(b"\x7fELF\x00\x01") is None
+
+    def test_binary_file_is_refused(self, tmp_path):
+        path = tmp_path / "blob.bin"
+        path.write_bytes(b"\x00" * 100)
+        assert "binary" in tool_file_read(str(path))
+
+
+class TestRanges:
+    def test_head_of_small_file_is_unchanged(self, tmp_path):
+        path = tmp_path / "a.txt"
+        path.write_text("Hello, world!", encoding="utf-8")
+        assert tool_file_read(str(path)) == "Hello, world!"
+
+    def test_head_of_large_file_is_truncated(self, tmp_path):
+        path = tmp_path / "big.txt"
+        path.write_text("x" * 50000, encoding="utf-8")
+        out = tool_file_read(str(path))
+        assert out.startswith("x" * 5000) and "truncated" in out
+
+    def test_byte_window_pages(self, log_file):
+        out = tool_file_read(log_file, offset=0, length=14)
+        assert out.startswith("line 1\nline 2\n") and "next offset=14" in out
+        assert "outside the file" in tool_file_read(log_file, offset=10 ** 9)
+
+    def test_line_range_uses_sparse_index(self, log_file):
+        out = tool_file_read(log_file, start_line=500, end_line=502)
+        assert out.splitlines() == ["line 500", "line 501", "line 502", "[lines 500-502; next start_line=503]"]
+        index = line_indexes.get(log_file, os.stat(log_file))
+        assert not index.complete  # only counted up to line 503
+        covered = len(index.counts)
+        tool_file_read(log_file, start_line=10, end_line=11)
+        assert len(index.counts) == covered  # earlier lines reuse the index
+
+    def test_line_range_to_end_reports_total(self, log_file):
+        out = tool_file_read(log_file, start_line=999)
+        assert out.splitlines() == ["line 999", "line 1000", "[lines 999-1000 of 1000]"]
+        assert "past the end" in tool_file_read(log_file, start_line=1001)
+        assert "invalid line range" in tool_file_read(log_file, start_line=5, end_line=2)
+
+    def test_long_ranges_are_capped_on_line_boundaries(self, log_file):
+        out = read_window(log_file, start_line=1, end_line=1000)
+        body, footer = out.rsplit("\n", 1)
+        assert len(body) <= file_reader.MAX_CHARS
+        last = int(body.splitlines()[-1].split()[1])
+        # locating end_line + 1 indexed the whole file, so the total is known
+        assert footer == f"[lines 1-{last} of 1000; next start_line={last + 1}]"
+
+    def test_modified_file_gets_a_fresh_index(self, log_file):
+        tool_file_read(log_file, start_line=2, end_line=2)
+        with open(log_file, "a", encoding="utf-8") as f:
+            f.write("line 1001\n")
+        assert tool_file_read(log_file, start_line=1001).splitlines()[0] == "line 1001"
+
+    def test_next_offset_counts_consumed_bytes(self, tmp_path):
+        bom = tmp_path / "bom.txt"
+        bom.write_bytes(codecs.BOM_UTF8 + b"a" * 6000)
+        out = tool_file_read(str(bom), offset=0, length=6000)
+        assert out.endswith("[bytes 0-5003 of 6003; next offset=5003]")  # BOM + 5000 chars
+
+        mixed = tmp_path / "mixed.txt"
+        mixed.write_bytes("é".encode("utf-8") * 5000 + b"\xff" * 10 + b"b" * 6000)  # sniffed as utf-8
+        out = tool_file_read(str(mixed), offset=9990, length=9000)
+        assert out.endswith("next offset=14995]")  # 5 x 2 bytes + 10 replaced bytes + 4985 x 1 byte
+        assert tool_file_read(str(mixed), offset=14995, length=1).startswith("b\n")
+
+    def test_windows_do_not_split_characters(self, tmp_path):
+        path = tmp_path / "cjk.txt"
+        path.write_text("中文" * 10, encoding="utf-8")
+        out = tool_file_read(str(path), offset=0, length=4)
+        assert out == "中\n[bytes 0-3 of 60; next offset=3]"
+
+    def test_utf16_pages_by_offset_only(self, tmp_path):
+        path = tmp_path / "u16.txt"
+        path.write_bytes(codecs.BOM_UTF16_LE + "line1\nline2\n".encode("utf-16-le"))
+        assert tool_file_read(str(path)) == "line1\nline2\n"
+        assert tool_file_read(str(path), offset=0, length=8) == "lin\n[bytes 0-8 of 26; next offset=8]"
+        assert tool_file_read(str(path), offset=9, length=4).startswith("e1\n[bytes 8-12")
+        assert "not supported for utf-16-le" in tool_file_read(str(path), start_line=2)
+
+    def test_overlong_line_continues_by_offset(self, tmp_path):
+        path = tmp_path / "wide.txt"
+        path.write_text("x" * 12000 + "\nshort\n", encoding="utf-8")
+        out = tool_file_read(str(path), start_line=1)
+        body, footer = out.rsplit("\n", 1)
+        assert body == "x" * 5000
+        assert footer == "[line 1 continues; bytes 0-5000 of 12007; next offset=5000]"
+        out = tool_file_read(str(path), start_line=1, end_line=2)
+        assert out.endswith("next offset=5000]")
+
+    def test_empty_line_before_overlong_line(self, tmp_path):
+        path = tmp_path / "gap.txt"
+        path.write_text("\n" + "y" * 9000 + "\n", encoding="utf-8")
+        assert tool_file_read(str(path), start_line=1) == "\n[lines 1-1; next start_line=2]"
+
+    def test_zero_size_pseudo_files_are_read(self, tmp_path):
+        if not os.path.exists("/proc/self/status"):
+            pytest.skip("no procfs")
+        out = tool_file_read("/proc/self/status")
+        assert out.startswith("Name:")
+        assert tool_file_read("/proc/self/status", start_line=2, end_line=2).splitlines()[1].startswith("[lines 2-2")
+        empty = tmp_path / "empty.txt"
+        empty.write_bytes(b"")
+        assert tool_file_read(str(empty)) == ""
+
+    def test_line_index_offsets(self):
+        import mmap
+        import tempfile
+        with tempfile.TemporaryFile() as f:
+            f.write(b"a\nbb\n\nccc")
+            f.flush()
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                index = LineIndex(9)
+                assert [index.line_offset(mm, n) for n in (1, 2, 3, 4)] == [0, 2, 5, 6]
+                assert index.line_offset(mm, 5) is None
+                assert index.total_lines(mm) == 4
+
+
+class TestSchema:
+    def test_paging_parameters_are_advertised(self):
+        from runtime.tools.builtin import register_builtin_tools
+        from runtime.tools.registry import ToolRegistry
+        props = register_builtin_tools(ToolRegistry()).get("filesystem.read").input_schema()["properties"]
+        assert {"offset", "length", "start_line", "end_line"} <= set(props)
@@ -0,0 +1,97 @@
+"""Load harness: mock LLM pacing, report rendering, CLI and a short end-to-end run."""
+import json
+import os
+import sys
+import time
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from tools.loadgen import (
+    LoadConfig,
+    MockLLMConfig,
+    create_mock_app,
+    percentile,
+    render_markdown,
+    run_load,
+    summarize,
+)
+from tools.loadgen.__main__ import main
+
+
+def mock_client(**cfg):
+    app = create_mock_app(MockLLMConfig(**cfg))
+    return app, httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://mock")
+
+
+class TestStats:
+    def test_percentile_interpolates(self):
+        values = [float(v) for v in range(1, 101)]
+        assert percentile(values, 0.5) == pytest.approx(50.5)
+        assert percentile(values, 0.99) == pytest.approx(99.01)
+        assert percentile([], 0.95) == 0.0
+
+    def test_summarize(self):
+        s = summarize([10.0, 20.0, 30.0, 40.0])
+        assert s["count"] == 4 and s["mean_ms"] == 25.0 and s["max_ms"] == 40.0
+        assert s["p50_ms"] <= s["p95_ms"] <= s["p99_ms"] <= s["max_ms"]
+
+
+class TestMockLLM:
+    @pytest.mark.asyncio
+    async def test_non_streaming_waits_latency_plus_tokens(self):
+        app, client = mock_client(latency_ms=50, tokens_per_second=200, output_tokens=10)
+        async with client:
+            started = time.perf_counter()
+            r = await client.post("/api/chat", json={"model": "m", "stream": False, "messages": [{"role": "user", "content": "x" * 40}]})
+            elapsed = time.perf_counter() - started
+        data = r.json()
+        assert elapsed >= 0.1  # 50 ms first token + 10 tokens at 200/s
+        assert data["done"] and data["eval_count"] == 10 and data["prompt_eval_count"] == 10
+        assert data["message"]["content"].startswith("tok0 tok1")
+        assert app.state.stats.to_dict()["requests"] == 1
+
+    @pytest.mark.asyncio
+    async def test_streams_ndjson_tokens(self):
+        app, client = mock_client(latency_ms=0, tokens_per_second=0, output_tokens=3)
+        async with client:
+            r = await client.post("/api/chat", json={"model": "m", "messages": []})
+            lines = [json.loads(line) for line in r.text.splitlines()]
+            tags = (await client.get("/api/tags")).json()
+        assert [line["message"]["content"] for line in lines[:-1]] == ["tok0 ", "tok1 ", "tok2 "]
+        assert lines[-1] == {"done": True, "prompt_eval_count": 0, "eval_count": 3}
+        assert tags == {"models": [{"name": "loadgen-mock"}]}
+        stats = app.state.stats.to_dict()
+        assert stats["streamed"] == 1 and stats["output_tokens"] == 3
+
+
+class TestCli:
+    def test_rejects_unknown_operations(self, capsys):
+        assert main(["--mix", "run=1,upload=2"]) == 2
+        assert "upload" in capsys.readouterr().err
+
+
+class TestLoadRun:
+    def test_short_run_reports_every_operation(self, tmp_path):
+        cfg = LoadConfig(
+            users=2, rate=12, duration=2.0, seed=3,
+            llm=MockLLMConfig(latency_ms=10, tokens_per_second=0, output_tokens=4),
+            workdir=str(tmp_path / "work"),
+        )
+        report = run_load(cfg)
+
+        assert report["throughput"]["errors"] == 0 and report["throughput"]["completed"] > 0
+        assert set(report["operations"]) <= {"run", "run.create", "chat", "chat.ttft", "kb.query", "task.create"}
+        for op in report["operations"].values():
+            assert op["p50_ms"] <= op["p95_ms"] <= op["p99_ms"] <= op["max_ms"]
+        streams = report["task_streams"]
+        assert streams["streams"] == 2 and streams["missing"] == 0
+        assert report["outbox"]["backlog"] == 0 and report["outbox"]["rows"] >= streams["expected"]
+        assert report["db_pool"]["checkouts"] > 0
+        assert report["mock_llm"]["requests"] == report["operations"].get("run", {}).get("count", 0) + report["operations"].get("chat", {}).get("count", 0)
+        assert (tmp_path / "work" / "modelforge.db").exists()
+
+        markdown = render_markdown(report)
+        assert "## 操作延迟" in markdown and "结束时积压 **0**" in markdown
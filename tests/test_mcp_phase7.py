@@ -149,4 +149,154 @@ class TestRuntimeMCP:
                 assert r.status_code == 400
                 r = c.get("/api/v1/agent/mcp/servers", headers=headers)
                 assert r.status_code == 200
-                assert "servers" in r.json()
\ No newline at end of file
+                assert "servers" in r.json()
+
+STDIO_SERVER = r'''
+import json, sys, threading, time, os
+
+lock = threading.Lock()
+tools = [{"name": "stdio.echo", "description": "echo", "inputSchema": {"type": "object"}}]
+
+def send(message):
+    with lock:
+        sys.stdout.write(json.dumps(message) + "\n")
+        sys.stdout.flush()
+
+def handle(msg):
+    method, rid = msg.get("method"), msg.get("id")
+    if method == "initialize":
+        send({"jsonrpc": "2.0", "id": rid, "result": {"serverInfo": {"name": "stdio-fake", "pid": os.getpid()}}})
+    elif method == "tools/list":
+        send({"jsonrpc": "2.0", "id": rid, "result": {"tools": tools}})
+    elif method == "tools/call":
+        args = msg["params"]["arguments"]
+        if msg["params"]["name"] == "crash":
+            os._exit(1)
+        if msg["params"]["name"] == "grow":
+            tools.append({"name": "stdio.new", "description": "new", "inputSchema": {"type": "object"}})
+            send({"jsonrpc": "2.0", "method": "notifications/tools/list_changed"})
+        time.sleep(args.get("delay", 0))
+        send({"jsonrpc": "2.0", "id": rid, "result": {"content": [{"type": "text", "text": str(args.get("text", os.getpid()))}]}})
+
+print("server starting (not json)", flush=True)
+for line in sys.stdin:
+    msg = json.loads(line)
+    if "id" in msg and "method" in msg:
+        threading.Thread(target=handle, args=(msg,)).start()
+'''
+
+
+@pytest.fixture
+def stdio_command(tmp_path):
+    script = tmp_path / "fake_mcp_server.py"
+    script.write_text(STDIO_SERVER, encoding="utf-8")
+    return [sys.executable, str(script)]
+
+
+class TestMCPSessions:
+    @pytest.mark.asyncio
+    async def test_http_reuses_one_keepalive_client(self):
+        client = MCPClient("fake", "http://fake/mcp").with_transport(fake_transport())
+        await client.initialize()
+        http = client._transport._client
+        await client.call_tool("mcp.time", {})
+        await client.call_tool("mcp.time", {})
+        assert client._transport._client is http
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_list_tools_is_cached(self):
+        calls = []
+
+        def handler(request):
+            payload = json.loads(request.content)
+            calls.append(payload.get("method"))
+            return fake_transport().handle_request(request)
+        client = MCPClient("fake", "http://fake/mcp").with_transport(httpx.MockTransport(handler))
+        await client.list_tools()
+        await client.list_tools()
+        assert calls.count("tools/list") == 1 and calls[0] == "initialize"  # lazy handshake
+        await client.list_tools(refresh=True)
+        assert calls.count("tools/list") == 2
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_stdio_multiplexes_concurrent_calls(self, stdio_command):
+        import asyncio
+        import time
+        client = MCPClient("local", command=stdio_command)
+        await client.initialize()
+        assert client.transport_kind == "stdio" and client.server_info["name"] == "stdio-fake"
+        started = time.monotonic()
+        outs = await asyncio.gather(
+            client.call_tool("stdio.echo", {"text": "slow", "delay": 0.5}),
+            client.call_tool("stdio.echo", {"text": "fast"}),
+            *(client.call_tool("stdio.echo", {"text": str(i), "delay": 0.3}) for i in range(5)),
+        )
+        assert outs[:2] == ["slow", "fast"] and outs[2:] == [str(i) for i in range(5)]
+        assert time.monotonic() - started < 2.5  # overlapped, not 2s of serial calls
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_stdio_reconnects_after_server_exit(self, stdio_command):
+        from runtime.mcp import MCPConnectionError
+        client = MCPClient("local", command=stdio_command, backoff_seconds=0.01)
+        await client.initialize()
+        first_pid = client.server_info["pid"]
+        with pytest.raises(MCPConnectionError):
+            await client.call_tool("crash", {})  # in flight when it died: not resent
+        assert await client.call_tool("stdio.echo", {"text": "back"}) == "back"
+        assert client.reconnects == 1 and client.server_info["pid"] != first_pid
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_stdio_transport_never_respawns_without_the_handshake(self, stdio_command):
+        from runtime.mcp import MCPConnectionError
+        client = MCPClient("local", command=stdio_command, backoff_seconds=0.01)
+        await client.initialize()
+        first_pid = client._transport.pid
+        client._transport._proc.kill()
+        await client._transport._proc.wait()
+        with pytest.raises(MCPConnectionError) as e:
+            await client._transport.request({"jsonrpc": "2.0", "id": "raw", "method": "tools/list"})
+        assert e.value.sent is False and client._transport.pid == first_pid
+        assert await client.call_tool("stdio.echo", {"text": "again"}) == "again"
+        assert client.reconnects == 1 and client.server_info["pid"] == client._transport.pid != first_pid
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_server_requests_are_answered_from_tracked_tasks(self, stdio_command):
+        import asyncio
+        client = MCPClient("local", command=stdio_command)
+        await client.initialize()
+        client._on_message({"jsonrpc": "2.0", "id": 99, "method": "ping"})
+        assert len(client._background) == 1
+        await asyncio.gather(*list(client._background))
+        assert not client._background
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_tools_list_changed_resyncs_registry(self, stdio_command):
+        import asyncio
+
+        from core.database import init_db
+        from repositories.run_repository import SQLAlchemyRunStore
+        from runtime.events import EventBus
+        from runtime.runtime import AgentRuntime
+        from services.agent_store import DBAgentStore
+        init_db()
+        registry = ToolRegistry()
+        rt = AgentRuntime(
+            run_store=SQLAlchemyRunStore(), agent_store=DBAgentStore(engine=None),
+            event_bus=EventBus(), tool_registry=registry, tool_runner=ToolExecutor(registry),
+        )
+        info = await rt.register_mcp_server("local", command=stdio_command)
+        assert info["transport"] == "stdio" and rt.get_tool("stdio.echo") is not None
+        await rt.get_tool("stdio.echo")._client.call_tool("grow", {})
+        for _ in range(50):
+            if rt.get_tool("stdio.new") is not None:
+                break
+            await asyncio.sleep(0.02)
+        assert rt.get_tool("stdio.new") is not None
+        assert await rt.unregister_mcp_server("local") is True
+        assert rt.get_tool("stdio.echo") is None
@@ -0,0 +1,118 @@
+"""Runtime metrics: fixed-memory histograms, labelled series, Prometheus exposition."""
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend", "app"))
+
+from runtime.metrics import Histogram, MetricsRegistry, timed_stream
+
+
+class TestHistogram:
+    def test_percentiles_are_within_bucket_error(self):
+        rng = random.Random(7)
+        values = [rng.lognormvariate(-3, 1.2) for _ in range(20000)]
+        h = Histogram()
+        for v in values:
+            h.observe(v)
+        values.sort()
+        for q in (0.5, 0.95, 0.99):
+            exact = values[int(q * len(values)) - 1]
+            assert abs(h.quantile(q) - exact) / exact < 0.1
+        assert h.count == 20000 and h.max == values[-1] and h.min == values[0]
+
+    def test_tail_is_not_averaged_away(self):
+        h = Histogram()
+        for _ in range(980):
+            h.observe(0.01)
+        for _ in range(20):
+            h.observe(5.0)
+        assert h.quantile(0.5) == pytest.approx(0.01, rel=0.1)
+        assert h.quantile(0.99) == 5.0  # clamped to the observed max
+
+    def test_extremes_and_cumulative_buckets(self):
+        h = Histogram()
+        for v in (0.0, 1e-9, 1e9):
+            h.observe(v)
+        assert h.quantile(0.01) == 0.0 and h.quantile(1.0) == 1e9
+        bounds = h.cumulative()
+        assert bounds[0] == (Histogram.MIN, 2) and bounds[-1][1] == 2
+        assert all(b[0] * 2 == pytest.approx(a[0]) for b, a in zip(bounds, bounds[1:]))
+
+
+class TestRegistry:
+    def test_labelled_counters_sum_without_labels(self):
+        m = MetricsRegistry()
+        m.on_tool_call(0.2, tool="web.fetch", agent="a", status="ok")
+        m.on_tool_call(0.4, tool="web.fetch", agent="a", status="timeout")
+        m.on_tool_call(0.1, tool="code.search", agent="b")
+        assert m.count("tool_calls_total") == 3
+        assert m.count("tool_calls_total", tool="web.fetch", agent="a", status="timeout") == 1
+        assert m.histogram("tool_call_duration", tool="web.fetch").count == 2
+        snap = m.snapshot()
+        assert snap["tool_call_duration_total"] == 3 and snap["tool_call_duration_max"] == 0.4
+        assert {"tool_call_duration_p50", "tool_call_duration_p95", "tool_call_duration_p99"} <= set(snap)
+
+    def test_label_cardinality_is_bounded(self, monkeypatch):
+        monkeypatch.setattr(MetricsRegistry, "MAX_SERIES", 3)
+        m = MetricsRegistry()
+        for i in range(10):
+            m.inc("llm_calls_total", model=f"m{i}")
+        assert len(m._counters["llm_calls_total"]) == 4  # 3 label sets + the overflow series
+        assert m.count("llm_calls_total") == 10
+
+    def test_prometheus_exposition(self):
+        m = MetricsRegistry()
+        m.on_llm_call(120, duration=0.75, model='gpt "x"', agent="bot")
+        m.inc("agent_runs_success")
+        m.gauge("event_queue_depth", lambda: 4)
+        text = m.render_prometheus(gauges={"runs_active": 2, "label": "skipped"})
+        assert '# TYPE modelforge_llm_calls_total counter' in text
+        assert 'modelforge_llm_calls_total{agent="bot",model="gpt \\"x\\"",status="ok"} 1' in text
+        assert 'modelforge_llm_tokens_total{model="gpt \\"x\\""} 120' in text
+        assert "modelforge_agent_runs_success_total 1" in text
+        assert "# TYPE modelforge_llm_request_duration_seconds histogram" in text
+        assert 'modelforge_llm_request_duration_seconds_bucket{model="gpt \\"x\\"",status="ok",le="+Inf"} 1' in text
+        assert 'modelforge_llm_request_duration_seconds_count{model="gpt \\"x\\"",status="ok"} 1' in text
+        assert "modelforge_event_queue_depth 4" in text and "modelforge_runs_active 2" in text
+        assert "label" not in text
+
+
+class TestInstrumentation:
+    @pytest.mark.asyncio
+    async def test_timed_stream_records_time_to_first_token(self):
+        import asyncio
+        m = MetricsRegistry()
+
+        async def chunks():
+            await asyncio.sleep(0.05)
+            yield "a"
+            await asyncio.sleep(0.05)
+            yield "b"
+
+        assert [c async for c in timed_stream(chunks(), model="m", metrics=m)] == ["a", "b"]
+        ttft = m.histogram("llm_time_to_first_token", model="m")
+        total = m.histogram("llm_request_duration", model="m", status="ok")
+        assert ttft.count == 1 and total.count == 1 and ttft.max < total.max
+
+    def test_db_checkouts_record_wait(self):
+        import core.database as database
+        from core.database import SessionLocal, set_checkout_observer
+        from runtime.metrics import get_metrics, instrument_db_pool
+        from sqlalchemy import text
+        previous = database._checkout_observer
+        instrument_db_pool()
+        try:
+            before = get_metrics().histogram("db_session_wait_duration").count
+            with SessionLocal() as db:
+                db.execute(text("select 1"))
+            assert get_metrics().histogram("db_session_wait_duration").count == before + 1
+        finally:
+            set_checkout_observer(previous)
+
+    def test_sampled_totals_are_exposed_as_counters(self):
+        text = MetricsRegistry().render_prometheus(gauges={"tool_pool_io_thread_tasks_total": 4, "tool_pool_io_thread_active": 1})
+        assert "# TYPE modelforge_tool_pool_io_thread_tasks_total counter" in text
+        assert "# TYPE modelforge_tool_pool_io_thread_active gauge" in text
@@ -0,0 +1,264 @@
+"""Model usage buckets: classification, in-memory aggregation, batched upserts, insights."""
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend", "app"))
+
+from runtime.errors import ModelRateLimitedError
+from services.model_metrics import MeteredRuntime, ModelMetricsRecorder, classify
+
+
+def make_user(username):
+    from core.database import SessionLocal, init_db
+    from models.records import User
+    init_db()
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.username == username).first()
+        if user is None:
+            user = User(username=username, email=username + "@x.com", password_hash="x")
+            db.add(user)
+            db.commit()
+        return user.id
+    finally:
+        db.close()
+
+
+def buckets(user_id):
+    from core.database import SessionLocal
+    from models.records import ModelMetricBucket
+    db = SessionLocal()
+    try:
+        return db.query(ModelMetricBucket).filter(ModelMetricBucket.user_id == user_id).all()
+    finally:
+        db.close()
+
+
+def http_error(status):
+    request = httpx.Request("POST", "http://model.local/v1/chat/completions")
+    return httpx.HTTPStatusError("boom", request=request, response=httpx.Response(status, request=request))
+
+
+class FakeRuntime:
+    def __init__(self, fail=None):
+        self.fail = fail
+        self.calls = 0
+
+    async def chat(self, model_name, messages, **kwargs):
+        self.calls += 1
+        if self.fail is not None:
+            raise self.fail
+        return {"content": "hello world", "model": model_name}
+
+    async def stream_chat(self, model_name, messages, **kwargs):
+        for chunk in ("hel", "lo"):
+            yield chunk
+
+    def status(self):
+        return {"ok": True}
+
+
+class TestClassify:
+    def test_outcome_classes(self):
+        assert classify(None) == "ok"
+        assert classify(asyncio.TimeoutError()) == "timeout"
+        assert classify(httpx.ReadTimeout("slow")) == "timeout"
+        assert classify(ModelRateLimitedError()) == "429"
+        assert classify(http_error(429)) == "429"
+        assert classify(http_error(404)) == "4xx"
+        assert classify(http_error(503)) == "5xx"
+        assert classify(ValueError("bad model")) == "4xx"
+        assert classify(ConnectionError("refused")) == "5xx"
+
+
+class TestRecorder:
+    def test_same_minute_aggregates_in_memory(self):
+        recorder = ModelMetricsRecorder()
+        recorder.record(1, "m", 100.0, input_tokens=10, output_tokens=5)
+        recorder.record(1, "m", 50.0, error=http_error(429))
+        recorder.record(1, "other", 10.0)
+        recorder.record(None, "m", 10.0)  # anonymous calls are not bucketed
+        assert recorder.pending() == 2
+        bucket = recorder._buckets[next(k for k in recorder._buckets if k[1] == "m")]
+        assert (bucket.request_count, bucket.success_count, bucket.error_429_count) == (2, 1, 1)
+        assert bucket.latency_sum_ms == 150.0 and bucket.input_tokens_estimate == 10
+
+    def test_flush_upserts_into_existing_rows(self):
+        user_id = make_user("metrics-flush")
+        recorder = ModelMetricsRecorder()
+        recorder.record(user_id, "flush-model", 100.0, input_tokens=10, output_tokens=4)
+        recorder.record(user_id, "flush-model", 300.0, error=asyncio.TimeoutError())
+        assert recorder.flush() == 1 and recorder.pending() == 0
+        recorder.record(user_id, "flush-model", 200.0, error=http_error(500), input_tokens=5)
+        assert recorder.flush() == 1
+        assert recorder.flush() == 0
+
+        rows = [r for r in buckets(user_id) if r.model_ref == "flush-model"]
+        assert len(rows) == 1  # second flush merged into the same minute bucket
+        row = rows[0]
+        assert (row.request_count, row.success_count, row.timeout_count, row.error_5xx_count) == (3, 1, 1, 1)
+        assert row.latency_sum_ms == 600.0
+        assert (row.input_tokens_estimate, row.output_tokens_estimate) == (15, 4)
+        assert row.bucket_start.second == 0 and row.bucket_start.microsecond == 0
+
+    def test_flush_without_native_upsert_merges_rows(self, monkeypatch):
+        from services import model_metrics
+        monkeypatch.setattr(model_metrics, "_UPSERT_DIALECTS", {})
+        user_id = make_user("metrics-generic")
+        recorder = ModelMetricsRecorder()
+        recorder.record(user_id, "generic-model", 100.0, input_tokens=3)
+        assert recorder.flush() == 1
+        recorder.record(user_id, "generic-model", 50.0, error=http_error(429))
+        assert recorder.flush() == 1
+
+        rows = [r for r in buckets(user_id) if r.model_ref == "generic-model"]
+        assert len(rows) == 1
+        assert (rows[0].request_count, rows[0].success_count, rows[0].error_429_count) == (2, 1, 1)
+        assert rows[0].latency_sum_ms == 150.0 and rows[0].input_tokens_estimate == 3
+
+    def test_failed_flush_keeps_buckets(self):
+        class BrokenSession:
+            def execute(self, *a, **kw):
+                raise RuntimeError("db down")
+
+            def rollback(self):
+                pass
+
+            def close(self):
+                pass
+
+        recorder = ModelMetricsRecorder(session_factory=BrokenSession)
+        recorder.record(1, "m", 10.0)
+        assert recorder.flush() == 0
+        recorder.record(1, "m", 10.0)
+        assert recorder.pending() == 1 and recorder.flush_failures == 1
+        assert next(iter(recorder._buckets.values())).request_count == 2
+
+    def test_background_flusher(self):
+        user_id = make_user("metrics-thread")
+        recorder = ModelMetricsRecorder(flush_interval=0.05)
+        recorder.start()
+        try:
+            recorder.record(user_id, "thread-model", 1.0)
+            deadline = time.monotonic() + 2.0
+            while recorder.pending() and time.monotonic() < deadline:
+                time.sleep(0.02)
+        finally:
+            recorder.stop()
+        assert [r.request_count for r in buckets(user_id) if r.model_ref == "thread-model"] == [1]
+
+
+class TestMeteredRuntime:
+    @pytest.mark.asyncio
+    async def test_chat_records_success_and_errors(self):
+        recorder = ModelMetricsRecorder()
+        ok = MeteredRuntime(FakeRuntime(), 7, recorder)
+        result = await ok.chat("m", [{"role": "user", "content": "hi there"}])
+        assert result["content"] == "hello world"
+        assert ok.status() == {"ok": True}  # other attributes pass through
+
+        failing = MeteredRuntime(FakeRuntime(fail=http_error(404)), 7, recorder)
+        with pytest.raises(httpx.HTTPStatusError):
+            await failing.chat("m", [])
+        bucket = next(iter(recorder._buckets.values()))
+        assert (bucket.request_count, bucket.success_count, bucket.error_4xx_count) == (2, 1, 1)
+        assert bucket.input_tokens_estimate > 0 and bucket.output_tokens_estimate > 0
+
+    @pytest.mark.asyncio
+    async def test_stream_records_once_after_the_last_chunk(self):
+        recorder = ModelMetricsRecorder()
+        runtime = MeteredRuntime(FakeRuntime(), 7, recorder)
+        chunks = [c async for c in runtime.stream_chat("m", [{"role": "user", "content": "hi"}])]
+        assert chunks == ["hel", "lo"]
+        bucket = next(iter(recorder._buckets.values()))
+        assert bucket.request_count == 1 and bucket.success_count == 1
+
+    @pytest.mark.asyncio
+    async def test_stream_falls_back_to_chat(self):
+        class ChatOnly:
+            async def chat(self, model_name, messages, **kwargs):
+                return {"content": "whole"}
+
+        runtime = MeteredRuntime(ChatOnly(), 7, ModelMetricsRecorder())
+        assert [c async for c in runtime.stream_chat("m", [])] == ["whole"]
+
+
+    def test_session_summary_bypasses_metering(self, monkeypatch):
+        from services import chat_service
+        scheduled = []
+
+        class Summarizer:
+            def schedule(self, session_id, chat, model):
+                scheduled.append(chat)
+
+        class Db:
+            def commit(self):
+                pass
+
+        monkeypatch.setattr(chat_service, "get_summarizer", lambda: Summarizer())
+        monkeypatch.setattr(chat_service.SessionService, "add_message", lambda *a, **kw: None)
+        monkeypatch.setattr(chat_service.SessionService, "get_session_message_count", lambda *a: 4)
+        inner = FakeRuntime()
+        recorder = ModelMetricsRecorder()
+        selected = MeteredRuntime(inner, 7, recorder)
+        chat_service._persist(Db(), type("S", (), {"id": 1})(), "hi", "hello", selected, "m")
+
+        assert scheduled == [inner.chat]
+        asyncio.run(scheduled[0]("m", [{"role": "user", "content": "summarize"}]))
+        assert inner.calls == 1 and recorder.pending() == 0
+
+
+class TestAgentUsage:
+    @pytest.mark.asyncio
+    async def test_engine_records_provider_calls(self):
+        from runtime.cancellation import CancellationToken
+        from runtime.execution import ExecutionEngine
+        from runtime.models import MockProvider
+        from runtime.run_context import RunContext
+
+        recorder = ModelMetricsRecorder()
+        engine = ExecutionEngine(usage=recorder)
+        ctx = RunContext(
+            run_id="usage-run", agent_id="a", user_id=3, model="mock-model", input_text="hi",
+            tools=[], cancellation=CancellationToken(),
+        )
+        provider = MockProvider(script=[MockProvider.final("done", usage={"prompt_tokens": 12, "completion_tokens": 3})])
+        assert (await engine.execute(ctx, provider))["status"] == "COMPLETED"
+        [((user_id, model_ref, _), bucket)] = list(recorder._buckets.items())
+        assert (user_id, bucket.request_count, bucket.success_count) == (3, 1, 1)
+        assert model_ref
+        assert (bucket.input_tokens_estimate, bucket.output_tokens_estimate) == (12, 3)
+
+
+class TestInsightsApi:
+    def test_insights_reports_flushed_buckets(self):
+        from fastapi.testclient import TestClient
+        from main import app
+        from models.records import User
+        from services.model_metrics import get_model_metrics
+
+        with TestClient(app) as client:
+            client.post("/api/v1/auth/register", json={"username": "insights-user", "password": "secret123", "email": "insights@x.com"})
+            token = client.post("/api/v1/auth/login", json={"username": "insights-user", "password": "secret123"}).json()["token"]
+            h = {"Authorization": "Bearer " + token}
+            from core.database import SessionLocal
+            db = SessionLocal()
+            user_id = db.query(User).filter(User.username == "insights-user").first().id
+            db.close()
+
+            recorder = get_model_metrics()
+            assert recorder is not None
+            recorder.record(user_id, "insight-model", 120.0, input_tokens=8, output_tokens=2)
+            recorder.record(user_id, "insight-model", 80.0, error=http_error(502))
+            recorder.flush()
+            data = client.get("/api/v1/workspaces/insights", headers=h).json()
+
+        item = next(i for i in data["insights"] if i["model_ref"] == "insight-model")
+        assert item["request_count"] == 2 and item["success_count"] == 1 and item["error_count"] == 1
+        assert item["average_latency_ms"] == 100.0
+        assert (item["input_tokens_estimate"], item["output_tokens_estimate"]) == (8, 2)
@@ -0,0 +1,173 @@
+"""Local model residency: LRU eviction under budgets, pinning, pre-warm."""
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend", "app"))
+
+from services.runtimes.model_residency import ModelResidencyManager, ResidentModel
+
+MB = 1024 * 1024
+
+
+class FakeLoader:
+    def __init__(self, sizes=None, delay=0.0):
+        self.sizes = sizes or {}
+        self.delay = delay
+        self.loaded: list[str] = []
+        self.unloaded: list[str] = []
+
+    def load(self, path, **kwargs):
+        if self.delay:
+            import time
+            time.sleep(self.delay)
+        self.loaded.append(path)
+        return ResidentModel(path=path, model=f"weights:{path}", footprint_bytes=self.sizes.get(path, 10 * MB))
+
+    def unload(self, entry):
+        self.unloaded.append(entry.path)
+
+
+def make_manager(loader, **kw):
+    kw.setdefault("ram_budget_bytes", 1000 * MB)
+    kw.setdefault("vram_budget_bytes", 0)
+    return ModelResidencyManager(loader=loader.load, unloader=loader.unload, **kw)
+
+
+class TestResidency:
+    @pytest.mark.asyncio
+    async def test_hit_does_not_reload(self):
+        loader = FakeLoader()
+        mgr = make_manager(loader)
+        a = await mgr.acquire("m/a")
+        b = await mgr.acquire("m/a")
+        assert a is b
+        assert loader.loaded == ["m/a"]
+        assert mgr.hits == 1
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction_by_count(self):
+        loader = FakeLoader()
+        mgr = make_manager(loader, max_resident=2)
+        await mgr.acquire("m/a")
+        await mgr.acquire("m/b")
+        await mgr.acquire("m/a")  # a becomes most recent
+        await mgr.acquire("m/c")
+        assert loader.unloaded == ["m/b"]
+        assert mgr.is_resident("m/a") and mgr.is_resident("m/c")
+
+    @pytest.mark.asyncio
+    async def test_memory_budget_eviction(self):
+        loader = FakeLoader(sizes={"m/a": 60 * MB, "m/b": 30 * MB, "m/c": 50 * MB})
+        mgr = make_manager(loader, ram_budget_bytes=100 * MB, max_resident=5)
+        await mgr.acquire("m/a")
+        await mgr.acquire("m/b")
+        await mgr.acquire("m/c")  # 140MB > budget: evict LRU (a)
+        assert loader.unloaded == ["m/a"]
+        assert mgr.used("ram") == 80 * MB
+
+    @pytest.mark.asyncio
+    async def test_pinned_model_survives(self):
+        loader = FakeLoader()
+        mgr = make_manager(loader, max_resident=2, pinned=["m/a"])
+        await mgr.acquire("m/a")
+        await mgr.acquire("m/b")
+        await mgr.acquire("m/c")
+        assert mgr.is_resident("m/a")
+        assert loader.unloaded == ["m/b"]
+        mgr.unpin("m/a")
+        await mgr.acquire("m/d")
+        assert loader.unloaded == ["m/b", "m/a"]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_acquire_single_flight(self):
+        loader = FakeLoader(delay=0.05)
+        mgr = make_manager(loader)
+        results = await asyncio.gather(*(mgr.acquire("m/a") for _ in range(5)))
+        assert loader.loaded == ["m/a"]
+        assert all(r is results[0] for r in results)
+
+    @pytest.mark.asyncio
+    async def test_prewarm_loads_in_background(self):
+        loader = FakeLoader(delay=0.02)
+        mgr = make_manager(loader)
+        assert mgr.prewarm("m/a")["status"] == "loading"
+        assert mgr.prewarm("m/a")["status"] == "loading"
+        await asyncio.sleep(0.1)
+        assert mgr.is_resident("m/a")
+        assert mgr.prewarm("m/a")["status"] == "resident"
+        assert loader.loaded == ["m/a"]
+
+    @pytest.mark.asyncio
+    async def test_explicit_unload_and_status(self):
+        loader = FakeLoader()
+        mgr = make_manager(loader)
+        await mgr.acquire("m/a")
+        status = mgr.status()
+        assert status["models"][0]["path"] == os.path.normpath("m/a")
+        assert status["pools"]["ram"]["used_mb"] == 10.0
+        assert mgr.unload("m/a") is True
+        assert mgr.status()["models"] == []
+
+    @pytest.mark.asyncio
+    async def test_context_counter_follows_load_and_eviction(self, monkeypatch):
+        import services.runtimes.model_residency as residency
+        from runtime.context.builder import ContextBuilder
+        from services.agent_runtime_service import _resident_counter
+
+        class Tok:
+            def encode(self, text, add_special_tokens=False):
+                return text.split()
+
+        loader = FakeLoader()
+        mgr = make_manager(loader)
+        monkeypatch.setattr(residency, "_manager", mgr)
+        builder = ContextBuilder(tokenizer_resolver=_resident_counter)
+        assert builder.counter_for("qwen-7b").name != "tokenizer"  # not loaded yet
+        entry = await mgr.acquire("models/qwen-7b")
+        entry.tokenizer = Tok()
+        counter = builder.counter_for("qwen-7b")  # bare name resolves to the resident path
+        assert counter.name == "tokenizer" and builder.counter_for("qwen-7b") is counter
+        mgr.evict("models/qwen-7b")
+        assert entry.token_counter is None
+        assert builder.counter_for("qwen-7b").name != "tokenizer"
+
+
+class TestLocalRuntimeResidency:
+    @pytest.mark.asyncio
+    async def test_model_name_selects_its_own_weights(self):
+        from services.runtimes.local_runtime import LocalRuntime
+        loader = FakeLoader()
+        rt = LocalRuntime(residency=make_manager(loader))
+        await rt.load("m/a")
+        await rt.load("m/b")
+        assert rt.residency.get("m/a").model == "weights:m/a"
+        assert rt.residency.get("m/b").model == "weights:m/b"
+        stopped = await rt.stop("m/a")
+        assert stopped["unloaded"] is True
+        assert loader.unloaded == ["m/a"]
+
+    def test_registry_releases_evicted_runtime(self):
+        from services.runtime_registry import RuntimeRegistry
+
+        class Releasable:
+            released = False
+
+            def release(self):
+                Releasable.released = True
+
+        reg = RuntimeRegistry()
+        reg.MAX_RUNTIMES = 1
+        reg._create = lambda name: Releasable() if name == "local" else object()
+        assert reg.get("local-gguf") is reg.get("local")
+        reg.get("ollama")
+        assert Releasable.released is True
+
+    def test_residency_status_does_not_create_the_local_runtime(self):
+        from services.runtime_registry import RuntimeRegistry
+        reg = RuntimeRegistry()
+        reg._create = lambda name: pytest.fail(f"{name} runtime created by a status read")
+        assert reg.residency()["models"] == []
+        assert reg._runtimes == {}
@@ -150,6 +150,86 @@ class TestMultiAgentGuards:
         assert len(children) == 1
         assert children[0].status == "TIMEOUT", f"child status: {children[0].status}"
 
+    @pytest.mark.asyncio
+    async def test_delegation_wait_ends_before_the_tool_timeout(self):
+        from runtime.tools.delegate import SETTLE_GRACE
+        rt = build_runtime(
+            {"p5boss4": [delegate("p5stuck", "t"), MockProvider.final("B4")]},
+            [dict(name="p5boss4", model="p5boss4", tools=["agent.delegate"], runtime_config={"timeout_seconds": 900}),
+             dict(name="p5stuck", model="p5stuck", tools=[])],
+        )
+        tool = rt.tool_registry.get("agent.delegate")
+        waits = []
+
+        async def expired_wait(run_id, timeout=None, cancellation=None):
+            waits.append(timeout)
+            return rt.run_store.get(run_id)  # still running when the wait gives up
+        rt.wait_for_run = expired_wait
+        run = rt.create_run(agent_id="p5boss4", input_text="x", user_id=1, execute=False)
+        await rt.execute_run(run.run_id)
+        assert waits == [tool.timeout - SETTLE_GRACE]
+        child = rt.list_runs(user_id=1, agent_id="p5stuck")[0]
+        assert child.metadata["remaining_seconds"] == tool.timeout - 2 * SETTLE_GRACE
+        assert child.status == "CANCELLED", "an abandoned child must not keep running"
+        assert rt.get_run(run.run_id).output == "B4"
+
+    @pytest.mark.asyncio
+    async def test_delegate_awaits_completion_without_polling(self):
+        async def slow_child(messages, tools=None, timeout=None):
+            await asyncio.sleep(0.3)
+            return MockProvider.final("child done")
+        rt = build_runtime({}, [
+            dict(name="p5waiter", model="p5waiter", tools=["agent.delegate"]),
+            dict(name="p5sleepy", model="p5sleepy", tools=[]),
+        ])
+        rt.provider_factory = lambda m: MockProvider(callback=slow_child) if m == "p5sleepy" else MockProvider(script=[delegate("p5sleepy", "t"), MockProvider.final("W")])
+        lookups = []
+        original = rt.get_run
+        rt.get_run = lambda run_id, user_id=None: lookups.append(run_id) or original(run_id, user_id)
+        run = rt.create_run(agent_id="p5waiter", input_text="x", user_id=1, execute=False)
+        await rt.execute_run(run.run_id)
+        assert lookups == [], "delegation must not poll the run store"
+        child = rt.list_runs(user_id=1, agent_id="p5sleepy")[0]
+        assert child.status == "COMPLETED"
+        assert rt.get_run(run.run_id).status == "COMPLETED"
+
+    @pytest.mark.asyncio
+    async def test_completion_future_resolves_on_cancel(self):
+        rt = build_runtime({}, [dict(name="p5idle", model="p5idle", tools=[])])
+        run = rt.create_run(agent_id="p5idle", input_text="x", user_id=1, execute=False)
+        fut = rt.completion(run.run_id)
+        assert not fut.done()
+        await rt.cancel_run(run.run_id)
+        assert fut.done() and fut.result().status == "CANCELLED"
+
+    @pytest.mark.asyncio
+    async def test_delegate_many_runs_children_concurrently(self):
+        async def slow_child(messages, tools=None, timeout=None):
+            await asyncio.sleep(0.4)
+            return MockProvider.final("part " + messages[-1]["content"])
+        fan_out = MockProvider.tool_call("agent.delegate_many", {"tasks": [
+            {"agent_id": "p5fan1", "task": "a"}, {"agent_id": "p5fan2", "task": "b"},
+        ]})
+        rt = build_runtime({}, [
+            dict(name="p5fanboss", model="p5fanboss", tools=["agent.delegate_many"]),
+            dict(name="p5fan1", model="p5fan1", tools=[]),
+            dict(name="p5fan2", model="p5fan2", tools=[]),
+        ])
+        seen = []
+
+        def boss(messages, tools, index):
+            seen.append(list(messages))
+            return fan_out if index == 1 else MockProvider.final("gathered")
+        rt.provider_factory = lambda m: MockProvider(callback=boss) if m == "p5fanboss" else MockProvider(callback=slow_child)
+        run = rt.create_run(agent_id="p5fanboss", input_text="x", user_id=1, execute=False)
+        started = asyncio.get_running_loop().time()
+        await rt.execute_run(run.run_id)
+        elapsed = asyncio.get_running_loop().time() - started
+        assert rt.get_run(run.run_id).output == "gathered"
+        assert elapsed < 0.75, "children must run concurrently"
+        tool_msg = seen[-1][-1]["content"]
+        assert "part a" in tool_msg and "part b" in tool_msg
+
     def test_run_api_exposes_parent_run_id(self):
         from fastapi.testclient import TestClient
         from main import app
@@ -4,6 +4,7 @@ import sys
 import tempfile
 from unittest.mock import patch
 
+import pytest
 from core.config import settings
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend", "app"))
@@ -15,6 +16,12 @@ from services.agent_tools import tool_code_search, tool_command_execute, tool_fi
 class TestAgentTools:
     """Tests for individual agent tools."""
 
+    @pytest.fixture(autouse=True)
+    def code_index_dir(self, tmp_path, monkeypatch):
+        # keep code.search indexes of throwaway dirs out of <data_dir>/code_index
+        from services import code_index
+        monkeypatch.setattr(code_index, "_cache", code_index.CodeIndexCache(str(tmp_path / "code_index")))
+
     def test_file_read_existing(self):
         with tempfile.NamedTemporaryFile(mode="w", delete=False, suffix=".txt", encoding="utf-8") as f:
             f.write("Hello, world!")
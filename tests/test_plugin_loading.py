@@ -0,0 +1,233 @@
+"""Plugin loading: manifest cache, lazy entry import, dependency waves, startup report."""
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend", "app"))
+
+from runtime.plugins import LazyPluginTool, PluginManager, PluginManifest, plugin_waves
+
+ENTRY = """
+import time
+from runtime.tools import Tool, ToolResult
+
+IMPORTS = {imports!r}
+open(IMPORTS, "a").write("{name}\\n")
+time.sleep({delay})
+
+
+class EchoTool(Tool):
+    name = "plugin.{name}"
+    description = "echo from {name}"
+    permissions = {permissions!r}
+
+    async def execute(self, arguments, context=None):
+        return ToolResult.ok("{name}:" + str(arguments.get("text", "")))
+
+
+def get_tools(ctx):
+    return [EchoTool()]
+"""
+
+
+def write_plugin(root, name, deps=(), declare=False, delay=0.0, broken=False, permissions=(), declared_permissions=()):
+    pdir = os.path.join(root, name)
+    os.makedirs(pdir, exist_ok=True)
+    lines = [f"name: {name}", "type: tool", "entry: entry.py", f"dependencies: [{', '.join(deps)}]"]
+    if declare:
+        lines += [
+            "tools:",
+            f"  - name: plugin.{name}",
+            f"    description: declared {name}",
+            "    input_schema: {type: object, properties: {text: {type: string}}}",
+        ]
+        if declared_permissions is not None:
+            lines.append(f"    permissions: [{', '.join(declared_permissions)}]")
+    with open(os.path.join(pdir, "plugin.yaml"), "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    source = ENTRY.format(name=name, delay=delay, imports=os.path.join(root, "imports.log"), permissions=list(permissions))
+    with open(os.path.join(pdir, "entry.py"), "w", encoding="utf-8") as f:
+        f.write("raise ImportError('broken plugin')\n" if broken else source)
+    return os.path.join(pdir, "plugin.yaml")
+
+
+def imported(root):
+    path = os.path.join(root, "imports.log")
+    return open(path).read().split() if os.path.exists(path) else []
+
+
+def make_runtime():
+    from core.database import init_db
+    from models.records import AgentRun  # noqa: F401
+    from repositories.event_repository import SQLAlchemyEventStore
+    from repositories.run_repository import SQLAlchemyRunStore
+    from runtime.events import EventBus
+    from runtime.runtime import AgentRuntime
+    from runtime.tools import ToolExecutor, ToolRegistry
+    init_db()
+    registry = ToolRegistry()
+    return AgentRuntime(
+        run_store=SQLAlchemyRunStore(),
+        agent_store=None,
+        event_bus=EventBus(store=SQLAlchemyEventStore()),
+        tool_registry=registry,
+        tool_runner=ToolExecutor(registry),
+        provider_factory=lambda m: None,
+    )
+
+
+def manager(root, **kwargs):
+    rt = make_runtime()
+    rt.plugin_manager = PluginManager(rt, plugins_dir=root, event_bus=rt.event_bus, **kwargs)
+    return rt, rt.plugin_manager
+
+
+class TestManifestCache:
+    def test_unchanged_manifest_is_not_reparsed(self, tmp_path, monkeypatch):
+        path = write_plugin(str(tmp_path), "alpha")
+        _, pm = manager(str(tmp_path))
+        calls = []
+        original = PluginManifest.from_file
+        monkeypatch.setattr(PluginManifest, "from_file", classmethod(lambda cls, p: calls.append(p) or original(p)))
+        pm.discover()
+        pm.discover()
+        assert calls == [path]
+
+        st = os.stat(path)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("description: changed\n")
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+        assert pm.discover()[0]["description"] == "changed"
+        assert len(calls) == 2
+
+    def test_cached_manifest_is_not_shared(self, tmp_path):
+        path = write_plugin(str(tmp_path), "alpha")
+        _, pm = manager(str(tmp_path))
+        pm.read_manifest(path).config["mutated"] = True
+        assert pm.read_manifest(path).config == {}
+
+
+class TestLazyImport:
+    @pytest.mark.asyncio
+    async def test_declared_tools_import_on_first_call(self, tmp_path):
+        root = str(tmp_path)
+        rt, pm = manager(root)
+        state = pm.load(pm.read_manifest(write_plugin(root, "lazy", declare=True)))
+        tool = rt.tool_registry.get("plugin.lazy")
+        assert isinstance(tool, LazyPluginTool) and state["lazy"] is True
+        assert tool.input_schema()["properties"] == {"text": {"type": "string"}}
+        assert imported(root) == []
+
+        results = await asyncio.gather(*(tool.execute({"text": str(i)}) for i in range(3)))
+        assert [r.output for r in results] == ["lazy:0", "lazy:1", "lazy:2"]
+        assert imported(root) == ["lazy"]  # concurrent first calls import once
+        assert not isinstance(rt.tool_registry.get("plugin.lazy"), LazyPluginTool)
+        assert "activate_ms" in pm.startup_report()["plugins"][0]
+
+    @pytest.mark.asyncio
+    async def test_undeclared_tools_and_disabled_lazy_import_load_eagerly(self, tmp_path):
+        root = str(tmp_path)
+        rt, pm = manager(root)
+        pm.load(pm.read_manifest(write_plugin(root, "eager")))
+        _, strict = manager(root, lazy_import=False)
+        strict.load(strict.read_manifest(write_plugin(root, "declared", declare=True)))
+        assert imported(root) == ["eager", "declared"]
+        assert not isinstance(rt.tool_registry.get("plugin.eager"), LazyPluginTool)
+
+    @pytest.mark.asyncio
+    async def test_first_call_is_checked_against_the_real_tool(self, tmp_path):
+        from runtime.errors import ToolDeniedError
+        from runtime.policy.engine import Policy
+        from runtime.run_context import ToolExecutionContext
+        root = str(tmp_path)
+        rt, pm = manager(root)
+        pm.load(pm.read_manifest(write_plugin(root, "fetch", declare=True, permissions=["NETWORK"])))
+        ctx = ToolExecutionContext(policy=Policy(network_access=False))
+        for _ in range(2):  # stand-in declared no permissions; real tool needs NETWORK
+            with pytest.raises(ToolDeniedError, match="network"):
+                await rt.tool_runner.run("plugin.fetch", {"text": "x"}, ctx)
+        assert imported(root) == ["fetch"]
+
+    def test_descriptor_without_permissions_loads_eagerly(self, tmp_path):
+        root = str(tmp_path)
+        rt, pm = manager(root)
+        state = pm.load(pm.read_manifest(write_plugin(root, "vague", declare=True, declared_permissions=None)))
+        assert state["lazy"] is False and imported(root) == ["vague"]
+        assert not isinstance(rt.tool_registry.get("plugin.vague"), LazyPluginTool)
+
+    @pytest.mark.asyncio
+    async def test_broken_lazy_plugin_fails_the_call(self, tmp_path):
+        root = str(tmp_path)
+        rt, pm = manager(root)
+        pm.load(pm.read_manifest(write_plugin(root, "bad", declare=True, broken=True)))
+        result = await rt.tool_registry.get("plugin.bad").execute({})
+        assert not result.success and "broken plugin" in result.error
+        assert pm.get("bad")["status"] == "failed"
+
+
+class TestDependencyWaves:
+    def test_topological_waves(self):
+        m = lambda name, *deps: PluginManifest(name=name, entry="x.py", dependencies=list(deps))  # noqa: E731
+        waves, unresolved = plugin_waves([
+            m("app", "db", "cache"), m("db"), m("cache", "db"), m("log"),
+            m("orphan", "nowhere"), m("child", "orphan"), m("a", "b"), m("b", "a"),
+        ])
+        assert [[p.name for p in wave] for wave in waves] == [["db", "log"], ["cache"], ["app"]]
+        assert unresolved == {
+            "orphan": "depends on missing plugin: nowhere",
+            "child": "dependency failed: orphan",
+            "a": "dependency cycle",
+            "b": "dependency cycle",
+        }
+        waves, _ = plugin_waves([m("cache", "db")], loaded={"db"})
+        assert [[p.name for p in wave] for wave in waves] == [["cache"]]
+
+    @pytest.mark.asyncio
+    async def test_load_all_imports_a_wave_in_parallel(self, tmp_path):
+        root = str(tmp_path)
+        for name in ("one", "two", "three"):
+            write_plugin(root, name, delay=0.3)
+        write_plugin(root, "top", deps=("one", "two"))
+        rt, pm = manager(root)
+        started = time.monotonic()
+        report = await pm.load_all()
+        assert time.monotonic() - started < 0.8  # three 0.3s imports overlap
+        assert report["waves"] == [["one", "three", "two"], ["top"]]
+        rows = {row["name"]: row for row in report["plugins"]}
+        assert rows["top"]["wave"] == 1 and rows["one"]["import_ms"] >= 300
+        assert {"manifest_ms", "setup_ms", "load_ms"} <= set(rows["one"])
+        assert (await rt.tool_registry.get("plugin.top").execute({"text": "x"})).output == "top:x"
+
+    @pytest.mark.asyncio
+    async def test_failures_skip_dependents_only(self, tmp_path):
+        root = str(tmp_path)
+        write_plugin(root, "bad", broken=True)
+        write_plugin(root, "needs_bad", deps=("bad",))
+        write_plugin(root, "fine")
+        _, pm = manager(root)
+        rows = {row["name"]: row for row in (await pm.load_all())["plugins"]}
+        assert rows["bad"]["status"] == "failed" and "broken plugin" in rows["bad"]["error"]
+        assert rows["needs_bad"] == {
+            "name": "needs_bad", "status": "failed", "lazy": False, "imported": False,
+            "error": "dependency failed: bad",
+        }
+        assert rows["fine"]["status"] == "loaded"
+
+    @pytest.mark.asyncio
+    async def test_lifecycle_events_are_flushed(self, tmp_path):
+        root = str(tmp_path)
+        write_plugin(root, "alpha")
+        rt, pm = manager(root)
+        seen = []
+        original = rt.event_bus.publish
+
+        async def publish(run_id, event_type, **kwargs):
+            seen.append(event_type)
+            return await original(run_id, event_type, **kwargs)
+
+        rt.event_bus.publish = publish
+        await pm.load_all()
+        assert seen == ["plugin.loaded"] and not pm._pending_events
@@ -0,0 +1,150 @@
+"""Admin profiling: route latency middleware, event-loop stall watchdog, stack sampler."""
+import asyncio
+import os
+import sys
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend", "app"))
+
+from core.config import ProfilingSettings
+from runtime.metrics import get_metrics
+from services.profiling import (
+    ROUTE_METRIC,
+    LoopMonitor,
+    RouteTimingMiddleware,
+    StackSampler,
+    init_profiler,
+)
+
+
+def blocking_callback(seconds):
+    time.sleep(seconds)
+
+
+def spin_here(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+class TestRouteTiming:
+    def test_routes_are_labelled_by_template(self):
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+
+        app = FastAPI()
+
+        @app.get("/items/{item_id}")
+        async def item(item_id: int):
+            return {"id": item_id}
+
+        app.add_middleware(RouteTimingMiddleware)
+        init_profiler(ProfilingSettings(enabled=True))
+        client = TestClient(app)
+        for i in range(3):
+            assert client.get(f"/items/{i}").status_code == 200
+        assert client.get("/nowhere").status_code == 404
+
+        series = {(labels["route"], labels["status"]): h for labels, h in get_metrics().series(ROUTE_METRIC)}
+        assert series[("/items/{item_id}", "2xx")].count >= 3
+        assert series[("unmatched", "4xx")].count >= 1
+
+    def test_disabled_profiler_is_a_pass_through(self):
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+
+        app = FastAPI()
+
+        @app.get("/quiet")
+        async def quiet():
+            return {}
+
+        app.add_middleware(RouteTimingMiddleware)
+        init_profiler(ProfilingSettings(enabled=False))
+        TestClient(app).get("/quiet")
+        assert not [labels for labels, _ in get_metrics().series(ROUTE_METRIC) if labels["route"] == "/quiet"]
+
+
+class TestLoopMonitor:
+    @pytest.mark.asyncio
+    async def test_stall_records_the_blocking_stack(self):
+        monitor = LoopMonitor(threshold=0.1, interval=0.02)
+        monitor.start()
+        try:
+            await asyncio.sleep(0.05)
+            blocking_callback(0.35)
+            await asyncio.sleep(0.1)
+        finally:
+            await monitor.stop()
+        assert not monitor.running
+        [stall] = list(monitor.stalls)
+        assert stall["lag_ms"] >= 250
+        assert "blocking_callback" in "".join(stall["stack"])
+        assert get_metrics().histogram("event_loop_lag_duration").max >= 0.25
+
+
+class TestStackSampler:
+    def test_collapsed_stacks(self):
+        stop = threading.Event()
+        worker = threading.Thread(target=spin_here, args=(stop,), name="busy;worker")
+        worker.start()
+        try:
+            sampler = StackSampler(0.2, interval=0.005).start()
+            sampler.join(2.0)
+        finally:
+            stop.set()
+            worker.join()
+        assert sampler.done and sampler.samples >= 10
+        lines = sampler.collapsed().splitlines()
+        busy = [line for line in lines if line.startswith("busy:worker;")]
+        assert busy and any("spin_here (test_profiling.py:" in line for line in busy)
+        assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+        assert not any(line.split(";", 1)[0].startswith("stack-sampler-") for line in lines)
+
+    def test_one_capture_at_a_time(self):
+        profiler = init_profiler(ProfilingSettings(max_capture_seconds=0.5))
+        first = profiler.capture(30)
+        assert first.duration == 0.5  # clamped to max_capture_seconds
+        with pytest.raises(ValueError):
+            profiler.capture(1)
+        first.cancel()
+        first.join(1.0)
+        assert profiler.capture(0.1, interval_ms=5).interval == 0.005
+
+
+class TestProfilingApi:
+    def _login(self, client, username):
+        client.post("/api/v1/auth/register", json={"username": username, "password": "secret123", "email": username + "@x.com"})
+        r = client.post("/api/v1/auth/login", json={"username": username, "password": "secret123"})
+        return {"Authorization": "Bearer " + r.json()["token"]}
+
+    def test_admin_dashboard_and_capture_download(self):
+        from core.config import settings
+        from fastapi.testclient import TestClient
+        from main import app
+
+        with TestClient(app) as client, patch.object(settings, "runtime_admin_usernames", "profadmin"):
+            h = self._login(client, "profadmin")
+            other = self._login(client, "profuser")
+            assert client.get("/api/v1/system/profiling", headers=other).status_code == 403
+
+            assert client.post("/api/v1/system/profiling", json={"enabled": True}, headers=h).json() == {"enabled": True}
+            client.get("/api/v1/agent/tools", headers=h)
+            data = client.get("/api/v1/system/profiling", headers=h).json()
+            assert data["enabled"] and data["event_loop"]["monitoring"]
+            row = next(r for r in data["routes"] if r["route"] == "/api/v1/agent/tools")
+            assert row["method"] == "GET" and row["count"] >= 1 and row["p95_ms"] >= row["p50_ms"]
+
+            capture = client.post("/api/v1/system/profiling/captures", json={"seconds": 0.2}, headers=h).json()
+            for _ in range(50):
+                r = client.get(f"/api/v1/system/profiling/captures/{capture['id']}", headers=h)
+                if r.status_code != 409:
+                    break
+                time.sleep(0.05)
+            assert r.status_code == 200 and "attachment" in r.headers["content-disposition"]
+            assert r.text.strip() and r.text.splitlines()[0].rsplit(" ", 1)[1].isdigit()
+            assert client.get("/api/v1/system/profiling/captures/missing", headers=h).status_code == 404
+            assert client.post("/api/v1/system/profiling", json={"enabled": False}, headers=h).json() == {"enabled": False}
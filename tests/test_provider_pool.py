@@ -0,0 +1,169 @@
+"""Provider pools: selection, circuit breaker, failover, hedging, streaming."""
+import asyncio
+import os
+import sys
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend", "app"))
+
+from runtime.errors import ModelUnavailableError
+from runtime.models import MockProvider, ModelResult
+from runtime.models.pool import EndpointBalancer, PoolMember, ProviderPool
+
+
+class FlakyProvider(MockProvider):
+    def __init__(self, name, delay=0.0, fail=0, status=503):
+        super().__init__(callback=lambda m, t, i: MockProvider.final(name))
+        self.delay, self.fail, self.status = delay, fail, status
+
+    async def chat(self, messages, *, tools=None, timeout=None) -> ModelResult:
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            self.fail -= 1
+            request = httpx.Request("POST", "http://pool.test")
+            raise httpx.HTTPStatusError("boom", request=request,
+                                        response=httpx.Response(self.status, request=request))
+        return await super().chat(messages, tools=tools, timeout=timeout)
+
+
+MSGS = [{"role": "user", "content": "hi"}]
+
+
+class TestEndpointBalancer:
+    def test_least_outstanding_and_ewma_selection(self):
+        a, b = PoolMember("a", None), PoolMember("b", None)
+        lo = EndpointBalancer([a, b])
+        a.outstanding = 2
+        assert lo.pick().name == "b"
+        ew = EndpointBalancer([a, b], strategy="ewma")
+        a.outstanding, a.ewma, b.ewma = 0, 0.5, 0.2
+        assert ew.pick().name == "b"
+        b.outstanding = 3  # 0.2 * 4 > 0.5 * 1
+        assert ew.pick().name == "a"
+
+    def test_breaker_opens_and_half_opens(self):
+        now = [0.0]
+        m = PoolMember("a", None)
+        bal = EndpointBalancer([m], failure_threshold=2, cooldown=10, clock=lambda: now[0])
+        bal.on_failure(m)
+        assert bal.pick() is m
+        bal.on_failure(m)
+        assert bal.pick() is None
+        now[0] = 11.0
+        assert bal.pick() is m  # half-open probe
+        m.outstanding = 1
+        assert bal.pick() is None
+        bal.on_success(m, 0.1)
+        assert m.failures == 0
+
+
+class TestProviderPool:
+    @pytest.mark.asyncio
+    async def test_failover_on_server_error(self):
+        pool = ProviderPool([("bad", FlakyProvider("bad", fail=5)), ("good", FlakyProvider("good"))],
+                            probe=None)
+        result = await pool.chat(MSGS)
+        assert result.content == "good"
+        assert [m["errors"] for m in pool.stats()["members"]] == [1, 0]
+
+    @pytest.mark.asyncio
+    async def test_client_errors_do_not_fail_over(self):
+        bad = FlakyProvider("bad", fail=1, status=400)
+        other = FlakyProvider("other")
+        pool = ProviderPool([("bad", bad), ("other", other)], probe=None)
+        pool.balancer.members[1].outstanding = 1  # force "bad" first
+        with pytest.raises(httpx.HTTPStatusError):
+            await pool.chat(MSGS)
+        assert other.call_count == 0
+        assert pool.balancer.members[0].failures == 0
+
+    @pytest.mark.asyncio
+    async def test_hedged_request_wins_tail(self):
+        slow, fast = FlakyProvider("slow", delay=1.0), FlakyProvider("fast", delay=0.01)
+        pool = ProviderPool([("slow", slow), ("fast", fast)], hedge_after=0.05, probe=None)
+        pool.balancer.members[1].outstanding = 1  # slow is picked first
+        result = await asyncio.wait_for(pool.chat(MSGS), timeout=0.5)
+        assert result.content == "fast"
+        assert pool.stats()["hedged"] == 1
+        await asyncio.sleep(0)
+        assert pool.balancer.members[0].outstanding == 0  # loser cancelled
+
+    @pytest.mark.asyncio
+    async def test_all_open_raises_unavailable(self):
+        pool = ProviderPool([("a", FlakyProvider("a", fail=9))], failure_threshold=1, probe=None)
+        with pytest.raises(httpx.HTTPStatusError):
+            await pool.chat(MSGS)
+        with pytest.raises(ModelUnavailableError):
+            await pool.chat(MSGS)
+
+    @pytest.mark.asyncio
+    async def test_stream_fails_over_before_first_chunk(self):
+        async def broken(member):
+            raise httpx.ConnectError("down")
+            yield  # pragma: no cover
+
+        async def working(member):
+            for part in ("a", "b"):
+                yield part
+
+        bal = EndpointBalancer([PoolMember("x", broken), PoolMember("y", working)])
+        chunks = [c async for c in bal.stream(lambda m: m.provider(m))]
+        assert chunks == ["a", "b"]
+        assert bal.members[0].errors == 1
+
+    @pytest.mark.asyncio
+    async def test_health_probe_marks_members(self):
+        async def probe(member):
+            return member.name != "down"
+
+        bal = EndpointBalancer([PoolMember("up", None), PoolMember("down", None)], probe=probe)
+        assert await bal.check_health() == {"up": True, "down": False}
+        assert bal.pick().name == "up"
+
+
+class TestPoolCache:
+    def test_lru_bound_closes_evicted_pools(self):
+        from runtime.models.pool import PoolCache
+
+        class Pool:
+            closed = False
+
+            def close(self):
+                self.closed = True
+
+        cache = PoolCache(max_pools=2)
+        a, b = cache.get(("a",), Pool), cache.get(("b",), Pool)
+        assert cache.get(("a",), Pool) is a  # refreshed: b is now the oldest
+        c = cache.get(("c",), Pool)
+        assert len(cache) == 2 and b.closed and not a.closed
+        cache.close()
+        assert a.closed and c.closed and len(cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_chat_uses_a_configured_model_pool(self, monkeypatch):
+        from core.config import ModelPoolSettings, PoolEndpointSettings, settings
+        from services import chat_service
+        from services.runtimes import pool_runtime
+
+        calls = []
+
+        async def chat(self, model_name, messages, **kwargs):
+            calls.append((self.base_url, model_name, kwargs))
+            return {"model": model_name, "content": "pooled"}
+
+        monkeypatch.setattr(pool_runtime.OllamaRuntime, "chat", chat)
+        monkeypatch.setattr(settings, "model_pools", {"gpu": ModelPoolSettings(endpoints=[
+            PoolEndpointSettings(base_url="http://h1:11434"), PoolEndpointSettings(base_url="http://h2:11434"),
+        ])})
+        monkeypatch.setattr(settings, "default_model_pool", "")
+        out = await chat_service.run_chat(None, None, "qwen", [{"role": "user", "content": "hi"}], model_pool="gpu", temperature=0.2)
+        assert out["content"] == "pooled" and calls[0][1:] == ("qwen", {"temperature": 0.2})
+        assert pool_runtime.model_pool_runtime("gpu") is pool_runtime.model_pool_runtime("gpu")
+        monkeypatch.setattr(settings, "default_model_pool", "gpu")
+        await chat_service.run_chat(None, None, "qwen", [{"role": "user", "content": "again"}])
+        assert len(calls) == 2 and {c[0] for c in calls} <= {"http://h1:11434", "http://h2:11434"}
+        with pytest.raises(ValueError):
+            await chat_service.run_chat(None, None, "qwen", [], model_pool="missing")
+        pool_runtime.close_chat_pools()
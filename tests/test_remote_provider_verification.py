@@ -96,3 +96,19 @@ def test_limit_and_service_failures_persist_safe_diagnostics(status_code, expect
     assert provider.verification_status == "failed"
     assert provider.verification_error_code == expected
     assert "test-secret" not in (provider.verified_models_json or "")
+
+
+def test_provider_quotas_are_saved_and_resolved():
+    db, user, provider, service = _service()
+    service.cipher.encrypt.return_value = "cipher"
+    saved = service.save(
+        user.id, name="Provider", base_url="https://api.example.test/v1", protocol="responses",
+        default_model="verified-model", api_key=None, requests_per_minute=120, max_concurrency=4,
+    )
+    assert saved["rate_limits"] == {"requests_per_minute": 120, "max_concurrency": 4}
+    assert service.resolve(user.id, provider.id)["rate_limits"] == {"requests_per_minute": 120, "max_concurrency": 4}
+    with pytest.raises(RemoteProviderError):
+        service.save(
+            user.id, name="Provider", base_url="https://api.example.test/v1", protocol="responses",
+            default_model="verified-model", api_key=None, max_concurrency=0,
+        )
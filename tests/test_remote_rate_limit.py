@@ -0,0 +1,112 @@
+"""Remote provider rate limiting: token buckets, Retry-After, AIMD, deadlines, sharing."""
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend", "app"))
+
+from runtime.errors import ModelRateLimitedError
+from runtime.models.rate_limit import (
+    ProviderLimiter,
+    TokenBucket,
+    estimate_tokens,
+    get_rate_limiter,
+    parse_retry_after,
+)
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None, usage=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self._usage = usage
+
+    def json(self):
+        return {"usage": {"total_tokens": self._usage}} if self._usage else {}
+
+
+class TestRateLimitPrimitives:
+    def test_token_bucket_refill_and_debt(self):
+        now = [0.0]
+        bucket = TokenBucket(60, clock=lambda: now[0])  # 1 token / second
+        bucket.take(60, now[0])
+        assert bucket.wait_time(1, now[0]) == pytest.approx(1.0)
+        now[0] = 2.0
+        assert bucket.wait_time(2, now[0]) == 0.0
+        bucket.take(10, now[0])  # usage above the estimate leaves a debt
+        assert bucket.wait_time(1, now[0]) == pytest.approx(9.0)
+        assert TokenBucket(0).wait_time(10**6, 0.0) == 0.0
+
+    def test_retry_after_forms(self):
+        assert parse_retry_after("2.5") == 2.5
+        assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+        assert parse_retry_after(None) is None and parse_retry_after("soon") is None
+
+    def test_estimate_counts_prompt_and_reserve(self):
+        msgs = [{"role": "user", "content": "hello world " * 10}]
+        assert estimate_tokens(msgs, max_tokens=100) > 100
+        assert estimate_tokens([], None) == 256
+
+
+class TestProviderLimiter:
+    @pytest.mark.asyncio
+    async def test_concurrency_queue_is_fifo_with_deadline(self):
+        limiter = ProviderLimiter(max_concurrency=1, max_wait=5)
+        order = []
+
+        async def call(name, hold):
+            async with limiter.slot():
+                order.append(name)
+                await asyncio.sleep(hold)
+
+        await asyncio.gather(call("a", 0.05), call("b", 0), call("c", 0))
+        assert order == ["a", "b", "c"]
+        async with limiter.slot():
+            with pytest.raises(ModelRateLimitedError):
+                await limiter.acquire(timeout=0.05)
+        assert limiter.stats()["timeouts"] == 1 and limiter.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_429_honours_retry_after_and_halves_concurrency(self):
+        limiter = ProviderLimiter(max_concurrency=4, max_wait=5)
+        responses = [FakeResponse(429, {"retry-after": "0.1"}), FakeResponse(200, usage=40)]
+
+        async def send():
+            return responses.pop(0)
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        result = await limiter.request(send, tokens=10)
+        assert result.status_code == 200
+        assert loop.time() - start >= 0.09
+        stats = limiter.stats()
+        assert stats["throttled"] == 1 and stats["admitted"] == 2
+        assert 2.0 <= limiter.concurrency < 3.0  # halved, then +1/limit
+
+    @pytest.mark.asyncio
+    async def test_unretryable_429_is_returned(self):
+        limiter = ProviderLimiter(max_wait=0.2)
+
+        async def send():
+            return FakeResponse(429, {"retry-after": "30"})
+
+        result = await limiter.request(send)
+        assert result.status_code == 429
+        assert limiter.stats()["blocked_for"] > 20
+
+    def test_limiter_is_shared_per_credential(self):
+        a = get_rate_limiter("https://api.example.test/v1/", "key-1")
+        assert a is get_rate_limiter("https://api.example.test/v1", "key-1")
+        assert a is not get_rate_limiter("https://api.example.test/v1", "key-2")
+
+    def test_provider_quotas_override_the_global_defaults(self):
+        a = get_rate_limiter("https://quota.example.test/v1", "key-q", {"requests_per_minute": 30})
+        b = get_rate_limiter("https://other.example.test/v1", "key-q")
+        assert a.requests.capacity == 30 and b.requests.capacity == 0
+        assert a.max_concurrency == b.max_concurrency == 8  # unset: global remote_rate_limit
+        # an edited provider reconfigures the shared limiter in place
+        same = get_rate_limiter("https://quota.example.test/v1", "key-q",
+                                {"requests_per_minute": 60, "max_concurrency": 2})
+        assert same is a and a.requests.capacity == 60 and a.max_concurrency == 2
@@ -0,0 +1,144 @@
+"""Opt-in LLM response cache: keying, TTL, size bound, provider/registry integration."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend", "app"))
+
+from runtime.metrics import MetricsRegistry
+from runtime.models import MockProvider
+from runtime.models.cache import (
+    CachedProvider,
+    ResponseCache,
+    cache_enabled_for,
+    cache_key,
+)
+
+MSGS = [{"role": "system", "content": "sys"}, {"role": "user", "content": "hi"}]
+
+
+class TestResponseCache:
+    def test_key_is_stable_and_sensitive(self):
+        a = cache_key("m", MSGS, None, {"temperature": 0, "top_p": None})
+        assert a == cache_key("m", [dict(m) for m in MSGS], [], {"temperature": 0})
+        assert a != cache_key("m2", MSGS, None, {"temperature": 0})
+        assert a != cache_key("m", MSGS, [{"name": "t"}], {"temperature": 0})
+
+    def test_enabled_only_when_deterministic_or_opted_in(self):
+        assert cache_enabled_for({"temperature": 0})
+        assert not cache_enabled_for({"temperature": 0.7})
+        assert not cache_enabled_for({})
+        assert cache_enabled_for({"temperature": 0.7, "response_cache": True})
+        assert not cache_enabled_for({"temperature": 0, "response_cache": False})
+
+    def test_ttl_expiry(self, tmp_path):
+        metrics = MetricsRegistry()
+        cache = ResponseCache(str(tmp_path), ttl_seconds=5, metrics=metrics)
+        cache.put("k" * 64, {"content": "x"})
+        stored_at, size = cache._index["k" * 64]
+        cache._index["k" * 64] = (stored_at - 10, size)
+        assert cache.get("k" * 64) is None
+        assert metrics.count("llm_cache_misses") == 1
+
+    def test_size_bound_and_persistence(self, tmp_path):
+        cache = ResponseCache(str(tmp_path), max_entries=2)
+        for i in range(3):
+            cache.put(f"{i:064d}", {"content": str(i)})
+        assert cache.stats()["entries"] == 2
+        assert cache.get(f"{0:064d}") is None
+        reopened = ResponseCache(str(tmp_path), max_entries=2)
+        assert reopened.get(f"{2:064d}") == {"content": "2"}
+
+    @pytest.mark.asyncio
+    async def test_cached_provider_skips_round_trip(self, tmp_path):
+        metrics = MetricsRegistry()
+        cache = ResponseCache(str(tmp_path), metrics=metrics)
+        inner = MockProvider(callback=lambda m, t, i: MockProvider.tool_call("echo", {"n": i}))
+        provider = CachedProvider(inner, cache, "mock")
+        first = await provider.chat(MSGS)
+        second = await provider.chat(MSGS)
+        assert inner.call_count == 1
+        assert second.cached and not first.cached
+        assert second.tool_calls[0].arguments == {"n": 1}
+        assert metrics.count("llm_cache_hits") == 1
+
+    @pytest.mark.asyncio
+    async def test_agent_opt_in(self, tmp_path):
+        from core.database import init_db
+        from repositories.run_repository import SQLAlchemyRunStore
+        from runtime.events import EventBus
+        from runtime.runtime import AgentRuntime
+        from runtime.types import AgentConfig
+        from services.agent_store import DBAgentStore
+        init_db()
+        inner = MockProvider(callback=lambda m, t, i: MockProvider.final("cached answer"))
+        rt = AgentRuntime(
+            run_store=SQLAlchemyRunStore(),
+            agent_store=DBAgentStore(engine=None),
+            event_bus=EventBus(),
+            provider_factory=lambda m: inner,
+            response_cache=ResponseCache(str(tmp_path)),
+        )
+        rt.create_agent(AgentConfig(name="cachebot", model="mock", runtime_config={"response_cache": True}))
+        for _ in range(2):
+            run = rt.create_run(agent_id="cachebot", input_text="same input", user_id=1)
+            await rt.execute_run(run.run_id)
+            assert rt.get_run(run.run_id, user_id=1).output == "cached answer"
+        assert inner.call_count == 1
+        snap = rt.metrics_snapshot()
+        assert snap["llm_cache_hits"] == 1
+        assert snap["llm_calls_total"] == 1
+
+    @pytest.mark.asyncio
+    async def test_registry_caches_temperature_zero(self, tmp_path, monkeypatch):
+        import services.runtime_registry as rr
+
+        class CountingRuntime:
+            calls = 0
+
+            async def chat(self, model, messages, **kwargs):
+                CountingRuntime.calls += 1
+                return {"model": model, "content": "ok", "raw": object()}
+
+        cache = ResponseCache(str(tmp_path))
+        monkeypatch.setattr(rr, "get_response_cache", lambda: cache)
+        reg = rr.RuntimeRegistry()
+        reg._create = lambda name: CountingRuntime()
+        await reg.chat("m", MSGS, temperature=0)
+        hit = await reg.chat("m", MSGS, temperature=0)
+        await reg.chat("m", MSGS, temperature=0.7)
+        assert hit["cached"] is True and hit["content"] == "ok"
+        assert CountingRuntime.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_chat_threads_temperature_and_opt_in_to_remote_providers(self, tmp_path, monkeypatch):
+        import services.chat_service as chat_service
+        import services.runtime_registry as rr
+
+        seen = []
+
+        class FakeRemote:
+            def __init__(self, **config):
+                self.base_url = config["base_url"]
+
+            async def chat(self, model, messages, **kwargs):
+                seen.append(kwargs)
+                return {"model": model, "content": "remote"}
+
+        cache = ResponseCache(str(tmp_path))
+        monkeypatch.setattr(rr, "get_response_cache", lambda: cache)
+        monkeypatch.setattr(chat_service, "OpenAIRuntime", FakeRemote)
+        provider = {"api_key": "k", "base_url": "https://a.example/v1", "default_model": "m", "protocol": "chat_completions"}
+        for _ in range(2):
+            out = await chat_service.run_chat(None, rr.RuntimeRegistry(), "m", MSGS, provider=provider, temperature=0)
+        assert out["cached"] is True and seen == [{"temperature": 0}]
+        await chat_service.run_chat(None, rr.RuntimeRegistry(), "m", MSGS, provider=provider, temperature=0.9, response_cache=False)
+        assert seen[-1] == {"temperature": 0.9}  # the opt-in flag never reaches the provider
+
+    def test_ollama_sampling_params_go_under_options(self):
+        from services.ollama_runtime import _ollama_options
+        assert _ollama_options({"temperature": 0, "max_tokens": 64, "format": "json"}) == {
+            "format": "json", "options": {"temperature": 0, "num_predict": 64},
+        }
+        assert _ollama_options({}) == {}
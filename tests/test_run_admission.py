@@ -0,0 +1,140 @@
+"""Run admission: global / per-user limits, priority classes, fairness, rejection."""
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend", "app"))
+
+from runtime.admission import AdmissionController, RunClass
+from runtime.errors import RunQueueFullError
+from runtime.metrics import MetricsRegistry
+
+
+def _starter(started):
+    def make(run_id):
+        return lambda: started.append(run_id) or True
+    return make
+
+
+class TestAdmissionController:
+    def test_global_limit_queues_and_release_admits(self):
+        started = []
+        start = _starter(started)
+        ac = AdmissionController(max_concurrent=2, max_per_user=0, max_queue=10)
+        positions = [ac.submit(f"r{i}", 1, RunClass.INTERACTIVE, start(f"r{i}")) for i in range(4)]
+        assert positions == [0, 0, 1, 2]
+        assert started == ["r0", "r1"]
+        ac.release("r0")
+        assert started == ["r0", "r1", "r2"]
+        assert ac.position("r3") == 1
+
+    def test_priority_then_round_robin_across_users(self):
+        started = []
+        start = _starter(started)
+        ac = AdmissionController(max_concurrent=1, max_per_user=0, max_queue=10)
+        ac.submit("busy", 9, RunClass.INTERACTIVE, start("busy"))
+        ac.submit("s1", 1, RunClass.SCHEDULED, start("s1"))
+        for rid in ("a1", "a2", "a3"):
+            ac.submit(rid, 1, RunClass.INTERACTIVE, start(rid))
+        ac.submit("b1", 2, RunClass.INTERACTIVE, start("b1"))
+        assert ac.position("b1") == 2 and ac.position("s1") == 5
+        for rid in ("busy", "a1", "b1", "a2", "a3"):
+            ac.release(rid)
+        assert started == ["busy", "a1", "b1", "a2", "a3", "s1"]
+
+    def test_per_user_limit_lets_other_users_through(self):
+        started = []
+        start = _starter(started)
+        ac = AdmissionController(max_concurrent=10, max_per_user=1, max_queue=10)
+        ac.submit("a1", 1, RunClass.INTERACTIVE, start("a1"))
+        assert ac.submit("a2", 1, RunClass.INTERACTIVE, start("a2")) == 1
+        assert ac.submit("b1", 2, RunClass.INTERACTIVE, start("b1")) == 0
+        assert started == ["a1", "b1"]
+
+    def test_rejects_when_queue_full(self):
+        metrics = MetricsRegistry()
+        start = _starter([])
+        ac = AdmissionController(max_concurrent=1, max_per_user=0, max_queue=1, metrics=metrics)
+        ac.submit("r0", 1, RunClass.INTERACTIVE, start("r0"))
+        ac.submit("r1", 1, RunClass.INTERACTIVE, start("r1"))
+        with pytest.raises(RunQueueFullError):
+            ac.submit("r2", 1, RunClass.INTERACTIVE, start("r2"))
+        assert metrics.count("runs_rejected_total") == 1
+        # delegated children borrow the parent's slot and are never rejected
+        assert ac.submit("child", 1, RunClass.DELEGATED, start("child")) == 0
+
+    def test_remove_and_failed_start_free_the_slot(self):
+        ac = AdmissionController(max_concurrent=1, max_per_user=0, max_queue=5)
+        ac.submit("r0", 1, RunClass.INTERACTIVE, lambda: False)
+        assert ac.status()["active"] == 0
+        ac.submit("r1", 1, RunClass.INTERACTIVE, lambda: True)
+        ac.submit("r2", 1, RunClass.INTERACTIVE, lambda: True)
+        assert ac.remove("r2") and ac.position("r2") is None
+        assert ac.status()["queued"] == 0
+
+    @pytest.mark.asyncio
+    async def test_suspended_run_frees_its_slot_and_reacquires_first(self):
+        started = []
+        start = _starter(started)
+        ac = AdmissionController(max_concurrent=1, max_per_user=0, max_queue=10)
+        ac.submit("waiting", 1, RunClass.INTERACTIVE, start("waiting"))
+        ac.submit("q1", 2, RunClass.INTERACTIVE, start("q1"))
+        ac.submit("q2", 2, RunClass.INTERACTIVE, start("q2"))
+        assert ac.suspend("waiting")
+        assert started == ["waiting", "q1"]  # the approval wait no longer holds the slot
+        back = asyncio.create_task(ac.reacquire("waiting"))
+        await asyncio.sleep(0)
+        assert not back.done() and ac.position("waiting") == 1
+        ac.release("q1")
+        await asyncio.wait_for(back, 1)
+        assert started == ["waiting", "q1"] and ac.status()["active"] == 1
+        ac.release("waiting")
+        assert started == ["waiting", "q1", "q2"]
+        assert not ac.suspend("never-admitted")
+
+
+class TestRuntimeAdmission:
+    @pytest.mark.asyncio
+    async def test_runs_stay_pending_until_a_slot_opens(self):
+        from core.database import init_db
+        from repositories.run_repository import SQLAlchemyRunStore
+        from runtime.events import EventBus
+        from runtime.models import MockProvider
+        from runtime.runtime import AgentRuntime
+        from runtime.types import AgentConfig
+        from services.agent_store import DBAgentStore
+        init_db()
+        gate = asyncio.Event()
+
+        class SlowProvider(MockProvider):
+            async def chat(self, messages, *, tools=None, timeout=None):
+                await gate.wait()
+                return await super().chat(messages, tools=tools, timeout=timeout)
+
+        provider = SlowProvider(callback=lambda m, t, i: MockProvider.final("done"))
+        rt = AgentRuntime(
+            run_store=SQLAlchemyRunStore(),
+            agent_store=DBAgentStore(engine=None),
+            event_bus=EventBus(),
+            provider_factory=lambda m: provider,
+            admission=AdmissionController(max_concurrent=1, max_per_user=0, max_queue=1),
+        )
+        rt.create_agent(AgentConfig(name="queuebot", model="mock"))
+        first = rt.create_run(agent_id="queuebot", input_text="one", user_id=1)
+        second = rt.create_run(agent_id="queuebot", input_text="two", user_id=1)
+        assert rt.queue_position(first.run_id) is None
+        assert rt.queue_position(second.run_id) == 1
+        with pytest.raises(RunQueueFullError):
+            rt.create_run(agent_id="queuebot", input_text="three", user_id=1)
+        await asyncio.sleep(0.05)
+        assert rt.get_run(second.run_id).status == "PENDING"
+        assert rt.metrics_snapshot()["run_queue_depth"] == 1
+
+        gate.set()
+        done = await rt.wait_for_run(second.run_id, timeout=5)
+        assert done.status == "COMPLETED"
+        snap = rt.metrics_snapshot()
+        assert snap["run_queue_wait_duration_total"] == 2
+        assert snap["runs_active"] == 0 and snap["run_queue_depth"] == 0
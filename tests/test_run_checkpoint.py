@@ -0,0 +1,221 @@
+"""Run checkpoints: per-step AgentState snapshots and resume after restart."""
+import asyncio
+import os
+import sys
+import time
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend", "app"))
+
+from runtime.cancellation import CancellationToken
+from runtime.checkpoint import (
+    InMemoryCheckpointStore,
+    decode_checkpoint,
+    encode_checkpoint,
+)
+from runtime.execution import ExecutionEngine
+from runtime.models import MockProvider, ModelResult
+from runtime.models.base import ToolCall
+from runtime.run_context import RunContext
+from runtime.types import AgentConfig, RunRecord
+
+
+class StepTools:
+    """Tool runner that records calls and can hang on a given tool (simulated crash)."""
+
+    def __init__(self, hang_on=None):
+        self.calls = []
+        self.hang_on = hang_on
+
+    def schema(self, name):
+        return {"type": "function", "function": {"name": name, "parameters": {"type": "object"}}}
+
+    async def run(self, name, arguments, ctx=None):
+        if name == self.hang_on:
+            released = asyncio.Event()  # only a cancelled run gets past the hang
+            if ctx is not None and ctx.cancellation_token is not None:
+                ctx.cancellation_token.add_callback(released.set)
+            await released.wait()
+        self.calls.append(name)
+        return f"{name} ok"
+
+
+def two_tools():
+    return ModelResult(content="", model="mock", tool_calls=[
+        ToolCall(id="c1", name="first", arguments={}),
+        ToolCall(id="c2", name="second", arguments={}),
+    ], usage={"total_tokens": 7})
+
+
+def make_ctx(run_id):
+    ctx = RunContext(run_id=run_id, agent_id="a", input_text="go", tools=["first", "second"],
+                     timeout_seconds=30, cancellation=CancellationToken())
+    ctx.started_at = time.monotonic()
+    return ctx
+
+
+class TestCheckpointEncoding:
+    def test_roundtrip_is_compact_and_versioned(self):
+        data = {"version": 1, "state": {"messages": [{"role": "tool", "content": "x" * 2000}]}}
+        blob = encode_checkpoint(data)
+        assert decode_checkpoint(blob) == data
+        assert len(blob) < 200
+        assert decode_checkpoint(encode_checkpoint({"version": 0})) is None
+        assert decode_checkpoint(b"garbage") is None
+
+
+class TestEngineResume:
+    @pytest.mark.asyncio
+    async def test_resume_skips_completed_model_and_tool_steps(self):
+        store = InMemoryCheckpointStore()
+        tools = StepTools(hang_on="second")
+        engine = ExecutionEngine(tool_runner=tools, checkpoints=store)
+        task = asyncio.create_task(engine.execute(make_ctx("r1"), MockProvider(script=[two_tools()])))
+        for _ in range(50):
+            await asyncio.sleep(0.01)
+            if tools.calls:
+                break
+        task.cancel()  # process dies while "second" runs
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        saved = store.load("r1")
+        assert saved["state"]["iteration"] == 1 and saved["token_usage"] == {"total_tokens": 7}
+
+        provider = MockProvider(script=[MockProvider.final("done")])
+        tools = StepTools()
+        outcome = await ExecutionEngine(tool_runner=tools, checkpoints=store).execute(make_ctx("r1"), provider)
+        assert outcome["status"] == "COMPLETED" and outcome["output"] == "done"
+        assert tools.calls == ["second"]  # "first" already has a recorded result
+        assert provider.call_count == 1
+        assert outcome["iteration"] == 2 and outcome["tool_call_count"] == 2
+        assert [m["tool_call_id"] for m in outcome["messages"] if m["role"] == "tool"] == ["c1", "c2"]
+
+    @pytest.mark.asyncio
+    async def test_restored_elapsed_counts_against_timeout(self):
+        store = InMemoryCheckpointStore()
+        store.save("r2", {"version": 1, "state": {"run_id": "r2", "messages": [], "iteration": 1},
+                          "token_usage": {}, "elapsed": 100.0})
+        ctx = make_ctx("r2")
+        ctx.timeout_seconds = 50
+        outcome = await ExecutionEngine(tool_runner=StepTools(), checkpoints=store).execute(
+            ctx, MockProvider(script=[MockProvider.final("late")]))
+        assert outcome["status"] == "TIMEOUT"
+
+
+class TestRuntimeResume:
+    @pytest.fixture
+    def runtime(self):
+        from core.database import init_db
+        from repositories.run_repository import SQLAlchemyRunStore
+        from runtime.events import EventBus
+        from runtime.runtime import AgentRuntime
+        from services.agent_store import DBAgentStore
+        init_db()
+        self.provider = MockProvider(script=[MockProvider.final("resumed")])
+        rt = AgentRuntime(
+            run_store=SQLAlchemyRunStore(),
+            agent_store=DBAgentStore(engine=None),
+            event_bus=EventBus(),
+            tool_runner=StepTools(),
+            provider_factory=lambda m: self.provider,
+            checkpoint_store=InMemoryCheckpointStore(),
+        )
+        rt.create_agent(AgentConfig(name="resumebot", model="mock", tools=["first", "second"]))
+        return rt
+
+    def orphan(self, rt, **fields):
+        run = RunRecord(run_id=uuid.uuid4().hex, agent_id="resumebot", user_id=1, status="RUNNING",
+                        input="go", model="mock", **fields)
+        rt.run_store.create(run)
+        rt.run_store.update(run.run_id, status="RUNNING")
+        return run.run_id
+
+    @pytest.mark.asyncio
+    async def test_orphaned_runs_resume_and_children_are_interrupted(self, runtime):
+        rt = runtime
+        parent = self.orphan(rt)
+        child = self.orphan(rt, parent_run_id=parent)
+        rt.checkpoint_store.save(parent, {"version": 1, "token_usage": {}, "elapsed": 0.0, "state": {
+            "run_id": parent, "iteration": 1, "tool_call_count": 2,
+            "messages": [
+                {"role": "user", "content": "go"},
+                {"role": "assistant", "content": "", "tool_calls": [
+                    {"id": "c1", "name": "first", "arguments": {}}]},
+                {"role": "tool", "content": "first ok", "tool_call_id": "c1", "name": "first"},
+            ],
+        }})
+        resumed = await rt.resume_runs()
+        assert parent in resumed and child not in resumed
+        assert rt.get_run(child).status == "CANCELLED"
+        done = await rt.wait_for_run(parent, timeout=5)
+        assert done.status == "COMPLETED" and done.output == "resumed"
+        assert self.provider.call_count == 1
+        assert rt.checkpoint_store.load(parent) is None
+
+    @pytest.mark.asyncio
+    async def test_run_leased_by_a_live_worker_is_not_resumed(self, runtime):
+        rt = runtime
+        held = self.orphan(rt)
+        assert rt.run_store.claim(held, "other-worker", 60)
+        lapsed = self.orphan(rt)
+        assert rt.run_store.claim(lapsed, "crashed-worker", -1)
+        resumed = await rt.resume_runs()
+        assert held not in resumed and lapsed in resumed
+        assert rt._resume_pending
+        assert (await rt.wait_for_run(lapsed, timeout=5)).status == "COMPLETED"
+        assert rt.get_run(held).status == "RUNNING"
+        assert await rt.execute_run(held, resume=True) == {"status": "RUNNING", "output": None, "error": None}
+        rt.run_store.update(held, status="CANCELLED")
+        await rt.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_shutdown_cancels_in_flight_runs(self, runtime):
+        rt = runtime
+        rt.tool_runner.hang_on = "first"
+        self.provider.script = [two_tools()]
+        rt.start()
+        run = rt.create_run(agent_id="resumebot", input_text="go")
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if rt.is_running(run.run_id) and rt.get_run(run.run_id).status == "RUNNING":
+                break
+        await rt.shutdown()
+        done = await rt.wait_for_run(run.run_id, timeout=5)
+        assert done.status == "CANCELLED"
+        assert rt._lease_task is None
+
+    @pytest.mark.asyncio
+    async def test_sqlalchemy_checkpoint_store_roundtrip(self, runtime):
+        from repositories.checkpoint_repository import SQLAlchemyCheckpointStore
+        store = SQLAlchemyCheckpointStore()
+        run_id = uuid.uuid4().hex
+        store.save(run_id, {"version": 1, "state": {"iteration": 1}})
+        store.save(run_id, {"version": 1, "state": {"iteration": 2}})
+        assert store.load(run_id)["state"]["iteration"] == 2
+        store.delete(run_id)
+        assert store.load(run_id) is None
+
+    @pytest.mark.asyncio
+    async def test_sqlalchemy_asave_writes_off_the_loop_in_order(self, runtime, monkeypatch):
+        import threading
+
+        from repositories.checkpoint_repository import SQLAlchemyCheckpointStore
+        store = SQLAlchemyCheckpointStore()
+        run_id = uuid.uuid4().hex
+        threads = []
+        write = store._write
+        monkeypatch.setattr(store, "_write", lambda *a: threads.append(threading.get_ident()) or write(*a))
+        await store.asave(run_id, {"version": 1, "state": {"iteration": 1}})
+        assert threads and threads[0] != threading.get_ident()
+        assert store.load(run_id)["state"]["iteration"] == 1
+        # a snapshot overtaken by a newer one of the same run is dropped
+        write(run_id, 3, b"newer", 10)
+        write(run_id, 2, b"older", 9)
+        from core.database import SessionLocal
+        from models.records import AgentRunCheckpoint
+        with SessionLocal() as db:
+            assert db.get(AgentRunCheckpoint, run_id).iteration == 3
+        store.delete(run_id)
+        assert store.load(run_id) is None and run_id not in store._written
@@ -0,0 +1,300 @@
+"""Run tracing: span tree, sampling, exporters, engine / delegation spans, flame breakdown."""
+import asyncio
+import json
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend", "app"))
+
+from runtime import tracing
+from runtime.models import MockProvider
+from runtime.tools import Tool, ToolResult
+from runtime.tracing import JsonLinesExporter, OTLPFileExporter, Tracer, breakdown
+from runtime.types import AgentConfig
+
+
+def build_runtime(scripts, tracer):
+    from core.database import init_db
+    from models.records import AgentRun  # noqa: F401
+    from repositories.event_repository import SQLAlchemyEventStore
+    from repositories.run_repository import SQLAlchemyRunStore
+    from runtime.events import EventBus
+    from runtime.runtime import AgentRuntime
+    from runtime.tools import ToolExecutor, ToolRegistry
+    from runtime.tools.builtin import register_builtin_tools
+    from services.agent_store import DBAgentStore
+    init_db()
+    registry = register_builtin_tools(ToolRegistry())
+    return AgentRuntime(
+        run_store=SQLAlchemyRunStore(),
+        agent_store=DBAgentStore(engine=None),
+        event_bus=EventBus(store=SQLAlchemyEventStore()),
+        tool_registry=registry,
+        tool_runner=ToolExecutor(registry),
+        provider_factory=lambda model: MockProvider(script=scripts.get(model, [MockProvider.final("default")])),
+        tracer=tracer,
+    )
+
+
+class ClockTool(Tool):
+    name = "trace.clock"
+    description = "returns a fixed time"
+
+    async def execute(self, arguments, context=None):
+        return ToolResult.ok("12:00")
+
+
+def tree(spans):
+    by_id = {s.span_id: s for s in spans}
+
+    def path(s):
+        names = []
+        while s is not None:
+            names.append(s.name)
+            s = by_id.get(s.parent_id)
+        return "/".join(reversed(names))
+
+    return sorted(path(s) for s in spans)
+
+
+class TestTracer:
+    def test_nested_spans_share_the_trace(self):
+        tracer = Tracer()
+        with tracer.span("agent.run", run_id="r1") as run:
+            with tracer.span("agent.iteration", iteration=1) as it:
+                with tracing.span("context.memory") as child:
+                    child.set(items=2, ignored=None)
+            assert tracing.current_span() is run
+        assert tracing.current_span() is None
+        spans = tracer.trace_for_run("r1")
+        assert [s.name for s in spans] == ["agent.run", "agent.iteration", "context.memory"]
+        assert {s.trace_id for s in spans} == {run.trace_id}
+        assert it.parent_id == run.span_id and child.parent_id == it.span_id
+        assert child.run_id == "r1" and child.attributes == {"items": 2}
+        assert all(s.end_ns >= s.start_ns for s in spans)
+
+    def test_errors_mark_the_span(self):
+        tracer = Tracer()
+        with pytest.raises(ValueError):
+            with tracer.span("tool.call", run_id="r2"):
+                raise ValueError("bad input")
+        [span] = tracer.trace_for_run("r2")
+        assert span.status == "error" and "bad input" in span.error
+
+    def test_sampling_disabled_and_module_span_outside_a_trace(self):
+        tracer = Tracer(sample_ratio=0.0)
+        with tracer.span("agent.run", run_id="r3") as run:
+            with tracing.span("llm.request") as child:
+                assert child is not None and not child.sampled
+        assert not run.sampled and tracer.trace_for_run("r3") == []
+        with Tracer(enabled=False).span("agent.run") as off:
+            assert off is None
+        with tracing.span("context.build") as orphan:
+            assert orphan is None
+
+    def test_root_starts_a_new_trace(self):
+        tracer = Tracer()
+        with tracer.span("agent.run", run_id="a") as a:
+            with tracer.span("agent.run", root=True, run_id="b") as b:
+                pass
+        assert b.parent_id is None and b.trace_id != a.trace_id
+
+    def test_old_traces_are_evicted(self):
+        tracer = Tracer(max_traces=2)
+        for i in range(3):
+            with tracer.span("agent.run", run_id=f"run{i}"):
+                pass
+        assert tracer.trace_for_run("run0") == []
+        assert len(tracer.trace_for_run("run2")) == 1
+
+    def test_breakdown_separates_self_time(self):
+        tracer = Tracer()
+        with tracer.span("agent.run", run_id="r4"):
+            with tracer.span("llm.request"):
+                pass
+        spans = tracer.trace_for_run("r4")
+        rows = {r["name"]: r for r in breakdown(spans)}
+        run = spans[0]
+        assert rows["agent.run"]["total_ms"] == round(run.duration_ms, 3)
+        assert rows["agent.run"]["self_ms"] <= rows["agent.run"]["total_ms"]
+        assert rows["llm.request"]["count"] == 1
+
+
+class TestExporters:
+    def test_jsonl_exports_each_finished_trace(self, tmp_path):
+        path = str(tmp_path / "spans.jsonl")
+        tracer = Tracer(exporter=JsonLinesExporter(path))
+        with tracer.span("agent.run", run_id="r5"):
+            with tracer.span("tool.call", tool="file_read"):
+                pass
+            assert not os.path.exists(path)  # exported once the root span ends
+        tracer.close()
+        lines = [json.loads(line) for line in open(path, encoding="utf-8")]
+        assert [s["name"] for s in lines] == ["tool.call", "agent.run"]
+        assert lines[0]["attributes"] == {"tool": "file_read"} and lines[0]["run_id"] == "r5"
+
+    def test_otlp_file_format(self, tmp_path):
+        path = str(tmp_path / "otlp.jsonl")
+        tracer = Tracer(exporter=OTLPFileExporter(path))
+        with tracer.span("agent.run", run_id="r6", iterations=2, cached=False, ratio=0.5):
+            with tracer.span("llm.request"):
+                pass
+        tracer.close()
+        [request] = [json.loads(line) for line in open(path, encoding="utf-8")]
+        resource = request["resourceSpans"][0]
+        assert resource["resource"]["attributes"][0] == {"key": "service.name", "value": {"stringValue": "modelforge"}}
+        spans = resource["scopeSpans"][0]["spans"]
+        root = next(s for s in spans if s["name"] == "agent.run")
+        child = next(s for s in spans if s["name"] == "llm.request")
+        assert len(root["traceId"]) == 32 and len(root["spanId"]) == 16
+        assert child["parentSpanId"] == root["spanId"] and "parentSpanId" not in root
+        attrs = {a["key"]: a["value"] for a in root["attributes"]}
+        assert attrs["iterations"] == {"intValue": "2"} and attrs["cached"] == {"boolValue": False}
+        assert attrs["ratio"] == {"doubleValue": 0.5} and attrs["run_id"] == {"stringValue": "r6"}
+        assert int(root["endTimeUnixNano"]) >= int(root["startTimeUnixNano"])
+
+    def test_writes_happen_off_the_caller_and_rotate_by_size(self, tmp_path, monkeypatch):
+        path = str(tmp_path / "spans.jsonl")
+        exporter = JsonLinesExporter(path, max_bytes=600, backup_count=2)
+        writers = set()
+        append = exporter._append
+
+        def record(text):
+            writers.add(threading.current_thread().name)
+            append(text)
+
+        monkeypatch.setattr(exporter, "_append", record)
+        tracer = Tracer(exporter=exporter)
+        for i in range(12):
+            with tracer.span("agent.run", run_id=f"rot-{i}"):
+                pass
+            assert exporter.flush()
+        tracer.close()
+        assert writers == {"trace-exporter"}
+        assert os.path.exists(path + ".1") and os.path.exists(path + ".2")
+        assert not os.path.exists(path + ".3")
+        for name in (path, path + ".1", path + ".2"):
+            assert os.path.getsize(name) <= 600
+        newest = [json.loads(line)["run_id"] for line in open(path, encoding="utf-8")]
+        assert newest[-1] == "rot-11"
+
+    def test_broken_exporter_does_not_fail_the_run(self):
+        class Broken:
+            def export(self, spans):
+                raise OSError("disk full")
+
+        tracer = Tracer(exporter=Broken())
+        with tracer.span("agent.run", run_id="r7"):
+            pass
+        assert tracer.export_failures == 1 and len(tracer.trace_for_run("r7")) == 1
+
+
+class TestRunSpans:
+    @pytest.mark.asyncio
+    async def test_run_iteration_model_and_tool_spans(self):
+        tracer = Tracer()
+        rt = build_runtime({
+            "traced": [
+                MockProvider.tool_call("trace.clock", {}),
+                MockProvider.final("done", usage={"prompt_tokens": 9, "completion_tokens": 2, "total_tokens": 11}),
+            ],
+        }, tracer)
+        rt.register_tool(ClockTool())
+        rt.create_agent(AgentConfig(name="traced-agent", model="traced", tools=["trace.clock"]))
+        run = rt.create_run(agent_id="traced-agent", input_text="what time", user_id=1, execute=False)
+        await rt.execute_run(run.run_id)
+        assert rt.get_run(run.run_id).status == "COMPLETED"
+
+        trace = rt.run_trace(run.run_id, user_id=1)
+        spans = tracer.trace_for_run(run.run_id)
+        assert tree(spans) == [
+            "agent.run",
+            "agent.run/agent.iteration",
+            "agent.run/agent.iteration",
+            "agent.run/agent.iteration/llm.request",
+            "agent.run/agent.iteration/llm.request",
+            "agent.run/agent.iteration/tool.call",
+        ]
+        root = spans[0]
+        assert root.attributes["status"] == "COMPLETED" and root.attributes["iterations"] == 2
+        assert root.attributes["tool_calls"] == 1 and root.attributes["tokens.prompt_tokens"] == 9
+        tool = next(s for s in spans if s.name == "tool.call")
+        assert tool.attributes["tool"] == "trace.clock" and tool.attributes["outcome"] == "ok"
+        assert trace["trace_id"] == root.trace_id and len(trace["spans"]) == 6
+        assert {r["name"] for r in trace["breakdown"]} == {"agent.run", "agent.iteration", "llm.request", "tool.call"}
+
+    @pytest.mark.asyncio
+    async def test_delegated_child_run_nests_under_the_tool_call(self):
+        tracer = Tracer()
+        rt = build_runtime({
+            "helper": [MockProvider.final("helper done")],
+            "boss": [
+                MockProvider.tool_call("agent.delegate", {"agent_id": "trace-helper", "task": "analyze"}),
+                MockProvider.final("boss done"),
+            ],
+        }, tracer)
+        rt.create_agent(AgentConfig(name="trace-helper", model="helper", tools=[]))
+        rt.create_agent(AgentConfig(name="trace-boss", model="boss", tools=["agent.delegate"]))
+        run = rt.create_run(agent_id="trace-boss", input_text="start", user_id=1, execute=False)
+        await asyncio.create_task(rt.execute_run(run.run_id))
+
+        spans = tracer.trace_for_run(run.run_id)
+        assert "agent.run/agent.iteration/tool.call/agent.run/agent.iteration/llm.request" in tree(spans)
+        child = next(s for s in spans if s.name == "agent.run" and s.parent_id)
+        assert child.attributes["agent_id"] == "trace-helper"
+        assert tracer.trace_for_run(child.run_id)[0].trace_id == spans[0].trace_id
+
+    @pytest.mark.asyncio
+    async def test_context_build_spans(self):
+        from runtime.cancellation import CancellationToken
+        from runtime.context.builder import ContextBuilder
+        from runtime.execution import ExecutionEngine
+        from runtime.run_context import RunContext
+
+        class History:
+            async def load(self, session_id, limit=20):
+                return [{"role": "user", "content": "earlier"}]
+
+        tracer = Tracer()
+        engine = ExecutionEngine(context_builder=ContextBuilder(history_provider=History()), tracer=tracer)
+        ctx = RunContext(run_id="ctx-run", agent_id="a", session_id=5, input_text="hi", tools=[],
+                         cancellation=CancellationToken())
+        with tracer.span("agent.run", run_id="ctx-run"):
+            await engine.execute(ctx, MockProvider(script=[MockProvider.final("ok")]))
+        paths = tree(tracer.trace_for_run("ctx-run"))
+        prefix = "agent.run/agent.iteration/context.build/"
+        assert {prefix + "context.memory", prefix + "context.knowledge", prefix + "context.history"} <= set(paths)
+        history = next(s for s in tracer.trace_for_run("ctx-run") if s.name == "context.history")
+        assert history.attributes["items"] == 1
+
+
+class TestTraceApi:
+    def test_run_trace_endpoint(self):
+        import time
+
+        from fastapi.testclient import TestClient
+        from main import app
+        from services.agent_runtime_service import get_agent_runtime
+
+        with TestClient(app) as client:
+            rt = get_agent_runtime()
+            rt.provider_factory = lambda m: MockProvider(script=[MockProvider.final("traced answer")])
+            client.post("/api/v1/auth/register", json={"username": "tracer", "password": "secret123", "email": "tracer@x.com"})
+            token = client.post("/api/v1/auth/login", json={"username": "tracer", "password": "secret123"}).json()["token"]
+            h = {"Authorization": "Bearer " + token}
+            client.post("/api/v1/agent/create", json={"name": "trace-api-bot", "model": "mock"}, headers=h)
+            run_id = client.post("/api/v1/agent/runs", json={"agent_id": "trace-api-bot", "input": "hi"}, headers=h).json()["run_id"]
+            for _ in range(100):
+                if client.get(f"/api/v1/agent/runs/{run_id}", headers=h).json()["status"] == "COMPLETED":
+                    break
+                time.sleep(0.05)
+            data = client.get(f"/api/v1/agent/runs/{run_id}/trace", headers=h).json()
+            assert client.get("/api/v1/agent/runs/missing/trace", headers=h).status_code == 404
+
+        names = [s["name"] for s in data["spans"]]
+        assert names[0] == "agent.run" and "llm.request" in names
+        assert data["spans"][0]["attributes"]["queue_wait_ms"] >= 0
+        assert data["breakdown"][0]["self_ms"] >= data["breakdown"][-1]["self_ms"]
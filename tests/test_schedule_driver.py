@@ -0,0 +1,311 @@
+"""Durable schedules: leader lease, misfire / concurrency policies, cron, jitter, coalescing."""
+import asyncio
+import datetime
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend", "app"))
+
+from core.config import ScheduleSettings
+from core.database import Base
+from models.records import ScheduledJob, ScheduleExecution, User
+from runtime.cron import CronExpression
+from runtime.scheduler import Scheduler
+from services.schedule_driver import ScheduleDriver
+from services.schedule_service import ScheduleService
+
+CFG = ScheduleSettings(poll_interval_seconds=5.0, lease_ttl_seconds=30.0, misfire_grace_seconds=60.0, max_catch_up=3)
+
+
+class FakeRuntime:
+    def __init__(self):
+        self.runs = {}
+        self.cancelled = []
+
+    def create_run(self, **kwargs):
+        run = SimpleNamespace(run_id=f"run_{len(self.runs) + 1}", status="RUNNING", kwargs=kwargs)
+        self.runs[run.run_id] = run
+        return run
+
+    def get_run(self, run_id):
+        return self.runs[run_id]
+
+    async def cancel_run(self, run_id):
+        self.cancelled.append(run_id)
+        self.runs[run_id].status = "CANCELLED"
+
+    async def wait_for_run(self, run_id, timeout=None, cancellation=None):
+        while self.runs[run_id].status == "RUNNING":
+            await asyncio.sleep(0.01)
+        return self.runs[run_id]
+
+
+@pytest.fixture
+def factory():
+    engine = create_engine(
+        "sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine)
+    Base.metadata.drop_all(bind=engine)
+
+
+def make_job(factory, **payload):
+    db = factory()
+    user = db.query(User).first()
+    if user is None:
+        user = User(username="u", email="u@x", password_hash="x")
+        db.add(user)
+        db.commit()
+    service = ScheduleService(db)
+    job = service.enable(service.create_draft(user.id, {"agent_id": "a1", "input": "go", **payload}))
+    job_id = job.id
+    db.close()
+    return job_id
+
+
+def set_due(factory, job_id, when):
+    db = factory()
+    db.get(ScheduledJob, job_id).next_run_at = when
+    db.commit()
+    db.close()
+
+
+def outcomes(factory, job_id):
+    db = factory()
+    try:
+        rows = db.query(ScheduleExecution).filter(ScheduleExecution.schedule_id == job_id).all()
+        return sorted(row.outcome for row in rows)
+    finally:
+        db.close()
+
+
+class TestScheduleDriver:
+    @pytest.mark.asyncio
+    async def test_only_lease_holder_fires(self, factory):
+        job_id = make_job(factory, schedule_kind="interval", interval_seconds=60)
+        now = datetime.datetime.utcnow()
+        set_due(factory, job_id, now)
+        rt_a, rt_b = FakeRuntime(), FakeRuntime()
+        a = ScheduleDriver(rt_a, factory, CFG, worker_id="a")
+        b = ScheduleDriver(rt_b, factory, CFG, worker_id="b")
+        await a.tick(now)
+        await b.tick(now)
+        assert a.is_leader and not b.is_leader
+        assert len(rt_a.runs) == 1 and not rt_b.runs
+        # a lapsed lease is taken over
+        later = now + datetime.timedelta(seconds=CFG.lease_ttl_seconds + 1)
+        await b.tick(later)
+        assert b.is_leader
+
+    @pytest.mark.asyncio
+    async def test_interval_advances_on_grid_and_reports_next_delay(self, factory):
+        job_id = make_job(factory, schedule_kind="interval", interval_seconds=60)
+        now = datetime.datetime.utcnow()
+        set_due(factory, job_id, now - datetime.timedelta(seconds=10))
+        runtime = FakeRuntime()
+        delay = await ScheduleDriver(runtime, factory, CFG, worker_id="a").tick(now)
+        assert len(runtime.runs) == 1
+        assert runtime.runs["run_1"].kwargs["run_class"] == "scheduled"
+        db = factory()
+        assert db.get(ScheduledJob, job_id).next_run_at == now + datetime.timedelta(seconds=50)
+        db.close()
+        assert delay == CFG.poll_interval_seconds
+
+    @pytest.mark.asyncio
+    async def test_misfire_skip_and_catch_up(self, factory):
+        now = datetime.datetime.utcnow()
+        skip = make_job(factory, schedule_kind="interval", interval_seconds=60)
+        set_due(factory, skip, now - datetime.timedelta(minutes=10))
+        runtime = FakeRuntime()
+        await ScheduleDriver(runtime, factory, CFG, worker_id="a").tick(now)
+        assert not runtime.runs
+        assert outcomes(factory, skip) == ["missed"]
+
+        db = factory()
+        db.get(ScheduledJob, skip).misfire_policy = "catch_up"
+        db.get(ScheduledJob, skip).concurrency_policy = "allow"
+        db.commit()
+        db.close()
+        set_due(factory, skip, now - datetime.timedelta(minutes=10))
+        await ScheduleDriver(runtime, factory, CFG, worker_id="a").tick(now)
+        assert len(runtime.runs) == CFG.max_catch_up
+
+    @pytest.mark.asyncio
+    async def test_catch_up_with_skip_fires_serially(self, factory):
+        now = datetime.datetime.utcnow()
+        job_id = make_job(factory, schedule_kind="interval", interval_seconds=60, misfire_policy="catch_up")
+        set_due(factory, job_id, now - datetime.timedelta(minutes=10))
+        runtime = FakeRuntime()
+        driver = ScheduleDriver(runtime, factory, CFG, worker_id="a")
+        await driver.tick(now)
+        await asyncio.sleep(0.05)
+        assert list(runtime.runs) == ["run_1"]  # the next slot waits instead of being skipped
+        for n in range(1, CFG.max_catch_up):
+            runtime.runs[f"run_{n}"].status = "COMPLETED"
+            await asyncio.sleep(0.05)
+            assert len(runtime.runs) == n + 1
+        assert outcomes(factory, job_id) == ["triggered"] * CFG.max_catch_up
+        await driver.stop()
+
+    @pytest.mark.asyncio
+    async def test_concurrency_skip_and_replace(self, factory):
+        now = datetime.datetime.utcnow()
+        job_id = make_job(factory, schedule_kind="interval", interval_seconds=60)
+        runtime = FakeRuntime()
+        driver = ScheduleDriver(runtime, factory, CFG, worker_id="a")
+        set_due(factory, job_id, now)
+        await driver.tick(now)
+        set_due(factory, job_id, now)
+        await driver.tick(now)
+        assert len(runtime.runs) == 1
+        assert outcomes(factory, job_id) == ["skipped", "triggered"]
+
+        db = factory()
+        db.get(ScheduledJob, job_id).concurrency_policy = "replace"
+        db.commit()
+        db.close()
+        set_due(factory, job_id, now)
+        await driver.tick(now)
+        assert runtime.cancelled == ["run_1"] and len(runtime.runs) == 2
+
+    @pytest.mark.asyncio
+    async def test_once_job_disarms_and_rehydrates(self, factory):
+        now = datetime.datetime.utcnow()
+        job_id = make_job(factory, schedule_kind="once", delay_seconds=30)
+        set_due(factory, job_id, None)
+        runtime = FakeRuntime()
+        driver = ScheduleDriver(runtime, factory, CFG, worker_id="a")
+        assert await driver.tick(now) == CFG.poll_interval_seconds
+        db = factory()
+        assert db.get(ScheduledJob, job_id).next_run_at == now + datetime.timedelta(seconds=30)
+        db.close()
+        await driver.tick(now + datetime.timedelta(seconds=31))
+        db = factory()
+        job = db.get(ScheduledJob, job_id)
+        assert len(runtime.runs) == 1 and not job.enabled and job.next_run_at is None
+        db.close()
+
+    def test_policies_are_validated(self, factory):
+        with pytest.raises(ValueError):
+            make_job(factory, schedule_kind="interval", interval_seconds=60, misfire_policy="later")
+
+
+class TestCronExpression:
+    def test_fields_steps_and_names(self):
+        cron = CronExpression("*/15 9-17 * * mon-fri")
+        t = datetime.datetime(2026, 10, 16, 17, 50)  # Friday
+        assert cron.next_after(t) == datetime.datetime(2026, 10, 19, 9, 0)
+        assert CronExpression("@monthly").next_after(t) == datetime.datetime(2026, 11, 1)
+        # day-of-month OR day-of-week when both are restricted
+        assert CronExpression("0 0 13 * fri").next_after(t) == datetime.datetime(2026, 10, 23)
+        # "*/1" is as unrestricted as "*": only the weekday applies
+        assert CronExpression("0 0 */1 * fri").next_after(t) == datetime.datetime(2026, 10, 23)
+        assert CronExpression("0 0 */1 * sun").next_after(t) == datetime.datetime(2026, 10, 18)
+        for bad in ("* * *", "61 * * * *", "5-1 * * * *", "* * * foo *"):
+            with pytest.raises(ValueError):
+                CronExpression(bad)
+
+    def test_timezone_and_dst(self):
+        cron = CronExpression("30 2 * * *")
+        after = datetime.datetime(2026, 3, 7, 12, 0)  # UTC
+        assert cron.next_fire(after, "Asia/Shanghai") == datetime.datetime(2026, 3, 7, 18, 30)
+        # 02:30 does not exist on 2026-03-08 in New York: runs after the gap
+        assert cron.next_fire(after, "America/New_York") == datetime.datetime(2026, 3, 8, 7, 30)
+        with pytest.raises(ValueError):
+            cron.next_fire(after, "Mars/Olympus")
+
+
+class TestCronSchedules:
+    def test_jitter_spreads_same_cadence(self, factory):
+        ids = [make_job(factory, cron_expression="0 * * * *", schedule_kind="cron", jitter_seconds=600) for _ in range(8)]
+        db = factory()
+        due = {db.get(ScheduledJob, i).next_run_at for i in ids}
+        top = min(d.replace(minute=0, second=0, microsecond=0) for d in due)
+        assert len(due) == 8
+        assert all(datetime.timedelta(0) <= d - top < datetime.timedelta(seconds=600) for d in due)
+        job = db.get(ScheduledJob, ids[0])
+        assert ScheduleService.jitter_offset(job) == ScheduleService.jitter_offset(job)
+        db.close()
+        with pytest.raises(ValueError):
+            make_job(factory, schedule_kind="cron", cron_expression="0 * * * *", jitter_seconds=-1)
+
+    def test_cron_advance_keeps_jitter_and_catches_up(self, factory):
+        job_id = make_job(factory, schedule_kind="cron", cron_expression="0 * * * *", jitter_seconds=300,
+                          misfire_policy="catch_up")
+        db = factory()
+        service = ScheduleService(db)
+        job = db.get(ScheduledJob, job_id)
+        offset = service.jitter_offset(job)
+        top = datetime.datetime(2026, 10, 19, 8, 0)
+        job.next_run_at = top + offset
+        assert service.advance(job, top + offset, 60, 10) == 1
+        assert job.next_run_at == top + datetime.timedelta(hours=1) + offset
+        job.next_run_at = top + offset
+        assert service.advance(job, top + datetime.timedelta(hours=5, minutes=30), 60, 3) == 3
+        assert job.next_run_at == top + datetime.timedelta(hours=6) + offset
+        db.close()
+
+    @pytest.mark.asyncio
+    async def test_coalesced_batch_is_dispatched_at_rate(self, factory):
+        now = datetime.datetime.utcnow()
+        ids = [make_job(factory, schedule_kind="interval", interval_seconds=3600) for _ in range(4)]
+        for job_id in ids:
+            set_due(factory, job_id, now - datetime.timedelta(seconds=1))
+        cfg = CFG.model_copy(update={"coalesce_window_seconds": 10.0, "dispatch_rate_per_second": 50.0})
+        runtime = FakeRuntime()
+        driver = ScheduleDriver(runtime, factory, cfg, worker_id="a")
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        assert await driver.tick(now) == 10.0
+        assert not runtime.runs and driver.pending == 4
+        db = factory()
+        db.get(ScheduledJob, ids[-1]).enabled = False  # paused within the window
+        db.commit()
+        db.close()
+        await asyncio.wait_for(driver._dispatcher, timeout=2)
+        assert len(runtime.runs) == 3
+        assert loop.time() - start >= 2 / 50.0
+        await driver.stop()
+
+    def test_coalesce_window_must_stay_below_lease_and_grace(self):
+        with pytest.raises(ValueError):
+            ScheduleSettings(coalesce_window_seconds=30.0, lease_ttl_seconds=30.0)
+        with pytest.raises(ValueError):
+            ScheduleSettings(coalesce_window_seconds=20.0, lease_ttl_seconds=60.0, misfire_grace_seconds=15.0)
+        assert ScheduleSettings(coalesce_window_seconds=10.0).coalesce_window_seconds == 10.0
+
+    @pytest.mark.asyncio
+    async def test_lease_is_renewed_during_a_long_sleep(self, factory):
+        cfg = CFG.model_copy(update={"poll_interval_seconds": 5.0, "lease_ttl_seconds": 0.3})
+        leader = ScheduleDriver(FakeRuntime(), factory, cfg, worker_id="a")
+        leader.start()
+        await asyncio.sleep(0.6)  # two lease periods into one poll sleep
+        other = ScheduleDriver(FakeRuntime(), factory, cfg, worker_id="b")
+        await other.tick()
+        assert leader.is_leader and not other.is_leader
+        await leader.stop()
+
+
+class TestHeapScheduler:
+    @pytest.mark.asyncio
+    async def test_many_jobs_share_one_timer(self):
+        fired = []
+
+        async def trigger(spec):
+            fired.append(spec["n"])
+
+        sched = Scheduler(trigger)
+        sched.start()
+        ids = [sched.schedule_once(0.05 - i * 0.01, {"n": i}) for i in range(4)]
+        sched.cancel(ids[0])
+        await asyncio.sleep(0.1)
+        assert fired == [3, 2, 1]
+        assert sched._timer is not None
+        await sched.stop()
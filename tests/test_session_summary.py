@@ -0,0 +1,99 @@
+"""Rolling session summaries: summary + recent turns, background refresh, invalidation."""
+import os
+import sys
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend", "app"))
+
+from core.config import SessionSummarySettings
+from core.database import Base
+from models.records import User
+from services.session_service import SessionService
+from services.session_summary import SessionSummarizer, prompt_history
+
+CFG = SessionSummarySettings(recent_messages=4, batch_messages=4, max_history_messages=50)
+
+
+@pytest.fixture
+def factory():
+    engine = create_engine(
+        "sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine)
+    Base.metadata.drop_all(bind=engine)
+
+
+def make_session(factory, turns):
+    with factory() as db:
+        user = User(username="u", email="u@x", password_hash="x")
+        db.add(user)
+        db.commit()
+        session = SessionService.create_session(db, user.id)
+        for i in range(turns):
+            SessionService.add_message(db, session.id, "user" if i % 2 == 0 else "assistant", f"turn {i}")
+        return session.id
+
+
+class FakeChat:
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, model, messages):
+        self.calls.append((model, messages))
+        return {"content": "SUMMARY"}
+
+
+class TestSessionSummary:
+    def test_history_is_most_recent_without_summary(self, factory):
+        sid = make_session(factory, 10)
+        with factory() as db:
+            history = prompt_history(db, sid, limit=3, config=CFG)
+        assert [m["content"] for m in history] == ["turn 7", "turn 8", "turn 9"]
+
+    @pytest.mark.asyncio
+    async def test_refresh_folds_older_turns(self, factory):
+        sid = make_session(factory, 10)
+        chat = FakeChat()
+        summarizer = SessionSummarizer(session_factory=factory, config=CFG)
+        assert await summarizer.refresh(sid, chat, "cheap") is True
+        assert chat.calls[0][0] == "cheap"
+        assert "turn 5" in chat.calls[0][1][-1]["content"]
+        assert "turn 6" not in chat.calls[0][1][-1]["content"]
+        with factory() as db:
+            history = prompt_history(db, sid, config=CFG)
+        assert history[0]["role"] == "system" and "SUMMARY" in history[0]["content"]
+        assert [m["content"] for m in history[1:]] == ["turn 6", "turn 7", "turn 8", "turn 9"]
+
+    @pytest.mark.asyncio
+    async def test_refresh_skipped_below_threshold(self, factory):
+        sid = make_session(factory, 6)
+        chat = FakeChat()
+        summarizer = SessionSummarizer(session_factory=factory, config=CFG)
+        assert await summarizer.refresh(sid, chat, "cheap") is False
+        assert chat.calls == []
+
+    @pytest.mark.asyncio
+    async def test_clear_invalidates_summary(self, factory):
+        sid = make_session(factory, 10)
+        summarizer = SessionSummarizer(session_factory=factory, config=CFG)
+        await summarizer.refresh(sid, FakeChat(), "cheap")
+        with factory() as db:
+            SessionService.clear_session_messages(db, sid)
+            SessionService.add_message(db, sid, "user", "fresh")
+            history = prompt_history(db, sid, config=CFG)
+        assert history == [{"role": "user", "content": "fresh"}]
+
+    @pytest.mark.asyncio
+    async def test_schedule_is_single_flight(self, factory):
+        sid = make_session(factory, 10)
+        chat = FakeChat()
+        summarizer = SessionSummarizer(session_factory=factory, config=CFG)
+        first = summarizer.schedule(sid, chat, "m")
+        assert summarizer.schedule(sid, chat, "m") is first
+        assert await first is True
+        assert len(chat.calls) == 1
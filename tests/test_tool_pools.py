@@ -0,0 +1,107 @@
+"""Tool execution classes: io-thread / cpu-process / inline pools, cancellation, utilization."""
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend", "app"))
+
+from runtime.cancellation import CancellationToken
+from runtime.errors import RunCancelledError
+from runtime.tools.builtin import FunctionTool, register_builtin_tools
+from runtime.tools.executor import ToolExecutor
+from runtime.tools.pool import CPU_PROCESS, INLINE, IO_THREAD, ToolPools
+from runtime.tools.registry import ToolRegistry
+
+
+def worker_pid() -> int:
+    return os.getpid()
+
+
+def spin(seconds: float) -> str:
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        pass
+    return "spun"
+
+
+@pytest.fixture
+def pools():
+    p = ToolPools(io_workers=2, cpu_workers=1, warm_modules=())
+    yield p
+    p.shutdown()
+
+
+class TestExecutionClasses:
+    @pytest.mark.asyncio
+    async def test_classes_run_in_their_pools(self, pools):
+        assert await pools.run(CPU_PROCESS, worker_pid, {}) != os.getpid()
+        assert await pools.run(INLINE, worker_pid, {}) == os.getpid()
+        assert await pools.run(IO_THREAD, spin, {"seconds": 0}) == "spun"
+        stats = pools.stats()
+        assert stats[CPU_PROCESS]["tasks_total"] == 1 and stats[CPU_PROCESS]["workers"] == 1
+        assert stats[IO_THREAD]["tasks_total"] == 1 and stats[IO_THREAD]["active"] == 0
+        with pytest.raises(ValueError):
+            await pools.run("gpu", spin, {"seconds": 0})
+
+    @pytest.mark.asyncio
+    async def test_warm_workers_are_reused(self, pools):
+        pools.warm()
+        first = await pools.run(CPU_PROCESS, worker_pid, {})
+        assert await pools.run(CPU_PROCESS, worker_pid, {}) == first
+
+    def test_builtin_code_search_is_cpu_class(self):
+        registry = register_builtin_tools(ToolRegistry())
+        assert registry.get("code.search").execution_class == CPU_PROCESS
+        assert registry.get("filesystem.read").to_dict()["execution_class"] == IO_THREAD
+        with pytest.raises(ValueError):
+            FunctionTool("x", "x", spin, {}, execution_class="gpu")
+
+    def test_pool_settings_come_from_the_environment(self, tmp_path, monkeypatch):
+        from core.config import load_config
+        monkeypatch.setenv("TOOLS_CPU_PROCESS_WORKERS", "3")
+        monkeypatch.setenv("TOOLS_CPU_PROCESS_START_METHOD", "forkserver")
+        tools = load_config(str(tmp_path / "missing.yaml")).tools
+        assert tools.cpu_process_workers == 3 and tools.cpu_process_start_method == "forkserver"
+
+
+class TestCancellation:
+    @pytest.mark.asyncio
+    async def test_token_cancel_terminates_running_cpu_call(self, pools):
+        first = await pools.run(CPU_PROCESS, worker_pid, {})
+        token = CancellationToken()
+        task = asyncio.create_task(pools.run(CPU_PROCESS, spin, {"seconds": 30}, cancellation=token))
+        await asyncio.sleep(0.3)
+        assert pools.stats()[CPU_PROCESS]["utilization"] == 1.0
+        started = time.monotonic()
+        token.cancel()
+        with pytest.raises(RunCancelledError):
+            await task
+        assert time.monotonic() - started < 5
+        stats = pools.stats()[CPU_PROCESS]
+        assert stats["cancelled_total"] == 1 and stats["recycled_total"] == 1 and stats["active"] == 0
+        # the busy worker was terminated; a fresh one serves the next call
+        assert await pools.run(CPU_PROCESS, worker_pid, {}) != first
+
+    @pytest.mark.asyncio
+    async def test_executor_timeout_and_cancelled_runs_propagate(self, pools):
+        registry = ToolRegistry()
+        registry.register(FunctionTool("busy", "busy", spin, {}, timeout=0.5,
+                                       execution_class=CPU_PROCESS, pools=pools))
+        registry.register(FunctionTool("slow", "slow", spin, {}, execution_class=IO_THREAD, pools=pools))
+        executor = ToolExecutor(registry)
+        from runtime.errors import ToolTimeoutError
+        with pytest.raises(ToolTimeoutError):
+            await executor.run("busy", {"seconds": 30})
+        assert pools.stats()[CPU_PROCESS]["recycled_total"] == 1
+
+        class Ctx:
+            timeout = 10
+            policy = None
+            cancellation_token = CancellationToken()
+
+        Ctx.cancellation_token.cancel()
+        with pytest.raises(RunCancelledError):
+            await executor.run("slow", {"seconds": 0}, Ctx())
@@ -0,0 +1,25 @@
+"""Reproducible load generation against an isolated ModelForge backend.
+
+``python -m tools.loadgen`` starts an Ollama-compatible mock model with
+injected latency and token rate, boots the backend in a subprocess on a
+throwaway database and data directory, and drives N users creating agent
+runs, streamed chats, knowledge-base queries and task-center events while
+their task SSE streams stay open. The run is reported as JSON and Markdown:
+throughput, p50/p95/p99 per operation, SSE delivery and outbox lag, DB
+pool checkout waits and event-loop lag.
+"""
+from .harness import LoadConfig, run_load
+from .mock_llm import MockLLMConfig, MockLLMServer, create_mock_app
+from .report import percentile, render_markdown, summarize, write_reports
+
+__all__ = [
+    "LoadConfig",
+    "MockLLMConfig",
+    "MockLLMServer",
+    "create_mock_app",
+    "percentile",
+    "render_markdown",
+    "run_load",
+    "summarize",
+    "write_reports",
+]
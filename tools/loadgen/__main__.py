@@ -0,0 +1,102 @@
+"""``python -m tools.loadgen`` - run a load test and write JSON + Markdown reports."""
+from __future__ import annotations
+
+import argparse
+import datetime
+import sys
+
+from .harness import OPERATIONS, LoadConfig, run_load
+from .mock_llm import MockLLMConfig
+from .report import render_markdown, write_reports
+
+
+def _mix(value: str) -> dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        try:
+            mix[name.strip()] = float(weight) if weight else 1.0
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"bad weight in {part!r}") from None
+    return mix
+
+
+def _env(value: str) -> tuple[str, str]:
+    key, sep, val = value.partition("=")
+    if not sep or not key:
+        raise argparse.ArgumentTypeError("expected KEY=VALUE")
+    return key, val
+
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(
+        prog="python -m tools.loadgen",
+        description="Load-test an isolated ModelForge backend with a mock LLM.",
+    )
+    load = p.add_argument_group("load")
+    load.add_argument("--users", type=int, default=8, help="simulated users (default: 8)")
+    load.add_argument("--rate", type=float, default=10.0, help="target operations per second, all users (default: 10)")
+    load.add_argument("--duration", type=float, default=30.0, help="seconds of load (default: 30)")
+    load.add_argument("--mix", type=_mix, default=None,
+                      help=f"operation weights, e.g. run=2,chat=1,kb=1,task=4 (operations: {', '.join(OPERATIONS)})")
+    load.add_argument("--streams-per-user", type=int, default=1, help="open task SSE streams per user (default: 1)")
+    load.add_argument("--max-inflight", type=int, default=256, help="operations in flight before arrivals are dropped")
+    load.add_argument("--seed", type=int, default=1, help="seed of arrivals, operation choice and mock jitter")
+
+    llm = p.add_argument_group("mock LLM")
+    llm.add_argument("--llm-latency-ms", type=float, default=200.0, help="time to first token (default: 200)")
+    llm.add_argument("--llm-jitter-ms", type=float, default=0.0, help="uniform +/- jitter on the first-token latency")
+    llm.add_argument("--llm-tokens-per-second", type=float, default=50.0, help="token rate, 0 = instant (default: 50)")
+    llm.add_argument("--llm-output-tokens", type=int, default=64, help="tokens per response (default: 64)")
+
+    server = p.add_argument_group("backend")
+    server.add_argument("--db-pool-size", type=int, default=None, help="DATABASE_POOL_SIZE of the backend")
+    server.add_argument("--db-max-overflow", type=int, default=None, help="DATABASE_MAX_OVERFLOW of the backend")
+    server.add_argument("--env", type=_env, action="append", default=[], metavar="KEY=VALUE",
+                        help="extra backend environment, repeatable (e.g. RUNTIME_MAX_CONCURRENT_RUNS=16)")
+    server.add_argument("--workdir", default=None, help="keep the isolated DB and server log here (default: temp dir)")
+
+    out = p.add_argument_group("output")
+    out.add_argument("--output-dir", default="reports/loadgen", help="report directory (default: reports/loadgen)")
+    out.add_argument("--name", default=None, help="report file stem (default: loadgen-<UTC timestamp>)")
+    return p
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    cfg = LoadConfig(
+        users=args.users,
+        rate=args.rate,
+        duration=args.duration,
+        streams_per_user=args.streams_per_user,
+        max_inflight=args.max_inflight,
+        llm=MockLLMConfig(
+            latency_ms=args.llm_latency_ms,
+            jitter_ms=args.llm_jitter_ms,
+            tokens_per_second=args.llm_tokens_per_second,
+            output_tokens=args.llm_output_tokens,
+            seed=args.seed,
+        ),
+        db_pool_size=args.db_pool_size,
+        db_max_overflow=args.db_max_overflow,
+        server_env=dict(args.env),
+        seed=args.seed,
+        workdir=args.workdir,
+    )
+    if args.mix is not None:
+        cfg.mix = args.mix
+    try:
+        cfg.validate()
+    except ValueError as exc:
+        print(f"loadgen: {exc}", file=sys.stderr)
+        return 2
+    report = run_load(cfg)
+    stem = args.name or "loadgen-" + datetime.datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    json_path, md_path = write_reports(report, args.output_dir, stem)
+    print(render_markdown(report))
+    print(f"reports: {json_path}  {md_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
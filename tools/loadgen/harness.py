@@ -0,0 +1,434 @@
+"""Backend subprocess, simulated users and the open-loop load driver."""
+from __future__ import annotations
+
+import asyncio
+import collections
+import datetime
+import json
+import os
+import random
+import secrets
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+from .mock_llm import MockLLMConfig, MockLLMServer, free_port
+from .report import summarize
+
+APP_DIR = Path(__file__).resolve().parents[2] / "backend" / "app"
+API = "/api/v1"
+ADMIN = "loadgen-admin"
+PASSWORD = "loadgen-secret-1"
+OPERATIONS = ("run", "chat", "kb", "task")
+RUN_TERMINAL = {"run.completed", "run.failed", "run.cancelled", "run.timeout"}
+
+
+@dataclass
+class LoadConfig:
+    users: int = 8
+    rate: float = 10.0  # operations per second across all users (Poisson arrivals)
+    duration: float = 30.0
+    mix: dict[str, float] = field(default_factory=lambda: {op: 1.0 for op in OPERATIONS})
+    streams_per_user: int = 1
+    max_inflight: int = 256
+    llm: MockLLMConfig = field(default_factory=MockLLMConfig)
+    db_pool_size: int | None = None
+    db_max_overflow: int | None = None
+    # extra backend environment, e.g. {"RUNTIME_MAX_CONCURRENT_RUNS": "16"}
+    server_env: dict[str, str] = field(default_factory=dict)
+    seed: int = 1
+    drain_timeout: float = 60.0
+    startup_timeout: float = 60.0
+    # keep the database and server log here instead of a temporary directory
+    workdir: str | None = None
+
+    def validate(self) -> None:
+        unknown = set(self.mix) - set(OPERATIONS)
+        if unknown:
+            raise ValueError(f"unknown operations in mix: {', '.join(sorted(unknown))}")
+        if not any(w > 0 for w in self.mix.values()):
+            raise ValueError("mix needs at least one operation with a positive weight")
+        if self.users < 1 or self.rate <= 0 or self.duration <= 0:
+            raise ValueError("users, rate and duration must be positive")
+
+
+class AppServer:
+    """The backend in a uvicorn subprocess on an isolated database and data directory."""
+
+    def __init__(self, workdir: str, env: dict[str, str], port: int | None = None):
+        self.workdir = workdir
+        self.port = port or free_port()
+        self.db_path = os.path.join(workdir, "modelforge.db")
+        self.log_path = os.path.join(workdir, "server.log")
+        data = os.path.join(workdir, "data")
+        self.env = {
+            **os.environ,
+            "MODELFORGE_ENV": "development",
+            "DATABASE_PATH": self.db_path,
+            "DATA_DIR": data,
+            "MODEL_DIR": os.path.join(data, "models"),
+            "DATASET_DIR": os.path.join(data, "datasets"),
+            "TRAIN_OUTPUT_DIR": os.path.join(data, "outputs"),
+            "PLUGINS_DIR": os.path.join(data, "plugins"),
+            "JWT_SECRET": secrets.token_urlsafe(48),
+            "RUNTIME_ADMIN_USERNAMES": ADMIN,
+            "SCHEDULES_ENABLED": "false",
+            "PROFILING_ENABLED": "true",
+            **env,
+        }
+        self._proc: subprocess.Popen | None = None
+        self._log: Any = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self, timeout: float = 60.0) -> AppServer:
+        self._log = open(self.log_path, "ab")
+        self._proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", str(APP_DIR),
+             "--host", "127.0.0.1", "--port", str(self.port), "--log-level", "warning", "--no-access-log",
+             # task SSE generators block up to their 10 s heartbeat before noticing a disconnect
+             "--timeout-graceful-shutdown", "2"],
+            env=self.env, cwd=self.workdir, stdout=self._log, stderr=subprocess.STDOUT,
+        )
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self._proc.poll() is not None:
+                raise RuntimeError(f"backend exited with code {self._proc.returncode}; see {self.log_path}")
+            try:
+                if httpx.get(self.url + "/healthz", timeout=1.0).status_code == 200:
+                    return self
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+        self.stop()
+        raise RuntimeError(f"backend did not become healthy within {timeout:g}s; see {self.log_path}")
+
+    def stop(self) -> None:
+        if self._proc is not None and self._proc.poll() is None:
+            self._proc.terminate()
+            try:
+                self._proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self._proc.kill()
+                self._proc.wait()
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+
+@dataclass
+class SimUser:
+    index: int
+    headers: dict[str, str]
+    agent: str
+    # task title -> perf_counter when POST /tasks was sent, read by the user's SSE streams
+    pending_tasks: dict[str, float] = field(default_factory=dict)
+
+
+class Recorder:
+    """Millisecond samples and error classes per operation name."""
+
+    def __init__(self):
+        self.samples: dict[str, list[float]] = collections.defaultdict(list)
+        self.errors: dict[str, collections.Counter] = collections.defaultdict(collections.Counter)
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.delivered = 0
+        self.expected_deliveries = 0
+
+    def add(self, name: str, started: float) -> None:
+        self.samples[name].append((time.perf_counter() - started) * 1000)
+
+    def error(self, name: str, exc: BaseException) -> None:
+        if isinstance(exc, httpx.HTTPStatusError):
+            key = str(exc.response.status_code)
+        elif isinstance(exc, httpx.TimeoutException):
+            key = "timeout"
+        else:
+            key = type(exc).__name__
+        self.errors[name][key] += 1
+
+
+def _kb_text(index: int) -> str:
+    rng = random.Random(index)
+    words = ["runtime", "outbox", "latency", "tokens", "agent", "stream", "cursor", "budget", "pool", "queue"]
+    return "\n\n".join(" ".join(rng.choice(words) for _ in range(60)) for _ in range(20))
+
+
+async def _login(base_url: str, username: str) -> dict[str, str]:
+    # a throwaway client per login keeps session cookies off the shared load client
+    async with httpx.AsyncClient(base_url=base_url, timeout=30.0) as c:
+        await c.post(f"{API}/auth/register", json={"username": username, "password": PASSWORD, "email": username + "@loadgen.local"})
+        r = await c.post(f"{API}/auth/login", json={"username": username, "password": PASSWORD})
+        r.raise_for_status()
+        return {"Authorization": "Bearer " + r.json()["token"]}
+
+
+async def _setup_user(client: httpx.AsyncClient, base_url: str, index: int, cfg: LoadConfig) -> SimUser:
+    headers = await _login(base_url, f"loadgen-{index}")
+    agent = f"loadgen-agent-{index}"
+    r = await client.post(f"{API}/agent/create", json={"name": agent, "model": cfg.llm.model}, headers=headers)
+    r.raise_for_status()
+    files = {"file": (f"loadgen-{index}.txt", _kb_text(index).encode(), "text/plain")}
+    r = await client.post(f"{API}/knowledge/upload", files=files, headers=headers)
+    r.raise_for_status()
+    return SimUser(index=index, headers=headers, agent=agent)
+
+
+async def _read_sse(response: httpx.Response):
+    """Yield ``(event, data)`` pairs of an SSE response; comments are skipped."""
+    event, data = None, []
+    async for line in response.aiter_lines():
+        if not line:
+            if data:
+                yield event, "\n".join(data)
+            event, data = None, []
+        elif line.startswith("event:"):
+            event = line[6:].strip()
+        elif line.startswith("data:"):
+            data.append(line[5:].strip())
+
+
+async def _task_stream(client: httpx.AsyncClient, user: SimUser, rec: Recorder, ready: asyncio.Event) -> None:
+    try:
+        async with client.stream("GET", f"{API}/tasks/stream", headers=user.headers, timeout=httpx.Timeout(None, connect=10.0)) as r:
+            r.raise_for_status()
+            ready.set()
+            async for event, data in _read_sse(r):
+                if event != "task.created":
+                    continue
+                title = (json.loads(data).get("payload") or {}).get("task", {}).get("title")
+                sent = user.pending_tasks.get(title)
+                if sent is not None:
+                    rec.add("task.delivery", sent)
+                    rec.delivered += 1
+    except (httpx.HTTPError, asyncio.CancelledError):
+        ready.set()
+        raise
+
+
+async def _op_run(client: httpx.AsyncClient, user: SimUser, rec: Recorder) -> None:
+    started = time.perf_counter()
+    r = await client.post(f"{API}/agent/runs", json={"agent_id": user.agent, "input": "summarise the outbox design"}, headers=user.headers)
+    r.raise_for_status()
+    rec.add("run.create", started)
+    run_id = r.json()["run_id"]
+    async with client.stream("GET", f"{API}/agent/runs/{run_id}/stream", headers=user.headers) as stream:
+        stream.raise_for_status()
+        async for event, _ in _read_sse(stream):
+            if event in RUN_TERMINAL:
+                if event != "run.completed":
+                    raise RuntimeError(event)
+                break
+    rec.add("run", started)
+
+
+async def _op_chat(client: httpx.AsyncClient, user: SimUser, rec: Recorder, model: str) -> None:
+    started = time.perf_counter()
+    body = {"model": model, "messages": [{"role": "user", "content": "how does the task outbox work?"}]}
+    first = True
+    async with client.stream("POST", f"{API}/chat/stream", json=body, headers=user.headers) as stream:
+        stream.raise_for_status()
+        async for _, data in _read_sse(stream):
+            item = json.loads(data)
+            if item.get("type") == "error":
+                raise RuntimeError(item["data"].get("code", "chat error"))
+            if first and item.get("type") == "delta":
+                rec.add("chat.ttft", started)
+                first = False
+            if item.get("type") == "done":
+                break
+    rec.add("chat", started)
+
+
+async def _op_kb(client: httpx.AsyncClient, user: SimUser, rec: Recorder) -> None:
+    started = time.perf_counter()
+    r = await client.post(f"{API}/knowledge/query", json={"question": "outbox latency budget", "top_k": 3}, headers=user.headers)
+    r.raise_for_status()
+    rec.add("kb.query", started)
+
+
+async def _op_task(client: httpx.AsyncClient, user: SimUser, rec: Recorder, streams: int) -> None:
+    title = "loadgen " + uuid.uuid4().hex
+    started = time.perf_counter()
+    user.pending_tasks[title] = started
+    rec.expected_deliveries += streams
+    r = await client.post(f"{API}/tasks", json={"task_type": "loadgen", "source": "loadgen", "title": title}, headers=user.headers)
+    r.raise_for_status()
+    rec.add("task.create", started)
+
+
+async def _timed(op: str, coro: Any, rec: Recorder) -> None:
+    try:
+        await coro
+        rec.completed += 1
+    except Exception as exc:
+        rec.failed += 1
+        rec.error(op, exc)
+
+
+def _outbox_lag(db_path: str) -> dict[str, Any]:
+    """Dispatch lag of every outbox row and the undispatched backlog, read from the isolated DB."""
+    with sqlite3.connect(db_path) as conn:
+        backlog = conn.execute("SELECT COUNT(*) FROM task_outbox WHERE dispatched_at IS NULL").fetchone()[0]
+        lags = [row[0] for row in conn.execute(
+            "SELECT (julianday(dispatched_at) - julianday(created_at)) * 86400000.0 "
+            "FROM task_outbox WHERE dispatched_at IS NOT NULL"
+        )]
+    summary = summarize([max(0.0, lag) for lag in lags])
+    return {"rows": len(lags) + backlog, "backlog": backlog, **{k: v for k, v in summary.items() if k != "count"}}
+
+
+async def _server_metrics(client: httpx.AsyncClient, headers: dict[str, str]) -> dict[str, Any]:
+    metrics = (await client.get(f"{API}/agent/metrics", headers=headers)).json()
+    profiling = (await client.get(f"{API}/system/profiling", headers=headers)).json()
+    wait = "db_session_wait_duration"
+    loop = profiling.get("event_loop") or {}
+    return {
+        "db_pool": {
+            "checkouts": metrics.get(wait + "_total", 0),
+            **{f"p{q}_ms": round(metrics.get(f"{wait}_p{q}", 0.0) * 1000, 2) for q in (50, 95, 99)},
+            "max_ms": round(metrics.get(wait + "_max", 0.0) * 1000, 2),
+        },
+        "event_loop": {
+            "lag_p50_ms": loop.get("lag_p50_ms", 0.0),
+            "lag_p99_ms": loop.get("lag_p99_ms", 0.0),
+            "lag_max_ms": loop.get("lag_max_ms", 0.0),
+            "stalls": len(loop.get("stalls") or []),
+        },
+        "server_routes": [r for r in profiling.get("routes", []) if r["route"] != f"{API}/system/profiling"],
+    }
+
+
+async def _drive(cfg: LoadConfig, base_url: str, server: AppServer) -> dict[str, Any]:
+    rng = random.Random(cfg.seed)
+    rec = Recorder()
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=64)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120.0, limits=limits) as client:
+        admin = await _login(base_url, ADMIN)
+        users = list(await asyncio.gather(*(_setup_user(client, base_url, i, cfg) for i in range(cfg.users))))
+
+        streams: list[asyncio.Task] = []
+        for user in users:
+            for _ in range(cfg.streams_per_user):
+                ready = asyncio.Event()
+                streams.append(asyncio.create_task(_task_stream(client, user, rec, ready)))
+                await asyncio.wait_for(ready.wait(), timeout=30.0)
+
+        ops = [op for op in OPERATIONS if cfg.mix.get(op, 0) > 0]
+        weights = [cfg.mix[op] for op in ops]
+        inflight: set[asyncio.Task] = set()
+        started = time.perf_counter()
+        next_at = started
+        while True:
+            next_at += rng.expovariate(cfg.rate)
+            if next_at - started >= cfg.duration:
+                break
+            await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+            if len(inflight) >= cfg.max_inflight:
+                rec.dropped += 1
+                continue
+            op = rng.choices(ops, weights)[0]
+            user = rng.choice(users)
+            if op == "run":
+                coro = _op_run(client, user, rec)
+            elif op == "chat":
+                coro = _op_chat(client, user, rec, cfg.llm.model)
+            elif op == "kb":
+                coro = _op_kb(client, user, rec)
+            else:
+                coro = _op_task(client, user, rec, cfg.streams_per_user)
+            task = asyncio.create_task(_timed(op, coro, rec))
+            inflight.add(task)
+            task.add_done_callback(inflight.discard)
+        if inflight:
+            await asyncio.wait(inflight, timeout=cfg.drain_timeout)
+        elapsed = time.perf_counter() - started
+
+        # give the outbox publisher a moment to wake the streams for the last tasks
+        deadline = time.monotonic() + 10.0
+        while rec.delivered < rec.expected_deliveries and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        for task in streams:
+            task.cancel()
+        await asyncio.gather(*streams, return_exceptions=True)
+        for task in inflight:
+            task.cancel()
+
+        server_side = await _server_metrics(client, admin)
+
+    operations = {}
+    # latency rows and the operation whose failures they report
+    rows = (("run", "run"), ("run.create", None), ("chat", "chat"), ("chat.ttft", None), ("kb.query", "kb"), ("task.create", "task"))
+    for name, op in rows:
+        values = rec.samples.get(name, [])
+        errors = dict(rec.errors.get(op, {})) if op else {}
+        if values or errors:
+            operations[name] = {**summarize(values), "errors": errors, "throughput_per_s": round(len(values) / elapsed, 2)}
+    delivery = summarize(rec.samples.get("task.delivery", []))
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "throughput": {
+            "target_rate": cfg.rate,
+            "achieved_rate": round(rec.completed / elapsed, 2),
+            "completed": rec.completed,
+            "errors": rec.failed,
+            "dropped": rec.dropped,
+        },
+        "operations": operations,
+        "task_streams": {
+            "streams": len(streams),
+            "expected": rec.expected_deliveries,
+            "delivered": rec.delivered,
+            "missing": max(0, rec.expected_deliveries - rec.delivered),
+            **{k: v for k, v in delivery.items() if k != "count"},
+        },
+        "outbox": _outbox_lag(server.db_path),
+        **server_side,
+    }
+
+
+def run_load(cfg: LoadConfig) -> dict[str, Any]:
+    """Run one load test end to end and return the report dict."""
+    cfg.validate()
+    started_at = datetime.datetime.utcnow().replace(microsecond=0).isoformat()
+    env = dict(cfg.server_env)
+    if cfg.db_pool_size is not None:
+        env["DATABASE_POOL_SIZE"] = str(cfg.db_pool_size)
+    if cfg.db_max_overflow is not None:
+        env["DATABASE_MAX_OVERFLOW"] = str(cfg.db_max_overflow)
+
+    tmp = None
+    workdir = cfg.workdir
+    if workdir is None:
+        tmp = tempfile.TemporaryDirectory(prefix="modelforge-loadgen-")
+        workdir = tmp.name
+    os.makedirs(workdir, exist_ok=True)
+    mock = MockLLMServer(cfg.llm).start()
+    try:
+        server = AppServer(workdir, {**env, "OLLAMA_BASE_URL": mock.url}).start(cfg.startup_timeout)
+        try:
+            result = asyncio.run(_drive(cfg, server.url, server))
+        finally:
+            server.stop()
+        return {
+            "started_at": started_at,
+            "config": asdict(cfg),
+            **result,
+            "mock_llm": mock.stats,
+        }
+    finally:
+        mock.stop()
+        if tmp is not None:
+            tmp.cleanup()
@@ -0,0 +1,161 @@
+"""Ollama-compatible mock model server with injected latency and token rate.
+
+The backend's default runtime (chat) and default agent provider both speak
+the Ollama ``/api/chat`` protocol, so pointing ``OLLAMA_BASE_URL`` here puts
+every model call of a load run on a model whose cost is known exactly:
+``latency_ms`` (+/- ``jitter_ms``) before the first token, then
+``output_tokens`` tokens at ``tokens_per_second``.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import socket
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+
+@dataclass
+class MockLLMConfig:
+    model: str = "loadgen-mock"
+    latency_ms: float = 200.0
+    jitter_ms: float = 0.0
+    tokens_per_second: float = 50.0  # 0 = emit all tokens at once
+    output_tokens: int = 64
+    seed: int = 1
+
+
+@dataclass
+class MockLLMStats:
+    requests: int = 0
+    streamed: int = 0
+    in_flight: int = 0
+    max_in_flight: int = 0
+    output_tokens: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def enter(self, stream: bool) -> None:
+        with self._lock:
+            self.requests += 1
+            self.streamed += int(stream)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def leave(self, tokens: int) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self.output_tokens += tokens
+
+    def to_dict(self) -> dict[str, int]:
+        return {
+            "requests": self.requests,
+            "streamed": self.streamed,
+            "max_in_flight": self.max_in_flight,
+            "output_tokens": self.output_tokens,
+        }
+
+
+def create_mock_app(cfg: MockLLMConfig, stats: MockLLMStats | None = None) -> FastAPI:
+    """ASGI app serving ``/api/tags`` and ``/api/chat`` (streaming and not)."""
+    app = FastAPI(title="loadgen mock LLM")
+    app.state.stats = stats = stats or MockLLMStats()
+    rng = random.Random(cfg.seed)
+
+    def first_token_delay() -> float:
+        jitter = rng.uniform(-cfg.jitter_ms, cfg.jitter_ms) if cfg.jitter_ms else 0.0
+        return max(0.0, cfg.latency_ms + jitter) / 1000
+
+    token_delay = 1 / cfg.tokens_per_second if cfg.tokens_per_second > 0 else 0.0
+    tokens = [f"tok{i} " for i in range(cfg.output_tokens)]
+
+    @app.get("/api/tags")
+    async def tags():
+        return {"models": [{"name": cfg.model}]}
+
+    @app.post("/api/chat")
+    async def chat(request: Request):
+        body = await request.json()
+        stream = body.get("stream", True)  # Ollama streams unless told otherwise
+        prompt_tokens = sum(len(str(m.get("content") or "")) for m in body.get("messages") or []) // 4
+        stats.enter(stream)
+        if not stream:
+            try:
+                await asyncio.sleep(first_token_delay() + token_delay * len(tokens))
+            finally:
+                stats.leave(len(tokens))
+            return {
+                "model": body.get("model", cfg.model),
+                "message": {"role": "assistant", "content": "".join(tokens).strip()},
+                "done": True,
+                "prompt_eval_count": prompt_tokens,
+                "eval_count": len(tokens),
+            }
+
+        async def ndjson():
+            sent = 0
+            try:
+                await asyncio.sleep(first_token_delay())
+                for token in tokens:
+                    yield json.dumps({"message": {"role": "assistant", "content": token}, "done": False}) + "\n"
+                    sent += 1
+                    if token_delay:
+                        await asyncio.sleep(token_delay)
+                yield json.dumps({"done": True, "prompt_eval_count": prompt_tokens, "eval_count": sent}) + "\n"
+            finally:
+                stats.leave(sent)
+
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats.to_dict()
+
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class MockLLMServer:
+    """Serves the mock app with uvicorn on a background thread."""
+
+    def __init__(self, cfg: MockLLMConfig, port: int | None = None):
+        import uvicorn
+
+        self.cfg = cfg
+        self.port = port or free_port()
+        self.app = create_mock_app(cfg)
+        self._server = uvicorn.Server(uvicorn.Config(
+            self.app, host="127.0.0.1", port=self.port, log_level="warning", access_log=False,
+        ))
+        self._thread = threading.Thread(target=self._server.run, name="loadgen-mock-llm", daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        return self.app.state.stats.to_dict()
+
+    def start(self, timeout: float = 10.0) -> MockLLMServer:
+        self._thread.start()
+        deadline = time.monotonic() + timeout
+        while not self._server.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError("mock LLM server did not start")
+            time.sleep(0.02)
+        return self
+
+    def stop(self) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=5.0)
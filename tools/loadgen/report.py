@@ -0,0 +1,112 @@
+"""Latency summaries and the JSON / Markdown load reports."""
+from __future__ import annotations
+
+import json
+import math
+import os
+from typing import Any
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Linearly interpolated quantile ``q`` (0..1) of ``values``; 0.0 when empty."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * q
+    lo, hi = math.floor(pos), math.ceil(pos)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+
+def summarize(values: list[float]) -> dict[str, float]:
+    """count / mean / p50 / p95 / p99 / max of millisecond samples."""
+    return {
+        "count": len(values),
+        "mean_ms": round(sum(values) / len(values), 2) if values else 0.0,
+        "p50_ms": round(percentile(values, 0.50), 2),
+        "p95_ms": round(percentile(values, 0.95), 2),
+        "p99_ms": round(percentile(values, 0.99), 2),
+        "max_ms": round(max(values), 2) if values else 0.0,
+    }
+
+
+def _row(cells: list[Any]) -> str:
+    return "| " + " | ".join(str(c) for c in cells) + " |"
+
+
+def render_markdown(report: dict[str, Any]) -> str:
+    cfg = report["config"]
+    llm = cfg["llm"]
+    totals = report["throughput"]
+    lines = [
+        "# ModelForge 负载测试报告",
+        "",
+        f"**执行时间**：{report['started_at']}（UTC），持续 {report['elapsed_s']} s",
+        "",
+        f"**场景**：{cfg['users']} 个用户，目标 {cfg['rate']} 次操作/秒，操作配比 "
+        + "、".join(f"{k}={v:g}" for k, v in cfg["mix"].items())
+        + f"，每用户 {cfg['streams_per_user']} 条任务 SSE 连接。",
+        "",
+        f"**Mock 模型**：首 token 延迟 {llm['latency_ms']:g} ms（±{llm['jitter_ms']:g} ms），"
+        f"{llm['tokens_per_second']:g} token/s，每次输出 {llm['output_tokens']} token。"
+        f"数据库：隔离 SQLite，连接池 {cfg['db_pool_size'] or '默认'} + 溢出 {cfg['db_max_overflow'] or '默认'}。",
+        "",
+        "## 吞吐",
+        "",
+        _row(["目标速率", "实际完成速率", "完成", "错误", "丢弃（超出并发上限）"]),
+        _row(["---"] * 5),
+        _row([f"{totals['target_rate']:g}/s", f"{totals['achieved_rate']:g}/s", totals["completed"], totals["errors"], totals["dropped"]]),
+        "",
+        "## 操作延迟",
+        "",
+        _row(["操作", "次数", "错误", "吞吐 (/s)", "p50 (ms)", "p95 (ms)", "p99 (ms)", "max (ms)"]),
+        _row(["---"] * 8),
+    ]
+    for name, op in report["operations"].items():
+        errors = ", ".join(f"{k}×{v}" for k, v in op["errors"].items()) or "0"
+        lines.append(_row([name, op["count"], errors, op["throughput_per_s"], op["p50_ms"], op["p95_ms"], op["p99_ms"], op["max_ms"]]))
+    streams, outbox, pool, loop = report["task_streams"], report["outbox"], report["db_pool"], report["event_loop"]
+    lines += [
+        "",
+        "## 任务 SSE 与 Outbox",
+        "",
+        f"- SSE 连接 {streams['streams']} 条：应交付 {streams['expected']}，已交付 {streams['delivered']}，缺失 {streams['missing']}。",
+        f"- 交付延迟（POST /tasks 发出 → SSE 收到）p50 / p95 / p99：{streams['p50_ms']} / {streams['p95_ms']} / {streams['p99_ms']} ms。",
+        f"- Outbox 派发滞后（写入 → 派发）p50 / p95 / p99 / max：{outbox['p50_ms']} / {outbox['p95_ms']} / {outbox['p99_ms']} / {outbox['max_ms']} ms，"
+        f"共 {outbox['rows']} 行，结束时积压 **{outbox['backlog']}**。",
+        "",
+        "## 服务端资源",
+        "",
+        f"- 数据库连接池借用等待（{pool['checkouts']} 次）p50 / p95 / p99 / max：{pool['p50_ms']} / {pool['p95_ms']} / {pool['p99_ms']} / {pool['max_ms']} ms。",
+        f"- 事件循环滞后 p50 / p99 / max：{loop['lag_p50_ms']} / {loop['lag_p99_ms']} / {loop['lag_max_ms']} ms，卡顿 {loop['stalls']} 次。",
+        f"- Mock 模型：{report['mock_llm'].get('requests', 0)} 次请求，最大并发 {report['mock_llm'].get('max_in_flight', 0)}。",
+    ]
+    routes = report.get("server_routes") or []
+    if routes:
+        lines += [
+            "",
+            "## 服务端路由延迟（至响应开始）",
+            "",
+            _row(["方法", "路由", "状态", "次数", "p50 (ms)", "p95 (ms)", "p99 (ms)"]),
+            _row(["---"] * 7),
+        ]
+        for r in routes:
+            lines.append(_row([r["method"], r["route"], r["status"], r["count"], r["p50_ms"], r["p95_ms"], r["p99_ms"]]))
+    lines += [
+        "",
+        "> 结果仅适用于上述单进程、SQLite、Mock 模型配置；在其他机器上以相同参数重跑即可复现对比。",
+        "",
+    ]
+    return "\n".join(lines)
+
+
+def write_reports(report: dict[str, Any], output_dir: str, stem: str) -> tuple[str, str]:
+    """Write ``<stem>.json`` and ``<stem>.md`` under ``output_dir``; returns both paths."""
+    os.makedirs(output_dir, exist_ok=True)
+    json_path = os.path.join(output_dir, stem + ".json")
+    md_path = os.path.join(output_dir, stem + ".md")
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    with open(md_path, "w", encoding="utf-8") as f:
+        f.write(render_markdown(report))
+    return json_path, md_path